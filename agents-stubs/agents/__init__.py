@@ -5,4 +5,4 @@ __all__ = [
     "metadata_gen",
     "mint_approval",
 ]
-# agents package
\ No newline at end of file
+# agents package
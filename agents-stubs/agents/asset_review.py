@@ -9,21 +9,23 @@ Whisper) via the `integrations` module. If those libraries are not
 installed, the integrations return safe stubs and the agent continues.
 """
 
+import contextlib
 import json
 import logging
 import os
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
 
 def _load_integrations():
     """Load the integrations module in a way that works whether this file
-    is executed as a package member or loaded directly via a proxy loader.
+    is imported as a package member or run directly as a script.
     """
     try:
-        # prefer the proxy-exposed package if available
-        import agents.integrations as integrations_module
+        # the sibling module, shared with every other importer (one model cache)
+        from . import integrations as integrations_module
         return integrations_module
-    except Exception:
+    except ImportError:
         pass
 
     # Fallback: load the integrations.py file next to this source file
@@ -67,6 +69,78 @@ integrations = _load_integrations()
 
 logger = logging.getLogger("mighty.asset_review")
 
+try:
+    from agents_stubs.utils.jsonio import write_json
+    from agents_stubs.utils.metrics import REGISTRY as _METRICS
+    from agents_stubs.utils.profiling import peak_rss_bytes, rss_bytes
+    from agents_stubs.utils.tracing import span as _span
+except ModuleNotFoundError as e:
+    if e.name != "agents_stubs":
+        raise
+    # run as a script: plain json, and no metrics, memory accounting or tracing
+    _METRICS = peak_rss_bytes = rss_bytes = None
+
+    def write_json(path, obj, compact=False):
+        with open(path, "w") as f:
+            json.dump(obj, f, indent=None if compact else 2)
+        return path
+
+    @contextlib.contextmanager
+    def _span(name, **attributes):
+        yield None
+
+MEMORY_BUCKETS = tuple(2 ** n * 1024 * 1024 for n in range(0, 14))  # 1 MiB .. 8 GiB
+
+
+def _call_integration(name: str, fn: Callable[..., Any], *args: Any, mode: str = "single") -> Any:
+    """Call an integration, recording its latency per integration and outcome.
+
+    Outcome is `ok`, `empty` (the integration fell back to None) or `error`.
+    Also records how much the call grew RSS and the process's peak RSS, to
+    spot integrations heading for an OOM. Concurrent calls share one process,
+    so the deltas are an upper bound under load.
+    """
+    start = time.perf_counter()
+    rss_before = rss_bytes() if rss_bytes else 0
+    peak_before = peak_rss_bytes() if peak_rss_bytes else 0
+    rss_delta = peak_delta = 0
+    outcome = "error"
+    try:
+        with _span(f"integration.{name}", mode=mode) as span:
+            try:
+                result = fn(*args)
+                outcome = "ok" if result is not None else "empty"
+            finally:
+                if rss_bytes:
+                    rss_delta = rss_bytes() - rss_before
+                    peak_delta = peak_rss_bytes() - peak_before
+                if span is not None:
+                    span.set_attribute("outcome", outcome)
+                    span.set_attribute("rss_delta_bytes", rss_delta)
+                    span.set_attribute("peak_rss_delta_bytes", peak_delta)
+        return result
+    finally:
+        if _METRICS is not None:
+            _METRICS.histogram(
+                "mighty_integration_duration_seconds",
+                "Model integration latency",
+                ("integration", "mode", "outcome"),
+            ).labels(integration=name, mode=mode, outcome=outcome).observe(
+                time.perf_counter() - start
+            )
+            _METRICS.histogram(
+                "mighty_integration_rss_delta_bytes",
+                "Resident memory growth across one integration call",
+                ("integration", "mode"),
+                buckets=MEMORY_BUCKETS,
+            ).labels(integration=name, mode=mode).observe(max(0, rss_delta))
+            _METRICS.histogram(
+                "mighty_integration_peak_rss_delta_bytes",
+                "Growth of the process peak RSS during one integration call",
+                ("integration", "mode"),
+                buckets=MEMORY_BUCKETS,
+            ).labels(integration=name, mode=mode).observe(max(0, peak_delta))
+
 
 def _find_local_asset_path(manifest: Optional[Dict[str, Any]]) -> Optional[str]:
     """Try to determine a local file path for the asset from the manifest.
@@ -82,63 +156,132 @@ def _find_local_asset_path(manifest: Optional[Dict[str, Any]]) -> Optional[str]:
     return None
 
 
-def run_asset_review(asset_cid: str, manifest: Dict[str, Any] = None) -> Dict[str, Any]:
+def _report(progress: Optional[Callable[..., None]], stage: str, status: str) -> None:
+    if progress is None:
+        return
+    try:
+        progress(stage, status)
+    except Exception as e:
+        logger.debug("Progress callback failed: %s", e)
+
+
+def run_asset_review(
+    asset_cid: str, manifest: Dict[str, Any] = None, progress: Optional[Callable[..., None]] = None
+) -> Dict[str, Any]:
     """Run a lightweight asset review and return suggestion + qc report.
 
     The function is resilient: integrations may be missing and will return
-    None or stubbed values.
+    None or stubbed values. `progress(stage, status)`, if given, is called as
+    each stage (`depth`, `segmentation`, `clip`, `transcription`, `qc`)
+    starts and finishes.
     """
-    ts = int(time.time())
-    card_id = (manifest or {}).get("card_id", f"card_{ts}")
+    with _span("asset_review", asset_cid=asset_cid):
+        # Attempt to locate a local image/audio path referenced in the manifest
+        image_path = _find_local_asset_path(manifest)
+        audio_path = (manifest or {}).get("audio_path")
+
+        # Run optional integrations
+        depth_map = None
+        segmentation = None
+        clip_tags: List[Dict[str, Any]] = []
+        transcription: Dict[str, Any] = {}
+
+        depth_plan = None
+
+        if image_path:
+            _report(progress, "depth", "started")
+            try:
+                depth_plan = _depth_plans([image_path])
+                args = (image_path,) if depth_plan is None else (image_path, depth_plan[0])
+                depth_map = _call_integration(
+                    "depth", integrations.estimate_depth_from_image, *args
+                )
+            except Exception as e:
+                logger.debug("Depth estimation failed: %s", e)
+            _report(progress, "depth", "done")
+
+            _report(progress, "segmentation", "started")
+            try:
+                segmentation = _call_integration(
+                    "segmentation", integrations.run_segmentation, image_path
+                )
+            except Exception as e:
+                logger.debug("Segmentation failed: %s", e)
+            _report(progress, "segmentation", "done")
+
+            _report(progress, "clip", "started")
+            try:
+                clip_tags = _call_integration("clip", integrations.clip_image_tags, image_path)
+            except Exception as e:
+                logger.debug("CLIP tagging failed: %s", e)
+            _report(progress, "clip", "done")
+        else:
+            for stage in ("depth", "segmentation", "clip"):
+                _report(progress, stage, "skipped")
+
+        if audio_path and os.path.exists(audio_path):
+            _report(progress, "transcription", "started")
+            try:
+                transcription = _call_integration(
+                    "whisper", integrations.transcribe_audio, audio_path
+                )
+            except Exception as e:
+                logger.debug("Audio transcription failed: %s", e)
+            _report(progress, "transcription", "done")
+        else:
+            _report(progress, "transcription", "skipped")
+
+        res = _build_review(
+            asset_cid, manifest, image_path, depth_map, segmentation, clip_tags, transcription,
+            depth_plan[0] if depth_plan else None,
+        )
+        _report(progress, "qc", "done")
+        return res
+
+
+def _depth_plans(paths: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """Ask the integrations for depth plans (variant, resolution, strategy) if they make them.
+
+    The plans are filled in with the outcome by the depth integration and
+    end up in the QC report. Stub integrations without a planner get None.
+    """
+    planner = getattr(integrations, "plan_depth", None)
+    if planner is None:
+        return None
+    try:
+        return [planner(p) for p in paths]
+    except Exception as e:
+        logger.debug("Depth planning failed: %s", e)
+        return None
 
-    # Attempt to locate a local image/audio path referenced in the manifest
-    image_path = _find_local_asset_path(manifest)
-    audio_path = (manifest or {}).get("audio_path")
 
-    # Run optional integrations
-    depth_map = None
-    segmentation = None
-    clip_tags: List[Dict[str, Any]] = []
-    transcription: Dict[str, Any] = {}
+def _split_artifact(value: Any) -> Tuple[Optional[str], Optional[str]]:
+    """An integration returns either a local path or a CID string."""
+    if isinstance(value, str):
+        if os.path.exists(value):
+            return value, None
+        return None, value
+    return None, None
+
+
+def _build_review(
+    asset_cid: str,
+    manifest: Optional[Dict[str, Any]],
+    image_path: Optional[str],
+    depth_map: Any,
+    segmentation: Any,
+    clip_tags: List[Dict[str, Any]],
+    transcription: Dict[str, Any],
+    depth_plan: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    ts = int(time.time())
+    card_id = (manifest or {}).get("card_id", f"card_{ts}")
 
     # We'll store both local paths and CIDs when available, grouped into objects
-    depth_map_path = None
-    depth_map_cid = None
-    segmentation_path = None
-    segmentation_cid = None
-
-    if image_path:
-        try:
-            depth_map = integrations.estimate_depth_from_image(image_path)
-            # integration returns either a local path or a CID string
-            if isinstance(depth_map, str):
-                if os.path.exists(depth_map):
-                    depth_map_path = depth_map
-                else:
-                    depth_map_cid = depth_map
-        except Exception as e:
-            logger.debug("Depth estimation failed: %s", e)
-
-        try:
-            segmentation = integrations.run_segmentation(image_path)
-            if isinstance(segmentation, str):
-                if os.path.exists(segmentation):
-                    segmentation_path = segmentation
-                else:
-                    segmentation_cid = segmentation
-        except Exception as e:
-            logger.debug("Segmentation failed: %s", e)
-
-        try:
-            clip_tags = integrations.clip_image_tags(image_path)
-        except Exception as e:
-            logger.debug("CLIP tagging failed: %s", e)
-
-    if audio_path and os.path.exists(audio_path):
-        try:
-            transcription = integrations.transcribe_audio(audio_path)
-        except Exception as e:
-            logger.debug("Audio transcription failed: %s", e)
+    depth_map_path, depth_map_cid = _split_artifact(depth_map)
+    segmentation_path, segmentation_cid = _split_artifact(segmentation)
+    clip_tags = clip_tags or []
+    transcription = transcription or {}
 
     # Build metadata suggestion
     metadata = {
@@ -146,7 +289,11 @@ def run_asset_review(asset_cid: str, manifest: Dict[str, Any] = None) -> Dict[st
         "asset_cid": asset_cid,
         "project": (manifest or {}).get("project", "UnknownProject"),
         "animator_version": (manifest or {}).get("animator_version", "stub-v1"),
-        "tags": [t.get("tag") for t in clip_tags] if clip_tags else (manifest or {}).get("tags", ["hiphop", "animated"]),
+        "tags": (
+            [t.get("tag") for t in clip_tags]
+            if clip_tags
+            else (manifest or {}).get("tags", ["hiphop", "animated"])
+        ),
         "depth_map": {"path": depth_map_path, "cid": depth_map_cid},
         "segmentation": {"path": segmentation_path, "cid": segmentation_cid},
         "transcription": transcription,
@@ -160,12 +307,17 @@ def run_asset_review(asset_cid: str, manifest: Dict[str, Any] = None) -> Dict[st
         qc_issues.append("low_confidence")
     if not image_path:
         qc_issues.append("no_local_image")
+    if depth_plan and depth_plan.get("status") in ("skipped", "out_of_memory"):
+        qc_issues.append("depth_skipped_low_memory")
 
     qc = {
         "card_id": card_id,
         "confidence_score": confidence_score,
         "issues": qc_issues,
     }
+    if depth_plan is not None:
+        # which MiDaS variant, resolution and strategy the scheduler chose, and how it went
+        qc["depth_plan"] = depth_plan
 
     # Suggested anchors: if segmentation available, propose anchors from masks
     anchors: List[Dict[str, Any]] = []
@@ -196,10 +348,118 @@ def run_asset_review(asset_cid: str, manifest: Dict[str, Any] = None) -> Dict[st
     return {"metadata_suggestion": metadata, "qc_report": qc, "suggested_ad_anchors": anchors}
 
 
-def run(asset_cid: str, manifest_path: Optional[str], out_dir: str) -> None:
-    """CLI-friendly runner that writes JSON files to out_dir.
+def _run_batched(
+    name: str,
+    batch_name: str,
+    single_name: str,
+    paths: List[str],
+    extra: Optional[List[Any]] = None,
+) -> List[Any]:
+    """Call the integration's batch entry point, falling back to per-item calls.
+
+    `extra`, if given, is passed alongside the paths (one entry per path).
+    """
+    batch_fn = getattr(integrations, batch_name, None)
+    if batch_fn is not None:
+        try:
+            args = (paths,) if extra is None else (paths, extra)
+            return list(_call_integration(name, batch_fn, *args, mode="batch"))
+        except Exception as e:
+            logger.debug("%s failed, falling back to %s: %s", batch_name, single_name, e)
+    return _run_each(name, single_name, paths, extra)
+
+
+def _run_each(
+    name: str,
+    single_name: str,
+    paths: List[str],
+    extra: Optional[List[Any]] = None,
+) -> List[Any]:
+    """Call the integration once per path; a failed item yields None."""
+    single_fn = getattr(integrations, single_name)
+    out = []
+    for n, p in enumerate(paths):
+        try:
+            out.append(
+                _call_integration(name, single_fn, *((p,) if extra is None else (p, extra[n])))
+            )
+        except Exception as e:
+            logger.debug("%s failed: %s", single_name, e)
+            out.append(None)
+    return out
+
+
+def run_asset_review_batch(
+    requests: List[Tuple[str, Optional[Dict[str, Any]]]],
+) -> List[Dict[str, Any]]:
+    """Review several `(asset_cid, manifest)` pairs with one batched depth call.
+
+    Only MiDaS has a real batched forward pass; SAM embeds one image at a
+    time and CLIP is still a placeholder, so both run per image. Results
+    are in input order and match what `run_asset_review` returns for each
+    pair.
+    """
+    resolved = [(cid, manifest, _find_local_asset_path(manifest)) for cid, manifest in requests]
+    imaged = [i for i, r in enumerate(resolved) if r[2]]
+    paths = [resolved[i][2] for i in imaged]
+
+    depth: Dict[int, Any] = {}
+    depth_plan: Dict[int, Any] = {}
+    segmentation: Dict[int, Any] = {}
+    clip: Dict[int, Any] = {}
+    if paths:
+        plans = _depth_plans(paths)
+        if plans is not None:
+            depth_plan = dict(zip(imaged, plans))
+        depth = dict(
+            zip(
+                imaged,
+                _run_batched(
+                    "depth", "estimate_depth_batch", "estimate_depth_from_image", paths, plans
+                ),
+            )
+        )
+        segmentation = dict(zip(imaged, _run_each("segmentation", "run_segmentation", paths)))
+        clip = dict(zip(imaged, _run_each("clip", "clip_image_tags", paths)))
+
+    results = []
+    for i, (cid, manifest, image_path) in enumerate(resolved):
+        transcription: Dict[str, Any] = {}
+        audio_path = (manifest or {}).get("audio_path")
+        if audio_path and os.path.exists(audio_path):
+            try:
+                transcription = _call_integration(
+                    "whisper", integrations.transcribe_audio, audio_path
+                )
+            except Exception as e:
+                logger.debug("Audio transcription failed: %s", e)
+        results.append(
+            _build_review(
+                cid,
+                manifest,
+                image_path,
+                depth.get(i),
+                segmentation.get(i),
+                clip.get(i) or [],
+                transcription,
+                depth_plan.get(i),
+            )
+        )
+    return results
+
+
+def run(
+    asset_cid: str,
+    manifest_path: Optional[str],
+    out_dir: str,
+    compact: bool = False,
+    echo: bool = True,
+) -> Tuple[str, str, str]:
+    """CLI-friendly runner that writes JSON files to out_dir and returns their paths.
 
     manifest_path: optional path to a manifest JSON file to influence suggestions.
+    compact: write without indentation (smaller and faster for large reviews).
+    echo: print the paths (off when the CLI daemon runs it for a client).
     """
     os.makedirs(out_dir, exist_ok=True)
     manifest = None
@@ -216,16 +476,16 @@ def run(asset_cid: str, manifest_path: Optional[str], out_dir: str) -> None:
     qc_path = os.path.join(out_dir, "qc_report.json")
     anchors_path = os.path.join(out_dir, "suggested_ad_anchors.json")
 
-    with open(sug_path, "w") as f:
-        json.dump(res["metadata_suggestion"], f, indent=2)
-    with open(qc_path, "w") as f:
-        json.dump(res["qc_report"], f, indent=2)
-    with open(anchors_path, "w") as f:
-        json.dump(res["suggested_ad_anchors"], f, indent=2)
+    with _span("write_json", compact=compact):
+        write_json(sug_path, res["metadata_suggestion"], compact)
+        write_json(qc_path, res["qc_report"], compact)
+        write_json(anchors_path, res["suggested_ad_anchors"], compact)
 
-    print(sug_path)
-    print(qc_path)
-    print(anchors_path)
+    if echo:
+        print(sug_path)
+        print(qc_path)
+        print(anchors_path)
+    return sug_path, qc_path, anchors_path
 
 
 if __name__ == "__main__":
@@ -235,5 +495,6 @@ if __name__ == "__main__":
     p.add_argument("--asset-cid", required=True)
     p.add_argument("--manifest-path", required=False)
     p.add_argument("--out-dir", default="./data/out")
+    p.add_argument("--compact", action="store_true", help="write JSON without indentation")
     args = p.parse_args()
-    run(args.asset_cid, args.manifest_path, args.out_dir)
+    run(args.asset_cid, args.manifest_path, args.out_dir, args.compact)
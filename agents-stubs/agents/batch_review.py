@@ -0,0 +1,284 @@
+"""Directory-scale, resumable asset review across a process pool.
+
+Inputs (`discover`):
+- a directory: every `*.json` manifest and every image not referenced by a
+  manifest (walked recursively, in sorted order)
+- a `.txt` list of manifest/image paths, one per line
+- a `.ndjson` / `.jsonl` file or `.json` list of `{asset_cid, manifest}` items
+
+Each asset gets its own output directory under `out_dir` holding
+`metadata_suggestion.json`, `qc_report.json` and `suggested_ad_anchors.json`.
+Finished items are appended to `out_dir/_journal.ndjson`; re-running the
+same command skips every item the journal records as `ok`, so an
+interrupted run resumes where it stopped (failed items are retried unless
+`retry_failed=False`).
+
+Usage:
+    python -m agents_stubs.cli batch --input ./assets --out-dir ./out --workers 8
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+logger = logging.getLogger("mighty.batch_review")
+
+JOURNAL = "_journal.ndjson"
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+PATH_KEYS = ("asset_path", "local_path", "image_path", "audio_path")
+
+Item = Tuple[str, str, Optional[Dict[str, Any]]]  # (id, asset_cid, manifest)
+
+
+def _manifest_item(path: str, root: str) -> Item:
+    with open(path) as f:
+        manifest = json.load(f)
+    base = os.path.dirname(path)
+    for key in PATH_KEYS:
+        value = manifest.get(key)
+        if isinstance(value, str) and value and not os.path.isabs(value):
+            manifest[key] = os.path.normpath(os.path.join(base, value))
+    item_id = os.path.relpath(path, root)
+    return (
+        item_id,
+        manifest.get("asset_cid") or os.path.splitext(os.path.basename(path))[0],
+        manifest,
+    )
+
+
+def _image_item(path: str, root: str) -> Item:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.relpath(path, root), stem, {"card_id": stem, "asset_path": os.path.abspath(path)}
+
+
+def _walk(root: str, exclude: Optional[str]) -> Iterator[Item]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != exclude
+        )
+        manifests, images = [], []
+        for name in sorted(filenames):
+            lower = name.lower()
+            if lower.endswith(".json") and not name.startswith("_"):
+                manifests.append(os.path.join(dirpath, name))
+            elif lower.endswith(IMAGE_EXTS):
+                images.append(os.path.join(dirpath, name))
+        referenced: Set[str] = set()
+        for path in manifests:
+            try:
+                item = _manifest_item(path, root)
+            except (OSError, ValueError) as e:
+                logger.warning("skipping unreadable manifest %s: %s", path, e)
+                continue
+            referenced.update(
+                os.path.abspath(v)
+                for k, v in (item[2] or {}).items()
+                if k in PATH_KEYS and isinstance(v, str)
+            )
+            yield item
+        for path in images:
+            if os.path.abspath(path) not in referenced:
+                yield _image_item(path, root)
+
+
+def _listed(entry: Dict[str, Any], source: str, n: int) -> Item:
+    """An entry of an .ndjson/.json item list; ids default to `<file>:<n>`."""
+    item_id = entry.get("id") or f"{os.path.basename(source)}:{n}"
+    return item_id, entry.get("asset_cid") or "", entry.get("manifest")
+
+
+def discover(source: str, exclude: Optional[str] = None) -> Iterator[Item]:
+    """Yield `(id, asset_cid, manifest)` for every asset in `source` (see module docstring).
+
+    `exclude` is a directory to skip while walking, e.g. an output dir inside the input.
+    """
+    if os.path.isdir(source):
+        yield from _walk(source, os.path.abspath(exclude) if exclude else None)
+        return
+    lower = source.lower()
+    base = os.path.dirname(os.path.abspath(source))
+    if lower.endswith((".ndjson", ".jsonl")):
+        with open(source) as f:
+            for n, line in enumerate(f, 1):
+                if line.strip():
+                    entry = json.loads(line)
+                    yield _listed(entry, source, n)
+    elif lower.endswith(".json"):
+        with open(source) as f:
+            for n, entry in enumerate(json.load(f), 1):
+                yield _listed(entry, source, n)
+    else:
+        with open(source) as f:
+            for line in f:
+                path = line.strip()
+                if not path or path.startswith("#"):
+                    continue
+                path = os.path.join(base, path)
+                yield (
+                    _manifest_item(path, base)
+                    if path.lower().endswith(".json")
+                    else _image_item(path, base)
+                )
+
+
+def output_dir(out_root: str, item_id: str) -> str:
+    """Stable per-asset directory: readable slug plus a short hash against collisions."""
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", item_id).strip("._")[:80] or "asset"
+    return os.path.join(out_root, f"{slug}-{hashlib.sha1(item_id.encode('utf-8')).hexdigest()[:8]}")
+
+
+def load_journal(out_root: str) -> Dict[str, Dict[str, Any]]:
+    """Last journal entry per item id; a torn final line from a crash is ignored."""
+    entries: Dict[str, Dict[str, Any]] = {}
+    path = os.path.join(out_root, JOURNAL)
+    if not os.path.exists(path):
+        return entries
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry["id"]] = entry
+    return entries
+
+
+def _init_worker() -> None:
+    # load the available models once per worker process, not once per asset
+    try:
+        from . import integrations
+
+        integrations.warm()
+    except Exception as e:
+        logger.debug("worker warm-up failed: %s", e)
+
+
+def review_one(item: Item, out_root: str, compact: bool = True) -> Dict[str, Any]:
+    """Review one asset and write its three files; runs in a pool worker."""
+    from .asset_review import run_asset_review, write_json
+
+    item_id, asset_cid, manifest = item
+    start = time.perf_counter()
+    res = run_asset_review(asset_cid, manifest)
+    out = output_dir(out_root, item_id)
+    os.makedirs(out, exist_ok=True)
+    for name in ("metadata_suggestion", "qc_report", "suggested_ad_anchors"):
+        write_json(os.path.join(out, f"{name}.json"), res[name], compact)
+    return {
+        "id": item_id,
+        "asset_cid": asset_cid,
+        "status": "ok",
+        "out_dir": out,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def run_batch(
+    source: str,
+    out_root: str,
+    workers: Optional[int] = None,
+    compact: bool = True,
+    retry_failed: bool = True,
+    limit: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+) -> Dict[str, int]:
+    """Review every asset from `source` into `out_root`, resuming from its journal.
+
+    Returns counts: discovered, skipped (already done), ok, error.
+    """
+    workers = workers or int(os.environ.get("MIGHTY_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 4
+    os.makedirs(out_root, exist_ok=True)
+    done = {
+        item_id for item_id, e in load_journal(out_root).items()
+        if e.get("status") == "ok" or (not retry_failed and e.get("status") == "error")
+    }
+    counts = {"discovered": 0, "skipped": 0, "ok": 0, "error": 0}
+    pending: Dict[Future, Item] = {}
+    submitted = 0
+
+    with open(os.path.join(out_root, JOURNAL), "a") as journal, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker
+    ) as pool:
+
+        def record(fut: Future) -> None:
+            item = pending.pop(fut)
+            try:
+                entry = fut.result()
+            except Exception as e:
+                logger.warning("review of %s failed: %s", item[0], e)
+                entry = {
+                    "id": item[0],
+                    "asset_cid": item[1],
+                    "status": "error",
+                    "error": f"{type(e).__name__}: {e}",
+                }
+            counts[entry["status"]] += 1
+            journal.write(json.dumps(entry) + "\n")
+            journal.flush()
+
+        def drain(block_until: int) -> None:
+            while len(pending) > block_until:
+                finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    record(fut)
+
+        try:
+            for item in discover(source, exclude=out_root):
+                if limit is not None and submitted >= limit:
+                    break
+                counts["discovered"] += 1
+                if item[0] in done:
+                    counts["skipped"] += 1
+                    continue
+                pending[pool.submit(review_one, item, out_root, compact)] = item
+                submitted += 1
+                drain(max_in_flight)
+            drain(0)
+        except BaseException:
+            for fut in pending:
+                fut.cancel()
+            raise
+        finally:
+            os.fsync(journal.fileno())
+    logger.info("batch review of %s: %s", source, counts)
+    return counts
+
+
+def add_arguments(p: Any) -> None:
+    p.add_argument(
+        "--input",
+        required=True,
+        help="directory, .txt path list, .ndjson/.jsonl or .json item list",
+    )
+    p.add_argument("--out-dir", required=True)
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="worker processes (default MIGHTY_BATCH_WORKERS or CPU count)",
+    )
+    p.add_argument("--pretty", action="store_true", help="indent output JSON")
+    p.add_argument(
+        "--no-retry-failed",
+        action="store_true",
+        help="on resume, skip items that previously failed",
+    )
+    p.add_argument("--limit", type=int, default=None, help="review at most this many new items")
+
+
+def run_from_args(args: Any) -> Dict[str, int]:
+    counts = run_batch(
+        args.input,
+        args.out_dir,
+        workers=args.workers,
+        compact=not args.pretty,
+        retry_failed=not args.no_retry_failed,
+        limit=args.limit,
+    )
+    print(json.dumps(counts))
+    return counts
@@ -1,40 +1,106 @@
 import argparse
 import sys
+
 from .asset_review import run as run_asset
+from . import batch_review
 from .metadata_gen import run as run_meta
 from .mint_approval import run as run_mint
 
+# commands a running CLI daemon executes for us (see service/daemon.py), and their path arguments
+DAEMON_COMMANDS = ("asset-review", "metadata-gen", "mint-approval")
+_PATH_ARGS = ("out_dir", "manifest_path", "suggestion")
+
+
+def _stubs_cli():
+    try:
+        from agents_stubs import cli
+    except ModuleNotFoundError as e:
+        if e.name != "agents_stubs":
+            raise
+        import cli  # agents-stubs/ itself on sys.path
+    return cli
+
+
+def run_command(args) -> str:
+    """Run one agent command; returns the paths (and CID) it wrote, one per line.
+
+    Used in-process and by the CLI daemon, which receives `args` as a dict.
+    """
+    if isinstance(args, dict):
+        args = argparse.Namespace(**args)
+    try:
+        if args.cmd == "asset-review":
+            lines = run_asset(args.asset_cid, args.manifest_path, args.out_dir, echo=False)
+        elif args.cmd == "metadata-gen":
+            lines = run_meta(
+                args.suggestion,
+                args.depth_map_cid,
+                args.ad_anchor_cid,
+                args.contributors,
+                args.out_dir,
+                echo=False,
+            )
+        elif args.cmd == "mint-approval":
+            lines = run_mint(
+                args.manifest_cid,
+                args.card_id,
+                args.credits_required,
+                args.admin_signature,
+                args.out_dir,
+                echo=False,
+            )
+        else:
+            raise ValueError(f"unknown command {args.cmd!r}")
+    except SystemExit as e:
+        # a usage error must not end the daemon's handler thread
+        raise ValueError(str(e)) from None
+    return "\n".join(lines)
+
 
 def main():
     p = argparse.ArgumentParser(prog="agents")
     sub = p.add_subparsers(dest="cmd")
+    daemon = argparse.ArgumentParser(add_help=False)
+    daemon.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="run in this process even if a daemon is running",
+    )
 
-    p_ar = sub.add_parser("asset-review")
+    p_ar = sub.add_parser("asset-review", parents=[daemon])
     p_ar.add_argument("--asset-cid", required=True)
     p_ar.add_argument("--manifest-path", required=False)
     p_ar.add_argument("--out-dir", default="./data/out")
 
-    p_mg = sub.add_parser("metadata-gen")
+    p_mg = sub.add_parser("metadata-gen", parents=[daemon])
     p_mg.add_argument("--suggestion", required=True)
     p_mg.add_argument("--depth-map-cid", required=False)
     p_mg.add_argument("--ad-anchor-cid", required=False)
     p_mg.add_argument("--contributors", required=False, nargs="*")
     p_mg.add_argument("--out-dir", default="./data/out")
 
-    p_ma = sub.add_parser("mint-approval")
+    p_ma = sub.add_parser("mint-approval", parents=[daemon])
     p_ma.add_argument("--manifest-cid", required=True)
     p_ma.add_argument("--card-id", required=True)
     p_ma.add_argument("--credits-required", required=False)
     p_ma.add_argument("--admin-signature", required=False)
     p_ma.add_argument("--out-dir", default="./data/out")
 
+    p_b = sub.add_parser("batch")
+    batch_review.add_arguments(p_b)
+
     args = p.parse_args()
-    if args.cmd == "asset-review":
-        run_asset(args.asset_cid, args.manifest_path, args.out_dir)
-    elif args.cmd == "metadata-gen":
-        run_meta(args.suggestion, args.depth_map_cid, args.ad_anchor_cid, args.contributors, args.out_dir)
-    elif args.cmd == "mint-approval":
-        run_mint(args.manifest_cid, args.card_id, args.credits_required, args.admin_signature, args.out_dir)
+    if args.cmd == "batch":
+        batch_review.run_from_args(args)
+    elif args.cmd in DAEMON_COMMANDS:
+        args.cli = "agents"  # the daemon hands it back to `run_command` here
+        out = _stubs_cli()._via_daemon(args, _PATH_ARGS)
+        if out is None:
+            try:
+                out = run_command(args)
+            except ValueError as e:
+                sys.exit(str(e))
+        print(out)
     else:
         p.print_help()
 
@@ -0,0 +1,372 @@
+"""Memory- and latency-aware planning for MiDaS depth estimation.
+
+`plan_depth(image_size)` picks the MiDaS variant, the network input size and
+how the image is processed, so a large model or a huge frame cannot OOM a
+small CPU node:
+
+- `full`: the whole image through the network, depth upsampled back to the
+  image's full resolution (the normal contract);
+- `tiled`: overlapping tiles of the full image, aligned to one low-resolution
+  pass over the whole image and blended, written straight to a full-resolution
+  depth map on disk. Frames whose long side exceeds
+  MIGHTY_DEPTH_TILE_THRESHOLD (default 4096 px) try this first; others fall
+  back to it when `full` does not fit. Tile size and overlap come from
+  MIGHTY_DEPTH_TILE_SIZE / MIGHTY_DEPTH_TILE_OVERLAP (default 1024 / 128 px);
+- `downscaled`: as `full`, but the depth map is produced at a reduced
+  `output_size` when a full-resolution map does not fit in memory;
+- `skip`: not even the smallest variant fits; depth is left out of the
+  review instead of crashing it.
+
+Candidates are tried best-quality first (see LADDER). The first one whose
+estimated peak memory fits the budget and whose estimated latency meets the
+target wins. If none meets the target, the fastest one that fits is used and
+`latency_target_met` is false. Variants already loaded in the process cost
+no extra weight memory.
+
+The budget is MIGHTY_DEPTH_MEMORY_FRACTION (default 0.8) of the memory
+available now: the lower of /proc/meminfo MemAvailable and the cgroup limit
+headroom, or MIGHTY_DEPTH_MEMORY_BUDGET (e.g. `2GiB`) if set. The latency
+target is MIGHTY_DEPTH_LATENCY_MS (unset: no target). MIGHTY_DEPTH_MODEL
+pins one variant.
+
+The memory and latency figures in VARIANTS are conservative CPU fp32
+estimates rather than measurements. The plan records what it assumed, so
+reviews show why a variant was chosen.
+"""
+import os
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+MiB = 1024 * 1024
+NOMINAL_SIZE = (1920, 1080)  # assumed when the image header cannot be read
+
+
+class Variant(NamedTuple):
+    name: str
+    weights_bytes: int
+    native_size: int
+    activation_bytes: int  # peak activations for one input at native_size
+    forward_ms: float  # one forward pass at native_size, batch 1
+    kind: str  # "dpt" or "small": selects the input normalization
+
+
+VARIANTS: Dict[str, Variant] = {
+    v.name: v
+    for v in (
+        Variant("DPT_Large", 1380 * MiB, 384, 512 * MiB, 2000.0, "dpt"),
+        Variant("DPT_Hybrid", 500 * MiB, 384, 384 * MiB, 1000.0, "dpt"),
+        Variant("MiDaS_small", 85 * MiB, 256, 128 * MiB, 120.0, "small"),
+    )
+}
+
+# (variant, network input size), best quality first
+LADDER: Tuple[Tuple[str, int], ...] = (
+    ("DPT_Large", 384),
+    ("DPT_Hybrid", 384),
+    ("DPT_Large", 256),
+    ("DPT_Hybrid", 256),
+    ("MiDaS_small", 256),
+    ("MiDaS_small", 192),
+)
+
+DECODE_BYTES_PER_PIXEL = 6  # decoded RGB plus the converted copy
+OUTPUT_BYTES_PER_PIXEL = 8  # float32 depth map plus the interpolation buffer
+TILE_BYTES_PER_PIXEL = 16  # crop, upsampled tile depth, its blend weights and a temporary
+TILED_DECODE_BYTES_PER_PIXEL = 4  # decoded image only; tiles are converted one at a time
+DECODE_MS_PER_MP = 15.0
+OUTPUT_MS_PER_MP = 40.0
+MAX_BATCH = 8
+# dynamic int8 shrinks the Linear weights (most of a DPT) ~4x and speeds them up;
+# convolutions stay fp32
+INT8_WEIGHT_FACTOR = 0.35
+INT8_LATENCY_FACTOR = 0.6
+
+
+def parse_bytes(value: str) -> int:
+    """`"512MiB"`, `"2GiB"`, `"1.5G"` or a plain byte count -> bytes."""
+    m = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)(i?B)?\s*", value or "", re.IGNORECASE)
+    if not m:
+        raise ValueError(f"bad byte size {value!r}; expected e.g. 512MiB or 2GiB")
+    scale = 1024 ** " KMGT".index((m.group(2) or " ").upper())
+    return int(float(m.group(1)) * scale)
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            text = f.read().strip()
+    except OSError:
+        return None
+    return int(text) if text.isdigit() else None
+
+
+def available_memory() -> Optional[int]:
+    """Bytes this process can still allocate, or None when it cannot be told."""
+    override = os.environ.get("MIGHTY_DEPTH_MEMORY_BUDGET")
+    if override:
+        return parse_bytes(override)
+    found: List[int] = []
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    found.append(int(line.split()[1]) * 1024)
+                    break
+    except (OSError, ValueError, IndexError):
+        pass
+    for limit_path, usage_path in (
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),  # cgroup v2
+        (
+            "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+            "/sys/fs/cgroup/memory/memory.usage_in_bytes",
+        ),  # v1
+    ):
+        limit, usage = _read_int(limit_path), _read_int(usage_path)
+        # v1 reports "no limit" as a huge number
+        if limit is not None and usage is not None and limit < 1 << 60:
+            found.append(max(0, limit - usage))
+            break
+    return min(found) if found else None
+
+
+def image_size(path: str) -> Optional[Tuple[int, int]]:
+    """(width, height) from the image header, without decoding the pixels."""
+    try:
+        from PIL import Image
+
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+def _estimate(
+    variant: Variant, input_size: int, pixels: int, out_pixels: int, loaded: bool
+) -> Tuple[int, int, float]:
+    """(fixed bytes, peak bytes, latency ms) for one image."""
+    scale = (input_size / variant.native_size) ** 2
+    fixed = (0 if loaded else variant.weights_bytes) + int(variant.activation_bytes * scale)
+    peak = fixed + pixels * DECODE_BYTES_PER_PIXEL + out_pixels * OUTPUT_BYTES_PER_PIXEL
+    latency = (
+        variant.forward_ms * scale
+        + pixels / 1e6 * DECODE_MS_PER_MP
+        + out_pixels / 1e6 * OUTPUT_MS_PER_MP
+    )
+    return fixed, peak, latency
+
+
+def _candidate(
+    name: str,
+    strategy: str,
+    input_size: int,
+    output_size: Sequence[int],
+    max_batch: int,
+    peak: int,
+    latency: float,
+    **extra: Any,
+) -> Dict[str, Any]:
+    return {
+        "model": name,
+        "strategy": strategy,
+        "input_size": input_size,
+        "output_size": list(output_size),
+        "max_batch": int(max_batch),
+        **extra,
+        "estimated_peak_bytes": int(peak),
+        "estimated_latency_ms": round(latency, 1),
+    }
+
+
+def _whole(
+    variant: Variant,
+    input_size: int,
+    pixels: int,
+    output_size: Sequence[int],
+    loaded: bool,
+    budget: Optional[int],
+    strategy: str = "full",
+) -> Optional[Dict[str, Any]]:
+    out_pixels = output_size[0] * output_size[1]
+    fixed, peak, latency = _estimate(variant, input_size, pixels, out_pixels, loaded)
+    if budget is not None and peak > budget:
+        return None
+    per_item = peak - (0 if loaded else variant.weights_bytes)
+    max_batch = (
+        MAX_BATCH
+        if budget is None
+        else max(1, min(MAX_BATCH, (budget - (peak - per_item)) // per_item))
+    )
+    return _candidate(variant.name, strategy, input_size, output_size, max_batch, peak, latency)
+
+
+def _downscaled(
+    variant: Variant, input_size: int, width: int, height: int, loaded: bool, budget: Optional[int]
+) -> Optional[Dict[str, Any]]:
+    pixels = width * height
+    fixed, _, _ = _estimate(variant, input_size, pixels, 0, loaded)
+    if budget is None or budget <= fixed + pixels * DECODE_BYTES_PER_PIXEL:
+        return None
+    # the largest output that still fits, but never smaller than the network input
+    room = (budget - fixed - pixels * DECODE_BYTES_PER_PIXEL) // OUTPUT_BYTES_PER_PIXEL
+    shrink = min(1.0, (room / pixels) ** 0.5)
+    out_w, out_h = max(1, int(width * shrink)), max(1, int(height * shrink))
+    if out_w * out_h >= pixels or max(out_w, out_h) < input_size:
+        return None
+    return _whole(
+        variant, input_size, pixels, (out_w, out_h), loaded, budget, strategy="downscaled"
+    )
+
+
+def tile_grid(width: int, height: int, tile: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """Overlapping `(x0, y0, x1, y1)` boxes covering the image, all the same size.
+
+    Tiles step by `tile - overlap`; the last row/column is shifted back to
+    end on the border, so it overlaps its neighbour by at least `overlap`.
+    """
+    def starts(dim: int) -> List[int]:
+        if dim <= tile:
+            return [0]
+        out = list(range(0, dim - tile, max(1, tile - overlap)))
+        return out + [dim - tile]
+
+    tw, th = min(tile, width), min(tile, height)
+    return [(x, y, x + tw, y + th) for y in starts(height) for x in starts(width)]
+
+
+def _tiled(
+    variant: Variant,
+    input_size: int,
+    width: int,
+    height: int,
+    tile: int,
+    overlap: int,
+    loaded: bool,
+    budget: Optional[int],
+) -> Optional[Dict[str, Any]]:
+    """Overlapping tiles plus one low-resolution pass of the whole image to align them.
+
+    The full-resolution depth and blend weights are accumulated in
+    disk-backed arrays, so the float working set is per tile, not per image.
+    """
+    if tile < input_size or max(width, height) <= tile:
+        return None
+    tiles = len(tile_grid(width, height, tile, overlap))
+    tw, th = min(tile, width), min(tile, height)
+    # the network sees each tile with its shorter side at input_size
+    scale = (input_size / variant.native_size) ** 2 * max(tw, th) / min(tw, th)
+    weights = 0 if loaded else variant.weights_bytes
+    per_tile = int(variant.activation_bytes * scale) + tw * th * TILE_BYTES_PER_PIXEL
+    base = weights + width * height * TILED_DECODE_BYTES_PER_PIXEL
+    if budget is None:
+        max_batch = min(MAX_BATCH, tiles)
+    else:
+        max_batch = min(MAX_BATCH, tiles, (budget - base) // per_tile if budget > base else 0)
+        if max_batch < 1:
+            return None
+    peak = base + per_tile * max_batch
+    latency = (
+        variant.forward_ms * scale * (tiles + 1)
+        + width * height / 1e6 * (DECODE_MS_PER_MP + OUTPUT_MS_PER_MP)
+    )
+    return _candidate(
+        variant.name, "tiled", input_size, (width, height), max_batch, peak, latency,
+        tile_size=tile, tile_overlap=overlap, tiles=tiles,
+    )
+
+
+def plan_depth(
+    size: Optional[Sequence[int]] = None,
+    free_bytes: Optional[int] = None,
+    latency_target_ms: Optional[float] = None,
+    loaded: Iterable[str] = (),
+    exclude: Iterable[Tuple[str, int]] = (),
+    quantized: bool = False,
+) -> Dict[str, Any]:
+    """Choose how to run depth estimation for one image of `size` (width, height).
+
+    `free_bytes` and `latency_target_ms` default to the environment (see
+    module docstring); `loaded` names variants already in memory; `exclude`
+    drops (variant, input size) rungs, e.g. one that just ran out of memory;
+    `quantized` plans for int8 weights (see quantization.py).
+    Returns a JSON-able plan; `model` is None when the strategy is `skip`.
+    """
+    if free_bytes is None:
+        free_bytes = available_memory()
+    if latency_target_ms is None and os.environ.get("MIGHTY_DEPTH_LATENCY_MS"):
+        latency_target_ms = float(os.environ["MIGHTY_DEPTH_LATENCY_MS"])
+    fraction = float(os.environ.get("MIGHTY_DEPTH_MEMORY_FRACTION", "0.8"))
+    budget = int(free_bytes * fraction) if free_bytes is not None else None
+    width, height = size or NOMINAL_SIZE
+    pixels = width * height
+    loaded = set(loaded)
+    excluded = set(exclude)
+    forced = os.environ.get("MIGHTY_DEPTH_MODEL", "auto")
+    if forced != "auto" and forced not in VARIANTS:
+        raise ValueError(
+            f"MIGHTY_DEPTH_MODEL={forced!r}; expected auto or one of {', '.join(VARIANTS)}"
+        )
+    rungs = [r for r in LADDER if r not in excluded and forced in ("auto", r[0])]
+
+    tile = int(os.environ.get("MIGHTY_DEPTH_TILE_SIZE", "1024"))
+    overlap = int(os.environ.get("MIGHTY_DEPTH_TILE_OVERLAP", "128"))
+    large = max(width, height) > int(os.environ.get("MIGHTY_DEPTH_TILE_THRESHOLD", "4096"))
+    # very large frames get tiles first: more detail and a bounded working set
+    strategies = ("tiled", "full", "downscaled") if large else ("full", "tiled", "downscaled")
+    fitting: List[Dict[str, Any]] = []
+    for strategy in strategies:
+        for name, input_size in rungs:
+            variant, is_loaded = VARIANTS[name], name in loaded
+            if quantized:
+                variant = variant._replace(
+                    weights_bytes=int(variant.weights_bytes * INT8_WEIGHT_FACTOR),
+                    forward_ms=variant.forward_ms * INT8_LATENCY_FACTOR,
+                )
+            if strategy == "tiled":
+                for tile_size in (tile, tile // 2):
+                    candidate = _tiled(
+                        variant,
+                        input_size,
+                        width,
+                        height,
+                        tile_size,
+                        min(overlap, tile_size // 4),
+                        is_loaded,
+                        budget,
+                    )
+                    if candidate:
+                        fitting.append(candidate)
+                        break
+            elif strategy == "full":
+                candidate = _whole(variant, input_size, pixels, (width, height), is_loaded, budget)
+                if candidate:
+                    fitting.append(candidate)
+            else:
+                candidate = _downscaled(variant, input_size, width, height, is_loaded, budget)
+                if candidate:
+                    fitting.append(candidate)
+
+    plan: Dict[str, Any] = {
+        "image_size": list(size) if size else None,
+        "memory_budget_bytes": budget,
+        "latency_target_ms": latency_target_ms,
+        "quantized": quantized,
+    }
+    if not fitting:
+        plan.update(
+            model=None, strategy="skip", reason="insufficient_memory", latency_target_met=None
+        )
+        return plan
+    chosen = None
+    if latency_target_ms is not None:
+        chosen = next((c for c in fitting if c["estimated_latency_ms"] <= latency_target_ms), None)
+    if chosen is not None:
+        plan.update(chosen, reason="fits_budget_and_latency", latency_target_met=True)
+    elif latency_target_ms is not None:
+        plan.update(
+            min(fitting, key=lambda c: c["estimated_latency_ms"]),
+            reason="fastest_that_fits",
+            latency_target_met=False,
+        )
+    else:
+        plan.update(fitting[0], reason="best_that_fits", latency_target_met=None)
+    return plan
@@ -6,115 +6,597 @@ library is unavailable, the function returns a safe stub value.
 These wrappers keep the main agent code clean and make it easy to
 swap in real models later.
 """
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
+import contextlib
+import gc
 import logging
 import os
 import tempfile
+import threading
+import time
 from typing import Tuple
 
 logger = logging.getLogger("mighty.integrations")
 
+try:
+    from agents_stubs.agents import depth_scheduler as _scheduler
+    from agents_stubs.agents import onnx_backend as _onnx
+    from agents_stubs.agents import quantization as _quant
+    from agents_stubs.utils.metrics import REGISTRY as _METRICS
+    from agents_stubs.utils.tracing import span as _span
+except ModuleNotFoundError as e:
+    if e.name != "agents_stubs":
+        raise
+    # loaded from its path by a script: torch-only, unplanned depth, no metrics or tracing
+    _scheduler = _onnx = _quant = _METRICS = None
 
-def estimate_depth_from_image(image_path: str) -> Optional[str]:
+    @contextlib.contextmanager
+    def _span(name, **attributes):
+        yield None
+
+
+_MODELS: Dict[str, Any] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def _cached_model(key: str, loader: Callable[[], Any]) -> Any:
+    """Load a model once per process and reuse it across calls and batches."""
+    with _MODELS_LOCK:
+        hit = key in _MODELS
+        if _METRICS is not None:
+            _METRICS.counter(
+                "mighty_model_cache_requests_total", "Model cache lookups", ("model", "result")
+            ).labels(model=key, result="hit" if hit else "miss").inc()
+        if not hit:
+            start = time.perf_counter()
+            with _span("model.load", model=key):
+                _MODELS[key] = loader()
+            if _METRICS is not None:
+                _METRICS.histogram(
+                    "mighty_model_load_seconds",
+                    "Model load time",
+                    ("model",),
+                    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+                ).labels(model=key).observe(time.perf_counter() - start)
+        return _MODELS[key]
+
+
+def _load_midas(model_type: str = "DPT_Large") -> Any:
+    import torch
+
+    midas = torch.hub.load("intel-isl/MiDaS", model_type)
+    midas.eval()
+    return midas
+
+
+def _backend(integration: str) -> str:
+    """"torch" or "onnx" for `integration` (MIGHTY_BACKEND_<INTEGRATION>, see onnx_backend.py)."""
+    return _onnx.backend(integration) if _onnx is not None else "torch"
+
+
+def _quantized(model: str) -> bool:
+    """Whether `model` runs int8 (MIGHTY_QUANTIZE, see quantization.py).
+
+    ONNX-backed depth runs fp32.
+    """
+    if model == "midas" and _backend("depth") == "onnx":
+        return False
+    return _quant is not None and _quant.enabled(model)
+
+
+def _midas_flavour() -> List[str]:
+    """Model cache key suffix for the MiDaS build currently selected."""
+    if _backend("depth") == "onnx":
+        return ["onnx"]
+    return ["int8"] if _quantized("midas") else []
+
+
+def _onnx_midas(model_type: str) -> Any:
+    size = _scheduler.VARIANTS[model_type].native_size if _scheduler else 384
+    try:
+        return _onnx.load_onnx(
+            f"midas-{model_type}", lambda: _load_midas(model_type), (1, 3, size, size)
+        )
+    except Exception as e:
+        logger.warning("ONNX backend unavailable for MiDaS %s, using torch: %s", model_type, e)
+        return _load_midas(model_type)
+
+
+def _midas(model_type: str) -> Any:
+    flavour = _midas_flavour()
+    if flavour == ["onnx"]:
+        return _cached_model(f"midas:{model_type}:onnx", lambda: _onnx_midas(model_type))
+    if flavour == ["int8"]:
+        return _cached_model(
+            f"midas:{model_type}:int8",
+            lambda: _quant.load_quantized(f"midas-{model_type}", lambda: _load_midas(model_type)),
+        )
+    return _cached_model(f"midas:{model_type}", lambda: _load_midas(model_type))
+
+
+def _warm_midas() -> Any:
+    """Load the variant the scheduler would pick for a typical frame right now."""
+    plan = (
+        _scheduler.plan_depth(loaded=_loaded_midas(), quantized=_quantized("midas"))
+        if _scheduler
+        else {"model": "DPT_Large"}
+    )
+    if plan["model"] is None:
+        raise MemoryError("not enough memory for any MiDaS variant")
+    return _midas(plan["model"])
+
+
+def _loaded_midas() -> List[str]:
+    """Variants resident in the backend and precision currently selected."""
+    flavour = _midas_flavour()
+    with _MODELS_LOCK:
+        keys = [key.split(":") for key in _MODELS if key.startswith("midas:")]
+    return [k[1] for k in keys if k[2:] == flavour]
+
+
+def _load_sam() -> Any:
+    from segment_anything import SamPredictor, sam_model_registry
+
+    model = sam_model_registry.get("default")
+    return SamPredictor(model)
+
+
+def _load_whisper() -> Any:
+    import whisper
+
+    return whisper.load_model("small")
+
+
+def _whisper() -> Any:
+    if _quantized("whisper"):
+        return _cached_model(
+            "whisper:int8", lambda: _quant.load_quantized("whisper-small", _load_whisper)
+        )
+    return _cached_model("whisper", _load_whisper)
+
+
+_LOADERS: Dict[str, Callable[[], Any]] = {
+    "midas": _warm_midas,
+    "sam": lambda: _cached_model("sam", _load_sam),
+    "whisper": _whisper,
+}
+
+
+def warm(models: Optional[List[str]] = None) -> Dict[str, str]:
+    """Load models into the process cache ahead of the first request.
+
+    `models` defaults to `MIGHTY_WARM_MODELS` (comma-separated) or all known
+    models. Returns `{model: "loaded" | "unavailable: <reason>"}`; missing
+    libraries are reported, not raised.
+    """
+    if models is None:
+        env = os.environ.get("MIGHTY_WARM_MODELS")
+        models = [m.strip() for m in env.split(",") if m.strip()] if env else list(_LOADERS)
+    status: Dict[str, str] = {}
+    for name in models:
+        loader = _LOADERS.get(name)
+        if loader is None:
+            status[name] = "unavailable: unknown model"
+            continue
+        try:
+            loader()
+            status[name] = "loaded"
+        except Exception as e:
+            logger.info("Model %s not warmed: %s", name, e)
+            status[name] = f"unavailable: {e}"
+    return status
+
+
+def _pin_artifact(path: str, label: str) -> str:
+    """Pin a generated file to nft.storage if `NFT_STORAGE_KEY` is set; return CID or path."""
+    api_key = os.environ.get("NFT_STORAGE_KEY")
+    if not api_key:
+        return path
+    try:
+        # dynamic import of pin helper to avoid import issues in proxy setup
+        try:
+            from agents_stubs.utils.pinning import pin_file_with_retries
+        except Exception:
+            # fallback to loading implementation directly from file
+            import importlib.util
+            p = os.path.join(os.path.dirname(__file__), "..", "utils", "pinning.py")
+            p = os.path.normpath(p)
+            spec = importlib.util.spec_from_file_location("mighty.pinning", p)
+            mod = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(mod)
+            pin_file_with_retries = getattr(mod, "pin_file_with_retries")
+
+        with _span("pin.artifact", label=label):
+            return pin_file_with_retries(path, api_key)
+    except Exception as e:
+        logger.debug("Pinning %s failed: %s", label, e)
+        return path
+
+
+def estimate_depth_from_image(
+    image_path: str, plan: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
     """Estimate depth map for an image. Returns a path or CID-like string.
 
-    Tries MiDaS via torch.hub if available. Otherwise returns None.
+    Tries MiDaS via torch.hub if available. Otherwise returns None. `plan`
+    (see depth_scheduler) is made here when not given and is updated with
+    the outcome.
     """
+    return estimate_depth_batch([image_path], None if plan is None else [plan])[0]
+
+
+def plan_depth(image_path: str) -> Dict[str, Any]:
+    """The scheduler's plan for one image, given the memory free right now."""
+    if _scheduler is None:
+        return {
+            "model": "DPT_Large",
+            "strategy": "full",
+            "input_size": 384,
+            "output_size": None,
+            "max_batch": 8,
+        }
+    return _scheduler.plan_depth(
+        _scheduler.image_size(image_path), loaded=_loaded_midas(), quantized=_quantized("midas")
+    )
+
+
+_NORMALIZE = {
+    "dpt": ((0.5, 0.5, 0.5), (0.5, 0.5, 0.5)),
+    "small": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+}
+
+
+def _is_oom(e: BaseException) -> bool:
+    if isinstance(e, MemoryError):
+        return True
+    text = str(e).lower()
+    return isinstance(e, RuntimeError) and any(
+        s in text for s in ("out of memory", "can't allocate", "not enough memory")
+    )
+
+
+def _net_size(width: int, height: int, input_size: int) -> Tuple[int, int]:
+    """MiDaS "minimal" resize: shorter side to input_size, both sides multiples of 32."""
+    scale = input_size / min(width, height)
+    net_w = max(32, int(round(width * scale / 32)) * 32)
+    net_h = max(32, int(round(height * scale / 32)) * 32)
+    return net_w, net_h
+
+
+def _to_tensor(img: Any, kind: str, size: Tuple[int, int]) -> Any:
+    """Resize a PIL image to `size` (width, height) and normalize it into a CHW tensor."""
+    import numpy as np
+    import torch
+    from PIL import Image
+
+    # resize before converting: converting a huge frame first would copy it at full size
+    if img.mode in ("RGB", "RGBA", "L"):
+        img = img.resize(size, Image.BICUBIC).convert("RGB")
+    else:
+        img = img.convert("RGB").resize(size, Image.BICUBIC)
+    mean, std = _NORMALIZE[kind]
+    mean, std = np.array(mean, dtype=np.float32), np.array(std, dtype=np.float32)
+    arr = (np.asarray(img, dtype=np.float32) / 255.0 - mean) / std
+    return torch.from_numpy(np.ascontiguousarray(arr.transpose(2, 0, 1)))
+
+
+def _net_input(image_path: str, kind: str, input_size: int) -> Tuple[Any, Tuple[int, int]]:
+    """Decode and resize one image for the network.
+
+    Returns the CHW tensor and the image's full (height, width).
+    """
+    from PIL import Image
+
+    with _span("image.decode", path=image_path):
+        img = Image.open(image_path)
+        width, height = img.size
+        net = _net_size(width, height, input_size)
+        img.draft("RGB", net)  # JPEGs decode at a reduced scale; no-op otherwise
+        return _to_tensor(img, kind, net), (height, width)
+
+
+def _blend_weights(box: Tuple[int, int, int, int], width: int, height: int, overlap: int) -> Any:
+    """Per-pixel weights for one tile: linear ramps over `overlap` on edges shared with other tiles.
+
+    Edges on the image border keep full weight, so every pixel is covered
+    by at least one tile with weight 1 or close to it.
+    """
+    import numpy as np
+
+    def ramp(start: int, stop: int, dim: int) -> Any:
+        n = stop - start
+        w = np.ones(n, dtype=np.float32)
+        if overlap > 0:
+            up = (np.arange(n, dtype=np.float32) + 0.5) / overlap
+            if start > 0:
+                w = np.minimum(w, up)
+            if stop < dim:
+                w = np.minimum(w, up[::-1])
+        return np.maximum(w, 1e-3)
+
+    x0, y0, x1, y1 = box
+    return np.outer(ramp(y0, y1, height), ramp(x0, x1, width))
+
+
+def _align(depth: Any, reference: Any) -> Tuple[float, float]:
+    """Least-squares scale and shift mapping `depth` onto `reference` (same shape).
+
+    MiDaS depth is relative: each tile comes out with its own scale and
+    shift. Fitting every tile to the same whole-image pass makes neighbours
+    agree before they are blended.
+    """
+    import numpy as np
+
+    d = np.asarray(depth, dtype=np.float64).ravel()
+    r = np.asarray(reference, dtype=np.float64).ravel()
+    var = d.var()
+    if d.size < 4 or var < 1e-12:
+        return 1.0, float(r.mean() - d.mean()) if d.size else 0.0
+    s = float(((d - d.mean()) * (r - r.mean())).mean() / var)
+    return s, float(r.mean() - s * d.mean())
+
+
+def _tiled_depth(image_path: str, plan: Dict[str, Any], midas: Any) -> str:
+    """Tiled, overlap-blended depth at full resolution; returns the .npy path.
+
+    The depth map and the blend-weight sums live in disk-backed arrays, so
+    apart from the decoded image the memory in use is bounded by
+    `max_batch` tiles.
+    """
+    import torch
+    from PIL import Image
+
+    kind = _scheduler.VARIANTS[plan["model"]].kind
+    input_size, tile, overlap = plan["input_size"], plan["tile_size"], plan["tile_overlap"]
+    with _span("image.decode", path=image_path):
+        img = Image.open(image_path)
+        img.load()
+    width, height = img.size
+    boxes = _scheduler.tile_grid(width, height, tile, overlap)
+    tile_net = _net_size(boxes[0][2] - boxes[0][0], boxes[0][3] - boxes[0][1], input_size)
+
+    with torch.no_grad():
+        with _span(
+            "depth.forward", batch_size=1, model=plan["model"], input_size=input_size, tiles=0
+        ):
+            reference = midas(
+                torch.stack([_to_tensor(img, kind, _net_size(width, height, input_size))])
+            )[0]
+
+    out = tempfile.NamedTemporaryFile(delete=False, suffix=".npy")
+    out.close()
     try:
-        import torch
+        _blend_tiles(img, plan, midas, reference, boxes, tile_net, out.name)
+    except BaseException:
+        os.unlink(out.name)
+        raise
+    return out.name
 
-        # try MiDaS from torch.hub
-        model_type = "DPT_Large"  # example
-        midas = torch.hub.load("intel-isl/MiDaS", model_type)
-        midas.eval()
-        # load transforms
-        midas_transforms = torch.hub.load("intel-isl/MiDaS", "transforms")
-        transform = midas_transforms.default_transform
-        from PIL import Image
+
+def _blend_tiles(
+    img: Any,
+    plan: Dict[str, Any],
+    midas: Any,
+    reference: Any,
+    boxes: List[Any],
+    tile_net: Tuple[int, int],
+    path: str,
+) -> None:
+    """Run the tiles in batches, align each to `reference` and accumulate them into `path`."""
+    import numpy as np
+    import torch
+
+    kind = _scheduler.VARIANTS[plan["model"]].kind
+    input_size, overlap = plan["input_size"], plan["tile_overlap"]
+    width, height = img.size
+    ref_h, ref_w = reference.shape[-2:]
+    depth_map = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(height, width))
+    with tempfile.TemporaryFile() as scratch:
+        weight_sum = np.memmap(scratch, dtype=np.float32, mode="w+", shape=(height, width))
+        step = max(1, plan.get("max_batch") or 1)
+        for start in range(0, len(boxes), step):
+            chunk = boxes[start:start + step]
+            batch = torch.stack([_to_tensor(img.crop(box), kind, tile_net) for box in chunk])
+            with torch.no_grad():
+                with _span(
+                    "depth.forward",
+                    batch_size=len(chunk),
+                    model=plan["model"],
+                    input_size=input_size,
+                    tiles=len(chunk),
+                ):
+                    prediction = midas(batch)
+                for row, (x0, y0, x1, y1) in enumerate(chunk):
+                    pred = prediction[row:row + 1].unsqueeze(1)
+                    # the matching window of the whole-image pass, at its own resolution
+                    gx0 = int(x0 * ref_w / width)
+                    gx1 = max(gx0 + 1, int(round(x1 * ref_w / width)))
+                    gy0 = int(y0 * ref_h / height)
+                    gy1 = max(gy0 + 1, int(round(y1 * ref_h / height)))
+                    ref = reference[gy0:gy1, gx0:gx1]
+                    small = torch.nn.functional.interpolate(
+                        pred, size=tuple(ref.shape), mode="bilinear", align_corners=False
+                    )
+                    scale, shift = _align(small.squeeze().cpu().numpy(), ref.cpu().numpy())
+                    depth = torch.nn.functional.interpolate(
+                        pred, size=(y1 - y0, x1 - x0), mode="bicubic", align_corners=False
+                    ).squeeze().cpu().numpy()
+                    weights = _blend_weights((x0, y0, x1, y1), width, height, overlap)
+                    depth_map[y0:y1, x0:x1] += (depth * scale + shift) * weights
+                    weight_sum[y0:y1, x0:x1] += weights
+            del batch, prediction
+        for y in range(0, height, 256):
+            depth_map[y:y + 256] /= weight_sum[y:y + 256]
+        depth_map.flush()
+        del weight_sum
+    del depth_map
+
+
+def _record_plan(plan: Dict[str, Any]) -> None:
+    if _METRICS is not None:
+        _METRICS.counter(
+            "mighty_depth_plans_total",
+            "Depth requests by chosen variant, strategy and outcome",
+            ("model", "strategy", "status"),
+        ).labels(
+            model=plan.get("model") or "none",
+            strategy=plan.get("strategy"),
+            status=plan.get("status"),
+        ).inc()
+
+
+def estimate_depth_batch(
+    image_paths: List[str], plans: Optional[List[Dict[str, Any]]] = None
+) -> List[Optional[str]]:
+    """Estimate depth maps for several images with one forward pass per variant and input shape.
+
+    Returns one path/CID (or None) per image, in order. Each image runs as
+    its plan says (planned here unless `plans` is given); `tiled` plans run
+    one image at a time, tiles batched. An image that runs out of memory is
+    replanned without the failing variant/size and retried; when nothing
+    fits, its plan's `status` is `out_of_memory` and the result is None.
+    """
+    results: List[Optional[str]] = [None] * len(image_paths)
+    if plans is None:
+        plans = [{} for _ in image_paths]
+    try:
+        import torch
+        from PIL import Image  # noqa: F401
         import numpy as np
+    except Exception as e:
+        logger.debug("MiDaS not available or failed: %s", e)
+        for plan in plans:
+            plan["status"] = "unavailable"
+        return results
+    for plan, image_path in zip(plans, image_paths):
+        if "model" not in plan:
+            plan.update(plan_depth(image_path))
 
-        img = Image.open(image_path).convert("RGB")
-        input_batch = transform(img).unsqueeze(0)
-        with torch.no_grad():
-            prediction = midas(input_batch)
-            prediction = torch.nn.functional.interpolate(
-                prediction.unsqueeze(1), size=img.size[::-1], mode="bicubic", align_corners=False
-            ).squeeze()
-        # write a simple depth map to a temp file
-        out = tempfile.NamedTemporaryFile(delete=False, suffix=".npy")
-        np.save(out.name, prediction.cpu().numpy())
-        out.close()
-        # Optionally pin to nft.storage if API key is present
-        api_key = os.environ.get("NFT_STORAGE_KEY")
-        if api_key:
-            try:
-                # dynamic import of pin helper to avoid import issues in proxy setup
+    failed: Dict[int, List[Tuple[str, int]]] = {i: [] for i in range(len(image_paths))}
+    retry: List[int] = []
+
+    def fail(indices: List[int], model_type: str, input_size: int, e: BaseException) -> None:
+        """Mark a failure; an out-of-memory one is replanned one rung down and retried."""
+        if not _is_oom(e) or _scheduler is None:
+            logger.debug("MiDaS batch failed: %s", e)
+            for i in indices:
+                plans[i].setdefault("status", "failed")
+            return
+        logger.warning(
+            "MiDaS %s@%d ran out of memory for %d image(s); replanning",
+            model_type,
+            input_size,
+            len(indices),
+        )
+        gc.collect()
+        for i in indices:
+            if results[i] is not None:
+                continue
+            failed[i].append((model_type, input_size))
+            fallback = _scheduler.plan_depth(
+                _scheduler.image_size(image_paths[i]),
+                loaded=_loaded_midas(),
+                exclude=failed[i],
+                quantized=_quantized("midas"),
+            )
+            fallback["fallback_from"] = failed[i][0][0]
+            plans[i].clear()
+            plans[i].update(fallback)
+            retry.append(i)
+
+    pending = list(range(len(image_paths)))
+    while pending:
+        retry = []
+        groups: Dict[Tuple[Any, ...], List[Tuple[int, Any, Tuple[int, int]]]] = {}
+        for i in pending:
+            plan = plans[i]
+            if plan["model"] is None:
+                plan["status"] = "out_of_memory" if failed[i] else "skipped"
+                continue
+            if plan.get("strategy") == "tiled":
                 try:
-                    from agents_stubs.utils.pinning import pin_file_with_retries
-                except Exception:
-                    # fallback to loading implementation directly from file
-                    import importlib.util
-                    p = os.path.join(os.path.dirname(__file__), "..", "utils", "pinning.py")
-                    p = os.path.normpath(p)
-                    spec = importlib.util.spec_from_file_location("mighty.pinning", p)
-                    mod = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(mod)
-                    pin_file_with_retries = getattr(mod, "pin_file_with_retries")
-
-                cid = pin_file_with_retries(out.name, api_key)
-                return cid
+                    results[i] = _pin_artifact(
+                        _tiled_depth(image_paths[i], plan, _midas(plan["model"])), "depth map"
+                    )
+                    plan["status"] = "ok"
+                except Exception as e:
+                    fail([i], plan["model"], plan["input_size"], e)
+                continue
+            kind = _scheduler.VARIANTS[plan["model"]].kind if _scheduler else "dpt"
+            try:
+                tensor, size = _net_input(image_paths[i], kind, plan["input_size"])
             except Exception as e:
-                logger.debug("Pinning depth map failed: %s", e)
-                return out.name
-        return out.name
-    except Exception as e:
-        logger.debug("MiDaS not available or failed: %s", e)
-        return None
+                logger.debug("Depth input %s failed: %s", image_paths[i], e)
+                plan["status"] = "failed"
+                continue
+            groups.setdefault((plan["model"], plan["input_size"], tuple(tensor.shape)), []).append(
+                (i, tensor, size)
+            )
+
+        for (model_type, input_size, _shape), items in groups.items():
+            step = min(plans[i]["max_batch"] for i, _, _ in items)
+            for start in range(0, len(items), step):
+                chunk = items[start:start + step]
+                try:
+                    midas = _midas(model_type)
+                    with torch.no_grad():
+                        with _span(
+                            "depth.forward",
+                            batch_size=len(chunk),
+                            model=model_type,
+                            input_size=input_size,
+                        ):
+                            prediction = midas(torch.stack([t for _, t, _ in chunk]))
+                        for row, (i, _, size) in enumerate(chunk):
+                            full = plans[i].get("strategy") != "downscaled"
+                            out_w, out_h = size[::-1] if full else plans[i]["output_size"]
+                            depth = torch.nn.functional.interpolate(
+                                prediction[row:row + 1].unsqueeze(1),
+                                size=(out_h, out_w),
+                                mode="bicubic",
+                                align_corners=False,
+                            ).squeeze()
+                            # write a simple depth map to a temp file
+                            out = tempfile.NamedTemporaryFile(delete=False, suffix=".npy")
+                            np.save(out.name, depth.cpu().numpy())
+                            out.close()
+                            del depth
+                            # Optionally pin to nft.storage if API key is present
+                            results[i] = _pin_artifact(out.name, "depth map")
+                            plans[i]["status"] = "ok"
+                    del prediction
+                except Exception as e:
+                    prediction = None
+                    fail([i for i, _, _ in chunk], model_type, input_size, e)
+        pending = retry
+    for plan in plans:
+        _record_plan(plan)
+    return results
 
 
 def run_segmentation(image_path: str) -> Optional[str]:
     """Run segmentation (SAM/YOLO). Returns a path to masks or None.
 
-    Attempts SAM via segment-anything if installed.
+    Attempts SAM via segment-anything if installed. SamPredictor embeds one
+    image at a time, so there is no batched entry point; batches call this
+    per image and share the cached predictor.
     """
     try:
-        # try to import segment-anything
-        from segment_anything import SamPredictor, sam_model_registry
         from PIL import Image
         import numpy as np
 
-        model = sam_model_registry.get("default")
-        predictor = SamPredictor(model)
-        img = np.array(Image.open(image_path).convert("RGB"))
-        predictor.set_image(img)
-        # produce a simple mask for now
-        masks = predictor.predict(points=None, boxes=None)
+        predictor = _cached_model("sam", _load_sam)
+        with _span("image.decode", path=image_path):
+            img = np.array(Image.open(image_path).convert("RGB"))
+        with _span("segmentation.predict"):
+            predictor.set_image(img)
+            # produce a simple mask for now
+            masks = predictor.predict(points=None, boxes=None)
         out = tempfile.NamedTemporaryFile(delete=False, suffix=".npz")
         # save masks as numpy arrays
-        import numpy as np
-
         np.savez(out.name, masks=masks)
         out.close()
-        api_key = os.environ.get("NFT_STORAGE_KEY")
-        if api_key:
-            try:
-                try:
-                    from agents_stubs.utils.pinning import pin_file_with_retries
-                except Exception:
-                    import importlib.util
-                    p = os.path.join(os.path.dirname(__file__), "..", "utils", "pinning.py")
-                    p = os.path.normpath(p)
-                    spec = importlib.util.spec_from_file_location("mighty.pinning", p)
-                    mod = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(mod)
-                    pin_file_with_retries = getattr(mod, "pin_file_with_retries")
-
-                cid = pin_file_with_retries(out.name, api_key)
-                return cid
-            except Exception as e:
-                logger.debug("Pinning segmentation failed: %s", e)
-                return out.name
-        return out.name
+        return _pin_artifact(out.name, "segmentation")
     except Exception as e:
         logger.debug("Segmentation not available or failed: %s", e)
         return None
@@ -124,11 +606,12 @@ def clip_image_tags(image_path: str, top_k: int = 5) -> List[Dict[str, Any]]:
     """Return CLIP tags for the image if CLIP is installed; else a stub list.
     """
     try:
-        import torch
+        import torch  # noqa: F401  (availability probe)
         from PIL import Image
-        from torchvision import transforms
+        from torchvision import transforms  # noqa: F401
         # Attempt to use a simple CLIP-like model via torchvision (placeholder)
-        img = Image.open(image_path).convert("RGB")
+        with _span("image.decode", path=image_path):
+            Image.open(image_path).convert("RGB")
         # stub: return dummy tags
         return [{"tag": "hiphop", "score": 0.9}, {"tag": "animated", "score": 0.85}][:top_k]
     except Exception as e:
@@ -142,9 +625,7 @@ def transcribe_audio(audio_path: str) -> Dict[str, Any]:
     Falls back to a stub transcription.
     """
     try:
-        import whisper
-
-        model = whisper.load_model("small")
+        model = _whisper()
         result = model.transcribe(audio_path)
         text = result.get("text", "")
         # bpm detection not implemented; return placeholder
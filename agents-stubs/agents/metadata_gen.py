@@ -1,39 +1,69 @@
 """Stub for metadata-generation agent."""
+import argparse
 import json
+import time
 from typing import Dict, Any
 import hashlib
 import os
-import requests
 from typing import Optional
 
-
-def build_metadata(metadata_suggestion: Dict[str, Any], depth_map_cid: str = None, ad_anchor_cid: str = None) -> Dict[str, Any]:
+try:
+    from agents_stubs.utils.tracing import span as _span
+except ModuleNotFoundError as e:
+    if e.name != "agents_stubs":
+        raise
+    import contextlib
+
+    # run as a script: no tracing
+    @contextlib.contextmanager
+    def _span(name, **attributes):
+        yield None
+
+
+def build_metadata(
+    metadata_suggestion: Dict[str, Any],
+    depth_map_cid: str = None,
+    ad_anchor_cid: str = None,
+    pin: bool = True,
+) -> Dict[str, Any]:
     """Build a canonical metadata.json from suggestion.
 
-    This stub computes a fake sha256 and returns a manifest dict.
+    This stub computes a fake sha256 and returns a manifest dict. With
+    `pin=False` the manifest is never pinned here, even if NFT_STORAGE_KEY
+    is set (the pipeline pins in its own stage).
     """
-    base = dict(metadata_suggestion)
-    base["depth_map_cid"] = depth_map_cid
-    base["ad_anchor_cid"] = ad_anchor_cid
-    # pretend asset content
-    sample_bytes = json.dumps(base, sort_keys=True).encode("utf-8")
-    base["sha256"] = hashlib.sha256(sample_bytes).hexdigest()
-    base["timestamp"] = "stub-timestamp"
-
-    # Optional: pin to nft.storage if NFT_STORAGE_KEY is present
-    key = os.environ.get("NFT_STORAGE_KEY")
-    if key:
-        try:
-            # use the robust helper in utils/pinning
-            from ..utils.pinning import pin_json_with_retries
-
-            cid = pin_json_with_retries(base, key)
-            base["manifest_cid"] = cid
-        except Exception:
-            # Do not fail the stub on pin errors; surface later via logs in real impl.
-            base["manifest_cid"] = None
-
-    return base
+    with _span("build_metadata", card_id=metadata_suggestion.get("card_id")):
+        base = dict(metadata_suggestion)
+        base["depth_map_cid"] = depth_map_cid
+        base["ad_anchor_cid"] = ad_anchor_cid
+        # pretend asset content
+        sample_bytes = json.dumps(base, sort_keys=True).encode("utf-8")
+        base["sha256"] = hashlib.sha256(sample_bytes).hexdigest()
+        base["timestamp"] = "stub-timestamp"
+
+        # Optional: pin to nft.storage if NFT_STORAGE_KEY is present
+        key = os.environ.get("NFT_STORAGE_KEY")
+        if key and pin:
+            try:
+                # use the robust helper in utils/pinning
+                from ..utils.pinning import pin_json_with_retries
+
+                cid = pin_json_with_retries(base, key)
+                base["manifest_cid"] = cid
+            except Exception:
+                # Do not fail the stub on pin errors; surface later via logs in real impl.
+                base["manifest_cid"] = None
+
+        return base
+
+
+def __getattr__(name: str) -> Any:
+    # `requests` is imported on first pin; keep `metadata_gen.requests` reachable for patching
+    if name == "requests":
+        import requests
+
+        return requests
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def pin_json_to_nft_storage(obj: Dict[str, Any], api_key: str) -> Optional[str]:
@@ -41,6 +71,8 @@ def pin_json_to_nft_storage(obj: Dict[str, Any], api_key: str) -> Optional[str]:
 
     This is a minimal helper. In production, use the official SDK and retries.
     """
+    import requests
+
     url = "https://api.nft.storage/store"
     headers = {"Authorization": f"Bearer {api_key}"}
     res = requests.post(url, json=obj, headers=headers, timeout=10)
@@ -79,18 +111,28 @@ def main():
 
 if __name__ == "__main__":
     main()
-import argparse
-import json
-import os
-import time
-import hashlib
+
+
+try:
+    from agents_stubs.utils.jsonio import write_json
+except ModuleNotFoundError as e:
+    if e.name != "agents_stubs":
+        raise
+
+    # run as a script: plain json
+    def write_json(path, obj, compact=False):
+        with open(path, "w") as f:
+            json.dump(obj, f, indent=None if compact else 2)
+        return path
 
 
 def compute_sha256_of_string(s):
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
-def run(suggestion_path, depth_map_cid, ad_anchor_cid, contributors, out_dir):
+def run(
+    suggestion_path, depth_map_cid, ad_anchor_cid, contributors, out_dir, compact=False, echo=True
+):
     os.makedirs(out_dir, exist_ok=True)
     with open(suggestion_path, "r") as f:
         suggestion = json.load(f)
@@ -117,13 +159,13 @@ def run(suggestion_path, depth_map_cid, ad_anchor_cid, contributors, out_dir):
     }
 
     out_path = os.path.join(out_dir, f"{metadata['card_id']}_metadata.json")
-    with open(out_path, "w") as f:
-        json.dump(metadata, f, indent=2)
+    write_json(out_path, metadata, compact)
 
     # fake pin: return a pseudo CID
     manifest_cid = "cid_" + metadata["sha256"][:12]
-    print(out_path)
-    print(manifest_cid)
+    if echo:
+        print(out_path)
+        print(manifest_cid)
     return out_path, manifest_cid
 
 
@@ -134,5 +176,13 @@ if __name__ == "__main__":
     p.add_argument("--ad-anchor-cid", required=False)
     p.add_argument("--contributors", required=False, nargs="*")
     p.add_argument("--out-dir", default="./data/out")
+    p.add_argument("--compact", action="store_true", help="write JSON without indentation")
     args = p.parse_args()
-    run(args.suggestion, args.depth_map_cid, args.ad_anchor_cid, args.contributors, args.out_dir)
+    run(
+        args.suggestion,
+        args.depth_map_cid,
+        args.ad_anchor_cid,
+        args.contributors,
+        args.out_dir,
+        args.compact,
+    )
@@ -1,38 +1,499 @@
 """Stub for mint-approval agent."""
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import argparse
+import hashlib
 import json
 import os
+import time
+
+# Limits for a single batchMint payload. MightyVerseAssets.batchMint loops over
+# its arrays, so both the card count and the calldata (dominated by the
+# metadata URIs) must stay well under the block gas limit.
+MAX_BATCH_SIZE = 50
+MAX_BATCH_URI_BYTES = 24 * 1024
 
 
-def prepare_mint(manifest_cid: str, card_id: str, credits_required: int = 0, admin_signature: str = None) -> Dict[str, Any]:
+def prepare_mint(
+    manifest_cid: str,
+    card_id: str,
+    credits_required: int = 0,
+    admin_signature: str = None,
+    admin_signers: Optional[Iterable[str]] = None,
+    mint_request: Optional[Dict[str, Any]] = None,
+    account: Optional[str] = None,
+    ledger: Any = None,
+) -> Dict[str, Any]:
     """Prepare a mint transaction payload (stub).
 
     This does not talk to chain; it returns a prepared payload and a fake tx id.
+    When `admin_signers` is given, `admin_signature` is verified as an EIP-712
+    MightyVerseAssets `MintRequest` built from `mint_request` (`recipient`,
+    `token_id`, `amount`, `metadata_uri`, `nonce`, `deadline`).
+    Without a signature, `credits_required` is held against `account` in the
+    off-chain credit `ledger` (see utils/credit_ledger.py) under the metadata
+    URI being minted; the payload carries the `credit_hold_id` that
+    `complete_mint` settles once the mint transaction is mined.
     """
+    hold_id = None
+    metadata_uri = (mint_request or {}).get("metadata_uri") or f"ipfs://{manifest_cid}"
     if credits_required > 0 and admin_signature is None:
-        # In real flow you'd check credit balance; here we return an error payload
-        return {"error": "insufficient_credits_or_missing_signature"}
+        ledger = ledger or _default_ledger()
+        if ledger is None or not account:
+            return {"error": "insufficient_credits_or_missing_signature"}
+        hold_id = ledger.reserve_many([(account, credits_required, "mint", metadata_uri)])[0]
+        if hold_id is None:
+            return {"error": "insufficient_credits"}
+    if mint_request is not None and _amount(mint_request) is None:
+        return {"error": "invalid_amount"}
+    if admin_signature is not None and admin_signers is not None:
+        card = dict(mint_request or {}, manifest_cid=manifest_cid, admin_signature=admin_signature)
+        check = _verify_admin_signatures([card], admin_signers)[0]
+        if check.get("error") == "invalid_mint_request":
+            return {"error": check["error"], "reason": check["reason"]}
+        if not check["valid"]:
+            return {"error": "invalid_admin_signature", "reason": check.get("error")}
 
     tx = {
         "card_id": card_id,
         "manifest_cid": manifest_cid,
+        "metadata_uri": metadata_uri,
         "network": "testnet-stub",
         "tx_id": f"tx_stub_{card_id}",
         "status": "prepared",
     }
+    if hold_id is not None:
+        tx["credit_hold_id"] = hold_id
     # If requested, run local hardhat deploy and return deployed address in tx
     if os.environ.get("USE_HARDHAT") == "1":
-        try:
-            from ..utils.hardhat import run_hardhat_deploy
+        _attach_hardhat_deploy([tx])
+
+    return tx
+
+
+def _default_ledger() -> Any:
+    """Shared ledger at `MIGHTY_CREDIT_LEDGER` (a SQLite path), if configured."""
+    path = os.environ.get("MIGHTY_CREDIT_LEDGER")
+    if not path:
+        return None
+    from agents_stubs.utils.credit_ledger import get_ledger
+
+    return get_ledger(path)
 
-            addr = run_hardhat_deploy()
-            tx["network"] = "local-hardhat"
-            tx["deployed_address"] = addr
-            tx["status"] = "deployed" if addr else "prepared"
-        except Exception as e:
+
+def _attach_hardhat_deploy(txs: List[Dict[str, Any]]) -> None:
+    """Resolve contracts on the local hardhat network and annotate every payload.
+
+    Uses the process-wide `HardhatSession`, so the node is started and the
+    contracts deployed at most once; later calls are a cached lookup plus one
+    batched `eth_getCode` round trip.
+    """
+    try:
+        from agents_stubs.utils.hardhat import get_session
+
+        addresses = get_session().deployed_addresses()
+    except Exception as e:
+        for tx in txs:
             tx["hardhat_error"] = str(e)
+        return
+    addr = addresses.get("MightyVerseAssets")
+    for tx in txs:
+        tx["network"] = "local-hardhat"
+        tx["deployed_address"] = addr
+        tx["contracts"] = addresses
+        tx["status"] = "deployed" if addr else "prepared"
+
+
+def _amount(card: Dict[str, Any]) -> Optional[int]:
+    """The card's mint amount (default 1), or None unless it is a positive integer."""
+    try:
+        amount = int(card.get("amount", 1))
+    except (TypeError, ValueError):
+        return None
+    return amount if amount > 0 else None
+
+
+def _mint_request_message(card: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the signed `MintRequest` for a card.
+
+    `nonce` and `deadline` are part of what the admin signed, so they are
+    required; raises ValueError naming the missing or malformed fields.
+    """
+    invalid = []
+    for field in ("nonce", "deadline"):
+        try:
+            if int(card[field]) < 0:
+                invalid.append(field)
+        except (KeyError, TypeError, ValueError):
+            invalid.append(field)
+    if invalid:
+        raise ValueError(", ".join(invalid))
+    return {
+        "to": card.get("recipient"),
+        "tokenId": int(card.get("token_id") or 0),
+        "amount": _amount(card),
+        "metadataURI": card.get("metadata_uri") or f"ipfs://{card['manifest_cid']}",
+        "nonce": int(card["nonce"]),
+        "deadline": int(card["deadline"]),
+    }
+
+
+def _verify_admin_signatures(
+    cards: List[Dict[str, Any]],
+    admin_signers: Iterable[str],
+    signature_domain: Optional[Dict[str, Any]] = None,
+    nonce_cache: Any = None,
+) -> List[Dict[str, Any]]:
+    """Verify the admin signatures of many cards in one batched EIP-712 call.
+
+    A card whose `MintRequest` is incomplete is not verified; its check is
+    `{"valid": False, "error": "invalid_mint_request", "reason": ...}`.
+    """
+    from agents_stubs.utils.eip712 import ENGINE, default_domain
+
+    domain = signature_domain or default_domain()
+    checks: List[Optional[Dict[str, Any]]] = []
+    items = []
+    for card in cards:
+        try:
+            message = _mint_request_message(card)
+        except ValueError as e:
+            checks.append(
+                {"valid": False, "error": "invalid_mint_request", "reason": f"missing {e}"}
+            )
+            continue
+        checks.append(None)
+        items.append({
+            "contract": "MightyVerseAssets",
+            "primary_type": "MintRequest",
+            "message": message,
+            "signature": card["admin_signature"],
+            **domain,
+        })
+    verified = iter(ENGINE.verify_batch(items, allowed_signers=admin_signers, nonces=nonce_cache))
+    return [check if check is not None else next(verified) for check in checks]
+
+
+def _approval_path(card: Dict[str, Any]) -> str:
+    if card.get("admin_signature"):
+        return "signature"
+    if card.get("approval_hash"):
+        return "registry"
+    if int(card.get("credits_required") or 0) > 0:
+        return "credits"
+    return "open"
+
+
+def _chunk(
+    cards: List[Dict[str, Any]], max_batch_size: int, max_uri_bytes: int
+) -> Iterable[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    size = 0
+    for card in cards:
+        uri_len = len(card["metadata_uri"].encode("utf-8"))
+        if chunk and (len(chunk) >= max_batch_size or size + uri_len > max_uri_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(card)
+        size += uri_len
+    if chunk:
+        yield chunk
 
-    return tx
+
+def prepare_mint_batch(
+    cards: List[Dict[str, Any]],
+    max_batch_size: int = MAX_BATCH_SIZE,
+    max_uri_bytes: int = MAX_BATCH_URI_BYTES,
+    admin_signers: Optional[Iterable[str]] = None,
+    signature_domain: Optional[Dict[str, Any]] = None,
+    nonce_cache: Any = None,
+    approval_index: Any = None,
+    ledger: Any = None,
+) -> Dict[str, Any]:
+    """Prepare batched mint payloads for many cards (stub).
+
+    Each card is a dict with the same fields `prepare_mint` takes
+    (`manifest_cid`, `card_id`, `credits_required`, `admin_signature`) plus
+    optional `recipient`, `amount`, `metadata_uri` and `approval_hash` (an
+    ApprovalRegistry operation hash). Cards are grouped by
+    recipient and approval path and split into `batchMint` payloads that
+    respect `max_batch_size` and `max_uri_bytes`. `batchMint` is restricted
+    to MINTER_ROLE and checks no signature, so it only carries cards the
+    minter approves itself (open, credits and registry paths); each
+    admin-signed card becomes its own `mintWithSignature` payload with
+    the signed `MintRequest` (which needs `nonce` and `deadline`). Cards
+    whose `amount` is not a positive integer are rejected.
+
+    Returns a dict with the `batches`, a per-card status list in input order
+    and a small summary. Cards that would fail `prepare_mint` are reported as
+    rejected instead of failing the whole batch. With `admin_signers`, all
+    signature-path cards are verified in one `verify_batch` call (see
+    utils/eip712.py), using `nonce_cache` for on-chain nonces when given.
+    With `approval_index` (an `EventIndexer`, see utils/indexer.py), all
+    registry-path cards are checked against the local index in one query.
+    Credits-path cards need an `account` and a credit `ledger` (or
+    `MIGHTY_CREDIT_LEDGER`); their holds are placed in one transaction.
+    """
+    statuses: List[Dict[str, Any]] = []
+    candidates: List[Tuple[Dict[str, Any], str, Dict[str, Any]]] = []
+    seen = set()
+
+    for card in cards:
+        card_id = card.get("card_id")
+        status: Dict[str, Any] = {"card_id": card_id}
+        statuses.append(status)
+        if not card_id or not card.get("manifest_cid"):
+            status.update(status="rejected", error="missing_card_id_or_manifest_cid")
+            continue
+        if card_id in seen:
+            status.update(status="rejected", error="duplicate_card_id")
+            continue
+        seen.add(card_id)
+        if _amount(card) is None:
+            status.update(status="rejected", error="invalid_amount")
+            continue
+        path = _approval_path(card)
+        if path == "credits" and not card.get("account"):
+            status.update(status="rejected", error="insufficient_credits_or_missing_signature")
+            continue
+        candidates.append((card, path, status))
+
+    holds: Dict[str, int] = {}
+    paid = [(card, status) for card, path, status in candidates if path == "credits"]
+    if paid:
+        ledger = ledger or _default_ledger()
+        if ledger is None:
+            hold_ids: List[Optional[int]] = [None] * len(paid)
+        else:
+            hold_ids = ledger.reserve_many(
+                (
+                    card["account"],
+                    int(card["credits_required"]),
+                    "mint",
+                    card.get("metadata_uri") or f"ipfs://{card['manifest_cid']}",
+                )
+                for card, _ in paid
+            )
+        for (card, status), hold_id in zip(paid, hold_ids):
+            if hold_id is None:
+                error = (
+                    "insufficient_credits"
+                    if ledger is not None
+                    else "insufficient_credits_or_missing_signature"
+                )
+                status.update(status="rejected", error=error)
+            else:
+                holds[card["card_id"]] = hold_id
+        candidates = [c for c in candidates if c[1] != "credits" or c[0]["card_id"] in holds]
+
+    if admin_signers is not None:
+        signed = [card for card, path, _ in candidates if path == "signature"]
+        checks = dict(zip(
+            (card["card_id"] for card in signed),
+            _verify_admin_signatures(signed, admin_signers, signature_domain, nonce_cache),
+        ))
+    else:
+        checks = {}
+    if approval_index is not None:
+        registry = [card for card, path, _ in candidates if path == "registry"]
+        approved = approval_index.is_approved(card["approval_hash"] for card in registry)
+        for card in registry:
+            if not approved.get(card["approval_hash"].lower()):
+                checks[card["card_id"]] = {"valid": False, "error": "approval_not_granted"}
+
+    groups: Dict[Tuple[Optional[str], str], List[Dict[str, Any]]] = {}
+    for card, path, status in candidates:
+        check = checks.get(card["card_id"])
+        if check is not None and not check["valid"]:
+            if path == "registry":
+                status.update(status="rejected", error=check["error"])
+            elif check["error"] == "invalid_mint_request":
+                status.update(status="rejected", error=check["error"], reason=check["reason"])
+            else:
+                status.update(
+                    status="rejected", error="invalid_admin_signature", reason=check.get("error")
+                )
+            continue
+        entry = {
+            "card_id": card["card_id"],
+            "manifest_cid": card["manifest_cid"],
+            "amount": _amount(card),
+            "metadata_uri": card.get("metadata_uri") or f"ipfs://{card['manifest_cid']}",
+            "admin_signature": card.get("admin_signature"),
+            "_status": status,
+        }
+        if path == "signature":
+            try:
+                entry["request"] = _mint_request_message(card)
+            except ValueError as e:
+                status.update(
+                    status="rejected", error="invalid_mint_request", reason=f"missing {e}"
+                )
+                continue
+        groups.setdefault((card.get("recipient"), path), []).append(entry)
+
+    batches: List[Dict[str, Any]] = []
+    for (recipient, path), entries in groups.items():
+        if path == "signature":
+            # batchMint is MINTER_ROLE-only and checks no signature: each
+            # admin-signed card is its own mintWithSignature call
+            chunks: Iterable[List[Dict[str, Any]]] = ([e] for e in entries)
+        else:
+            chunks = _chunk(entries, max_batch_size, max_uri_bytes)
+        for chunk in chunks:
+            digest = hashlib.sha256(
+                "|".join(e["card_id"] for e in chunk).encode("utf-8")
+            ).hexdigest()
+            batch_id = f"batch_{digest[:12]}"
+            if path == "signature":
+                method = "mintWithSignature"
+                args = {"request": chunk[0]["request"], "signature": chunk[0]["admin_signature"]}
+            else:
+                method = "batchMint"
+                args = {
+                    "recipients": [recipient] * len(chunk),
+                    "amounts": [e["amount"] for e in chunk],
+                    "metadataURIs": [e["metadata_uri"] for e in chunk],
+                }
+            batch = {
+                "batch_id": batch_id,
+                "recipient": recipient,
+                "approval_path": path,
+                "method": method,
+                "args": args,
+                "cards": [],
+                "network": "testnet-stub",
+                "tx_id": f"tx_stub_{batch_id}",
+                "status": "prepared",
+            }
+            for index, e in enumerate(chunk):
+                item = {
+                    "card_id": e["card_id"],
+                    "manifest_cid": e["manifest_cid"],
+                    "index": index,
+                    "status": "prepared",
+                }
+                if path == "signature":
+                    item["admin_signature"] = e["admin_signature"]
+                if e["card_id"] in holds:
+                    item["credit_hold_id"] = holds[e["card_id"]]
+                    e["_status"]["credit_hold_id"] = holds[e["card_id"]]
+                batch["cards"].append(item)
+                e["_status"].update(status="batched", batch_id=batch_id, index=index)
+            batches.append(batch)
+
+    if batches and os.environ.get("USE_HARDHAT") == "1":
+        _attach_hardhat_deploy(batches)
+
+    rejected = sum(1 for s in statuses if s["status"] == "rejected")
+    return {
+        "batches": batches,
+        "cards": statuses,
+        "summary": {
+            "cards": len(statuses),
+            "batched": len(statuses) - rejected,
+            "rejected": rejected,
+            "transactions": len(batches),
+        },
+    }
+
+
+def _hold_ids(result: Dict[str, Any]) -> List[int]:
+    found: Dict[int, None] = {}
+    if result.get("credit_hold_id") is not None:
+        found[result["credit_hold_id"]] = None
+    for item in list(result.get("cards") or []) + list(result.get("batches") or []):
+        found.update(dict.fromkeys(_hold_ids(item)))
+    return list(found)
+
+
+def _default_rpc() -> Any:
+    """JSON-RPC client for the ledger's chain (`MIGHTY_SETTLEMENT_RPC_URL`), if configured."""
+    url = os.environ.get("MIGHTY_SETTLEMENT_RPC_URL")
+    if not url:
+        return None
+    from agents_stubs.utils.hardhat import JsonRpcClient
+
+    return JsonRpcClient(url)
+
+
+def complete_mint(
+    result: Dict[str, Any],
+    tx_hash: str,
+    account: str,
+    ledger: Any = None,
+    rpc: Any = None,
+    assets_address: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Commit or release the credit holds of a prepared mint from its transaction on-chain.
+
+    `result` is a `prepare_mint` payload, one batch, or a whole
+    `prepare_mint_batch` result, and `tx_hash` the mint transaction sent for
+    it. Only the reserved mint holds of `account` are touched: other holds are
+    listed in `rejected`, and ones no longer reserved in `expired`.
+
+    The outcome is read from the transaction, never taken from the caller. A
+    hold is committed when the mined transaction emitted `AssetMinted` for the
+    hold's metadata URI from the MightyVerseAssets contract (`assets_address`,
+    default `MIGHTY_ASSETS_ADDRESS`). It is released when the transaction was
+    sent to that contract with the URI in its calldata and reverted, and is
+    otherwise left reserved (`pending`) until it expires. Committed holds
+    become deductions that the ledger's settlement worker puts on-chain
+    (utils/credit_ledger.py).
+    """
+    from agents_stubs.utils.indexer import asset_mints
+
+    keys = ("committed", "released", "expired", "pending", "rejected")
+    done: Dict[str, List[int]] = {key: [] for key in keys}
+    hold_ids = _hold_ids(result)
+    if not hold_ids:
+        return done
+    ledger = ledger or _default_ledger()
+    if ledger is None:
+        return {"error": "no_credit_ledger"}
+    rpc = rpc or _default_rpc()
+    assets_address = (assets_address or os.environ.get("MIGHTY_ASSETS_ADDRESS") or "").lower()
+    if rpc is None or not assets_address:
+        return {"error": "no_chain_rpc"}
+
+    holds = ledger.holds(hold_ids)
+    owned = []
+    for hold_id in hold_ids:
+        hold = holds.get(hold_id)
+        if hold is None or hold["account"] != account.lower() or hold["operation"] != "mint":
+            done["rejected"].append(hold_id)
+        elif hold["status"] != "reserved":
+            done["expired"].append(hold_id)  # already committed, released or settled
+        else:
+            owned.append(hold_id)
+    if not owned:
+        return done
+
+    receipt, tx = rpc.batch([
+        ("eth_getTransactionReceipt", [tx_hash]),
+        ("eth_getTransactionByHash", [tx_hash]),
+    ])
+    if not receipt or not tx:
+        done["pending"] = owned
+        return done
+    if int(receipt.get("status") or "0x0", 16) == 1:
+        minted = [m["metadata_uri"] for m in asset_mints(receipt.get("logs") or [], assets_address)]
+        to_commit = []
+        for hold_id in owned:
+            if holds[hold_id]["ref"] in minted:
+                minted.remove(holds[hold_id]["ref"])  # one event pays for one hold
+                to_commit.append(hold_id)
+            else:
+                done["pending"].append(hold_id)
+        done["expired"] += ledger.commit_many(to_commit)
+        done["committed"] = [i for i in to_commit if i not in done["expired"]]
+        return done
+    calldata = bytes.fromhex((tx.get("input") or "0x")[2:])
+    sent_here = (tx.get("to") or "").lower() == assets_address
+    for hold_id in owned:
+        uri = (holds[hold_id]["ref"] or "").encode("utf-8")
+        done["released" if sent_here and uri and uri in calldata else "pending"].append(hold_id)
+    ledger.release_many(done["released"])
+    return done
 
 
 def main():
@@ -43,19 +504,35 @@ def main():
     except Exception:
         payload = {}
 
-    res = prepare_mint(payload.get("manifest_cid", ""), payload.get("card_id", "card_stub"), payload.get("credits_required", 0), payload.get("admin_signature"))
+    res = prepare_mint(
+        payload.get("manifest_cid", ""),
+        payload.get("card_id", "card_stub"),
+        payload.get("credits_required", 0),
+        payload.get("admin_signature"),
+    )
     print(json.dumps(res))
 
 
 if __name__ == "__main__":
     main()
-import argparse
-import json
-import os
-import time
 
 
-def run(manifest_cid, card_id, credits_required, admin_signature, out_dir):
+try:
+    from agents_stubs.utils.jsonio import write_json
+except ModuleNotFoundError as e:
+    if e.name != "agents_stubs":
+        raise
+
+    # run as a script: plain json
+    def write_json(path, obj, compact=False):
+        with open(path, "w") as f:
+            json.dump(obj, f, indent=None if compact else 2)
+        return path
+
+
+def run(
+    manifest_cid, card_id, credits_required, admin_signature, out_dir, compact=False, echo=True
+):
     os.makedirs(out_dir, exist_ok=True)
     result = {
         "card_id": card_id,
@@ -79,17 +556,16 @@ def run(manifest_cid, card_id, credits_required, admin_signature, out_dir):
     # Simulate creating a tx
     tx = {"to": "0xMightyVerseMock", "data": "0xdeadbeef", "status": "pending"}
     tx_path = os.path.join(out_dir, f"{card_id}_mint_tx.json")
-    with open(tx_path, "w") as f:
-        json.dump(tx, f, indent=2)
+    write_json(tx_path, tx, compact)
 
     # Simulate receipt
     receipt = {"txHash": "0x" + str(int(time.time())), "status": "success", "blockNumber": 123456}
     receipt_path = os.path.join(out_dir, f"{card_id}_tx_receipt.json")
-    with open(receipt_path, "w") as f:
-        json.dump(receipt, f, indent=2)
+    write_json(receipt_path, receipt, compact)
 
-    print(tx_path)
-    print(receipt_path)
+    if echo:
+        print(tx_path)
+        print(receipt_path)
     return tx_path, receipt_path
 
 
@@ -100,5 +576,13 @@ if __name__ == "__main__":
     p.add_argument("--credits-required", required=False)
     p.add_argument("--admin-signature", required=False)
     p.add_argument("--out-dir", default="./data/out")
+    p.add_argument("--compact", action="store_true", help="write JSON without indentation")
     args = p.parse_args()
-    run(args.manifest_cid, args.card_id, args.credits_required, args.admin_signature, args.out_dir)
+    run(
+        args.manifest_cid,
+        args.card_id,
+        args.credits_required,
+        args.admin_signature,
+        args.out_dir,
+        args.compact,
+    )
@@ -0,0 +1,179 @@
+"""ONNX Runtime CPU backend for the integration models, exported once and cached.
+
+MIGHTY_BACKEND_<INTEGRATION> selects the backend per integration:
+`MIGHTY_BACKEND_DEPTH=onnx` runs MiDaS through ONNX Runtime, `torch` (the
+default) keeps the PyTorch eager model. CLIP tagging is still a placeholder
+without a model, so depth is the only integration with a switch for now.
+
+A model is exported once from its PyTorch module (dynamic batch, height and
+width) under MIGHTY_ONNX_CACHE (default `~/.cache/mighty/onnx`), keyed by
+model, torch version and opset. Every export is checked against the eager
+model at two input shapes before it is used, so a graph that baked in a
+shape or diverges numerically is rejected rather than cached. Later
+processes build the session straight from the cached graph without loading
+the PyTorch weights.
+
+Sessions use the CPU execution provider with
+MIGHTY_ORT_INTRA_OP_THREADS (threads inside one operator, default: ONNX
+Runtime's choice, one per physical core) and MIGHTY_ORT_INTER_OP_THREADS
+(operators run in parallel when above 1, default sequential).
+
+Whether ONNX is faster or leaner than torch on a node is measured, not
+assumed: see the `backend.*` benchmarks in benchmarks/bench.py.
+"""
+import logging
+import os
+import tempfile
+from typing import Any, Callable, Dict, Sequence
+
+logger = logging.getLogger("mighty.onnx")
+
+BACKENDS = ("torch", "onnx")
+OPSET = 17
+MAX_EXPORT_ERROR = 1e-3
+
+
+def backend(integration: str) -> str:
+    """"torch" or "onnx" for `integration` ("depth"), from MIGHTY_BACKEND_<INTEGRATION>."""
+    value = os.environ.get(f"MIGHTY_BACKEND_{integration.upper()}", "").strip().lower() or "torch"
+    if value not in BACKENDS:
+        raise ValueError(
+            f"MIGHTY_BACKEND_{integration.upper()}={value!r}: expected one of {', '.join(BACKENDS)}"
+        )
+    return value
+
+
+def cache_dir() -> str:
+    return os.environ.get("MIGHTY_ONNX_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "mighty", "onnx"
+    )
+
+
+def cache_path(key: str) -> str:
+    import torch
+
+    version = torch.__version__.replace("+", "_")
+    return os.path.join(cache_dir(), f"{key}-torch{version}-opset{OPSET}.onnx")
+
+
+def _threads(name: str) -> int:
+    value = os.environ.get(name, "").strip()
+    return max(0, int(value)) if value else 0
+
+
+def session_options() -> Any:
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    opts.intra_op_num_threads = _threads("MIGHTY_ORT_INTRA_OP_THREADS")
+    inter = _threads("MIGHTY_ORT_INTER_OP_THREADS")
+    if inter > 1:
+        opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        opts.inter_op_num_threads = inter
+    return opts
+
+
+class OnnxModel:
+    """An ONNX Runtime session called like the PyTorch module it was exported from.
+
+    Takes and returns torch tensors (or numpy arrays), so the pre- and
+    post-processing around the model stays the same for both backends.
+    """
+
+    def __init__(self, path: str):
+        import onnxruntime as ort
+
+        self.path = path
+        self.session = ort.InferenceSession(
+            path, sess_options=session_options(), providers=["CPUExecutionProvider"]
+        )
+        self.input = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: Any) -> Any:
+        import numpy as np
+
+        is_torch = hasattr(batch, "detach")
+        x = batch.detach().cpu().numpy() if is_torch else batch
+        out = self.session.run(None, {self.input: np.ascontiguousarray(x, dtype=np.float32)})[0]
+        if is_torch:
+            import torch
+
+            return torch.from_numpy(out)
+        return out
+
+    def eval(self) -> "OnnxModel":
+        return self
+
+
+def _dynamic_axes(rank: int) -> Dict[str, Dict[int, str]]:
+    axes = {0: "batch"}
+    if rank == 4:
+        axes.update({2: "height", 3: "width"})
+    return {"input": axes, "output": {0: "batch"}}
+
+
+def _check(model: Any, onnx_model: OnnxModel, examples: Sequence[Any]) -> None:
+    """Raise unless the graph reproduces the eager model on every example."""
+    import torch
+
+    with torch.no_grad():
+        for x in examples:
+            ref = model(x).cpu().numpy()
+            out = onnx_model(x).numpy()
+            span = float(ref.max() - ref.min()) or 1.0
+            error = float(abs(out - ref).max()) / span if out.shape == ref.shape else float("inf")
+            if error > MAX_EXPORT_ERROR:
+                raise RuntimeError(
+                    f"exported graph differs from torch at input {tuple(x.shape)}: "
+                    f"relative error {error:.2g}"
+                )
+
+
+def export(model: Any, example_shape: Sequence[int], path: str) -> OnnxModel:
+    """Export `model` to `path` (atomically, owner-only) and return the checked session."""
+    import torch
+
+    shape = tuple(example_shape)
+    example = torch.randn(*shape)
+    # a second shape catches a graph that traced the example's size as a constant
+    examples = [example]
+    if len(shape) == 4:
+        examples.append(torch.randn(2, shape[1], shape[2] + 32, shape[3] + 64))
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                model, (example,), tmp, input_names=["input"], output_names=["output"],
+                dynamic_axes=_dynamic_axes(len(shape)), opset_version=OPSET, dynamo=False,
+            )
+        onnx_model = OnnxModel(tmp)
+        _check(model, onnx_model, examples)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    onnx_model.path = path
+    logger.info("Exported %s to %s", type(model).__name__, path)
+    return onnx_model
+
+
+def load_onnx(key: str, build_torch: Callable[[], Any], example_shape: Sequence[int]) -> OnnxModel:
+    """The ONNX Runtime model for `key`: from the cached graph, or exported from `build_torch()`.
+
+    A cached graph that fails to load is exported again rather than raised;
+    an export that fails its check raises.
+    """
+    path = cache_path(key)
+    if os.path.exists(path):
+        try:
+            model = OnnxModel(path)
+            logger.info("Loaded ONNX graph %s from %s", key, path)
+            return model
+        except Exception as e:
+            logger.warning("ONNX cache %s unusable, exporting again: %s", path, e)
+    torch_model = build_torch()
+    torch_model.eval()
+    return export(torch_model, example_shape, path)
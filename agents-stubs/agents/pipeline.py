@@ -0,0 +1,361 @@
+"""Stage-parallel card pipeline: review -> metadata -> pin -> mint-prep.
+
+Each stage has its own worker threads and reads from a bounded queue fed by
+the previous stage, so model-bound review, I/O-bound pinning and chain
+preparation overlap across cards instead of running one card at a time. A
+full queue blocks its producer (back-pressure), so memory stays bounded
+however many cards are streamed in.
+
+Items are dicts (`{"asset_cid", "manifest"}` plus whatever earlier stages
+added). A stage that raises marks the item with `error` (`stage`, `error`)
+and later stages pass it through untouched. Results stream out in
+completion order, each with its input `index`.
+
+`stats()` reports per stage: items processed, errors, busy time, throughput,
+utilization (busy time / (workers x wall time)) and the mean/max occupancy
+of its input queue; `bottleneck` names the most utilized stage. A stage
+whose input queue sits near capacity while the stage after it is idle is
+the one to give more workers.
+
+Usage:
+    python -m agents_stubs.cli pipeline --input ./assets --out results.ndjson \\
+        --workers review=2,metadata=1,pin=8,mint=1
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger("mighty.pipeline")
+
+try:
+    from agents_stubs.utils.metrics import REGISTRY as _METRICS
+except ModuleNotFoundError as e:
+    if e.name != "agents_stubs":
+        raise
+    _METRICS = None  # loaded outside the repo layout: no metrics
+
+_DONE = object()
+
+StageFn = Callable[[Dict[str, Any]], Any]
+
+
+class Stage:
+    """One pipeline step: `fn(item)` updates the item dict in place."""
+
+    def __init__(self, name: str, fn: StageFn, workers: int = 1, queue_size: Optional[int] = None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or self.workers * 4
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.depth_sum = 0
+        self.depth_max = 0
+        self.samples = 0
+
+    def stats(self, wall: float) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "errors": self.errors,
+                "busy_seconds": round(self.busy, 4),
+                "throughput_per_s": round(self.processed / wall, 3) if wall else 0.0,
+                "utilization": round(self.busy / (self.workers * wall), 3) if wall else 0.0,
+                "queue": {
+                    "capacity": self.queue_size,
+                    "mean": round(self.depth_sum / self.samples, 2) if self.samples else 0.0,
+                    "max": self.depth_max,
+                },
+            }
+
+
+class Pipeline:
+    """Run items through `stages` concurrently; see module docstring."""
+
+    def __init__(self, stages: List[Stage], sample_interval: float = 0.01):
+        if not stages:
+            raise ValueError("a pipeline needs at least one stage")
+        self.stages = stages
+        self.sample_interval = sample_interval
+        self.items = 0
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Live while running; final once `run` has been drained."""
+        if self._started is None:
+            wall = 0.0
+        else:
+            wall = (self._finished or time.perf_counter()) - self._started
+        stages = {s.name: s.stats(wall) for s in self.stages}
+        done = stages[self.stages[-1].name]["processed"]
+        return {
+            "items": self.items,
+            "seconds": round(wall, 4),
+            "throughput_per_s": round(done / wall, 3) if wall else 0.0,
+            "bottleneck": max(stages, key=lambda n: stages[n]["utilization"]),
+            "stages": stages,
+        }
+
+    def run(self, items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Feed `items` through every stage, yielding finished items as they complete."""
+        queues = [queue.Queue(maxsize=s.queue_size) for s in self.stages]
+        out: "queue.Queue[Any]" = queue.Queue(maxsize=self.stages[-1].queue_size)
+        downstream = queues[1:] + [out]
+        cancel = threading.Event()
+        sampled = threading.Event()
+        failure: List[BaseException] = []
+        remaining = [s.workers for s in self.stages]
+        remaining_lock = threading.Lock()
+        self.items = 0
+        for stage in self.stages:
+            stage.reset()
+        self._started, self._finished = time.perf_counter(), None
+
+        def feed() -> None:
+            try:
+                for index, item in enumerate(items):
+                    if cancel.is_set():
+                        break
+                    item = dict(item, index=index)
+                    self.items += 1
+                    queues[0].put(item)
+            except BaseException as e:  # surfaced to the consumer after the drain
+                failure.append(e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    queues[0].put(_DONE)
+
+        def work(i: int) -> None:
+            stage, inbox, outbox = self.stages[i], queues[i], downstream[i]
+            while True:
+                try:
+                    item = inbox.get(timeout=0.1)
+                except queue.Empty:
+                    if (
+                        cancel.is_set()
+                    ):  # the consumer went away; the drain below unblocks producers
+                        break
+                    continue
+                if item is _DONE:
+                    break
+                if "error" not in item and not cancel.is_set():
+                    start = time.perf_counter()
+                    try:
+                        stage.fn(item)
+                        ok = True
+                    except Exception as e:
+                        logger.warning(
+                            "pipeline stage %s failed for item %s: %s",
+                            stage.name,
+                            item.get("index"),
+                            e,
+                        )
+                        item["error"] = {"stage": stage.name, "error": f"{type(e).__name__}: {e}"}
+                        ok = False
+                    elapsed = time.perf_counter() - start
+                    with stage.lock:
+                        stage.processed += 1
+                        stage.errors += not ok
+                        stage.busy += elapsed
+                    if _METRICS is not None:
+                        _METRICS.histogram(
+                            "mighty_pipeline_stage_seconds",
+                            "Time one pipeline stage spent on one item",
+                            ("stage", "outcome"),
+                        ).labels(stage=stage.name, outcome="ok" if ok else "error").observe(elapsed)
+                outbox.put(item)
+            with remaining_lock:
+                remaining[i] -= 1
+                last = remaining[i] == 0
+            if last:
+                for _ in range(self.stages[i + 1].workers if i + 1 < len(self.stages) else 1):
+                    outbox.put(_DONE)
+
+        def sample() -> None:
+            while not sampled.wait(self.sample_interval):
+                for stage, q in zip(self.stages, queues):
+                    depth = q.qsize()
+                    with stage.lock:
+                        stage.depth_sum += depth
+                        stage.samples += 1
+                        stage.depth_max = max(stage.depth_max, depth)
+
+        threads = [threading.Thread(target=feed, name="mighty-pipeline-feed", daemon=True)]
+        for i, stage in enumerate(self.stages):
+            threads += [
+                threading.Thread(
+                    target=work, args=(i,), name=f"mighty-pipeline-{stage.name}-{n}", daemon=True
+                )
+                for n in range(stage.workers)
+            ]
+        sampler = threading.Thread(target=sample, name="mighty-pipeline-sampler", daemon=True)
+        for t in threads + [sampler]:
+            t.start()
+
+        finished = False
+        try:
+            while True:
+                item = out.get()
+                if item is _DONE:
+                    break
+                yield item
+            finished = True
+            if failure:
+                raise failure[0]
+        finally:
+            if finished:
+                for t in threads:
+                    t.join()
+            else:  # consumer stopped early: unblock every stage
+                cancel.set()
+                while any(t.is_alive() for t in threads):
+                    for q in queues + [out]:
+                        try:
+                            while True:
+                                q.get_nowait()
+                        except queue.Empty:
+                            pass
+                    for t in threads:
+                        t.join(0.01)
+            sampled.set()
+            sampler.join()
+            self._finished = time.perf_counter()
+            logger.info("pipeline finished: %s", self.stats())
+
+
+# -- the card stages ---------------------------------------------------------
+
+def review_stage(item: Dict[str, Any]) -> None:
+    from .asset_review import run_asset_review
+
+    item["review"] = run_asset_review(item.get("asset_cid") or "", item.get("manifest"))
+
+
+def metadata_stage(item: Dict[str, Any]) -> None:
+    from .metadata_gen import build_metadata
+
+    suggestion = item["review"]["metadata_suggestion"]
+    depth = (suggestion.get("depth_map") or {}).get("cid")
+    item["metadata"] = build_metadata(suggestion, depth, None, pin=False)
+
+
+def pin_stage(item: Dict[str, Any]) -> None:
+    """Pin the manifest when NFT_STORAGE_KEY is set; otherwise leave it unpinned."""
+    key = os.environ.get("NFT_STORAGE_KEY")
+    if not key:
+        item["manifest_cid"] = None
+        return
+    try:
+        from agents_stubs.utils.pinning import pin_json_with_retries
+    except ImportError:  # run with agents-stubs/ itself on sys.path
+        from utils.pinning import pin_json_with_retries
+    item["manifest_cid"] = pin_json_with_retries(item["metadata"], key)
+
+
+def mint_stage(item: Dict[str, Any]) -> None:
+    """Prepare the mint; an unpinned manifest is referenced by its sha256."""
+    from .mint_approval import prepare_mint
+
+    manifest = item["metadata"]
+    cid = item.get("manifest_cid") or f"sha256:{manifest['sha256']}"
+    item["mint"] = prepare_mint(cid, manifest.get("card_id") or "", credits_required=0)
+
+
+CARD_STAGES = {
+    "review": review_stage,
+    "metadata": metadata_stage,
+    "pin": pin_stage,
+    "mint": mint_stage,
+}
+DEFAULT_WORKERS = {"review": 2, "metadata": 1, "pin": 8, "mint": 1}
+
+
+def parse_workers(value: Optional[str]) -> Dict[str, int]:
+    """`"review=4,pin=16"` -> `{"review": 4, "pin": 16}` (unknown stages rejected)."""
+    workers: Dict[str, int] = {}
+    for part in (value or "").split(","):
+        if not part.strip():
+            continue
+        name, _, count = part.partition("=")
+        name = name.strip()
+        if name not in CARD_STAGES or not count.strip().isdigit():
+            raise ValueError(f"bad stage worker spec {part!r}; expected e.g. review=2,pin=8")
+        workers[name] = int(count)
+    return workers
+
+
+def card_pipeline(
+    workers: Optional[Dict[str, int]] = None, queue_size: Optional[int] = None
+) -> Pipeline:
+    """The review -> metadata -> pin -> mint pipeline with per-stage worker counts.
+
+    Defaults come from DEFAULT_WORKERS, overridden by MIGHTY_PIPELINE_WORKERS
+    (same `review=2,pin=8` syntax) and then by `workers`.
+    """
+    counts = dict(
+        DEFAULT_WORKERS,
+        **parse_workers(os.environ.get("MIGHTY_PIPELINE_WORKERS")),
+        **(workers or {}),
+    )
+    return Pipeline([Stage(name, fn, counts[name], queue_size) for name, fn in CARD_STAGES.items()])
+
+
+def _result(item: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        k: item[k]
+        for k in ("index", "id", "asset_cid", "manifest_cid", "metadata", "mint", "error")
+        if k in item
+    }
+    if "review" in item:
+        out["qc_report"] = item["review"].get("qc_report")
+    return out
+
+
+def add_arguments(p: Any) -> None:
+    p.add_argument(
+        "--input",
+        required=True,
+        help="directory, .txt path list, .ndjson/.jsonl or .json item list",
+    )
+    p.add_argument(
+        "--out", default=None, help="write one NDJSON result per card here (default: stdout)"
+    )
+    p.add_argument(
+        "--workers", default=None, help="per-stage workers, e.g. review=2,metadata=1,pin=8,mint=1"
+    )
+    p.add_argument(
+        "--queue-size", type=int, default=None, help="capacity of each stage's input queue"
+    )
+
+
+def run_from_args(args: Any) -> Dict[str, Any]:
+    import json
+    import sys
+
+    from .batch_review import discover
+
+    pipeline = card_pipeline(parse_workers(args.workers), args.queue_size)
+    items = (
+        {"id": i, "asset_cid": cid, "manifest": manifest}
+        for i, cid, manifest in discover(args.input)
+    )
+    sink = open(args.out, "w") if args.out else sys.stdout
+    try:
+        for item in pipeline.run(items):
+            sink.write(json.dumps(_result(item)) + "\n")
+    finally:
+        if args.out:
+            sink.close()
+    stats = pipeline.stats()
+    print(json.dumps(stats), file=sys.stderr if not args.out else sys.stdout)
+    return stats
@@ -0,0 +1,101 @@
+"""Opt-in dynamic int8 quantization of the CPU models, cached on disk.
+
+MIGHTY_QUANTIZE selects which models run quantized: `midas`, `whisper`
+(comma-separated), `all`, or unset/`0` for none. Quantization is PyTorch
+dynamic quantization of every `nn.Linear`: int8 weights, activations
+quantized on the fly. That covers the attention projections (qkv/out) and
+MLPs of the DPT transformers and of Whisper, where nearly all of their
+compute and weight memory is. Convolutions stay fp32.
+
+A quantized model is saved once under MIGHTY_QUANT_CACHE (default
+`~/.cache/mighty/quantized`), keyed by model, torch version and quantized
+engine, and later processes load it from there without loading the fp32
+weights first. The cache holds pickled modules: keep it private (files are
+written 0600) and clear it when upgrading model code.
+
+Whether int8 is good enough for a given model is measured, not assumed:
+see benchmarks/quant_report.py.
+"""
+import logging
+import os
+import tempfile
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("mighty.quantization")
+
+MODELS = ("midas", "whisper")
+
+
+def enabled(model: str) -> bool:
+    """Whether MIGHTY_QUANTIZE asks for `model` ("midas", "whisper") to run int8."""
+    value = os.environ.get("MIGHTY_QUANTIZE", "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return False
+    if value in ("1", "all", "true", "yes", "on"):
+        return True
+    return model in {v.strip() for v in value.split(",")}
+
+
+def cache_dir() -> str:
+    return os.environ.get("MIGHTY_QUANT_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "mighty", "quantized"
+    )
+
+
+def quantize(model: Any) -> Any:
+    """Dynamic int8 copy of `model` (nn.Linear layers); the original is left untouched."""
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def cache_path(key: str) -> str:
+    import torch
+
+    engine = torch.backends.quantized.engine
+    version = torch.__version__.replace("+", "_")
+    return os.path.join(cache_dir(), f"{key}-torch{version}-{engine}.pt")
+
+
+def load_quantized(key: str, build_fp32: Callable[[], Any]) -> Any:
+    """The int8 model for `key`: from the disk cache, or built from `build_fp32()` and cached.
+
+    A cache file that fails to load (truncated, written by other code) is
+    rebuilt rather than raised.
+    """
+    import torch
+
+    path = cache_path(key)
+    if os.path.exists(path):
+        try:
+            model = torch.load(path, weights_only=False)
+            model.eval()
+            logger.info("Loaded quantized %s from %s", key, path)
+            return model
+        except Exception as e:
+            logger.warning("Quantized cache %s unusable, rebuilding: %s", path, e)
+    model = quantize(build_fp32())
+    model.eval()
+    _save(model, path)
+    return model
+
+
+def _save(model: Any, path: str) -> Optional[str]:
+    """Write atomically and owner-only; a read-only cache just means no caching."""
+    import torch
+
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                torch.save(model, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except Exception as e:
+        logger.warning("Could not cache quantized model at %s: %s", path, e)
+        return None
+    logger.info("Cached quantized model at %s", path)
+    return path
@@ -0,0 +1,37 @@
+"""`agents_stubs` for when this directory itself is on sys.path.
+
+From the repository root, the `agents_stubs` package there maps onto this
+tree. The Dockerfile (`uvicorn service.app:app` in /app), `make dev` and
+`python cli.py` run from inside agents-stubs/ instead, where that package
+is not importable. This module stands in for it: `agents_stubs.<name>` is
+an alias of the top-level `<name>` (`service`, `utils`, `agents`, ...), so
+each module executes once, under its top-level name, whichever name it is
+imported by.
+"""
+import importlib
+import importlib.abc
+import importlib.util
+import sys
+
+__path__ = []  # a package, so `agents_stubs.<name>` imports are resolved by the finder below
+
+
+class _AliasLoader(importlib.abc.Loader):
+    def create_module(self, spec):
+        return importlib.import_module(spec.name.split(".", 1)[1])
+
+    def exec_module(self, module):
+        pass  # already executed under its top-level name
+
+
+class _AliasFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path=None, target=None):
+        if not fullname.startswith(f"{__name__}."):
+            return None
+        if importlib.util.find_spec(fullname.split(".", 1)[1]) is None:
+            return None
+        return importlib.util.spec_from_loader(fullname, _AliasLoader())
+
+
+if not any(isinstance(f, _AliasFinder) for f in sys.meta_path):
+    sys.meta_path.insert(0, _AliasFinder())
@@ -0,0 +1,535 @@
+r"""Benchmark suite: agents, hashing, manifests, schema validation, pinning, service.
+
+    python -m agents_stubs.benchmarks.bench                       # full run
+    python -m agents_stubs.benchmarks.bench --quick --only hashing,manifest
+    python -m agents_stubs.benchmarks.bench --out results.json \
+        --baseline agents-stubs/benchmarks/baseline.json
+    python -m agents_stubs.benchmarks.bench --write-baseline agents-stubs/benchmarks/baseline.json
+
+Every benchmark runs against a deterministic synthetic corpus (corpus.py,
+built from sample-data/) and reports latency percentiles in milliseconds.
+Pinning talks to a local mock of nft.storage (mock_nft_storage.py), never
+the network. Benchmarks whose optional dependency is missing (jsonschema,
+fastapi, torch, onnxruntime, the MiDaS weights) are reported as `skipped`.
+
+`backend.depth.*` run the same MiDaS variant (MIGHTY_BENCH_DEPTH_MODEL,
+default MiDaS_small) through PyTorch eager and ONNX Runtime, reporting
+latency and `model_rss_mb`, the resident memory added by loading and
+running the model. Memory is only comparable between separate runs, e.g.
+`--only backend.depth.onnx` then `--only backend.depth.torch`.
+
+Output is one JSON document: `meta` (interpreter, platform, CPU count,
+loaded models), `results` and, with `--baseline`, a `comparison`. A
+benchmark regresses when its p50 exceeds the baseline p50 by more than the
+tolerance (`--tolerance`, MIGHTY_BENCH_TOLERANCE, default 0.25, or a
+per-benchmark value under `tolerance` in the baseline file). The exit
+status is 1 when anything regressed. Baselines are machine-specific:
+regenerate one on the machine (or CI runner class) that compares against it.
+"""
+import argparse
+import contextlib
+import gc
+import hashlib
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from . import corpus, mock_nft_storage
+except ImportError:  # run as a script
+    import corpus
+    import mock_nft_storage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = os.path.join(
+    os.path.dirname(ROOT), ".github", "agents", "contracts", "metadata-schema.json"
+)
+METRIC = "p50_ms"
+
+Bench = Callable[["Context"], Dict[str, Any]]
+BENCHMARKS: Dict[str, Bench] = {}
+
+
+class Skip(Exception):
+    """Raised by a benchmark whose optional dependency is unavailable."""
+
+
+def benchmark(name: str) -> Callable[[Bench], Bench]:
+    def register(fn: Bench) -> Bench:
+        BENCHMARKS[name] = fn
+        return fn
+
+    return register
+
+
+class Context:
+    def __init__(self, cards: List[Dict[str, str]], quick: bool):
+        self.cards = cards
+        self.quick = quick
+
+    def n(self, full: int) -> int:
+        """Iteration count, scaled down in quick mode."""
+        return max(3, full // 10) if self.quick else full
+
+    def manifest(self, i: int) -> Dict[str, Any]:
+        with open(self.cards[i % len(self.cards)]["manifest"]) as f:
+            return json.load(f)
+
+
+def measure(
+    fn: Callable[[int], Any], iterations: int, warmup: int = 5, inner: int = 1
+) -> Dict[str, Any]:
+    """Time `iterations` samples of `inner` calls to `fn(i)` each; per-call latency stats in ms.
+
+    Use `inner` > 1 for microsecond operations, where one call is below timer
+    noise. The garbage collector is paused while sampling, as `timeit` does.
+    """
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(iterations):
+            start = time.perf_counter()
+            for k in range(i * inner, (i + 1) * inner):
+                fn(k)
+            samples.append((time.perf_counter() - start) * 1000.0 / inner)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "iterations": iterations,
+        "mean_ms": round(mean, 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "min_ms": round(samples[0], 4),
+        "ops_per_s": round(1000.0 / mean, 2) if mean else None,
+    }
+
+
+@contextlib.contextmanager
+def _env(**values: Optional[str]) -> Iterator[None]:
+    old = {k: os.environ.get(k) for k in values}
+    try:
+        for k, v in values.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        yield
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+# -- agents ------------------------------------------------------------------
+
+@benchmark("asset_review.stub")
+def _asset_review_stub(ctx: Context) -> Dict[str, Any]:
+    """Review without a local asset: no model or decode work, just the agent."""
+    from agents_stubs.agents.asset_review import run_asset_review
+
+    return measure(
+        lambda i: run_asset_review(f"bafybench{i}", {"card_id": f"stub-{i}", "project": "bench"}),
+        ctx.n(300),
+        inner=20,
+    )
+
+
+@benchmark("asset_review.models")
+def _asset_review_models(ctx: Context) -> Dict[str, Any]:
+    """Review with a real image: runs every installed model (stubs where missing)."""
+    from agents_stubs.agents.asset_review import run_asset_review
+
+    manifests = [ctx.manifest(i) for i in range(len(ctx.cards))]
+    res = measure(
+        lambda i: run_asset_review(f"bafybench{i}", manifests[i % len(manifests)]), ctx.n(200)
+    )
+    res["models"] = _models()
+    return res
+
+
+@benchmark("asset_review.batch8")
+def _asset_review_batch(ctx: Context) -> Dict[str, Any]:
+    from agents_stubs.agents.asset_review import run_asset_review_batch
+
+    def run(i: int) -> Any:
+        return run_asset_review_batch(
+            [(f"bafybench{i}-{k}", manifests[(i + k) % len(manifests)]) for k in range(8)]
+        )
+
+    manifests = [ctx.manifest(i) for i in range(len(ctx.cards))]
+    return measure(run, ctx.n(100))
+
+
+# -- hashing and manifests ---------------------------------------------------
+
+@benchmark("hashing.sha256_files")
+def _hash_files(ctx: Context) -> Dict[str, Any]:
+    """Stream-hash every corpus file (1 MiB reads), as when fingerprinting assets."""
+    paths = [p for c in ctx.cards for p in (c["image"], c["audio"])]
+    total = sum(os.path.getsize(p) for p in paths)
+
+    def run(_i: int) -> None:
+        for p in paths:
+            h = hashlib.sha256()
+            with open(p, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+
+    res = measure(run, ctx.n(30))
+    res["bytes"] = total
+    res["mb_per_s"] = (
+        round(total / (1 << 20) / (res["mean_ms"] / 1000.0), 1) if res["mean_ms"] else None
+    )
+    return res
+
+
+@benchmark("hashing.request_key")
+def _request_key(ctx: Context) -> Dict[str, Any]:
+    from agents_stubs.service.cache import request_key
+
+    payload = {
+        "metadata_suggestion": ctx.manifest(0),
+        "depth_map_cid": "bafydepth",
+        "ad_anchor_cid": None,
+    }
+    return measure(
+        lambda i: request_key("metadata-gen", payload, pinning=False, format="application/json"),
+        ctx.n(300),
+        inner=50,
+    )
+
+
+@benchmark("manifest.build")
+def _manifest(ctx: Context) -> Dict[str, Any]:
+    from agents_stubs.agents.asset_review import run_asset_review
+    from agents_stubs.agents.metadata_gen import build_metadata
+
+    suggestion = run_asset_review("bafybench", ctx.manifest(0))["metadata_suggestion"]
+    return measure(
+        lambda i: build_metadata(suggestion, "bafydepth", None, pin=False), ctx.n(300), inner=50
+    )
+
+
+@benchmark("schema.validate")
+def _schema(ctx: Context) -> Dict[str, Any]:
+    try:
+        import jsonschema
+    except ImportError:
+        raise Skip("jsonschema not installed")
+    from agents_stubs.agents.asset_review import run_asset_review
+
+    with open(SCHEMA) as f:
+        schema = json.load(f)
+    validator = jsonschema.validators.validator_for(schema)(schema)
+    meta = run_asset_review("bafy" + "a" * 12, ctx.manifest(0))["metadata_suggestion"]
+    meta["asset_cid"] = "bafy" + "a" * 12
+    return measure(lambda i: validator.validate(meta), ctx.n(300), inner=10)
+
+
+# -- pinning (local mock) ----------------------------------------------------
+
+@benchmark("pinning.json")
+def _pin_json(ctx: Context) -> Dict[str, Any]:
+    from agents_stubs.utils.pinning import pin_json_with_retries
+
+    manifest = ctx.manifest(0)
+    with mock_nft_storage.serve() as url, _env(NFT_STORAGE_API_URL=url):
+        return measure(
+            lambda i: pin_json_with_retries(dict(manifest, n=i), "bench-key"), ctx.n(200)
+        )
+
+
+@benchmark("pinning.file")
+def _pin_file(ctx: Context) -> Dict[str, Any]:
+    from agents_stubs.utils.pinning import pin_file_with_retries
+
+    paths = [c["image"] for c in ctx.cards]
+    with mock_nft_storage.serve() as url, _env(NFT_STORAGE_API_URL=url):
+        return measure(
+            lambda i: pin_file_with_retries(paths[i % len(paths)], "bench-key"), ctx.n(200)
+        )
+
+
+# -- service -----------------------------------------------------------------
+
+def _client() -> Any:
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        raise Skip("fastapi not installed")
+    from agents_stubs.service.app import app
+
+    return TestClient(app)
+
+
+def _post(client: Any, path: str, body: Callable[[int], Dict[str, Any]]) -> Callable[[int], Any]:
+    def run(i: int) -> None:
+        r = client.post(path, json=body(i))
+        if r.status_code >= 400:
+            raise RuntimeError(f"{path} answered {r.status_code}")
+
+    return run
+
+
+@benchmark("service.mint_approval")
+def _svc_mint(ctx: Context) -> Dict[str, Any]:
+    def body(i: int) -> Dict[str, Any]:
+        return {"manifest_cid": f"bafybench{i}", "card_id": f"svc-{i}", "credits_required": 0}
+
+    with _env(NFT_STORAGE_KEY=None):
+        return measure(_post(_client(), "/mint-approval", body), ctx.n(300))
+
+
+@benchmark("service.metadata_gen")
+def _svc_metadata(ctx: Context) -> Dict[str, Any]:
+    """Repeated bodies, so this mostly measures the response-cache hit path."""
+    manifests = [ctx.manifest(i) for i in range(4)]
+    body = lambda i: {"metadata_suggestion": manifests[i % 4]}  # noqa: E731
+    with _env(NFT_STORAGE_KEY=None):
+        return measure(_post(_client(), "/metadata-gen", body), ctx.n(300))
+
+
+@benchmark("service.asset_review")
+def _svc_review(ctx: Context) -> Dict[str, Any]:
+    body = lambda i: {"asset_cid": f"bafybench{i}", "manifest": ctx.manifest(i)}  # noqa: E731
+    with _env(NFT_STORAGE_KEY=None):
+        return measure(_post(_client(), "/asset-review", body), ctx.n(100))
+
+
+# -- model backends ----------------------------------------------------------
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _depth_backend(ctx: Context, backend: str) -> Dict[str, Any]:
+    """MiDaS forward passes on the corpus images through one backend (MIGHTY_BENCH_DEPTH_MODEL)."""
+    try:
+        import torch
+        if backend == "onnx":
+            import onnxruntime  # noqa: F401
+    except ImportError as e:
+        raise Skip(f"{e.name or e} not installed")
+    from agents_stubs.agents import depth_scheduler, integrations, onnx_backend
+
+    name = os.environ.get("MIGHTY_BENCH_DEPTH_MODEL", "MiDaS_small")
+    variant = depth_scheduler.VARIANTS[name]
+    inputs = []
+    for card in ctx.cards:
+        try:
+            net_input = integrations._net_input(card["image"], variant.kind, variant.native_size)
+            inputs.append(net_input[0].unsqueeze(0))
+        except Exception:
+            continue  # not every corpus image decodes (sample-data/sample.png)
+    if not inputs:
+        raise Skip("no decodable corpus images")
+    try:
+        if backend == "onnx":
+            # export outside the measurement: steady state loads the cached graph only
+            onnx_backend.load_onnx(
+                f"midas-{name}",
+                lambda: integrations._load_midas(name),
+                (1, 3, variant.native_size, variant.native_size),
+            )
+        gc.collect()
+        before = _rss_bytes()
+        if backend == "onnx":
+            model = onnx_backend.OnnxModel(onnx_backend.cache_path(f"midas-{name}"))
+        else:
+            model = integrations._load_midas(name)
+    except Exception as e:
+        raise Skip(f"{name} unavailable for {backend}: {e}")
+    with torch.no_grad():
+        res = measure(lambda i: model(inputs[i % len(inputs)]), ctx.n(30), warmup=2)
+    after = _rss_bytes()
+    res.update(model=name, backend=backend, torch_threads=torch.get_num_threads())
+    res["model_rss_mb"] = round((after - before) / (1 << 20), 1) if before and after else None
+    if backend == "onnx":
+        res["intra_op_threads"] = os.environ.get("MIGHTY_ORT_INTRA_OP_THREADS") or "default"
+        res["inter_op_threads"] = os.environ.get("MIGHTY_ORT_INTER_OP_THREADS") or "default"
+    model = None  # drop the weights before the next benchmark measures RSS
+    gc.collect()
+    return res
+
+
+@benchmark("backend.depth.torch")
+def _depth_torch(ctx: Context) -> Dict[str, Any]:
+    return _depth_backend(ctx, "torch")
+
+
+@benchmark("backend.depth.onnx")
+def _depth_onnx(ctx: Context) -> Dict[str, Any]:
+    return _depth_backend(ctx, "onnx")
+
+
+# -- runner ------------------------------------------------------------------
+
+def _models() -> List[str]:
+    from agents_stubs.agents import integrations
+
+    return sorted(name for name, status in integrations.warm().items() if status == "loaded")
+
+
+def run(
+    only: Optional[List[str]] = None,
+    quick: bool = False,
+    corpus_dir: Optional[str] = None,
+    cards: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Run the selected benchmarks (names or name prefixes); returns the result document."""
+    def selects(o: str, n: str) -> bool:
+        return n == o or n.startswith(o + ".")
+
+    names = [n for n in BENCHMARKS if not only or any(selects(o, n) for o in only)]
+    unknown = [o for o in only or [] if not any(selects(o, n) for n in BENCHMARKS)]
+    if unknown:
+        raise ValueError(f"unknown benchmarks: {', '.join(unknown)}")
+    corpus_dir = corpus_dir or os.path.join(tempfile.gettempdir(), "mighty-bench-corpus")
+    ctx = Context(corpus.build_corpus(corpus_dir, cards or (6 if quick else 24)), quick)
+    results: Dict[str, Any] = {}
+    for name in names:
+        try:
+            results[name] = BENCHMARKS[name](ctx)
+        except Skip as e:
+            results[name] = {"skipped": str(e)}
+        print(f"{name}: {results[name]}", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": quick,
+            "cards": len(ctx.cards),
+            "models": _models(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25
+) -> Dict[str, Any]:
+    """Compare p50 latencies; `baseline["tolerance"]` may override per benchmark."""
+    overrides = baseline.get("tolerance") or {}
+    cur, base = current.get("results", {}), baseline.get("results", {})
+    rows: Dict[str, Dict[str, Any]] = {}
+    for name in sorted(set(cur) | set(base)):
+        c, b = cur.get(name) or {}, base.get(name) or {}
+        tol = overrides.get(name, tolerance)
+        if name not in cur:
+            rows[name] = {"status": "missing"}
+        elif name not in base:
+            rows[name] = {"status": "new", "current": c.get(METRIC)}
+        elif METRIC not in c or METRIC not in b:
+            rows[name] = {"status": "skipped"}
+        else:
+            ratio = c[METRIC] / b[METRIC] if b[METRIC] else 1.0
+            if ratio > 1 + tol:
+                status = "regression"
+            elif ratio < 1 / (1 + tol):
+                status = "improved"
+            else:
+                status = "ok"
+            rows[name] = {
+                "status": status,
+                "baseline": b[METRIC],
+                "current": c[METRIC],
+                "ratio": round(ratio, 3),
+                "tolerance": tol,
+            }
+    return {
+        "metric": METRIC,
+        "benchmarks": rows,
+        "regressions": [n for n, r in rows.items() if r["status"] == "regression"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(
+        prog="agents_stubs.benchmarks.bench", description=__doc__.splitlines()[0]
+    )
+    p.add_argument(
+        "--only",
+        help="comma-separated benchmark names or prefixes (e.g. hashing,service.mint_approval)",
+    )
+    p.add_argument(
+        "--quick", action="store_true", help="fewer iterations and a smaller corpus (smoke run)"
+    )
+    p.add_argument(
+        "--corpus-dir", default=None, help="where to build the synthetic corpus (default: temp dir)"
+    )
+    p.add_argument("--cards", type=int, default=None, help="corpus size")
+    p.add_argument("--out", default=None, help="write the JSON results here (default: stdout)")
+    p.add_argument("--baseline", default=None, help="baseline JSON to compare against")
+    p.add_argument(
+        "--tolerance", type=float, default=float(os.environ.get("MIGHTY_BENCH_TOLERANCE", "0.25"))
+    )
+    p.add_argument("--write-baseline", default=None, help="save these results as the new baseline")
+    p.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    p.add_argument("--verbose", action="store_true", help="keep INFO logs from the code under test")
+    args = p.parse_args(argv)
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    try:
+        only = args.only.split(",") if args.only else None
+        doc = run(only, args.quick, args.corpus_dir, args.cards)
+    finally:
+        logging.disable(logging.NOTSET)
+    if args.baseline:
+        with open(args.baseline) as f:
+            doc["comparison"] = compare(doc, json.load(f), args.tolerance)
+    text = json.dumps(doc, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.write_baseline:
+        tolerance = {}
+        if os.path.exists(args.write_baseline):  # keep hand-tuned per-benchmark tolerances
+            with open(args.write_baseline) as f:
+                tolerance = json.load(f).get("tolerance") or {}
+        with open(args.write_baseline, "w") as f:
+            json.dump(
+                {"meta": doc["meta"], "results": doc["results"], "tolerance": tolerance},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write("\n")
+    regressions = doc.get("comparison", {}).get("regressions") or []
+    if regressions:
+        print(f"regressions beyond tolerance: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Deterministic synthetic corpus for the benchmarks, seeded from sample-data/.
+
+`build_corpus(dest, cards)` writes `cards` card directories, each with an
+image (valid RGB PNGs of a few sizes, plus the original sample.png), a
+fake audio blob and a `manifest.json` pointing at both. The same arguments
+always produce byte-identical files, so runs are comparable.
+"""
+import json
+import os
+import random
+import struct
+import zlib
+from typing import Dict, List
+
+SAMPLE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample-data"
+)
+SIZES = (64, 256, 512)
+AUDIO_BYTES = 256 * 1024
+
+
+def _png(width: int, height: int, rng: random.Random) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        crc = zlib.crc32(kind + data) & 0xFFFFFFFF
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+    # noisy gradient rows: compressible like artwork, not a solid fill
+    rows = []
+    for y in range(height):
+        base = bytes((x * 255 // max(1, width - 1) + y) & 0xFF for x in range(width))
+        noise = rng.randbytes(width)
+        rows.append(b"\x00" + bytes(c for px in zip(base, noise, base[::-1]) for c in px))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(b"".join(rows), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def build_corpus(dest: str, cards: int = 24, seed: int = 1337) -> List[Dict[str, str]]:
+    """Write the corpus under `dest` (reused if already complete); returns per-card paths."""
+    rng = random.Random(seed)
+    with open(os.path.join(SAMPLE_DIR, "sample.png"), "rb") as f:
+        sample = f.read()
+    entries = []
+    for n in range(cards):
+        card_dir = os.path.join(dest, f"card-{n:04d}")
+        os.makedirs(card_dir, exist_ok=True)
+        size = SIZES[n % len(SIZES)]
+        image = sample if n == 0 else _png(size, size, rng)
+        audio = rng.randbytes(AUDIO_BYTES)
+        image_path = os.path.join(card_dir, "image.png")
+        audio_path = os.path.join(card_dir, "audio.bin")
+        manifest_path = os.path.join(card_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            with open(image_path, "wb") as f:
+                f.write(image)
+            with open(audio_path, "wb") as f:
+                f.write(audio)
+            manifest = {
+                "card_id": f"bench-{n:04d}",
+                "project": "bench",
+                "title": f"Benchmark card {n}",
+                "asset_path": image_path,
+                "audio_path": audio_path,
+            }
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f)
+        entries.append({
+            "card_id": f"bench-{n:04d}",
+            "image": image_path,
+            "audio": audio_path,
+            "manifest": manifest_path,
+        })
+    return entries
@@ -0,0 +1,403 @@
+r"""Load generator for the agent service: request mixes, concurrency, arrival rates.
+
+    python -m agents_stubs.benchmarks.loadgen --concurrency 16 --duration 30
+    python -m agents_stubs.benchmarks.loadgen --rate 200 --duration 30 \
+        --mix mint-approval=3,asset-review=1
+    python -m agents_stubs.benchmarks.loadgen --target http://127.0.0.1:8000 --sweep 1,2,4,8,16,32
+
+Requests go to the FastAPI app in-process (through httpx's ASGI transport,
+no sockets) unless `--target` names a running server. `--mix` weights the
+endpoints (`asset-review`, `metadata-gen`, `mint-approval`). Bodies vary per
+request; `--distinct n` cycles through n bodies to exercise the response
+cache instead.
+
+Two load models:
+- closed loop (`--concurrency n`): n clients, each sending its next request
+  when the previous one answers. Throughput is whatever the service gives.
+- open loop (`--rate r`): requests arrive at r per second (Poisson, or
+  evenly with `--arrivals constant`) whether or not earlier ones finished.
+  Latency is measured from the scheduled arrival, so time spent waiting for
+  a free connection (`--max-in-flight`) counts, and a stalled service is not
+  hidden by the client slowing down with it.
+
+The report is one JSON document with p50/p95/p99/max latency, throughput and
+error rates, overall and per endpoint. 429s from admission control are
+counted as `shed`, separately from other errors. `--sweep` runs the closed
+loop at each concurrency level and names the saturation point: the last
+level that still raised throughput by at least `--gain` (default 10%) with
+an error rate under `--max-error-rate`.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+ENDPOINTS: Dict[str, Callable[[int], Any]] = {
+    "asset-review": lambda k: ("/asset-review", {
+        "asset_cid": f"bafyload{k}",
+        "manifest": {"card_id": f"load-{k}", "project": "load"},
+    }),
+    "metadata-gen": lambda k: ("/metadata-gen", {
+        "metadata_suggestion": {
+            "card_id": f"load-{k}", "project": "load", "title": f"Load card {k}",
+        },
+    }),
+    "mint-approval": lambda k: ("/mint-approval", {
+        "manifest_cid": f"bafyload{k}", "card_id": f"load-{k}", "credits_required": 0,
+    }),
+}
+DEFAULT_MIX = "asset-review=1,metadata-gen=2,mint-approval=2"
+
+
+def parse_mix(value: Optional[str]) -> Dict[str, float]:
+    """`"asset-review=1,mint-approval=3"` -> endpoint weights (unknown endpoints rejected)."""
+    mix: Dict[str, float] = {}
+    for part in (value or DEFAULT_MIX).split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        try:
+            w = float(weight) if weight.strip() else 1.0
+        except ValueError:
+            w = -1.0
+        if name not in ENDPOINTS or w < 0:
+            raise ValueError(
+                f"bad mix entry {part!r}; expected e.g. asset-review=1,mint-approval=3"
+            )
+        if w:
+            mix[name] = w
+    if not mix:
+        raise ValueError("the request mix is empty")
+    return mix
+
+
+def percentiles(samples: List[float]) -> Dict[str, Any]:
+    """Nearest-rank latency summary in ms for samples in seconds."""
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None, "mean_ms": None}
+    s = sorted(samples)
+
+    def rank(q: float) -> float:
+        return round(s[min(len(s) - 1, max(0, int(q * len(s) + 0.5) - 1))] * 1000.0, 3)
+
+    return {
+        "p50_ms": rank(0.50),
+        "p95_ms": rank(0.95),
+        "p99_ms": rank(0.99),
+        "max_ms": round(s[-1] * 1000.0, 3),
+        "mean_ms": round(sum(s) / len(s) * 1000.0, 3),
+    }
+
+
+class Recorder:
+    """Collects one (endpoint, latency, status) record per request."""
+
+    def __init__(self) -> None:
+        self.records: Dict[str, List[Any]] = {}
+
+    def add(self, endpoint: str, latency: float, status: Optional[int]) -> None:
+        self.records.setdefault(endpoint, []).append((latency, status))
+
+    @staticmethod
+    def _summary(records: List[Any], wall: float) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for _, status in records:
+            key = str(status) if status is not None else "error"
+            statuses[key] = statuses.get(key, 0) + 1
+        ok = [lat for lat, status in records if status is not None and status < 400]
+        shed = statuses.get("429", 0)
+        errors = len(records) - len(ok) - shed
+        return {
+            "requests": len(records),
+            "ok": len(ok),
+            "errors": errors,
+            "shed": shed,
+            "error_rate": round((errors + shed) / len(records), 4) if records else 0.0,
+            "throughput_per_s": round(len(ok) / wall, 2) if wall else 0.0,
+            # latency of answered requests only; failures are often fast and would flatter it
+            **percentiles(ok),
+            "statuses": statuses,
+        }
+
+    def report(self, wall: float) -> Dict[str, Any]:
+        everything = [r for rs in self.records.values() for r in rs]
+        return {
+            "seconds": round(wall, 3),
+            **self._summary(everything, wall),
+            "endpoints": {
+                name: self._summary(rs, wall) for name, rs in sorted(self.records.items())
+            },
+        }
+
+
+class _Picker:
+    def __init__(self, mix: Dict[str, float], seed: int, distinct: int):
+        self.names = list(mix)
+        self.weights = [mix[n] for n in self.names]
+        self.rng = random.Random(seed)
+        self.distinct = distinct
+        self.count = 0
+
+    def next(self) -> Any:
+        name = self.rng.choices(self.names, self.weights)[0]
+        k = self.count % self.distinct if self.distinct else self.count
+        self.count += 1
+        path, body = ENDPOINTS[name](k)
+        return name, path, body
+
+
+def _client(target: Optional[str], max_connections: int) -> Any:
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=max_connections, max_keepalive_connections=max_connections
+    )
+    timeout = httpx.Timeout(float(os.environ.get("MIGHTY_LOADGEN_TIMEOUT", "60")))
+    if target:
+        return httpx.AsyncClient(base_url=target.rstrip("/"), limits=limits, timeout=timeout)
+    from agents_stubs.service.app import app
+
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://loadgen",
+        limits=limits,
+        timeout=timeout,
+    )
+
+
+async def _send(
+    client: Any, picker: _Picker, recorder: Optional[Recorder], since: Optional[float] = None
+) -> None:
+    name, path, body = picker.next()
+    start = time.perf_counter() if since is None else since
+    try:
+        r = await client.post(path, json=body)
+        status: Optional[int] = r.status_code
+    except Exception as e:  # connection refused, timeout: counted, not raised
+        logging.getLogger("mighty.loadgen").debug("%s failed: %s", path, e)
+        status = None
+    if recorder is not None:
+        recorder.add(name, time.perf_counter() - start, status)
+
+
+async def _closed_loop(
+    client: Any, picker: _Picker, recorder: Recorder, concurrency: int, deadline: float,
+    budget: Optional[List[int]],
+) -> None:
+    async def user() -> None:
+        while time.perf_counter() < deadline:
+            if budget is not None:
+                if budget[0] <= 0:
+                    return
+                budget[0] -= 1
+            await _send(client, picker, recorder)
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+
+async def _open_loop(
+    client: Any, picker: _Picker, recorder: Recorder, rate: float, deadline: float,
+    budget: Optional[List[int]], max_in_flight: int, poisson: bool, rng: random.Random,
+) -> None:
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+
+    async def arrival(scheduled: float) -> None:
+        async with slots:
+            await _send(client, picker, recorder, since=scheduled)
+
+    scheduled = time.perf_counter()
+    while scheduled < deadline and (budget is None or budget[0] > 0):
+        if budget is not None:
+            budget[0] -= 1
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.ensure_future(arrival(scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        scheduled += rng.expovariate(rate) if poisson else 1.0 / rate
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def _run(
+    target: Optional[str], mix: Dict[str, float], concurrency: int, rate: Optional[float],
+    duration: Optional[float], requests: Optional[int], warmup: int, seed: int, distinct: int,
+    max_in_flight: int, arrivals: str,
+) -> Dict[str, Any]:
+    picker = _Picker(mix, seed, distinct)
+    recorder = Recorder()
+    async with _client(target, max(concurrency, max_in_flight if rate else concurrency)) as client:
+        for _ in range(warmup):
+            await _send(client, picker, None)
+        budget = [requests] if requests else None
+        start = time.perf_counter()
+        deadline = start + duration if duration else float("inf")
+        if rate:
+            await _open_loop(
+                client, picker, recorder, rate, deadline, budget, max_in_flight,
+                arrivals == "poisson", random.Random(seed + 1),
+            )
+        else:
+            await _closed_loop(client, picker, recorder, concurrency, deadline, budget)
+        wall = time.perf_counter() - start
+    report = recorder.report(wall)
+    report["config"] = {
+        "target": target or "in-process",
+        "mode": "open" if rate else "closed",
+        "mix": mix,
+        "concurrency": None if rate else concurrency,
+        "rate_per_s": rate,
+        "arrivals": arrivals if rate else None,
+        "max_in_flight": max_in_flight if rate else None,
+        "duration_s": duration,
+        "requests": requests,
+        "distinct": distinct or None,
+    }
+    return report
+
+
+def run_load(
+    target: Optional[str] = None,
+    mix: Optional[Dict[str, float]] = None,
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    duration: Optional[float] = None,
+    requests: Optional[int] = None,
+    warmup: int = 0,
+    seed: int = 1337,
+    distinct: int = 0,
+    max_in_flight: int = 256,
+    arrivals: str = "poisson",
+) -> Dict[str, Any]:
+    """Drive the service once and return the report; stops at `duration` seconds or `requests`."""
+    if not duration and not requests:
+        raise ValueError("give a duration or a request count")
+    if rate is not None and rate <= 0:
+        raise ValueError("rate must be positive")
+    return asyncio.run(_run(
+        target, mix or parse_mix(None), max(1, concurrency), rate, duration, requests,
+        warmup, seed, distinct, max(1, max_in_flight), arrivals,
+    ))
+
+
+def find_saturation(
+    points: List[Dict[str, Any]], gain: float = 0.1, max_error_rate: float = 0.01
+) -> Optional[int]:
+    """The concurrency past which throughput stops growing by `gain` (or errors exceed the limit).
+
+    `points` are sweep reports in ascending concurrency. None means the sweep
+    never flattened out: try higher levels.
+    """
+    best: Optional[Dict[str, Any]] = None
+    for p in points:
+        if p["error_rate"] > max_error_rate:
+            return best["config"]["concurrency"] if best else p["config"]["concurrency"]
+        if best is not None and p["throughput_per_s"] < best["throughput_per_s"] * (1 + gain):
+            return best["config"]["concurrency"]
+        best = p
+    return None
+
+
+def sweep(
+    levels: List[int], gain: float = 0.1, max_error_rate: float = 0.01, **kwargs: Any
+) -> Dict[str, Any]:
+    """Closed-loop `run_load` at each concurrency level; see find_saturation."""
+    points = []
+    for level in sorted(set(levels)):
+        points.append(run_load(concurrency=level, rate=None, **kwargs))
+        p = points[-1]
+        print(f"concurrency {level}: {p['throughput_per_s']}/s p50 {p['p50_ms']} ms "
+              f"p99 {p['p99_ms']} ms errors {p['error_rate']:.2%}", file=sys.stderr)
+    return {
+        "saturation_concurrency": find_saturation(points, gain, max_error_rate),
+        "levels": [
+            {"concurrency": p["config"]["concurrency"], **{k: p[k] for k in (
+                "throughput_per_s", "p50_ms", "p95_ms", "p99_ms", "error_rate")}}
+            for p in points
+        ],
+        "runs": points,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(
+        prog="agents_stubs.benchmarks.loadgen", description=__doc__.splitlines()[0]
+    )
+    p.add_argument(
+        "--target", default=None, help="base URL of a running service (default: in-process app)"
+    )
+    p.add_argument("--mix", default=None, help=f"endpoint weights (default {DEFAULT_MIX})")
+    p.add_argument("--concurrency", type=int, default=8, help="closed-loop clients")
+    p.add_argument(
+        "--rate", type=float, default=None,
+        help="open-loop arrivals per second (overrides --concurrency)",
+    )
+    p.add_argument("--arrivals", choices=("poisson", "constant"), default="poisson")
+    p.add_argument(
+        "--max-in-flight", type=int, default=256, help="open-loop cap on concurrent requests"
+    )
+    p.add_argument(
+        "--duration", type=float, default=None,
+        help="seconds per run (default 10 unless --requests)",
+    )
+    p.add_argument("--requests", type=int, default=None, help="stop after this many requests")
+    p.add_argument("--warmup", type=int, default=10, help="unrecorded requests sent first")
+    p.add_argument(
+        "--distinct", type=int, default=0,
+        help="cycle through this many request bodies (0: all unique)",
+    )
+    p.add_argument("--seed", type=int, default=1337)
+    p.add_argument(
+        "--sweep", default=None,
+        help="comma-separated concurrency levels to find the saturation point",
+    )
+    p.add_argument(
+        "--gain", type=float, default=0.1, help="sweep: minimum throughput gain per level"
+    )
+    p.add_argument(
+        "--max-error-rate", type=float, default=0.01,
+        help="sweep: error rate that counts as saturated",
+    )
+    p.add_argument("--out", default=None, help="write the JSON report here (default: stdout)")
+    p.add_argument(
+        "--verbose", action="store_true", help="keep INFO logs from the in-process service"
+    )
+    args = p.parse_args(argv)
+
+    kwargs = dict(
+        target=args.target, mix=parse_mix(args.mix),
+        duration=args.duration or (None if args.requests else 10.0),
+        requests=args.requests, warmup=args.warmup, seed=args.seed, distinct=args.distinct,
+    )
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    try:
+        if args.sweep:
+            levels = [int(v) for v in args.sweep.split(",") if v.strip()]
+            doc = sweep(levels, args.gain, args.max_error_rate, **kwargs)
+        else:
+            doc = run_load(
+                concurrency=args.concurrency, rate=args.rate, max_in_flight=args.max_in_flight,
+                arrivals=args.arrivals, **kwargs,
+            )
+    finally:
+        logging.disable(logging.NOTSET)
+    text = json.dumps(doc, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Local stand-in for the nft.storage API, for pinning benchmarks and tests.
+
+    with serve(latency=0.005) as base_url:
+        os.environ["NFT_STORAGE_API_URL"] = base_url
+        pin_json_with_retries(obj, "any-key")
+
+POST /store and /upload answer `{"ok": true, "value": {"cid": ...}}` with a
+CID derived from the body. `latency` adds a fixed delay per request and
+`fail_every=n` answers every n-th request with 503 to exercise retries.
+"""
+import contextlib
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def do_POST(self) -> None:  # noqa: N802 (http.server naming)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        srv = self.server
+        with srv.lock:
+            srv.requests += 1
+            n = srv.requests
+        if srv.latency:
+            time.sleep(srv.latency)
+        if self.path not in ("/store", "/upload"):
+            self._reply(404, {"ok": False, "error": "not found"})
+        elif srv.fail_every and n % srv.fail_every == 0:
+            self._reply(503, {"ok": False, "error": "unavailable"})
+        else:
+            cid = "bafy" + hashlib.sha256(body).hexdigest()[:52]
+            self._reply(200, {"ok": True, "value": {"cid": cid}})
+
+    def _reply(self, status: int, doc: dict) -> None:
+        data = json.dumps(doc).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *_args) -> None:
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float, fail_every: int):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def serve(latency: float = 0.0, fail_every: int = 0) -> Iterator[str]:
+    """Run the mock on an ephemeral port; yields its base URL."""
+    server = _Server(latency, fail_every)
+    thread = threading.Thread(target=server.serve_forever, name="mock-nft-storage", daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
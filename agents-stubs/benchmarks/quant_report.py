@@ -0,0 +1,231 @@
+r"""Accuracy vs latency of int8 (MIGHTY_QUANTIZE) against fp32, per model.
+
+    python -m agents_stubs.benchmarks.quant_report --images frames/*.png --audio clips/*.wav
+    python -m agents_stubs.benchmarks.quant_report --models midas --depth-model DPT_Hybrid \
+        --out quant.json
+
+Both precisions run the same samples. For MiDaS the int8 depth is aligned
+to the fp32 depth (scale and shift, as depth is relative) and the error is
+the mean absolute difference as a fraction of the fp32 depth range. For
+Whisper it is the word error rate of the int8 transcript against the fp32
+one. Latency is the median of `--runs` calls; model size is the serialized
+state size.
+
+A model is recommended for MIGHTY_QUANTIZE when it is faster and within
+tolerance: MIGHTY_QUANT_MAX_DEPTH_ERROR (default 0.02) and
+MIGHTY_QUANT_MAX_WER (default 0.05). Without `--images` the report uses
+the benchmark corpus; images that do not decode are skipped with a warning.
+Those images are synthetic, so pass representative frames before acting on
+the result. Whisper needs real audio
+(`--audio`) and is skipped otherwise. Building the int8 models fills the
+quantized-model cache as a side effect.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from . import corpus
+except ImportError:  # run as a script
+    import corpus
+
+
+def wer(reference: str, hypothesis: str) -> float:
+    """Word error rate: word-level edit distance / reference length."""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def _timed(fn: Callable[[], Any], runs: int) -> Tuple[Any, float]:
+    """(last result, median ms) over `runs` calls after one warmup call."""
+    result = fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return result, statistics.median(samples)
+
+
+def model_bytes(model: Any) -> int:
+    import torch
+
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell()
+
+
+def _summary(
+    fp32_ms: List[float], int8_ms: List[float], errors: List[float], metric: str, limit: float
+) -> Dict[str, Any]:
+    fp32, int8 = statistics.fmean(fp32_ms), statistics.fmean(int8_ms)
+    worst = max(errors)
+    return {
+        "samples": len(errors),
+        "fp32_ms": round(fp32, 2),
+        "int8_ms": round(int8, 2),
+        "speedup": round(fp32 / int8, 3) if int8 else None,
+        f"{metric}_mean": round(statistics.fmean(errors), 5),
+        f"{metric}_max": round(worst, 5),
+        "tolerance": limit,
+        "within_tolerance": worst <= limit,
+    }
+
+
+def compare_depth(
+    fp32: Any, int8: Any, inputs: Sequence[Any], runs: int = 3, limit: Optional[float] = None
+) -> Dict[str, Any]:
+    """Run each CHW input through both models; latency and aligned depth error."""
+    import numpy as np
+    import torch
+
+    from agents_stubs.agents.integrations import _align
+
+    if limit is None:
+        limit = float(os.environ.get("MIGHTY_QUANT_MAX_DEPTH_ERROR", "0.02"))
+    fp32_ms, int8_ms, errors = [], [], []
+    with torch.no_grad():
+        for x in inputs:
+            batch = x.unsqueeze(0)
+            ref, t_ref = _timed(lambda: fp32(batch), runs)
+            out, t_out = _timed(lambda: int8(batch), runs)
+            ref, out = ref.squeeze().cpu().numpy(), out.squeeze().cpu().numpy()
+            scale, shift = _align(out, ref)
+            span = float(ref.max() - ref.min()) or 1.0
+            errors.append(float(np.abs(out * scale + shift - ref).mean()) / span)
+            fp32_ms.append(t_ref)
+            int8_ms.append(t_out)
+    return _summary(fp32_ms, int8_ms, errors, "depth_error", limit)
+
+
+def compare_transcripts(
+    fp32: Any, int8: Any, audio_paths: Sequence[str], runs: int = 1, limit: Optional[float] = None
+) -> Dict[str, Any]:
+    """Transcribe each clip with both models; latency and WER of int8 against fp32."""
+    limit = float(os.environ.get("MIGHTY_QUANT_MAX_WER", "0.05")) if limit is None else limit
+    fp32_ms, int8_ms, errors = [], [], []
+    for path in audio_paths:
+        ref, t_ref = _timed(lambda: fp32.transcribe(path, fp16=False), runs)
+        out, t_out = _timed(lambda: int8.transcribe(path, fp16=False), runs)
+        errors.append(wer(ref.get("text", ""), out.get("text", "")))
+        fp32_ms.append(t_ref)
+        int8_ms.append(t_out)
+    return _summary(fp32_ms, int8_ms, errors, "wer", limit)
+
+
+def _sample_images() -> List[str]:
+    cards = corpus.build_corpus(os.path.join(tempfile.gettempdir(), "mighty-bench-corpus"), 6)
+    return [c["image"] for c in cards]
+
+
+def build_report(
+    images: Sequence[str],
+    audio: Sequence[str],
+    models: Sequence[str],
+    depth_model: Optional[str] = None,
+    runs: int = 3,
+) -> Dict[str, Any]:
+    import torch
+
+    from agents_stubs.agents import depth_scheduler, integrations, quantization
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "torch": torch.__version__,
+            "engine": torch.backends.quantized.engine,
+            "threads": torch.get_num_threads(),
+            "cpu_count": os.cpu_count(),
+        },
+        "models": {},
+    }
+    if "midas" in models:
+        name = depth_model or depth_scheduler.plan_depth(loaded=())["model"] or "MiDaS_small"
+        variant = depth_scheduler.VARIANTS[name]
+        inputs = []
+        for path in images:
+            try:
+                inputs.append(integrations._net_input(path, variant.kind, variant.native_size)[0])
+            except Exception as e:
+                logging.getLogger("mighty.quantization").warning("Skipping %s: %s", path, e)
+        if not inputs:
+            report["models"]["midas"] = {"skipped": "no decodable --images"}
+        else:
+            fp32 = integrations._load_midas(name)
+            int8 = quantization.load_quantized(f"midas-{name}", lambda: fp32)
+            row = compare_depth(fp32, int8, inputs, runs)
+            row.update(variant=name, fp32_bytes=model_bytes(fp32), int8_bytes=model_bytes(int8))
+            report["models"]["midas"] = row
+    if "whisper" in models:
+        if not audio:
+            report["models"]["whisper"] = {"skipped": "no --audio samples given"}
+        else:
+            fp32 = integrations._load_whisper()
+            int8 = quantization.load_quantized("whisper-small", lambda: fp32)
+            row = compare_transcripts(fp32, int8, audio, max(1, runs // 3))
+            row.update(fp32_bytes=model_bytes(fp32), int8_bytes=model_bytes(int8))
+            report["models"]["whisper"] = row
+    recommend = [
+        m
+        for m, row in report["models"].items()
+        if row.get("within_tolerance") and (row.get("speedup") or 0) > 1.05
+    ]
+    report["recommend"] = recommend
+    report["env"] = f"MIGHTY_QUANTIZE={','.join(recommend)}" if recommend else None
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(
+        prog="agents_stubs.benchmarks.quant_report", description=__doc__.splitlines()[0]
+    )
+    p.add_argument(
+        "--images", nargs="*", default=None, help="depth samples (default: the bench corpus)"
+    )
+    p.add_argument(
+        "--audio", nargs="*", default=[],
+        help="transcription samples (Whisper is skipped without them)",
+    )
+    p.add_argument("--models", default="midas,whisper", help="comma-separated: midas, whisper")
+    p.add_argument(
+        "--depth-model", default=None,
+        help="MiDaS variant (default: the scheduler's pick for this machine)",
+    )
+    p.add_argument("--runs", type=int, default=3, help="timed calls per sample and precision")
+    p.add_argument("--out", default=None, help="write the JSON report here (default: stdout)")
+    args = p.parse_args(argv)
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        print("quant_report needs torch", file=sys.stderr)
+        return 2
+    logging.basicConfig(level=logging.INFO)
+    report = build_report(
+        args.images or _sample_images(), args.audio, models, args.depth_model, args.runs
+    )
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,49 +5,69 @@ Usage examples (pipe JSON into the CLI):
 cat payload.json | python -m agents_stubs.cli asset-review
 cat payload.json | python -m agents_stubs.cli metadata-gen
 cat payload.json | python -m agents_stubs.cli mint-approval
+python -m agents_stubs.cli batch --input ./assets --out-dir ./out --workers 8
+python -m agents_stubs.cli pipeline --input ./assets --workers review=2,pin=8
+python -m agents_stubs.cli daemon    # optional: keep models warm for later calls
 
+Output files are written compact; pass --pretty for indented JSON.
+`--profile cpu,sample,mem` (or MIGHTY_PROFILE) writes profiles of the run
+to MIGHTY_PROFILE_DIR.
+
+When `cli daemon` is running (see service/daemon.py), asset-review,
+metadata-gen and mint-approval run inside it; otherwise in this process.
 """
 import sys
 import json
-import importlib.util
+import importlib
 import os
 
-# Helper to load a module by file path inside the agents-stubs/agents folder.
-ROOT = os.path.abspath(os.path.dirname(__file__))
-AGENTS_DIR = os.path.join(ROOT, "agents")
+try:
+    from agents_stubs.utils import profiling
+    from agents_stubs.utils.jsonio import write_json
+except ImportError:  # run with agents-stubs/ itself on sys.path
+    from utils import profiling
+    from utils.jsonio import write_json
 
 
 def _load_agent_module(name: str):
-    path = os.path.join(AGENTS_DIR, f"{name}.py")
-    spec = importlib.util.spec_from_file_location(name, path)
-    if spec is None or spec.loader is None:
-        raise ImportError(f"Cannot load agent module: {name}")
-    mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(mod)
-    return mod
+    """Import an agent module once, under its package name, only when its command runs."""
+    try:
+        return importlib.import_module(f"agents_stubs.agents.{name}")
+    except ModuleNotFoundError as e:
+        if e.name != "agents_stubs":
+            raise
+        # run with agents-stubs/ itself on sys.path
+        return importlib.import_module(f"agents.{name}")
 
 
-def main():
-    import argparse
+def _batch_module():
+    # imported as a package module so the process pool can pickle its worker function
+    return _load_agent_module("batch_review")
 
-    parser = argparse.ArgumentParser(prog="agents.cli")
-    sub = parser.add_subparsers(dest="agent")
 
-    p_ar = sub.add_parser("asset-review")
-    p_ar.add_argument("--asset-cid", required=False)
-    p_ar.add_argument("--out-dir", required=True)
+def _daemon_module():
+    try:
+        from agents_stubs.service import daemon
+    except ImportError:  # run with agents-stubs/ itself on sys.path
+        from service import daemon
+    return daemon
 
-    p_md = sub.add_parser("metadata-gen")
-    p_md.add_argument("--suggestion", required=True)
-    p_md.add_argument("--out-dir", required=True)
 
-    p_mint = sub.add_parser("mint-approval")
-    p_mint.add_argument("--manifest-cid", required=True)
-    p_mint.add_argument("--card-id", required=True)
-    p_mint.add_argument("--credits-required", type=int, default=0)
-    p_mint.add_argument("--out-dir", required=True)
+# commands the resident daemon can run for us, and their path arguments
+DAEMON_COMMANDS = ("asset-review", "metadata-gen", "mint-approval")
+_PATH_ARGS = ("out_dir", "suggestion")
 
-    args = parser.parse_args(sys.argv[1:])
+
+def run_command(args) -> str:
+    """Run one agent command; returns what the CLI prints (written file paths)."""
+    if isinstance(args, dict):
+        import argparse
+
+        args = argparse.Namespace(**args)
+    if getattr(args, "cli", None) == "agents":
+        # sent by `agents/cli.py`, whose commands take different arguments
+        return _load_agent_module("cli").run_command(args)
+    compact = not getattr(args, "pretty", False)
 
     if args.agent == "asset-review":
         mod = _load_agent_module("asset_review")
@@ -57,20 +77,17 @@ def main():
         paths = []
         # write files
         mpath = os.path.join(out_dir, "metadata_suggestion.json")
-        with open(mpath, "w") as f:
-            json.dump(res["metadata_suggestion"], f)
+        write_json(mpath, res["metadata_suggestion"], compact)
         paths.append(mpath)
         qpath = os.path.join(out_dir, "qc_report.json")
-        with open(qpath, "w") as f:
-            json.dump(res["qc_report"], f)
+        write_json(qpath, res["qc_report"], compact)
         paths.append(qpath)
         apath = os.path.join(out_dir, "suggested_ad_anchors.json")
-        with open(apath, "w") as f:
-            json.dump(res["suggested_ad_anchors"], f)
+        write_json(apath, res["suggested_ad_anchors"], compact)
         paths.append(apath)
-        print("\n".join(paths))
+        return "\n".join(paths)
 
-    elif args.agent == "metadata-gen":
+    if args.agent == "metadata-gen":
         sug_path = args.suggestion
         with open(sug_path) as f:
             suggestion = json.load(f)
@@ -79,11 +96,10 @@ def main():
         out_dir = args.out_dir
         os.makedirs(out_dir, exist_ok=True)
         mpath = os.path.join(out_dir, "metadata.json")
-        with open(mpath, "w") as f:
-            json.dump(manifest, f)
-        print(mpath)
+        write_json(mpath, manifest, compact)
+        return mpath
 
-    elif args.agent == "mint-approval":
+    if args.agent == "mint-approval":
         manifest_cid = args.manifest_cid
         card_id = args.card_id
         credits = args.credits_required
@@ -92,17 +108,109 @@ def main():
         out_dir = args.out_dir
         os.makedirs(out_dir, exist_ok=True)
         txpath = os.path.join(out_dir, "mint_tx.json")
-        with open(txpath, "w") as f:
-            json.dump(tx, f)
+        write_json(txpath, tx, compact)
         # fake receipt
         receipt = {"tx_id": tx.get("tx_id"), "status": "submitted"}
         rpath = os.path.join(out_dir, "tx_receipt.json")
-        with open(rpath, "w") as f:
-            json.dump(receipt, f)
-        print("\n".join([txpath, rpath]))
+        write_json(rpath, receipt, compact)
+        return "\n".join([txpath, rpath])
+
+    return str({"error": "unknown agent"})
+
+
+def _via_daemon(args, path_args=_PATH_ARGS):
+    """Run the command in a resident daemon; None if none is running.
+
+    `path_args` are made absolute, since the daemon runs in another directory.
+    """
+    daemon = _daemon_module()
+    if not daemon.enabled() or getattr(args, "no_daemon", False):
+        return None
+    payload = {k: v for k, v in vars(args).items() if k not in ("profile", "no_daemon")}
+    for key in path_args:
+        if payload.get(key):
+            payload[key] = os.path.abspath(payload[key])
+    try:
+        reply = daemon.request({"op": "run", "args": payload})
+    except daemon.DaemonError as e:
+        sys.exit(f"error: {e}")
+    if reply is None:
+        return None
+    if reply.get("status") != "ok":
+        sys.exit(f"error: {reply.get('error')}")
+    return reply["output"]
+
+
+def _daemon_main(args) -> None:
+    daemon = _daemon_module()
+    if args.status or args.stop:
+        reply = daemon.request({"op": "stop" if args.stop else "status"}, args.socket)
+        print(json.dumps(reply or {"status": "not running", "socket": args.socket or daemon.socket_path()}))
+        if reply is None:
+            sys.exit(1)
+        return
+    import logging
+
+    logging.basicConfig(level=logging.INFO)
+    daemon.serve(args.socket, runner=run_command)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="agents.cli")
+    sub = parser.add_subparsers(dest="agent")
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--pretty", action="store_true", help="indent output JSON")
+    output.add_argument("--profile", help="comma-separated profile modes: cpu, sample, mem (runs in-process)")
+    output.add_argument("--no-daemon", action="store_true", help="run in this process even if a daemon is running")
+
+    p_ar = sub.add_parser("asset-review", parents=[output])
+    p_ar.add_argument("--asset-cid", required=False)
+    p_ar.add_argument("--out-dir", required=True)
+
+    p_md = sub.add_parser("metadata-gen", parents=[output])
+    p_md.add_argument("--suggestion", required=True)
+    p_md.add_argument("--out-dir", required=True)
 
-    else:
-        print({"error": "unknown agent"})
+    p_mint = sub.add_parser("mint-approval", parents=[output])
+    p_mint.add_argument("--manifest-cid", required=True)
+    p_mint.add_argument("--card-id", required=True)
+    p_mint.add_argument("--credits-required", type=int, default=0)
+    p_mint.add_argument("--out-dir", required=True)
+
+    p_batch = sub.add_parser("batch", help="review a directory or list of assets across a process pool (resumable)")
+    _batch_module().add_arguments(p_batch)
+    p_batch.add_argument("--profile", help="comma-separated profile modes: cpu, sample, mem")
+
+    p_pipe = sub.add_parser("pipeline", help="stream many cards through review, metadata, pin and mint stages")
+    _load_agent_module("pipeline").add_arguments(p_pipe)
+    p_pipe.add_argument("--profile", help="comma-separated profile modes: cpu, sample, mem")
+
+    p_daemon = sub.add_parser("daemon", help="keep models warm and serve CLI commands over a Unix socket")
+    p_daemon.add_argument("--socket", default=None, help="socket path (default MIGHTY_DAEMON_SOCKET)")
+    p_daemon.add_argument("--status", action="store_true", help="print the running daemon's status")
+    p_daemon.add_argument("--stop", action="store_true", help="stop the running daemon")
+
+    args = parser.parse_args(sys.argv[1:])
+    if args.agent == "daemon":
+        _daemon_main(args)
+        return
+
+    modes = profiling.parse_modes(getattr(args, "profile", None)) or None
+    if args.agent in DAEMON_COMMANDS and not (modes or profiling.requested_modes()):
+        out = _via_daemon(args)
+        if out is not None:
+            print(out)
+            return
+
+    with profiling.maybe(f"cli-{args.agent}", modes):
+        if args.agent == "batch":
+            _batch_module().run_from_args(args)
+        elif args.agent == "pipeline":
+            _load_agent_module("pipeline").run_from_args(args)
+        else:
+            print(run_command(args))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,259 @@
+"""Admission control and priority lanes for the agent service.
+
+Each request path maps to a lane with its own concurrency limit and bounded
+wait queue, so a burst of heavy reviews cannot starve the cheap mint and
+metadata calls. When a lane's queue is full (or a request waits longer than
+the lane's `timeout`), the request is shed with 429 and a `Retry-After`
+estimated from recent service times. Paths outside every lane (health,
+readiness, metrics, job status) are never queued.
+
+Default lanes:
+- fast: /mint-approval, /metadata-gen and job submissions
+- heavy: /asset-review and /asset-review/batch
+
+Configuration (env):
+- MIGHTY_FAST_CONCURRENCY / MIGHTY_FAST_QUEUE (default 32 / 128)
+- MIGHTY_HEAVY_CONCURRENCY / MIGHTY_HEAVY_QUEUE (default 4 / 16)
+- MIGHTY_ADMISSION_TIMEOUT: max queue wait in seconds (default 30)
+- MIGHTY_ADMISSION_LANES: JSON `{lane: {concurrency, queue, timeout, paths}}`
+  merged over the defaults, e.g. to give one endpoint its own lane
+"""
+import asyncio
+import collections
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional
+
+from agents_stubs.utils.metrics import REGISTRY
+
+logger = logging.getLogger("mighty.admission")
+
+SHED = REGISTRY.counter("mighty_admission_shed_total", "Requests rejected by admission control", ("lane", "reason"))
+WAIT = REGISTRY.histogram("mighty_admission_wait_seconds", "Time spent queued for a lane slot", ("lane",))
+
+
+class LaneFull(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A queued request: its future (owned by its own event loop) and whether it was handed a slot."""
+
+    __slots__ = ("fut", "granted")
+
+    def __init__(self, fut: asyncio.Future):
+        self.fut = fut
+        self.granted = False
+
+
+def _wake(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class Lane:
+    """FIFO concurrency limiter with a bounded wait queue.
+
+    Safe across event loops and threads: `active` and the queue are guarded
+    by a lock, and a waiter is woken on its own loop. Whether a waiter owns a
+    slot is decided under the lock (`granted`), not by its future, so a
+    hand-off racing a timeout never loses or duplicates a slot.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int, timeout: float, paths: List[str]):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue = max(0, queue)
+        self.timeout = timeout
+        self.paths = paths
+        self.active = 0
+        self.shed = 0
+        self._waiters: Deque[_Waiter] = collections.deque()
+        self._lock = threading.Lock()
+        self._service_time = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        per_slot = self._service_time or 1.0
+        return max(1, math.ceil(per_slot * (self.waiting + 1) / self.concurrency))
+
+    def _reject(self, reason: str) -> LaneFull:
+        self.shed += 1
+        SHED.labels(lane=self.name, reason=reason).inc()
+        return LaneFull(reason, self.retry_after())
+
+    async def acquire(self) -> None:
+        with self._lock:
+            if self.active < self.concurrency and not self._waiters:
+                self.active += 1
+                return
+            if self.waiting >= self.queue:
+                raise self._reject("queue_full")
+            waiter = _Waiter(asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.fut), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter.granted:
+                    return  # slot was handed over just as we timed out
+                self._remove(waiter)
+                raise self._reject("timeout")
+        except BaseException:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._remove(waiter)
+            if granted:
+                self.release(0.0)  # pass the slot on rather than leaking it
+            raise
+        finally:
+            waiter.fut.cancel()
+            WAIT.labels(lane=self.name).observe(time.perf_counter() - start)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, duration: float) -> None:
+        with self._lock:
+            if duration:
+                # exponentially weighted service time, used for Retry-After
+                self._service_time = duration if not self._service_time else 0.8 * self._service_time + 0.2 * duration
+            if not self._waiters:
+                self.active -= 1
+                return
+            # hand the slot straight to the next waiter, woken on its own loop
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        try:
+            waiter.fut.get_loop().call_soon_threadsafe(_wake, waiter.fut)
+        except RuntimeError:  # its loop is closed: the waiter is gone, pass the slot on
+            self.release(0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "shed": self.shed,
+            "service_time_seconds": self._service_time,
+        }
+
+
+def default_lanes() -> Dict[str, Dict[str, Any]]:
+    env = os.environ.get
+    timeout = float(env("MIGHTY_ADMISSION_TIMEOUT", "30"))
+    lanes: Dict[str, Dict[str, Any]] = {
+        "fast": {
+            "concurrency": int(env("MIGHTY_FAST_CONCURRENCY", "32")),
+            "queue": int(env("MIGHTY_FAST_QUEUE", "128")),
+            "timeout": timeout,
+            "paths": ["/mint-approval", "/metadata-gen", "/jobs/asset-review", "/jobs/metadata-gen", "/jobs/mint-approval"],
+        },
+        "heavy": {
+            "concurrency": int(env("MIGHTY_HEAVY_CONCURRENCY", "4")),
+            "queue": int(env("MIGHTY_HEAVY_QUEUE", "16")),
+            "timeout": timeout,
+            "paths": ["/asset-review"],
+        },
+    }
+    overrides = env("MIGHTY_ADMISSION_LANES")
+    if overrides:
+        for name, cfg in json.loads(overrides).items():
+            lanes[name] = {**lanes.get(name, {"timeout": timeout, "paths": []}), **cfg}
+    return lanes
+
+
+class AdmissionController:
+    def __init__(self, lanes: Optional[Dict[str, Dict[str, Any]]] = None):
+        config = lanes if lanes is not None else default_lanes()
+        self.lanes = {
+            name: Lane(name, cfg["concurrency"], cfg["queue"], cfg.get("timeout", 30.0), list(cfg.get("paths", [])))
+            for name, cfg in config.items()
+        }
+        # longest prefix wins, so a dedicated lane for /asset-review/batch beats /asset-review
+        self._routes = sorted(
+            ((p.rstrip("/"), lane) for lane in self.lanes.values() for p in lane.paths),
+            key=lambda r: len(r[0]),
+            reverse=True,
+        )
+
+    def lane_for(self, path: str) -> Optional[Lane]:
+        for prefix, lane in self._routes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return lane
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an `AdmissionController` to HTTP requests."""
+
+    def __init__(self, app: Any, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or get_controller()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        lane = self.controller.lane_for(scope.get("path", "")) if scope["type"] == "http" else None
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await lane.acquire()
+        except LaneFull as e:
+            logger.info("shed %s request to %s (%s)", lane.name, scope.get("path"), e.reason)
+            body = json.dumps({"detail": "overloaded", "lane": lane.name, "reason": e.reason}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(e.retry_after).encode("ascii")),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release(time.perf_counter() - start)
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_controller() -> AdmissionController:
+    """Return the process-wide controller (lanes read from the environment once)."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+        REGISTRY.gauge_callback(
+            "mighty_admission_queue_depth",
+            lambda: {(("lane", n),): l.waiting for n, l in _controller.lanes.items()},
+            "Requests waiting for a lane slot",
+        )
+        REGISTRY.gauge_callback(
+            "mighty_admission_in_flight",
+            lambda: {(("lane", n),): l.active for n, l in _controller.lanes.items()},
+            "Requests holding a lane slot",
+        )
+    return _controller
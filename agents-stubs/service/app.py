@@ -1,14 +1,63 @@
 """FastAPI service wrapper for agent stubs."""
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List
+import asyncio
+import hmac
 import logging
+import os
 
 from agents import asset_review as ar_mod
 from agents import metadata_gen as mg_mod
 from agents import mint_approval as ma_mod
+from agents_stubs.service.admission import AdmissionMiddleware, get_controller
+from agents_stubs.service.batch_review import iter_list, iter_ndjson, new_run, review_executor
+from agents_stubs.service.batching import batcher_stats, get_batcher
+from agents_stubs.service.cache import etag_matches, get_cache, request_key
+from agents_stubs.service.http_metrics import MetricsMiddleware, register_cache_ratios
+from agents_stubs.service.http_profiling import ProfilingMiddleware
+from agents_stubs.service.http_tracing import TracingMiddleware
+from agents_stubs.service import readiness
+from agents_stubs.service.jobs import JobQueueFull, get_manager, sse_events
+from agents_stubs.service.responses import DuplexStreamingResponse, FastJSONResponse, encode, negotiated
+from agents_stubs.utils import jsonio, profiling, tracing
+from agents_stubs.utils.metrics import REGISTRY
 
-app = FastAPI(title="MightyVerse Agent Stubs")
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    # prefork workers inherit a ready (already warm) state from the master
+    if not readiness.is_ready():
+        if os.environ.get("MIGHTY_WARM_ON_START") == "1":
+            from agents import integrations
+
+            readiness.warm_in_background(integrations.warm)
+        else:
+            readiness.mark_ready()
+    settlement = None
+    if os.environ.get("MIGHTY_CREDIT_LEDGER"):
+        from agents_stubs.utils.credit_ledger import get_ledger, worker_from_env
+
+        # every worker process starts one; the ledger's settlement lease lets only one of them run
+        settlement = worker_from_env(get_ledger(os.environ["MIGHTY_CREDIT_LEDGER"]))
+        if settlement is not None:
+            settlement.start()
+    yield
+    if settlement is not None:
+        settlement.stop()
+
+
+app = FastAPI(title="MightyVerse Agent Stubs", lifespan=_lifespan, default_response_class=FastJSONResponse)
+# outermost last: metrics, then tracing (so spans include admission queueing), then admission
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
+register_cache_ratios(lambda: get_cache().stats())
+REGISTRY.gauge_callback("mighty_process_rss_bytes", profiling.rss_bytes, "Resident set size of this worker")
+REGISTRY.gauge_callback("mighty_process_peak_rss_bytes", profiling.peak_rss_bytes, "Peak resident set size of this worker")
 
 logger = logging.getLogger("agents_stubs")
 logging.basicConfig(level=logging.INFO)
@@ -30,6 +79,23 @@ class MintApprovalRequest(BaseModel):
     card_id: str
     credits_required: Optional[int] = 0
     admin_signature: Optional[str] = None
+    account: Optional[str] = None
+
+
+class MintBatchCard(MintApprovalRequest):
+    recipient: Optional[str] = None
+    amount: Optional[int] = 1
+    metadata_uri: Optional[str] = None
+
+
+class MintBatchRequest(BaseModel):
+    cards: List[MintBatchCard]
+
+
+class MintCompleteRequest(BaseModel):
+    result: Dict[str, Any]
+    tx_hash: str
+    account: str
 
 
 @app.get("/health")
@@ -37,34 +103,222 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def ready():
+    body = readiness.status()
+    return JSONResponse(body, status_code=200 if readiness.is_ready() else 503)
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/asset-review")
-def asset_review(req: AssetReviewRequest):
+def asset_review(req: AssetReviewRequest, accept: Optional[str] = Header(None)):
     logger.info("asset-review called: %s", req.asset_cid)
     try:
-        res = ar_mod.run_asset_review(req.asset_cid or "", req.manifest)
-        return res
+        batcher = get_batcher("asset_review", ar_mod.run_asset_review_batch)
+        with profiling.maybe("asset-review") as prof:
+            # a profiled request runs inline so the profile sees the review itself
+            if batcher is None or prof is not None:
+                result = ar_mod.run_asset_review(req.asset_cid or "", req.manifest)
+            else:
+                result = batcher((req.asset_cid or "", req.manifest))
     except Exception as e:
         logger.exception("asset-review failed")
         raise HTTPException(status_code=500, detail=str(e))
+    return negotiated(result, accept)
+
+
+async def _review_async(asset_cid: str, manifest: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    batcher = get_batcher("asset_review", ar_mod.run_asset_review_batch)
+    if batcher is not None:
+        return await asyncio.wrap_future(batcher.submit((asset_cid, manifest)))
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(review_executor(), tracing.bind(ar_mod.run_asset_review), asset_cid, manifest)
+
+
+@app.post("/asset-review/batch")
+async def asset_review_batch(request: Request):
+    """Review many `{asset_cid, manifest}` items; streams NDJSON results in completion order.
+
+    Accepts a JSON list (or `{"items": [...]}`) or an `application/x-ndjson` body.
+    """
+    run = new_run(_review_async)
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = iter_ndjson(request.stream())
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid JSON body")
+        if isinstance(body, dict):
+            body = body.get("items")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="expected a list of {asset_cid, manifest} items")
+        if len(body) > run.max_items:
+            raise HTTPException(status_code=413, detail=f"batch_too_large: at most {run.max_items} items")
+        items = iter_list(body)
+    logger.info("asset-review batch started")
+    # The NDJSON body is read while results stream back, so a client can only run ahead by a few items.
+    run.start(items)
+    return DuplexStreamingResponse(run.lines(), media_type="application/x-ndjson")
+
+
+@app.get("/batching/stats")
+def batching_stats():
+    return batcher_stats()
+
+
+@app.get("/admission/stats")
+def admission_stats():
+    return get_controller().stats()
 
 
 @app.post("/metadata-gen")
-def metadata_gen(req: MetadataGenRequest):
+def metadata_gen(
+    req: MetadataGenRequest, if_none_match: Optional[str] = Header(None), accept: Optional[str] = Header(None)
+):
     logger.info("metadata-gen called for card: %s", req.metadata_suggestion.get("card_id"))
-    try:
-        manifest = mg_mod.build_metadata(req.metadata_suggestion, req.depth_map_cid, req.ad_anchor_cid)
-        return manifest
-    except Exception as e:
-        logger.exception("metadata-gen failed")
-        raise HTTPException(status_code=500, detail=str(e))
+    pinning = bool(os.environ.get("NFT_STORAGE_KEY"))
+    cache = get_cache()
+    fmt = jsonio.negotiate(accept)
+    key = request_key("metadata-gen", req.model_dump(), pinning=pinning, format=fmt)
+    entry = cache.get(key)
+    if entry is None:
+        try:
+            with profiling.maybe("metadata-gen"):
+                manifest = mg_mod.build_metadata(req.metadata_suggestion, req.depth_map_cid, req.ad_anchor_cid)
+        except Exception as e:
+            logger.exception("metadata-gen failed")
+            raise HTTPException(status_code=500, detail=str(e))
+        body = encode(manifest, fmt)
+        # a failed pin is retried on the next request rather than cached
+        if pinning and not manifest.get("manifest_cid"):
+            entry = (body, None)
+        else:
+            entry = (body, cache.put(key, body))
+    body, etag = entry
+    headers = {"ETag": etag, "Vary": "Accept"} if etag else {"Vary": "Accept"}
+    if etag and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=fmt, headers=headers)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return get_cache().stats()
 
 
 @app.post("/mint-approval")
-def mint_approval(req: MintApprovalRequest):
+def mint_approval(req: MintApprovalRequest, accept: Optional[str] = Header(None)):
     logger.info("mint-approval called for card: %s", req.card_id)
     try:
-        tx = ma_mod.prepare_mint(req.manifest_cid, req.card_id, credits_required=req.credits_required, admin_signature=req.admin_signature)
-        return tx
+        with profiling.maybe("mint-approval"):
+            tx = ma_mod.prepare_mint(
+                req.manifest_cid, req.card_id, credits_required=req.credits_required,
+                admin_signature=req.admin_signature, account=req.account,
+            )
+        return negotiated(tx, accept)
     except Exception as e:
         logger.exception("mint-approval failed")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/mint-approval/batch")
+def mint_approval_batch(req: MintBatchRequest, accept: Optional[str] = Header(None)):
+    logger.info("mint-approval batch called for %d cards", len(req.cards))
+    try:
+        with profiling.maybe("mint-approval-batch"):
+            result = ma_mod.prepare_mint_batch([c.model_dump() for c in req.cards])
+        return negotiated(result, accept)
+    except Exception as e:
+        logger.exception("mint-approval batch failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _require_internal(authorization: Optional[str]) -> None:
+    """Allow only callers holding `MIGHTY_INTERNAL_TOKEN`; without it the endpoint is off."""
+    token = os.environ.get("MIGHTY_INTERNAL_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest((authorization or "").encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+        raise HTTPException(status_code=401, detail="invalid internal token", headers={"WWW-Authenticate": "Bearer"})
+
+
+@app.post("/mint-approval/complete")
+def mint_approval_complete(req: MintCompleteRequest, authorization: Optional[str] = Header(None)):
+    _require_internal(authorization)
+    result = ma_mod.complete_mint(req.result, req.tx_hash, req.account)
+    if result.get("error"):
+        raise HTTPException(status_code=503, detail=result["error"])
+    return result
+
+
+def _submit_job(kind: str, fn, *args, **kwargs) -> JSONResponse:
+    try:
+        job = get_manager().submit(kind, fn, *args, **kwargs)
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="job queue full", headers={"Retry-After": "5"})
+    body = {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+    return JSONResponse(body, status_code=202, headers={"Location": body["status_url"]})
+
+
+def _single_stage(stage: str, fn):
+    def run(*args, progress=None, **kwargs):
+        progress(stage, "started")
+        res = fn(*args, **kwargs)
+        progress(stage, "done")
+        return res
+
+    return run
+
+
+@app.post("/jobs/asset-review", status_code=202)
+def asset_review_job(req: AssetReviewRequest):
+    logger.info("asset-review job submitted: %s", req.asset_cid)
+    return _submit_job("asset-review", ar_mod.run_asset_review, req.asset_cid or "", req.manifest)
+
+
+@app.post("/jobs/metadata-gen", status_code=202)
+def metadata_gen_job(req: MetadataGenRequest):
+    logger.info("metadata-gen job submitted for card: %s", req.metadata_suggestion.get("card_id"))
+    build = _single_stage("metadata", mg_mod.build_metadata)
+    return _submit_job("metadata-gen", build, req.metadata_suggestion, req.depth_map_cid, req.ad_anchor_cid)
+
+
+@app.post("/jobs/mint-approval", status_code=202)
+def mint_approval_job(req: MintApprovalRequest):
+    logger.info("mint-approval job submitted for card: %s", req.card_id)
+    prepare = _single_stage("mint", ma_mod.prepare_mint)
+    return _submit_job(
+        "mint-approval", prepare, req.manifest_cid, req.card_id,
+        credits_required=req.credits_required, admin_signature=req.admin_signature, account=req.account,
+    )
+
+
+def _get_job(job_id: str):
+    job = get_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str, accept: Optional[str] = Header(None)):
+    return negotiated(_get_job(job_id).to_dict(), accept)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = _get_job(job_id)
+    return StreamingResponse(
+        sse_events(job), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
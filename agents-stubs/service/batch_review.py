@@ -0,0 +1,185 @@
+"""Streaming batch review: many `{asset_cid, manifest}` items per request.
+
+Items are parsed from a JSON list or an NDJSON body, reviewed with bounded
+concurrency and reported back as NDJSON lines in completion order. Each
+line carries the item's input `index`; failures are reported inline
+(`status: "error"`) without aborting the rest of the batch.
+
+Configuration (env):
+- MIGHTY_BATCH_REVIEW_CONCURRENCY: items in flight per request (default 4)
+- MIGHTY_BATCH_REVIEW_MAX_ITEMS: items accepted per request (default 1000);
+  a longer JSON list is rejected with 413, and an NDJSON body is read up to
+  the limit and answered with one final `batch_too_large` line
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from agents_stubs.utils import jsonio
+
+logger = logging.getLogger("mighty.batch_review")
+
+Review = Callable[[str, Optional[Dict[str, Any]]], Awaitable[Dict[str, Any]]]
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Yield one parsed value (or the `ValueError`) per non-empty NDJSON line."""
+    buf = b""
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse(line)
+    if buf.strip():
+        yield _parse(buf)
+
+
+def _parse(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"invalid_json: {e}")
+
+
+async def iter_list(items: Any) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+def _validate(item: Any) -> Tuple[str, Optional[Dict[str, Any]]]:
+    if isinstance(item, Exception):
+        raise item
+    if not isinstance(item, dict):
+        raise ValueError("invalid_item: expected an object")
+    asset_cid = item.get("asset_cid") or ""
+    manifest = item.get("manifest")
+    if not isinstance(asset_cid, str) or (manifest is not None and not isinstance(manifest, dict)):
+        raise ValueError("invalid_item: asset_cid must be a string and manifest an object")
+    return asset_cid, manifest
+
+
+class BatchReviewRun:
+    """Review items as they are read; results are drained with `lines()`.
+
+    Memory is bounded by `concurrency`, not by the size of the body: at most
+    `concurrency` items wait to be dispatched, `concurrency` are reviewed and
+    `concurrency` result lines wait to be sent, so a client that sends
+    faster than items are reviewed (or reads results slower) is held back.
+    Reading stops after `max_items`, and one terminal `batch_too_large` line
+    ends the stream.
+    """
+
+    def __init__(self, review: Review, concurrency: int = 4, max_items: int = 1000):
+        self.review = review
+        self.max_items = max_items
+        concurrency = max(1, concurrency)
+        self._sem = asyncio.Semaphore(concurrency)
+        self._out: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending: "asyncio.Queue[Optional[Tuple[int, Any]]]" = asyncio.Queue(maxsize=concurrency)
+        self._reader: Optional[asyncio.Task] = None
+        self._feeder: Optional[asyncio.Task] = None
+        self.truncated = False
+        self.counts = {"items": 0, "ok": 0, "error": 0}
+
+    async def _run_one(self, index: int, item: Any) -> None:
+        line: Dict[str, Any] = {"index": index}
+        try:
+            asset_cid, manifest = _validate(item)
+            line["asset_cid"] = asset_cid
+            line.update(status="ok", result=await self.review(asset_cid, manifest))
+            self.counts["ok"] += 1
+        except Exception as e:
+            if not isinstance(e, ValueError):
+                logger.exception("batch review item %d failed", index)
+            line.update(status="error", error=str(e))
+            self.counts["error"] += 1
+        try:
+            await self._out.put(jsonio.dumps(line) + b"\n")
+        finally:
+            self._sem.release()
+
+    async def _read(self, items: AsyncIterator[Any]) -> None:
+        try:
+            async for item in items:
+                if self.counts["items"] >= self.max_items:
+                    self.truncated = True
+                    break
+                await self._pending.put((self.counts["items"], item))
+                self.counts["items"] += 1
+        except Exception as e:
+            # e.g. the client went away mid-body: finish what was read
+            logger.warning("batch review body read failed after %d items: %s", self.counts["items"], e)
+        await self._pending.put(None)
+
+    async def _dispatch(self) -> None:
+        while True:
+            entry = await self._pending.get()
+            if entry is None:
+                break
+            await self._sem.acquire()
+            task = asyncio.create_task(self._run_one(*entry))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+        if self.truncated:
+            line = {"status": "error", "error": f"batch_too_large: at most {self.max_items} items"}
+            await self._out.put(jsonio.dumps(line) + b"\n")
+        await self._out.put(None)
+
+    def start(self, items: AsyncIterator[Any]) -> None:
+        """Start reading and reviewing `items`; the body is read while `lines()` streams results.
+
+        Serve `lines()` with a response that does not itself read from
+        `receive` (see `service.responses.DuplexStreamingResponse`).
+        """
+        self._reader = asyncio.create_task(self._read(items))
+        self._feeder = asyncio.create_task(self._dispatch())
+
+    async def lines(self) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                line = await self._out.get()
+                if line is None:
+                    break
+                yield line
+            await self._feeder
+        finally:
+            self.cancel()
+
+    def cancel(self) -> None:
+        for task in (self._reader, self._feeder):
+            if task is not None and not task.done():
+                task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def review_executor() -> ThreadPoolExecutor:
+    """Dedicated pool for batch items when micro-batching is disabled."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("MIGHTY_BATCH_REVIEW_CONCURRENCY", "4")),
+                thread_name_prefix="mighty-batch-review",
+            )
+        return _executor
+
+
+def new_run(review: Review) -> BatchReviewRun:
+    return BatchReviewRun(
+        review,
+        concurrency=int(os.environ.get("MIGHTY_BATCH_REVIEW_CONCURRENCY", "4")),
+        max_items=int(os.environ.get("MIGHTY_BATCH_REVIEW_MAX_ITEMS", "1000")),
+    )
@@ -0,0 +1,158 @@
+"""Dynamic micro-batching for concurrent model requests.
+
+Requests arriving within a short window (or until `max_batch` is reached)
+are collected and handed to a single batched call; each caller blocks on
+its own future and gets back its own result. Batch sizes and per-request
+queue waits are recorded so the window can be tuned. A batch runs under
+the trace of its first sampled caller and links to the others.
+
+Configuration (env):
+- MIGHTY_BATCH_WINDOW_MS: collection window; 0 disables batching (default 10)
+- MIGHTY_BATCH_MAX: maximum requests per batch (defaults to
+  MIGHTY_HEAVY_CONCURRENCY, i.e. 4)
+
+Admission lets at most MIGHTY_HEAVY_CONCURRENCY `/asset-review` requests
+run at once, and only those can be waiting in a batch, so a larger
+MIGHTY_BATCH_MAX only helps when async jobs or `/asset-review/batch` share
+the batcher. Raise both together to get bigger batches.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agents_stubs.utils import profiling, tracing
+from agents_stubs.utils.metrics import REGISTRY, Histogram, linear_buckets
+
+logger = logging.getLogger("mighty.batching")
+
+WAIT_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.015, 0.02, 0.03, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class MicroBatcher:
+    """Collect items for up to `window_ms` and run `batch_fn(items) -> results`."""
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        window_ms: float = 10.0,
+        max_batch: int = 16,
+        workers: int = 1,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.batch_size = Histogram(
+            f"mighty_{name}_batch_size", linear_buckets(1, 1, self.max_batch), f"{name} micro-batch sizes"
+        )
+        self.queue_wait = Histogram(
+            f"mighty_{name}_queue_wait_seconds", WAIT_BUCKETS, f"{name} time from arrival to batch start"
+        )
+        self._queue: "queue.Queue[Tuple[Any, Future, float, Optional[tracing.Span]]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"batch-{name}")
+        self._closed = False
+        self._thread = threading.Thread(target=self._collect, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        if self._closed:
+            raise RuntimeError(f"batcher {self.name} is closed")
+        fut: Future = Future()
+        self._queue.put((item, fut, time.perf_counter(), tracing.current_span()))
+        return fut
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        return self.submit(item).result(timeout)
+
+    def _collect(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.put(None)  # re-deliver shutdown after this batch
+                    break
+                batch.append(nxt)
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: List[Tuple[Any, Future, float, Optional[tracing.Span]]]) -> None:
+        started = time.perf_counter()
+        self.batch_size.observe(len(batch))
+        for _, _, enqueued, _ in batch:
+            self.queue_wait.observe(started - enqueued)
+        callers = [s for _, _, _, s in batch if s is not None and s.sampled]
+        try:
+            with tracing.attach(callers[0] if callers else None), tracing.span(
+                f"{self.name}.batch", batch_size=len(batch)
+            ) as span, profiling.maybe(f"{self.name}-batch"):
+                if span is not None:
+                    span.links = callers[1:]
+                results = self.batch_fn([item for item, _, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.exception("%s batch of %d failed", self.name, len(batch))
+            for _, fut, _, _ in batch:
+                fut.set_exception(e)
+            return
+        for (_, fut, _, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "queued": self._queue.qsize(),
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+        }
+
+    def close(self) -> None:
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=True)
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(name: str, batch_fn: Callable[[List[Any]], List[Any]]) -> Optional[MicroBatcher]:
+    """Return the shared batcher for `name`, or None when batching is disabled."""
+    window_ms = float(os.environ.get("MIGHTY_BATCH_WINDOW_MS", "10"))
+    if window_ms <= 0:
+        return None
+    with _batchers_lock:
+        if name not in _batchers:
+            max_batch = os.environ.get("MIGHTY_BATCH_MAX") or os.environ.get(
+                "MIGHTY_HEAVY_CONCURRENCY", "4"
+            )
+            batcher = MicroBatcher(name, batch_fn, window_ms=window_ms, max_batch=int(max_batch))
+            REGISTRY.register_histogram(batcher.batch_size)
+            REGISTRY.register_histogram(batcher.queue_wait)
+            _batchers[name] = batcher
+        return _batchers[name]
+
+
+def batcher_stats() -> Dict[str, Any]:
+    with _batchers_lock:
+        return {name: b.stats() for name, b in _batchers.items()}
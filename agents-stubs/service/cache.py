@@ -0,0 +1,146 @@
+"""Request-hash keyed response cache for idempotent endpoints.
+
+Entries are serialized response bodies keyed by a hash of the endpoint name
+and canonical request JSON. The in-memory tier is an LRU bounded by total
+bytes; an optional on-disk tier (one file per entry) survives restarts and
+is shared by workers pointed at the same directory.
+
+Configuration (env):
+- MIGHTY_CACHE_MAX_BYTES: in-memory budget (default 32 MiB)
+- MIGHTY_CACHE_DIR: enable the on-disk tier in this directory
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("mighty.cache")
+
+
+def request_key(endpoint: str, payload: Any, **variant: Any) -> str:
+    """Stable key for a request; `variant` holds settings that change the response."""
+    raw = json.dumps([endpoint, payload, variant], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + optional disk) cache of `(body, etag)` entries."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, disk_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".json")
+
+    def _remember(self, key: str, body: bytes, etag: str) -> None:
+        if len(body) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[0])
+        self._entries[key] = (body, etag)
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    body = f.read()
+            except OSError:
+                body = None
+            if body is not None:
+                entry = (body, etag_for(body))
+                with self._lock:
+                    self._remember(key, *entry)
+                    self.disk_hits += 1
+                return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, body: bytes) -> str:
+        """Store a response body and return its ETag."""
+        etag = etag_for(body)
+        with self._lock:
+            self._remember(key, body, etag)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+                with os.fdopen(fd, "wb") as f:
+                    f.write(body)
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.debug("Could not write cache entry %s: %s", key, e)
+        return etag
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else None,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Return the process-wide `ResponseCache`, configured from the environment."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                max_bytes=int(os.environ.get("MIGHTY_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+                disk_dir=os.environ.get("MIGHTY_CACHE_DIR") or None,
+            )
+        return _cache
@@ -0,0 +1,214 @@
+"""Resident CLI daemon: keep models warm and run CLI commands over a Unix socket.
+
+Start it once per machine/user, then use the CLI as usual; `asset-review`,
+`metadata-gen` and `mint-approval` are sent to the daemon when its socket
+answers and run in-process when it does not (no daemon, stale socket,
+MIGHTY_DAEMON=0 or `--no-daemon`).
+
+Usage:
+    python -m agents_stubs.cli daemon [--socket PATH]      # serve (foreground)
+    python -m agents_stubs.cli daemon --status | --stop
+
+Wire protocol: one JSON object per line. The client sends
+`{"op": "run" | "status" | "stop", "args": {...}}` and reads one reply,
+`{"status": "ok", ...}` or `{"status": "error", "error": "..."}`. Commands
+run in the daemon's environment and working directory, so the client sends
+absolute paths. The socket is created with mode 0600 in a directory only
+its owner can write to, and the client only connects to a socket owned by
+the same user, so another local user cannot stand in for the daemon.
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("mighty.daemon")
+
+Runner = Callable[[Dict[str, Any]], str]
+
+
+class DaemonError(RuntimeError):
+    """The daemon accepted a request but failed to answer it."""
+
+
+def socket_path() -> str:
+    """MIGHTY_DAEMON_SOCKET, else a socket in $XDG_RUNTIME_DIR, else in a private per-user temp dir."""
+    if os.environ.get("MIGHTY_DAEMON_SOCKET"):
+        return os.environ["MIGHTY_DAEMON_SOCKET"]
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], "mighty-agents.sock")
+    return os.path.join(tempfile.gettempdir(), f"mighty-agents-{os.getuid()}", "daemon.sock")
+
+
+def _shared_dir(path: str) -> bool:
+    """True when the directory holding `path` is not ours alone to write to."""
+    st = os.stat(os.path.dirname(os.path.abspath(path)))
+    return st.st_uid != os.getuid() or bool(st.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+
+def _untrusted(path: str) -> Optional[str]:
+    """Why the socket at `path` may belong to someone else, or None when it is ours."""
+    uid = os.stat(path).st_uid
+    if uid != os.getuid():
+        return f"{path} is owned by uid {uid}"
+    if _shared_dir(path):
+        return f"{os.path.dirname(os.path.abspath(path))} is writable by other users"
+    return None
+
+
+def enabled() -> bool:
+    return os.environ.get("MIGHTY_DAEMON", "1") != "0"
+
+
+def request(payload: Dict[str, Any], path: Optional[str] = None, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Send one request; None when no daemon is listening (nothing was sent).
+
+    Once the request is delivered, a broken reply raises DaemonError rather
+    than returning None: the command may already have run, so the caller must
+    not silently run it a second time.
+    """
+    path = path or socket_path()
+    timeout = timeout if timeout is not None else float(os.environ.get("MIGHTY_DAEMON_TIMEOUT", "600"))
+    if not os.path.exists(path):
+        return None
+    reason = _untrusted(path)
+    if reason:
+        logger.warning("not using daemon socket: %s", reason)
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(1.0)
+        try:
+            sock.connect(path)
+        except OSError as e:
+            logger.debug("daemon at %s not reachable: %s", path, e)
+            return None
+        sock.settimeout(timeout)
+        try:
+            sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        except OSError as e:
+            raise DaemonError(f"daemon connection failed: {e}") from e
+        if not line:
+            raise DaemonError("daemon closed the connection without replying")
+        return json.loads(line)
+    finally:
+        sock.close()
+
+
+class _State:
+    def __init__(self, runner: Optional[Runner]):
+        self.runner = runner
+        self.pid = os.getpid()
+        self.started = time.time()
+        self.models: Dict[str, str] = {}
+        self.served = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "status": "ok",
+                "pid": self.pid,
+                "uptime_seconds": round(time.time() - self.started, 3),
+                "served": self.served,
+                "errors": self.errors,
+                "models": dict(self.models),
+            }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        state = self.server.state
+        op = None
+        try:
+            req = json.loads(line)
+            op = req.get("op")
+            if op == "status":
+                reply = state.status()
+            elif op == "stop":
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                reply = {"status": "ok", "stopping": True}
+            elif op == "run" and state.runner is not None:
+                output = state.runner(req.get("args") or {})
+                reply = {"status": "ok", "output": output}
+            else:
+                raise ValueError(f"unknown op {op!r}")
+        except Exception as e:
+            logger.warning("daemon request failed: %s", e)
+            reply = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        if op == "run":
+            with state.lock:
+                state.served += 1
+                state.errors += reply["status"] != "ok"
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    state: _State
+
+
+def _claim(path: str) -> None:
+    """Remove a stale socket file; refuse to start if a daemon already answers.
+
+    The socket's directory is created owner-only when missing, and must not
+    be writable by other users.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    if _shared_dir(path):
+        raise RuntimeError(f"refusing to serve {path}: its directory is writable by other users")
+    if not os.path.exists(path):
+        return
+    if request({"op": "status"}, path, timeout=2.0) is not None:
+        raise RuntimeError(f"a daemon is already listening on {path}")
+    os.unlink(path)
+
+
+def serve(path: Optional[str] = None, runner: Optional[Runner] = None, warm: bool = True, ready: Optional[threading.Event] = None) -> None:
+    """Warm models, then serve requests on the Unix socket until stopped."""
+    path = path or socket_path()
+    _claim(path)
+    state = _State(runner)
+    if warm:
+        try:
+            from agents_stubs.agents import integrations
+        except ImportError:  # run with agents-stubs/ itself on sys.path
+            from agents import integrations
+        state.models = integrations.warm()
+        logger.info("daemon warmed models: %s", state.models)
+    old_umask = os.umask(0o177)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(old_umask)
+    server.state = state
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_a: threading.Thread(target=server.shutdown, daemon=True).start())
+    logger.info("daemon %d listening on %s", state.pid, path)
+    if ready is not None:
+        ready.set()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        logger.info("daemon %d stopped after %d requests", state.pid, state.served)
@@ -0,0 +1,80 @@
+"""HTTP request metrics and the `/metrics` exposition for the agent service."""
+import time
+from typing import Any, Dict
+
+from agents_stubs.utils.metrics import REGISTRY, ratio
+
+REQUESTS = REGISTRY.counter(
+    "mighty_http_requests_total", "HTTP requests by route, method and status", ("method", "route", "status")
+)
+LATENCY = REGISTRY.histogram(
+    "mighty_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+IN_FLIGHT = REGISTRY.gauge("mighty_http_requests_in_flight", "HTTP requests currently being served")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, status codes and latency per route.
+
+    Routes are labelled by their template (e.g. `/jobs/{job_id}`) to keep
+    label cardinality bounded.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        gauge = IN_FLIGHT.labels()
+        gauge.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            gauge.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope.get("method", "")
+            REQUESTS.labels(method=method, route=route, status=status["code"]).inc()
+            LATENCY.labels(method=method, route=route).observe(time.perf_counter() - start)
+
+
+def _family_ratio(family_name: str, key_label: str) -> Dict[Any, Any]:
+    counts: Dict[str, Dict[str, float]] = {}
+    fam = REGISTRY.family(family_name)
+    for labels, child in (fam.children() if fam else []):
+        counts.setdefault(labels[key_label], {}).setdefault(labels["result"], 0.0)
+        counts[labels[key_label]][labels["result"]] += child.value
+    return {((key_label, k),): ratio(v.get("hit", 0), v.get("miss", 0)) for k, v in counts.items()}
+
+
+def register_cache_ratios(response_cache_stats: Any) -> None:
+    """Expose model-cache and response-cache hit ratios as gauges."""
+    REGISTRY.gauge_callback(
+        "mighty_model_cache_hit_ratio",
+        lambda: _family_ratio("mighty_model_cache_requests_total", "model"),
+        "Share of model lookups served from the in-process model cache",
+    )
+    REGISTRY.gauge_callback(
+        "mighty_response_cache_hit_ratio",
+        lambda: response_cache_stats()["hit_ratio"],
+        "Share of response-cache lookups served from memory or disk",
+    )
+    REGISTRY.gauge_callback(
+        "mighty_response_cache_bytes", lambda: response_cache_stats()["bytes"], "Bytes held by the response cache"
+    )
+    for field in ("hits", "disk_hits", "misses", "evictions"):
+        REGISTRY.gauge_callback(
+            f"mighty_response_cache_{field}_total",
+            (lambda f=field: response_cache_stats()[f]),
+            f"Response cache {field.replace('_', ' ')}",
+            kind="counter",
+        )
@@ -0,0 +1,26 @@
+"""ASGI middleware honoring the `X-Mighty-Profile` request header.
+
+The header only takes effect when MIGHTY_PROFILE_HEADER=1, so clients
+cannot make a production service write profiles. The requested modes are
+put in a contextvar that `profiling.maybe()` reads where the work runs.
+"""
+from typing import Any, Dict
+
+from agents_stubs.utils import profiling
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not profiling.header_allowed():
+            await self.app(scope, receive, send)
+            return
+        value = dict(scope.get("headers") or []).get(profiling.HEADER.encode("ascii"))
+        modes = profiling.parse_modes(value.decode("latin-1")) if value else ()
+        if not modes:
+            await self.app(scope, receive, send)
+            return
+        with profiling.request(modes):
+            await self.app(scope, receive, send)
@@ -0,0 +1,40 @@
+"""ASGI middleware that opens the root span for each HTTP request.
+
+An incoming `traceparent` header continues the caller's trace; the
+response carries `traceparent` for the request span so clients can look
+up slow requests. Sits outside admission control so queueing shows up in
+the span's duration.
+"""
+from typing import Any, Dict
+
+from agents_stubs.utils import tracing
+
+
+class TracingMiddleware:
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not tracing.enabled():
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        incoming = headers.get(b"traceparent", b"").decode("latin-1") or None
+        method = scope.get("method", "GET")
+        with tracing.span(f"{method} {scope.get('path', '')}", traceparent=incoming, **{"http.method": method}) as span:
+
+            async def send_traced(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "error"
+                    message = {**message, "headers": [*message.get("headers", []), (b"traceparent", span.traceparent.encode())]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_traced)
+            finally:
+                route = scope.get("route")
+                if route is not None and getattr(route, "path", None):
+                    span.name = f"{method} {route.path}"
+                    span.set_attribute("http.route", route.path)
@@ -0,0 +1,182 @@
+"""Background job runner for the agent service.
+
+Long-running agent calls (asset review, metadata generation, mint
+preparation) are submitted as jobs and executed on a dedicated, bounded
+thread pool so they never occupy the HTTP server's own threadpool. Each job
+records per-stage progress events; clients poll `GET /jobs/{id}` or follow
+`GET /jobs/{id}/events` (server-sent events).
+
+Sizing (env):
+- MIGHTY_JOB_WORKERS: worker threads (default 2)
+- MIGHTY_JOB_QUEUE: max queued + running jobs before submissions are refused (default 64)
+- MIGHTY_JOB_RETENTION: finished jobs kept in memory for polling (default 1000)
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agents_stubs.utils import profiling, tracing
+
+logger = logging.getLogger("mighty.jobs")
+
+FINISHED = ("succeeded", "failed")
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when the job queue is at capacity."""
+
+
+class Job:
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self._seq = itertools.count(1)
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+
+    def emit(self, stage: str, status: str, **info: Any) -> None:
+        """Record a progress event and push it to live subscribers."""
+        with self._lock:
+            event = {"seq": next(self._seq), "stage": stage, "status": status, "ts": time.time(), **info}
+            self.events.append(event)
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                pass  # subscriber's loop is gone
+
+    def subscribe(self) -> asyncio.Queue:
+        """Return a queue pre-filled with past events that receives new ones."""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            for event in self.events:
+                queue.put_nowait(event)
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[1] is not queue]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.events[-1] if self.events else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Bounded worker pool plus an in-memory job registry."""
+
+    def __init__(self, workers: int = 2, max_pending: int = 64, retention: int = 1000):
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mighty-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Job:
+        """Queue `fn(*args, progress=job.emit, **kwargs)`; raises `JobQueueFull` at capacity."""
+        job = Job(kind)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs pending")
+            self._pending += 1
+            self._jobs[job.id] = job
+            self._evict()
+        job.emit("queued", "ok")
+        self._executor.submit(tracing.bind(self._run), job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        job.emit("job", "started")
+        try:
+            with tracing.span(f"job.{job.kind}", job_id=job.id), profiling.maybe(f"job-{job.kind}"):
+                job.result = fn(*args, progress=job.emit, **kwargs)
+            job.status = "succeeded"
+        except Exception as e:
+            logger.exception("%s job %s failed", job.kind, job.id)
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._pending -= 1
+            job.emit("job", job.status)
+
+    def _evict(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.status in FINISHED]
+        for jid in finished[: max(0, len(self._jobs) - self.retention)]:
+            del self._jobs[jid]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pending": self._pending, "max_pending": self.max_pending, "tracked": len(self._jobs)}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+async def sse_events(job: Job, keepalive: float = 15.0):
+    """Yield a job's progress as server-sent events until it finishes."""
+    queue = job.subscribe()
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event['seq']}\nevent: progress\ndata: {json.dumps(event)}\n\n"
+            if event["stage"] == "job" and event["status"] in FINISHED:
+                yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+    finally:
+        job.unsubscribe(queue)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> JobManager:
+    """Return the process-wide `JobManager`, sized from the environment."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(
+                workers=int(os.environ.get("MIGHTY_JOB_WORKERS", "2")),
+                max_pending=int(os.environ.get("MIGHTY_JOB_QUEUE", "64")),
+                retention=int(os.environ.get("MIGHTY_JOB_RETENTION", "1000")),
+            )
+        return _manager
@@ -0,0 +1,187 @@
+"""Prefork serving entry point: warm models once, then fork uvicorn workers.
+
+The master process imports the app, loads every available model into the
+integrations cache and only then forks, so model weights are shared
+copy-on-write between workers instead of loaded once per worker. All
+workers accept on one inherited listening socket. Workers are restarted
+gracefully after `max_requests` requests (with jitter so they do not all
+recycle at once) or when their RSS exceeds `max_rss_mb`.
+
+Usage:
+    python -m agents_stubs.service.prefork --workers 4 --port 8000
+
+Env defaults: MIGHTY_WORKERS, MIGHTY_MAX_REQUESTS, MIGHTY_MAX_RSS_MB.
+
+Forking after models are loaded is only safe while no inference has run in
+the master: do not serve requests from the master process.
+"""
+import argparse
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from agents_stubs.utils.profiling import rss_bytes
+
+logger = logging.getLogger("mighty.prefork")
+
+
+def _watch_memory(server: Any, max_rss_bytes: int, interval: float = 5.0) -> None:
+    def run() -> None:
+        while not server.should_exit:
+            rss = rss_bytes()
+            if rss > max_rss_bytes:
+                logger.info("worker %d RSS %d > budget %d; restarting", os.getpid(), rss, max_rss_bytes)
+                server.should_exit = True
+                return
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="mighty-rss-watch", daemon=True).start()
+
+
+def _run_worker(app: Any, sock: socket.socket, max_requests: Optional[int], max_rss_bytes: Optional[int]) -> None:
+    import uvicorn
+
+    limit = max_requests + random.randint(0, max(1, max_requests // 10)) if max_requests else None
+    config = uvicorn.Config(app, limit_max_requests=limit, timeout_graceful_shutdown=30, log_level="info")
+    server = uvicorn.Server(config)
+    if max_rss_bytes:
+        _watch_memory(server, max_rss_bytes)
+    server.run(sockets=[sock])
+
+
+class PreforkSupervisor:
+    """Fork `workers` uvicorn processes on a shared socket and keep them running."""
+
+    def __init__(
+        self,
+        app: Any,
+        sock: socket.socket,
+        workers: int = 2,
+        max_requests: Optional[int] = None,
+        max_rss_mb: Optional[int] = None,
+        graceful_timeout: float = 30.0,
+    ):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.graceful_timeout = graceful_timeout
+        self.children: Dict[int, float] = {}
+        self.restarts = 0
+        self._stopping = False
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                _run_worker(self.app, self.sock, self.max_requests, self.max_rss_bytes)
+            except BaseException:
+                logger.exception("worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.time()
+        logger.info("started worker %d", pid)
+        return pid
+
+    def stop(self, *_args: Any) -> None:
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        deadline: Optional[float] = None
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                if self._stopping:
+                    deadline = deadline or time.time() + self.graceful_timeout
+                    if time.time() > deadline:
+                        for child in list(self.children):
+                            os.kill(child, signal.SIGKILL)
+                time.sleep(0.1)
+                continue
+            started = self.children.pop(pid, time.time())
+            if self._stopping:
+                continue
+            logger.info("worker %d exited with %d; restarting", pid, os.waitstatus_to_exitcode(status))
+            self.restarts += 1
+            if time.time() - started < 1.0:
+                time.sleep(1.0)  # avoid a hot respawn loop on startup crashes
+            self.spawn()
+        self.sock.close()
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = 2,
+    max_requests: Optional[int] = None,
+    max_rss_mb: Optional[int] = None,
+    warm: bool = True,
+) -> None:
+    from agents_stubs.service import readiness
+    from agents_stubs.service.app import app
+
+    info: Dict[str, str] = {}
+    if warm:
+        from agents import integrations
+
+        start = time.time()
+        info = integrations.warm()
+        logger.info("warmed models in %.1fs: %s", time.time() - start, info)
+    readiness.mark_ready(info)
+    sock = bind_socket(host, port)
+    # Move everything allocated so far out of the GC's reach so collections in
+    # workers do not touch (and copy) the shared pages.
+    gc.collect()
+    gc.freeze()
+    PreforkSupervisor(app, sock, workers, max_requests, max_rss_mb).run()
+
+
+def main() -> None:
+    env = os.environ.get
+    p = argparse.ArgumentParser(description="Prefork server for the MightyVerse agent service")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--workers", type=int, default=int(env("MIGHTY_WORKERS", "2")))
+    p.add_argument("--max-requests", type=int, default=int(env("MIGHTY_MAX_REQUESTS", "0")) or None)
+    p.add_argument("--max-rss-mb", type=int, default=int(env("MIGHTY_MAX_RSS_MB", "0")) or None)
+    p.add_argument("--no-warm", action="store_true")
+    args = p.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    serve(args.host, args.port, args.workers, args.max_requests, args.max_rss_mb, warm=not args.no_warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Process readiness state for the agent service.
+
+`/health` is liveness only; `/ready` reports ready once models are warm.
+The prefork master (service/prefork.py) warms before forking, so workers
+inherit a ready state. A plain uvicorn process marks itself ready on
+startup, warming in the background first when `MIGHTY_WARM_ON_START=1`.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("mighty.readiness")
+
+_state: Dict[str, Any] = {"ready": False, "warm": {}, "ready_at": None}
+_lock = threading.Lock()
+
+
+def mark_ready(warm: Optional[Dict[str, str]] = None) -> None:
+    with _lock:
+        _state.update(ready=True, warm=dict(warm or {}), ready_at=time.time())
+
+
+def mark_not_ready() -> None:
+    with _lock:
+        _state.update(ready=False, ready_at=None)
+
+
+def is_ready() -> bool:
+    return bool(_state["ready"])
+
+
+def status() -> Dict[str, Any]:
+    with _lock:
+        body = {k: v for k, v in _state.items() if k != "ready"}
+        return {"status": "ready" if _state["ready"] else "warming", "pid": os.getpid(), **body}
+
+
+def warm_in_background(warm: Callable[[], Dict[str, str]]) -> threading.Thread:
+    """Run `warm()` on a thread and mark the process ready when it returns."""
+
+    def run() -> None:
+        try:
+            info = warm()
+        except Exception as e:
+            logger.exception("warm-up failed")
+            info = {"error": str(e)}
+        mark_ready(info)
+
+    thread = threading.Thread(target=run, name="mighty-warm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,53 @@
+"""Response classes backed by `utils/jsonio.py`.
+
+`FastJSONResponse` is the app's default response class (orjson when
+installed). Endpoints with large bodies return `negotiated(...)`, which
+also serves MessagePack to clients sending `Accept: application/msgpack`
+and skips FastAPI's `jsonable_encoder` pass over the result.
+"""
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from agents_stubs.utils import jsonio, tracing
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return jsonio.dumps(content)
+
+
+class MsgpackResponse(Response):
+    media_type = jsonio.MSGPACK
+
+    def render(self, content: Any) -> bytes:
+        return jsonio.packb(content)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """A streaming response that leaves `receive` to the endpoint.
+
+    Below ASGI 2.4, Starlette's `StreamingResponse` watches `receive` for a
+    disconnect while it streams, which would swallow body chunks an endpoint
+    is still reading (see `/asset-review/batch`). This one only sends; a
+    client that goes away shows up as a failed send or a read error.
+    """
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def encode(content: Any, fmt: str) -> bytes:
+    with tracing.span("response.encode", format=fmt):
+        return jsonio.packb(content) if fmt == jsonio.MSGPACK else jsonio.dumps(content)
+
+
+def negotiated(content: Any, accept: Optional[str], status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    headers = {**(headers or {}), "Vary": "Accept"}
+    fmt = jsonio.negotiate(accept)
+    with tracing.span("response.encode", format=fmt):
+        if fmt == jsonio.MSGPACK:
+            return MsgpackResponse(content, status_code=status_code, headers=headers)
+        return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -1,7 +1,85 @@
 import sys
 import os
 
+import pytest
+
 # Ensure workspace root is on sys.path so tests can import the `agents_stubs` proxy package
 WORKSPACE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if WORKSPACE_ROOT not in sys.path:
     sys.path.insert(0, WORKSPACE_ROOT)
+
+
+try:
+    import torch
+except ImportError:  # the model-backend tests skip without it
+    torch = None
+
+if torch is not None:
+
+    class TinyDepth(torch.nn.Module):
+        """A tiny depth-shaped model: images (N, 3, H, W) -> depth (N, H, W), any size.
+
+        The Linear head is what dynamic int8 quantization replaces; the
+        convolution keeps height and width dynamic for ONNX export. Defined at
+        module level so `torch.save` can pickle it.
+        """
+
+        def __init__(self):
+            super().__init__()
+            self.conv = torch.nn.Conv2d(3, 16, 3, padding=1)
+            self.head = torch.nn.Linear(16, 1)
+
+        def forward(self, x):
+            return self.head(torch.relu(self.conv(x)).permute(0, 2, 3, 1)).squeeze(-1)
+
+
+def _tiny_depth():
+    torch.manual_seed(0)
+    return TinyDepth().eval()
+
+
+@pytest.fixture
+def tiny_depth():
+    """Factory for the same small depth model on every call (needs torch)."""
+    pytest.importorskip("torch")
+    return _tiny_depth
+
+
+@pytest.fixture
+def tiny_midas(monkeypatch, tiny_depth):
+    """Make `integrations._midas` load `tiny_depth` into an empty model cache."""
+    from agents_stubs.agents import integrations
+
+    monkeypatch.setattr(integrations, "_MODELS", {})
+    monkeypatch.setattr(integrations, "_load_midas", lambda model_type: tiny_depth())
+    return integrations
+
+
+@pytest.fixture
+def cache_round_trip(tiny_depth):
+    """Check an on-disk model cache: `check(load, path)` -> the first two loads.
+
+    `load(build)` returns the model for `tiny_depth`, building it with
+    `build()` only on a cache miss; `path()` is the cache file. The file must
+    be owner-only, a second load must not build, and a corrupt file must be
+    rebuilt rather than raised.
+    """
+
+    def check(load, path):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return tiny_depth()
+
+        first = load(build)
+        assert os.path.exists(path()) and os.stat(path()).st_mode & 0o077 == 0
+        second = load(build)
+        assert builds == [1]
+        with open(path(), "wb") as f:
+            f.write(b"truncated")
+        load(build)
+        assert builds == [1, 1]
+        return first, second
+
+    return check
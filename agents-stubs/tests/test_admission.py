@@ -0,0 +1,111 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from fastapi.testclient import TestClient
+
+from agents_stubs.service.admission import AdmissionController, AdmissionMiddleware
+from agents_stubs.service.app import app
+
+
+def _slow_app(release: asyncio.Event):
+    async def inner(scope, receive, send):
+        if scope["path"].startswith("/heavy"):
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": scope["path"].encode()})
+
+    return inner
+
+
+def _controller(**heavy):
+    return AdmissionController({
+        "fast": {"concurrency": 4, "queue": 4, "timeout": 5, "paths": ["/fast"]},
+        "heavy": {"concurrency": 1, "queue": 1, "timeout": 5, "paths": ["/heavy"], **heavy},
+    })
+
+
+def test_lane_routing_uses_longest_prefix():
+    ctl = AdmissionController({
+        "a": {"concurrency": 1, "queue": 1, "paths": ["/asset-review"]},
+        "b": {"concurrency": 1, "queue": 1, "paths": ["/asset-review/batch"]},
+    })
+    assert ctl.lane_for("/asset-review").name == "a"
+    assert ctl.lane_for("/asset-review/batch").name == "b"
+    assert ctl.lane_for("/asset-reviewer") is None
+    assert ctl.lane_for("/health") is None
+
+
+def test_full_heavy_lane_sheds_while_fast_lane_flows():
+    async def run():
+        release = asyncio.Event()
+        ctl = _controller()
+        transport = httpx.ASGITransport(app=AdmissionMiddleware(_slow_app(release), ctl))
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            running = asyncio.create_task(client.get("/heavy/1"))
+            queued = asyncio.create_task(client.get("/heavy/2"))
+            while ctl.lanes["heavy"].waiting < 1:
+                await asyncio.sleep(0.01)
+            shed = await client.get("/heavy/3")
+            fast = await client.get("/fast")
+            stats = ctl.stats()
+            release.set()
+            return shed, fast, stats, await running, await queued, ctl.stats()
+
+    shed, fast, stats, running, queued, after = asyncio.run(run())
+    assert shed.status_code == 429 and int(shed.headers["retry-after"]) >= 1
+    assert shed.json()["lane"] == "heavy"
+    assert fast.status_code == 200
+    assert stats["heavy"]["active"] == 1 and stats["heavy"]["waiting"] == 1
+    assert running.status_code == queued.status_code == 200
+    assert after["heavy"] == {**after["heavy"], "active": 0, "waiting": 0, "shed": 1}
+
+
+def test_queue_wait_timeout_sheds():
+    async def run():
+        release = asyncio.Event()
+        ctl = _controller(timeout=0.05)
+        transport = httpx.ASGITransport(app=AdmissionMiddleware(_slow_app(release), ctl))
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            running = asyncio.create_task(client.get("/heavy/1"))
+            await asyncio.sleep(0.01)
+            timed_out = await client.get("/heavy/2")
+            release.set()
+            await running
+            return timed_out, ctl.stats()
+
+    timed_out, stats = asyncio.run(run())
+    assert timed_out.status_code == 429 and timed_out.json()["reason"] == "timeout"
+    assert stats["heavy"]["active"] == 0 and stats["heavy"]["waiting"] == 0
+
+
+def test_service_exposes_admission_stats_and_metrics():
+    client = TestClient(app)
+    client.post("/mint-approval", json={"manifest_cid": "bafy", "card_id": "a1", "credits_required": 1})
+    stats = client.get("/admission/stats").json()
+    assert {"fast", "heavy"} <= set(stats)
+    assert stats["fast"]["active"] == 0
+    text = client.get("/metrics").text
+    assert 'mighty_admission_queue_depth{lane="heavy"} 0' in text
+
+
+def test_waiters_on_other_event_loops_are_woken():
+    lane = AdmissionController({"heavy": {"concurrency": 1, "queue": 8, "timeout": 5, "paths": ["/heavy"]}}).lanes["heavy"]
+    order = []
+
+    def caller(i):
+        async def run():
+            await lane.acquire()
+            order.append(i)
+            await asyncio.sleep(0.01)
+            lane.release(0.01)
+
+        asyncio.run(run())  # each thread runs its own event loop
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(pool.map(caller, range(6)))
+    assert sorted(order) == list(range(6)) and time.perf_counter() - start < 2
+    assert lane.stats()["active"] == 0 and lane.stats()["waiting"] == 0 and lane.shed == 0
+
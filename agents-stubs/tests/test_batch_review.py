@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+
+from agents_stubs.agents import batch_review
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _corpus(tmp_path):
+    src = tmp_path / "assets"
+    (src / "set1").mkdir(parents=True)
+    (src / "set1" / "hero.png").write_bytes(b"not really a png")
+    (src / "set1" / "hero.json").write_text(json.dumps({"asset_cid": "bafy_hero", "card_id": "hero", "asset_path": "hero.png"}))
+    (src / "loose.jpg").write_bytes(b"not really a jpeg")
+    (src / "villain.json").write_text(json.dumps({"card_id": "villain", "title": "The Villain"}))
+    return src
+
+
+def test_discover_dedupes_referenced_images_and_skips_the_output_dir(tmp_path):
+    src = _corpus(tmp_path)
+    (src / "out").mkdir()
+    (src / "out" / "stale.json").write_text("{}")
+    items = list(batch_review.discover(str(src), exclude=str(src / "out")))
+    assert [(i[0], i[1]) for i in items] == [("villain.json", "villain"), ("loose.jpg", "loose"), ("set1/hero.json", "bafy_hero")]
+    assert items[2][2]["asset_path"] == str(src / "set1" / "hero.png")
+
+
+def test_batch_writes_per_asset_dirs_and_resumes_from_the_journal(tmp_path):
+    src = _corpus(tmp_path)
+    out = tmp_path / "out"
+    assert batch_review.run_batch(str(src), str(out), workers=2, limit=2) == {"discovered": 2, "skipped": 0, "ok": 2, "error": 0}
+    assert batch_review.run_batch(str(src), str(out), workers=2) == {"discovered": 3, "skipped": 2, "ok": 1, "error": 0}
+    assert batch_review.run_batch(str(src), str(out), workers=2) == {"discovered": 3, "skipped": 3, "ok": 0, "error": 0}
+    hero = out / os.path.basename(batch_review.output_dir(str(out), "set1/hero.json"))
+    assert sorted(os.listdir(hero)) == ["metadata_suggestion.json", "qc_report.json", "suggested_ad_anchors.json"]
+    assert json.loads((hero / "metadata_suggestion.json").read_text())["asset_cid"] == "bafy_hero"
+
+
+def test_torn_journal_line_and_failed_items_are_retried(tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    items = tmp_path / "items.ndjson"
+    items.write_text("\n".join(json.dumps({"id": n, "asset_cid": f"bafy_{n}", "manifest": {"card_id": n}}) for n in ("a", "b", "c")))
+    (out / batch_review.JOURNAL).write_text(
+        json.dumps({"id": "a", "status": "ok"}) + "\n" + json.dumps({"id": "b", "status": "error"}) + "\n" + '{"id": "c", "sta'
+    )
+    assert batch_review.run_batch(str(items), str(out), workers=1, retry_failed=False)["skipped"] == 2
+    (out / batch_review.JOURNAL).write_text(json.dumps({"id": "b", "status": "error"}) + "\n")
+    assert batch_review.run_batch(str(items), str(out), workers=1)["ok"] == 3
+
+
+def test_cli_batch_subcommand(tmp_path):
+    src = _corpus(tmp_path)
+    out = tmp_path / "out"
+    proc = subprocess.run(
+        [sys.executable, "-m", "agents_stubs.cli", "batch", "--input", str(src), "--out-dir", str(out), "--workers", "2"],
+        cwd=os.path.dirname(ROOT), capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert json.loads(proc.stdout.strip().splitlines()[-1]) == {"discovered": 3, "skipped": 0, "ok": 3, "error": 0}
+    assert len(batch_review.load_journal(str(out))) == 3
+
+
+# `python cli.py ...` from agents-stubs/ in an environment where `agents_stubs` cannot be imported at all
+_WITHOUT_PACKAGE = """
+import runpy, sys
+
+class Block:
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] == "agents_stubs":
+            raise ModuleNotFoundError("No module named 'agents_stubs'", name="agents_stubs")
+
+sys.meta_path.insert(0, Block())
+sys.path[0] = "."
+sys.argv = ["cli.py"] + sys.argv[1:]
+runpy.run_path("cli.py", run_name="__main__")
+"""
+
+
+def test_cli_script_runs_without_the_package(tmp_path):
+    src = _corpus(tmp_path)
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONPATH"}
+    for args in (["asset-review", "--out-dir", str(tmp_path / "one")], ["batch", "--input", str(src), "--out-dir", str(tmp_path / "b")]):
+        proc = subprocess.run(
+            [sys.executable, "-c", _WITHOUT_PACKAGE] + args, cwd=ROOT, env=env, capture_output=True, text=True, timeout=120
+        )
+        assert proc.returncode == 0, proc.stderr
+    assert os.path.exists(tmp_path / "one" / "qc_report.json")
+    assert len(batch_review.load_journal(str(tmp_path / "b"))) == 3
@@ -0,0 +1,94 @@
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import agents.asset_review as ar_mod
+from agents_stubs.service.app import app
+from agents_stubs.service import batching
+from agents_stubs.service.batching import MicroBatcher
+from agents_stubs.utils.metrics import Histogram
+
+
+def test_histogram_quantiles():
+    h = Histogram("t", buckets=(1, 2, 5))
+    for v in (0.5, 1.5, 1.5, 4, 9):
+        h.observe(v)
+    snap = h.snapshot()
+    assert snap["count"] == 5 and snap["buckets"] == {"1": 1, "2": 2, "5": 1, "+Inf": 1}
+    assert snap["p50"] == 2 and snap["p99"] == 9
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    calls = []
+    release = threading.Event()
+
+    def batch_fn(items):
+        release.wait(2)
+        calls.append(list(items))
+        return [ValueError("bad") if i == 3 else i * 10 for i in items]
+
+    batcher = MicroBatcher("t", batch_fn, window_ms=50, max_batch=4)
+    futures = [batcher.submit(i) for i in range(6)]
+    release.set()
+    assert [f.result(2) for f in futures[:3]] == [0, 10, 20]
+    with pytest.raises(ValueError):
+        futures[3].result(2)
+    assert futures[5].result(2) == 50
+    assert sorted(len(c) for c in calls) == [2, 4]
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == 2 and stats["queue_wait_seconds"]["count"] == 6
+    batcher.close()
+
+
+def test_batch_max_defaults_to_heavy_lane_concurrency(monkeypatch):
+    monkeypatch.delenv("MIGHTY_BATCH_MAX", raising=False)
+    monkeypatch.setenv("MIGHTY_HEAVY_CONCURRENCY", "6")
+    monkeypatch.setattr(batching, "_batchers", {})
+    batcher = batching.get_batcher("t", lambda items: items)
+    assert batcher.max_batch == 6
+    batcher.close()
+
+
+def test_run_asset_review_batch_batches_only_depth(monkeypatch, tmp_path):
+    counts = {"depth": 0, "seg": 0}
+
+    def depth_batch(paths):
+        counts["depth"] += 1
+        return [f"bafydepth{i}" for i in range(len(paths))]
+
+    def segment(path):
+        counts["seg"] += 1
+        return None
+
+    fake = types.SimpleNamespace(
+        estimate_depth_batch=depth_batch,
+        run_segmentation=segment,
+        clip_image_tags=lambda p: [{"tag": "solo", "score": 0.9}],
+        transcribe_audio=lambda p: {"text": "", "bpm": None},
+    )
+    monkeypatch.setitem(ar_mod.run_asset_review_batch.__globals__, "integrations", fake)
+    image = tmp_path / "a.png"
+    image.write_bytes(b"x")
+    requests = [("bafy0", {"card_id": "c0", "image_path": str(image)}), ("bafy1", {"card_id": "c1"}),
+                ("bafy2", {"card_id": "c2", "image_path": str(image)})]
+    results = ar_mod.run_asset_review_batch(requests)
+    assert counts == {"depth": 1, "seg": 2}
+    assert [r["metadata_suggestion"]["card_id"] for r in results] == ["c0", "c1", "c2"]
+    assert results[2]["metadata_suggestion"]["depth_map"]["cid"] == "bafydepth1"
+    assert results[0]["metadata_suggestion"]["tags"] == ["solo"]
+    assert results[1]["qc_report"]["issues"] == ["low_confidence", "no_local_image"]
+
+
+def test_asset_review_endpoint_batches_and_reports_stats():
+    client = TestClient(app)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(
+            lambda i: client.post("/asset-review", json={"asset_cid": f"bafy{i}", "manifest": {"card_id": f"c{i}"}}),
+            range(8),
+        ))
+    assert [r.json()["metadata_suggestion"]["card_id"] for r in responses] == [f"c{i}" for i in range(8)]
+    stats = client.get("/batching/stats").json()["asset_review"]
+    assert stats["queue_wait_seconds"]["count"] >= 8
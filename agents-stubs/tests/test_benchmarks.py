@@ -0,0 +1,53 @@
+import json
+import sys
+
+from agents_stubs.benchmarks import bench, corpus, mock_nft_storage
+from agents_stubs.utils import pinning
+
+
+def test_corpus_is_deterministic(tmp_path):
+    a = corpus.build_corpus(str(tmp_path / "a"), cards=4)
+    b = corpus.build_corpus(str(tmp_path / "b"), cards=4)
+    for x, y in zip(a, b):
+        assert open(x["image"], "rb").read() == open(y["image"], "rb").read()
+    assert open(a[1]["image"], "rb").read().startswith(b"\x89PNG")
+    assert json.load(open(a[2]["manifest"]))["asset_path"] == a[2]["image"]
+
+
+def test_pinning_targets_the_local_mock(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "nft_storage", None)  # force the HTTP path
+    f = tmp_path / "x.bin"
+    f.write_bytes(b"abc")
+    with mock_nft_storage.serve(fail_every=2) as url:
+        monkeypatch.setenv("NFT_STORAGE_API_URL", url)
+        assert pinning.pin_json_with_retries({"a": 1}, "key", backoff=0).startswith("bafy")
+        assert pinning.pin_file_with_retries(str(f), "key", backoff=0).startswith("bafy")  # 2nd request 503s, retried
+
+
+def test_quick_run_reports_latency_per_benchmark(tmp_path):
+    doc = bench.run(["hashing", "manifest"], quick=True, corpus_dir=str(tmp_path), cards=3)
+    assert set(doc["results"]) == {"hashing.sha256_files", "hashing.request_key", "manifest.build"}
+    assert all(r["p50_ms"] > 0 and r["iterations"] >= 3 for r in doc["results"].values())
+    assert doc["meta"]["quick"] is True and doc["meta"]["cards"] == 3
+
+
+def test_compare_applies_global_and_per_benchmark_tolerance():
+    base = {
+        "results": {"a": {"p50_ms": 1.0}, "b": {"p50_ms": 1.0}, "c": {"p50_ms": 1.0}, "gone": {"p50_ms": 1.0}, "s": {"skipped": "x"}},
+        "tolerance": {"b": 1.0},
+    }
+    cur = {"results": {"a": {"p50_ms": 1.3}, "b": {"p50_ms": 1.9}, "c": {"p50_ms": 0.5}, "new": {"p50_ms": 1.0}, "s": {"p50_ms": 1.0}}}
+    rows = bench.compare(cur, base, tolerance=0.25)["benchmarks"]
+    assert {n: r["status"] for n, r in rows.items()} == {
+        "a": "regression", "b": "ok", "c": "improved", "gone": "missing", "new": "new", "s": "skipped",
+    }
+
+
+def test_cli_writes_json_and_fails_on_regression(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"results": {"manifest.build": {"p50_ms": 1e-6}}}))
+    out = tmp_path / "out.json"
+    args = ["--quick", "--only", "manifest", "--corpus-dir", str(tmp_path / "c"), "--cards", "2"]
+    assert bench.main(args + ["--out", str(out), "--baseline", str(baseline)]) == 1
+    assert json.loads(out.read_text())["comparison"]["regressions"] == ["manifest.build"]
+    assert bench.main(args + ["--out", str(out), "--baseline", str(baseline), "--tolerance", "1e9"]) == 0
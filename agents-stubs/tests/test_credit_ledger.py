@@ -0,0 +1,294 @@
+import threading
+
+import pytest
+
+from agents.mint_approval import complete_mint, prepare_mint, prepare_mint_batch
+from agents_stubs.utils.credit_ledger import (
+    CreditLedger,
+    InsufficientCreditsError,
+    SettlementWorker,
+    Submitter,
+    _encode_deduct_call,
+    sign_legacy_transaction,
+)
+from agents_stubs.utils.eip712 import keccak256
+from agents_stubs.utils.indexer import ASSET_MINTED_TOPIC
+
+ALICE = "0x" + "01" * 20
+BOB = "0x" + "02" * 20
+ASSETS = "0x" + "aa" * 20
+
+
+class FakeIndexer:
+    def __init__(self):
+        self.balance = {}
+        self.deductions = {}
+
+    def balances(self, accounts):
+        return {a.lower(): self.balance.get(a.lower(), 0) for a in accounts}
+
+    def deductions_by_tx(self, tx_hashes):
+        return {tx: self.deductions[tx] for tx in tx_hashes if tx in self.deductions}
+
+
+class FakeSubmitter(Submitter):
+    """Records prepared and broadcast transactions; `errors` are raised by `send` after it was sent."""
+
+    def __init__(self):
+        self.prepared = {}
+        self.sent = []
+        self.mined = {}
+        self.errors = []
+        self.fail_prepare = 0
+
+    def prepare(self, account, amount, operation):
+        if self.fail_prepare:
+            self.fail_prepare -= 1
+            raise RuntimeError("node down")
+        tx_hash = f"0x{len(self.prepared) + 1:064x}"
+        self.prepared[tx_hash] = (account, amount, operation)
+        return tx_hash, tx_hash  # the raw transaction stands in for itself
+
+    def send(self, raw_tx):
+        self.sent.append(raw_tx)
+        if self.errors:
+            raise self.errors.pop(0)
+
+    def receipt(self, tx_hash):
+        return self.mined.get(tx_hash)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = CreditLedger(str(tmp_path / "ledger.db"))
+    ledger.set_onchain_balance(ALICE, 100)
+    yield ledger
+    ledger.close()
+
+
+def test_reserve_commit_release(ledger):
+    hold = ledger.reserve(ALICE, 30, "mint", "card1")
+    assert ledger.available(ALICE) == 70
+    ledger.release(hold)
+    assert ledger.available(ALICE) == 100
+    ledger.deduct(ALICE, 60, "mint")
+    assert not ledger.can_afford(ALICE, 41)
+    with pytest.raises(InsufficientCreditsError):
+        ledger.reserve(ALICE, 41, "mint")
+    assert ledger.reserve_many([(ALICE, 40, "mint", "a"), (ALICE, 1, "mint", "b"), (BOB, 1, "mint", "c")])[1:] == [None, None]
+
+
+def test_expired_reservations_free_credits(ledger):
+    hold = ledger.reserve(ALICE, 100, "mint", ttl=-1)
+    assert ledger.available(ALICE) == 100
+    with pytest.raises(ValueError):
+        ledger.commit(hold)
+
+
+def test_concurrent_reservations_never_overspend(tmp_path, ledger):
+    other = CreditLedger(ledger.db_path)
+    won = []
+
+    def worker(target):
+        for _ in range(30):
+            try:
+                won.append(target.reserve(ALICE, 7, "mint"))
+            except InsufficientCreditsError:
+                pass
+
+    threads = [threading.Thread(target=worker, args=(l,)) for l in (ledger, other, ledger, other)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(won) == 100 // 7
+    assert ledger.available(ALICE) == 100 % 7
+    other.close()
+
+
+def test_settle_nets_per_account_and_reconciles(ledger):
+    ledger.set_onchain_balance(BOB, 10)
+    for _ in range(5):
+        ledger.deduct(ALICE, 4, "mint")
+    ledger.deduct(ALICE, 1, "metadata")
+    ledger.deduct(BOB, 2, "mint")
+    submit = FakeSubmitter()
+    submit.fail_prepare = 1
+
+    first = ledger.settle(submit)
+    assert [r["status"] for r in first] == ["failed", "submitted", "submitted"]
+    retry = ledger.settle(submit)
+    assert len(retry) == 1 and retry[0]["status"] == "submitted"
+    assert sorted(submit.prepared.values()) == sorted([(ALICE, 20, "mint"), (ALICE, 1, "metadata"), (BOB, 2, "mint")])
+    assert sorted(submit.sent) == sorted(submit.prepared)
+    assert ledger.settle(submit) == []
+    assert ledger.available(ALICE) == 79
+
+    indexer = FakeIndexer()
+    indexer.balance = {ALICE: 79, BOB: 8}
+    for tx_hash, (account, amount, operation) in submit.prepared.items():
+        indexer.deductions[tx_hash] = [{"account": account, "amount": amount, "operation": operation}]
+    assert ledger.reconcile(indexer) == {"confirmed": 3, "outstanding": 0, "accounts": 2}
+    assert ledger.available(ALICE) == 79
+    assert ledger.available(BOB) == 8
+
+
+def test_settle_recovers_by_tx_hash_before_resending(ledger):
+    submit = FakeSubmitter()
+    ledger.deduct(ALICE, 5, "mint")
+    submit.errors = [KeyboardInterrupt()]  # the process stops right after the broadcast
+    with pytest.raises(KeyboardInterrupt):
+        ledger.settle(submit)
+    (landed,) = submit.prepared
+    assert ledger.settle(submit) == []  # not stale yet: another worker may still be sending it
+    submit.mined[landed] = True
+    assert [(r["status"], r["tx_hash"]) for r in ledger.settle(submit, stale_after=0)] == [("submitted", landed)]
+    assert submit.sent == [landed]
+
+    # the node dropped the connection: the same signed bytes are sent again, nothing is re-signed
+    ledger.deduct(ALICE, 7, "mint")
+    submit.errors = [RuntimeError("connection reset")]
+    (failed,) = ledger.settle(submit)
+    assert failed["status"] == "failed" and failed["tx_hash"]
+    (retry,) = ledger.settle(submit)
+    assert retry["status"] == "submitted" and retry["tx_hash"] == failed["tx_hash"]
+    assert len(submit.prepared) == 2 and submit.sent[-2:] == [failed["tx_hash"]] * 2
+
+    # a reverted transaction deducted nothing, so a new one is prepared
+    submit.mined[failed["tx_hash"]] = False
+    (again,) = ledger.settle(submit, stale_after=0)
+    assert again["status"] == "submitted" and again["tx_hash"] not in (landed, failed["tx_hash"])
+    assert submit.prepared[again["tx_hash"]] == (ALICE, 7, "mint")
+
+    # its sender nonce was taken by another transaction, so it can never be mined
+    submit.errors = [RuntimeError("nonce too low")]
+    (renewed,) = ledger.settle(submit, stale_after=0)
+    assert renewed["status"] == "submitted" and renewed["tx_hash"] != again["tx_hash"]
+    assert len(submit.prepared) == 4 and ledger.available(ALICE) == 88
+
+
+def test_a_partial_submitter_fails_when_constructed():
+    class SendOnly(Submitter):
+        def send(self, raw_tx):
+            pass
+
+    with pytest.raises(TypeError):
+        SendOnly()
+
+
+def test_only_one_settlement_worker_runs_per_ledger(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    ledgers = [CreditLedger(path), CreditLedger(path)]  # e.g. two prefork service workers
+    ledgers[0].set_onchain_balance(ALICE, 100)
+    ledgers[0].deduct(ALICE, 7, "mint")
+    submit = FakeSubmitter()
+    workers = [SettlementWorker(ledger, submit, interval=0.01) for ledger in ledgers]
+    assert [w.run_once() for w in workers] == [True, False]
+    ledgers[1].deduct(ALICE, 3, "mint")
+    assert [w.run_once() for w in workers] == [True, False]
+    assert [a for a, _, _ in submit.prepared.values()] == [ALICE, ALICE]
+
+    # the lease is handed over when its holder stops
+    workers[0].start()
+    workers[0].stop()
+    workers[0].join(5)
+    assert workers[1].run_once()
+    for ledger in ledgers:
+        ledger.close()
+
+
+class FakeMintChain:
+    """Serves receipts and transactions for mint tx hashes: `status` 1 with `uris` minted, or 0 reverted."""
+
+    def __init__(self):
+        self.txs = {}
+
+    def mine(self, tx_hash, status, uris, to=ASSETS):
+        logs = [{"address": ASSETS, "topics": [ASSET_MINTED_TOPIC, f"0x{i + 1:064x}", "0x" + "0" * 24 + BOB[2:]],
+                 "data": "0x" + format(1, "064x") + format(64, "064x") + format(len(uri), "064x")
+                 + uri.encode().hex().ljust(64 * ((len(uri) + 31) // 32), "0")}
+                for i, uri in enumerate(uris)]
+        calldata = "0x" + b"".join(uri.encode() for uri in uris).hex()
+        self.txs[tx_hash] = ({"status": hex(status), "logs": logs if status else []}, {"to": to, "input": calldata})
+
+    def batch(self, calls):
+        return list(self.txs.get(calls[0][1][0], (None, None)))
+
+
+def test_complete_mint_settles_holds_from_the_chain(ledger):
+    chain = FakeMintChain()
+    tx = prepare_mint("bafy", "card1", credits_required=30, account=ALICE, ledger=ledger)
+    # not mined yet: nothing changes, whatever the caller believes
+    assert complete_mint(tx, "0xa", ALICE, ledger, chain, ASSETS)["pending"] == [tx["credit_hold_id"]]
+    chain.mine("0xa", 1, ["ipfs://bafy"])
+    assert complete_mint(tx, "0xa", ALICE, ledger, chain, ASSETS)["committed"] == [tx["credit_hold_id"]]
+
+    cards = [{"card_id": f"c{i}", "manifest_cid": f"bafy{i}", "credits_required": 10, "account": ALICE}
+             for i in range(3)]
+    res = prepare_mint_batch(cards, ledger=ledger)
+    assert ledger.available(ALICE) == 40
+    # a landed transaction that minted someone else's card leaves these holds reserved
+    chain.mine("0xb", 1, ["ipfs://other"])
+    assert len(complete_mint(res, "0xb", ALICE, ledger, chain, ASSETS)["pending"]) == 3
+    # a reverted transaction only releases the cards it carried
+    chain.mine("0xc", 0, ["ipfs://bafy0", "ipfs://bafy1"])
+    done = complete_mint(res, "0xc", ALICE, ledger, chain, ASSETS)
+    assert len(done["released"]) == 2 and len(done["pending"]) == 1
+    assert ledger.available(ALICE) == 60
+    # ...and only when it was sent to the assets contract
+    chain.mine("0xd", 0, ["ipfs://bafy2"], to="0x" + "ee" * 20)
+    assert len(complete_mint(res, "0xd", ALICE, ledger, chain, ASSETS)["pending"]) == 1
+    assert [(r["account"], r["amount"]) for r in ledger.settle(FakeSubmitter())] == [(ALICE, 30)]
+
+    # holds of another account are never touched
+    ledger.set_onchain_balance(BOB, 10)
+    other = prepare_mint("bafy9", "card9", credits_required=5, account=BOB, ledger=ledger)
+    chain.mine("0xe", 0, ["ipfs://bafy9"])
+    assert complete_mint(other, "0xe", ALICE, ledger, chain, ASSETS)["rejected"] == [other["credit_hold_id"]]
+    assert ledger.holds([other["credit_hold_id"]])[other["credit_hold_id"]]["status"] == "reserved"
+
+    hold = ledger.reserve(ALICE, 5, "mint", "ipfs://late", ttl=-1)
+    chain.mine("0xf", 1, ["ipfs://late"])
+    assert complete_mint({"credit_hold_id": hold}, "0xf", ALICE, ledger, chain, ASSETS)["expired"] == [hold]
+    assert complete_mint({"card_id": "signed"}, "0xf", ALICE)["committed"] == []
+
+
+def test_sign_legacy_transaction_matches_eip155_example():
+    tx = {"nonce": 9, "gasPrice": 20 * 10**9, "gas": 21000, "to": "0x" + "35" * 20, "value": 10**18, "data": "0x"}
+    tx_hash, raw = sign_legacy_transaction(tx, "0x" + "46" * 32, chain_id=1)
+    assert raw == (
+        "0xf86c098504a817c800825208943535353535353535353535353535353535353535880de0b6b3a76400008025a028ef61340bd939bc"
+        "2195fe537567866003e1a15d3c71ff63e1590620aa636276a067cbe9d8997f761aecb703304b3800ccf555c9f3dc64214b297fb1966a3b6d83"
+    )
+    assert tx_hash == "0x" + keccak256(bytes.fromhex(raw[2:])).hex()
+    # lowercase (non-checksummed) addresses are accepted
+    assert sign_legacy_transaction(dict(tx, to="0x" + "ab" * 20), "0x" + "46" * 32, chain_id=1)[1] != raw
+
+
+def test_encode_deduct_call_layout():
+    data = bytes.fromhex(_encode_deduct_call(
+        {"from": ALICE, "amount": 5, "operation": "mint", "nonce": 2, "deadline": 99}, b"\x11" * 65
+    )[2:])
+    assert data[:4] == keccak256(b"deductCreditsWithSignature((address,uint256,string,uint256,uint256),bytes)")[:4]
+    words = [int.from_bytes(data[4 + i:36 + i], "big") for i in range(0, len(data) - 4, 32)]
+    assert words[:2] == [64, 64 + 7 * 32]
+    assert words[2:8] == [int(ALICE, 16), 5, 160, 2, 99, 4]
+    assert words[9] == 65
+
+
+def test_prepare_mint_holds_credits(ledger):
+    tx = prepare_mint("bafy", "card1", credits_required=60, account=ALICE, ledger=ledger)
+    assert tx["status"] == "prepared" and tx["credit_hold_id"]
+    assert prepare_mint("bafy", "card2", credits_required=60, account=ALICE, ledger=ledger) == {"error": "insufficient_credits"}
+    assert prepare_mint("bafy", "card3", credits_required=5)["error"] == "insufficient_credits_or_missing_signature"
+
+    cards = [
+        {"card_id": f"c{i}", "manifest_cid": f"bafy{i}", "credits_required": 15, "account": ALICE}
+        for i in range(4)
+    ]
+    res = prepare_mint_batch(cards, ledger=ledger)
+    assert [c["status"] for c in res["cards"]] == ["batched", "batched", "rejected", "rejected"]
+    assert res["cards"][2]["error"] == "insufficient_credits"
+    assert res["batches"][0]["approval_path"] == "credits"
+    assert all("credit_hold_id" in c for c in res["batches"][0]["cards"])
+    assert ledger.available(ALICE) == 10
@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from agents_stubs import cli
+from agents_stubs.service import daemon
+
+WORKSPACE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+@pytest.fixture
+def running(tmp_path):
+    path = str(tmp_path / "d.sock")
+    ready = threading.Event()
+    t = threading.Thread(target=daemon.serve, args=(path,), kwargs={"runner": cli.run_command, "warm": False, "ready": ready})
+    t.start()
+    assert ready.wait(10)
+    yield path
+    daemon.request({"op": "stop"}, path)
+    t.join(10)
+
+
+def _cli(args, cwd, sock):
+    env = {**os.environ, "MIGHTY_DAEMON_SOCKET": sock, "PYTHONPATH": WORKSPACE_ROOT}
+    return subprocess.run([sys.executable, "-m", "agents.cli", *args], cwd=cwd, env=env, capture_output=True, text=True, timeout=60)
+
+
+def test_cli_runs_commands_in_the_daemon(running, tmp_path):
+    proc = _cli(["asset-review", "--asset-cid", "bafy_d", "--out-dir", "out"], str(tmp_path), running)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.split()[0] == str(tmp_path / "out" / "metadata_suggestion.json")
+    assert json.loads((tmp_path / "out" / "metadata_suggestion.json").read_text())["asset_cid"] == "bafy_d"
+    status = daemon.request({"op": "status"}, running)
+    assert status["pid"] == os.getpid() and status["served"] == 1 and status["errors"] == 0
+
+
+def test_agents_runner_cli_runs_commands_in_the_daemon(running, tmp_path):
+    # `python -m agents.cli` from inside agents-stubs/ is the runner in agents/cli.py
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"card_id": "hero"}))
+    args = ["asset-review", "--asset-cid", "bafy_r", "--manifest-path", str(manifest), "--out-dir", str(tmp_path / "out")]
+    proc = _cli(args, os.path.join(WORKSPACE_ROOT, "agents-stubs"), running)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.split() == [str(tmp_path / "out" / n) for n in
+                                   ("metadata_suggestion.json", "qc_report.json", "suggested_ad_anchors.json")]
+    assert daemon.request({"op": "status"}, running)["served"] == 1
+
+    mint = ["mint-approval", "--manifest-cid", "m", "--card-id", "c", "--out-dir", str(tmp_path / "out")]
+    proc = _cli(mint, os.path.join(WORKSPACE_ROOT, "agents-stubs"), running)
+    assert proc.returncode == 1 and "Either credits_required or admin_signature" in proc.stderr
+    assert daemon.request({"op": "status"}, running)["errors"] == 1
+
+
+def test_command_errors_come_back_without_a_local_rerun(running, tmp_path):
+    proc = _cli(["metadata-gen", "--suggestion", "missing.json", "--out-dir", "out"], str(tmp_path), running)
+    assert proc.returncode == 1 and "FileNotFoundError" in proc.stderr
+    assert daemon.request({"op": "status"}, running)["errors"] == 1
+
+
+def test_cli_falls_back_in_process_without_a_daemon(tmp_path):
+    stale = tmp_path / "stale.sock"
+    stale.write_text("")  # a leftover file with nobody listening
+    proc = _cli(["mint-approval", "--manifest-cid", "m", "--card-id", "c", "--out-dir", "out"], str(tmp_path), str(stale))
+    assert proc.returncode == 0, proc.stderr
+    assert (tmp_path / "out" / "tx_receipt.json").exists()
+
+
+def test_stop_removes_the_socket_and_a_second_daemon_is_refused(running):
+    with pytest.raises(RuntimeError):
+        daemon.serve(running, warm=False)
+    assert oct(os.stat(running).st_mode & 0o777) == "0o600"
+    assert daemon.request({"op": "stop"}, running)["stopping"] is True
+    for _ in range(100):
+        if not os.path.exists(running):
+            break
+        threading.Event().wait(0.05)
+    assert daemon.request({"op": "status"}, running) is None
+
+
+def test_socket_defaults_to_a_private_location(monkeypatch, tmp_path):
+    monkeypatch.delenv("MIGHTY_DAEMON_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert daemon.socket_path() == str(tmp_path / "mighty-agents.sock")
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    assert os.path.basename(os.path.dirname(daemon.socket_path())) == f"mighty-agents-{os.getuid()}"
+
+
+def test_client_ignores_sockets_other_users_could_control(running, monkeypatch):
+    parent = os.path.dirname(running)
+    os.chmod(parent, 0o777)
+    try:
+        assert daemon.request({"op": "status"}, running) is None
+        with pytest.raises(RuntimeError, match="writable by other users"):
+            daemon.serve(os.path.join(parent, "other.sock"), warm=False)
+    finally:
+        os.chmod(parent, 0o700)
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    assert daemon.request({"op": "status"}, running) is None
+    monkeypatch.undo()
+    assert daemon.request({"op": "status"}, running)["status"] == "ok"
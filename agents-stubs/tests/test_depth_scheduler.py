@@ -0,0 +1,123 @@
+import contextlib
+import sys
+import types
+
+import pytest
+
+import agents.asset_review as ar_mod
+from agents_stubs.agents import depth_scheduler as ds
+from agents_stubs.agents import integrations
+
+GiB = 1024 ** 3
+FRAME = (1920, 1080)
+
+
+def test_budget_picks_the_largest_variant_that_fits(monkeypatch):
+    assert ds.plan_depth(FRAME, free_bytes=16 * GiB)["model"] == "DPT_Large"
+    assert ds.plan_depth(FRAME, free_bytes=int(1.5 * GiB))["model"] == "DPT_Hybrid"
+    small = ds.plan_depth(FRAME, free_bytes=400 * ds.MiB)
+    assert (small["model"], small["strategy"], small["output_size"]) == ("MiDaS_small", "full", list(FRAME))
+    assert small["estimated_peak_bytes"] <= small["memory_budget_bytes"]
+    # no room for a full-resolution map (and tiling disabled): a smaller one rather than none
+    monkeypatch.setenv("MIGHTY_DEPTH_TILE_SIZE", "64")
+    big = ds.plan_depth((7680, 4320), free_bytes=500 * ds.MiB)
+    assert big["strategy"] == "downscaled" and big["output_size"][0] < 7680 and big["estimated_peak_bytes"] <= big["memory_budget_bytes"]
+    skip = ds.plan_depth(FRAME, free_bytes=64 * ds.MiB)
+    assert (skip["model"], skip["strategy"], skip["reason"]) == (None, "skip", "insufficient_memory")
+
+
+def test_latency_target_and_loaded_weights():
+    fast = ds.plan_depth(FRAME, free_bytes=16 * GiB, latency_target_ms=1200)
+    assert fast["model"] == "DPT_Hybrid" and fast["latency_target_met"] is True
+    missed = ds.plan_depth(FRAME, free_bytes=16 * GiB, latency_target_ms=1)
+    assert missed["model"] == "MiDaS_small" and missed["input_size"] == 192 and missed["latency_target_met"] is False
+    # weights already resident cost nothing, so a loaded DPT_Large fits where a cold one would not
+    assert ds.plan_depth(FRAME, free_bytes=GiB)["model"] != "DPT_Large"
+    assert ds.plan_depth(FRAME, free_bytes=GiB, loaded=["DPT_Large"])["model"] == "DPT_Large"
+    assert ds.plan_depth(FRAME, free_bytes=16 * GiB, exclude=[("DPT_Large", 384)])["model"] == "DPT_Hybrid"
+
+
+def test_environment_overrides(monkeypatch):
+    assert ds.parse_bytes("2GiB") == 2 * GiB and ds.parse_bytes("512M") == 512 * ds.MiB and ds.parse_bytes("100") == 100
+    monkeypatch.setenv("MIGHTY_DEPTH_MEMORY_BUDGET", "400MiB")
+    assert ds.available_memory() == 400 * ds.MiB and ds.plan_depth(FRAME)["model"] == "MiDaS_small"
+    monkeypatch.setenv("MIGHTY_DEPTH_MEMORY_BUDGET", "16GiB")
+    monkeypatch.setenv("MIGHTY_DEPTH_MODEL", "DPT_Hybrid")
+    monkeypatch.setenv("MIGHTY_DEPTH_LATENCY_MS", "1")
+    plan = ds.plan_depth(FRAME)
+    assert plan["model"] == "DPT_Hybrid" and plan["latency_target_ms"] == 1.0
+    monkeypatch.setenv("MIGHTY_DEPTH_MODEL", "bogus")
+    with pytest.raises(ValueError):
+        ds.plan_depth(FRAME)
+
+
+class _T:
+    shape = (3, 32, 32)
+
+    def __getitem__(self, _):
+        return self
+
+    def unsqueeze(self, _):
+        return self
+
+    squeeze = cpu = lambda self: self
+
+    def numpy(self):
+        return "depth"
+
+
+def test_out_of_memory_replans_with_a_smaller_variant(monkeypatch, tmp_path):
+    calls = []
+
+    def load(model_type):
+        def forward(batch):
+            calls.append(model_type)
+            if model_type == "DPT_Large":
+                raise RuntimeError("DefaultCPUAllocator: not enough memory: you tried to allocate 4GB")
+            return _T()
+
+        return forward
+
+    fake_torch = types.SimpleNamespace(
+        no_grad=contextlib.nullcontext,
+        stack=list,
+        nn=types.SimpleNamespace(functional=types.SimpleNamespace(interpolate=lambda x, **kw: x)),
+    )
+    monkeypatch.setitem(sys.modules, "torch", fake_torch)
+    monkeypatch.setitem(sys.modules, "numpy", types.SimpleNamespace(save=lambda name, arr: None))
+    monkeypatch.setitem(sys.modules, "PIL", types.SimpleNamespace(Image=None))
+    monkeypatch.setattr(integrations, "_net_input", lambda path, kind, size: (_T(), (1080, 1920)))
+    monkeypatch.setattr(integrations, "_load_midas", load)
+    monkeypatch.setattr(integrations, "_MODELS", {})
+    monkeypatch.setenv("MIGHTY_DEPTH_MEMORY_BUDGET", "16GiB")
+    monkeypatch.delenv("NFT_STORAGE_KEY", raising=False)
+
+    plan = ds.plan_depth(FRAME)
+    assert plan["model"] == "DPT_Large"
+    result = integrations.estimate_depth_from_image(str(tmp_path / "frame.png"), plan)
+    assert result and result.endswith(".npy")
+    assert calls == ["DPT_Large", "DPT_Hybrid"]
+    assert (plan["model"], plan["status"], plan["fallback_from"]) == ("DPT_Hybrid", "ok", "DPT_Large")
+
+
+def test_review_records_the_plan_and_flags_skipped_depth(monkeypatch, tmp_path):
+    image = tmp_path / "a.png"
+    image.write_bytes(b"x")
+
+    def estimate(path, plan):
+        plan["status"] = "skipped"
+        return None
+
+    fake = types.SimpleNamespace(
+        plan_depth=lambda path: {"model": None, "strategy": "skip", "reason": "insufficient_memory"},
+        estimate_depth_from_image=estimate,
+        run_segmentation=lambda p: None,
+        clip_image_tags=lambda p: [],
+        transcribe_audio=lambda p: {},
+    )
+    monkeypatch.setitem(ar_mod.run_asset_review.__globals__, "integrations", fake)
+    qc = ar_mod.run_asset_review("bafy", {"card_id": "c", "image_path": str(image)})["qc_report"]
+    assert qc["depth_plan"]["strategy"] == "skip" and qc["depth_plan"]["status"] == "skipped"
+    assert "depth_skipped_low_memory" in qc["issues"]
+    batch_qc = ar_mod.run_asset_review_batch([("bafy", {"card_id": "c", "image_path": str(image)})])[0]["qc_report"]
+    assert batch_qc["depth_plan"]["status"] == "skipped"
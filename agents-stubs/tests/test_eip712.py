@@ -0,0 +1,102 @@
+from agents_stubs.utils import eip712
+from agents_stubs.utils.eip712 import ENGINE, NonceCache, TypedDataEngine, keccak256, recover_signer
+
+HARDHAT_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+HARDHAT_ADDR = "0xf39fd6e51aad88f6f4ce6ab8827279cfffb92266"
+
+
+def test_keccak_and_address_vectors():
+    assert keccak256(b"").hex() == "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    assert eip712.private_key_to_address(HARDHAT_KEY) == HARDHAT_ADDR
+
+
+def test_eip712_spec_example():
+    # "Ether Mail" example from the EIP-712 specification
+    schemes = {"Mail": {"name": "Ether Mail", "version": "1", "types": {
+        "Person": (("name", "string"), ("wallet", "address")),
+        "Mail": (("from", "Person"), ("to", "Person"), ("contents", "string")),
+    }}}
+    engine = TypedDataEngine(schemes)
+    msg = {
+        "from": {"name": "Cow", "wallet": "0xCD2a3d9F938E13CD947Ec05AbC7FE734Df8DD826"},
+        "to": {"name": "Bob", "wallet": "0xbBbBBBBbbBBBbbbBbbBbbbbBBbBbbbbBbBbbBBbB"},
+        "contents": "Hello, Bob!",
+    }
+    digest = engine.digest("Mail", "Mail", msg, 1, "0xCcCCccccCCCCcCCCCCCcCcCccCcCCCcCcccccccC")
+    assert digest.hex() == "be609aee343fb3c4b28e1df9e632fca64fcfaede20f02e86244efddf30957bd2"
+    sig = engine.sign(keccak256(b"cow"), "Mail", "Mail", msg, chain_id=1,
+                      verifying_contract="0xCcCCccccCCCCcCCCCCCcCcCccCcCCCcCcccccccC")
+    assert sig.endswith("1c")  # v = 28
+    assert recover_signer(digest, sig) == "0xcd2a3d9f938e13cd947ec05abc7fe734df8dd826"
+
+
+def _approval(nonce, deadline=2_000_000_000):
+    msg = {"operationHash": "0x" + "ab" * 32, "requester": "0x" + "11" * 20, "nonce": nonce, "deadline": deadline}
+    return {"contract": "ApprovalRegistry", "primary_type": "Approval", "message": msg,
+            "signature": ENGINE.sign(HARDHAT_KEY, "ApprovalRegistry", "Approval", msg)}
+
+
+def test_verify_batch_checks_signer_deadline_and_nonces():
+    fetched = []
+
+    def fetch(contract, accounts):
+        fetched.append((contract, accounts))
+        return {a: 1 for a in accounts}
+
+    nonces = NonceCache(fetch)
+    items = [_approval(1), _approval(1), _approval(0), _approval(2, deadline=1)]
+    items.append(dict(_approval(3), signature="0x" + "00" * 65))
+    res = ENGINE.verify_batch(items, allowed_signers=[HARDHAT_ADDR], nonces=nonces, now=1_000)
+    assert [r.get("error") for r in res] == [None, "duplicate_nonce", "invalid_nonce", "expired_deadline", "invalid_signature"]
+    assert res[0]["valid"] and res[0]["signer"] == HARDHAT_ADDR
+    assert fetched == [("ApprovalRegistry", ["0x" + "11" * 20])]
+
+    # the nonce is served from cache on the next batch
+    res = ENGINE.verify_batch([_approval(2)], allowed_signers=["0x" + "22" * 20], nonces=nonces)
+    assert res[0]["error"] == "unauthorized_signer"
+    assert len(fetched) == 1
+
+
+def test_verify_batch_requires_sequential_nonces_per_account():
+    nonces = NonceCache(lambda contract, accounts: {a: 4 for a in accounts})
+    items = [_approval(5), _approval(4), _approval(5), _approval(7), _approval(6)]
+    res = ENGINE.verify_batch(items, nonces=nonces)
+    assert [r.get("error") for r in res] == ["nonce_gap", None, None, "nonce_gap", None]
+
+    # without a cache the first nonce in the batch anchors the sequence
+    res = ENGINE.verify_batch([_approval(9), _approval(11), _approval(10), _approval(9)])
+    assert [r.get("error") for r in res] == [None, "nonce_gap", None, "duplicate_nonce"]
+
+
+def test_prepare_mint_batch_verifies_admin_signatures():
+    from agents.mint_approval import prepare_mint_batch
+
+    cards = []
+    for i in range(3):
+        card = {"card_id": f"c{i}", "manifest_cid": f"bafy{i}", "recipient": "0x" + "33" * 20,
+                "nonce": i, "deadline": 2_000_000_000}
+        msg = {"to": card["recipient"], "tokenId": 0, "amount": 1, "metadataURI": f"ipfs://bafy{i}",
+               "nonce": i, "deadline": card["deadline"]}
+        card["admin_signature"] = ENGINE.sign(HARDHAT_KEY, "MightyVerseAssets", "MintRequest", msg)
+        cards.append(card)
+    cards[2]["amount"] = 5  # signed amount no longer matches
+    res = prepare_mint_batch(cards, admin_signers=[HARDHAT_ADDR])
+    assert [c["status"] for c in res["cards"]] == ["batched", "batched", "rejected"]
+    assert res["cards"][2]["error"] == "invalid_admin_signature"
+
+
+def test_mint_requests_without_nonce_or_deadline_are_rejected():
+    from agents.mint_approval import prepare_mint, prepare_mint_batch
+
+    cards = [
+        {"card_id": "c0", "manifest_cid": "bafy0", "admin_signature": "0x" + "11" * 65, "nonce": 0},
+        {"card_id": "c1", "manifest_cid": "bafy1", "admin_signature": "0x" + "11" * 65,
+         "nonce": None, "deadline": 2_000_000_000},
+    ]
+    res = prepare_mint_batch(cards, admin_signers=[HARDHAT_ADDR])
+    assert [(c["status"], c["error"], c["reason"]) for c in res["cards"]] == [
+        ("rejected", "invalid_mint_request", "missing deadline"),
+        ("rejected", "invalid_mint_request", "missing nonce"),
+    ]
+    tx = prepare_mint("bafy0", "c0", admin_signature="0x" + "11" * 65, admin_signers=[HARDHAT_ADDR])
+    assert tx == {"error": "invalid_mint_request", "reason": "missing nonce, deadline"}
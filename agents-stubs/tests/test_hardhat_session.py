@@ -0,0 +1,75 @@
+import agents_stubs.utils.hardhat as hh
+
+
+class FakeRpc:
+    def __init__(self):
+        self.code = {}
+        self.calls = []
+
+    def call(self, method, params=None):
+        self.calls.append(method)
+        if method == "eth_chainId":
+            return "0x539"
+        raise AssertionError(method)
+
+    def batch(self, calls):
+        self.calls.append("batch")
+        return [self.code.get(params[0], "0x") for _, params in calls]
+
+    def close(self):
+        pass
+
+
+def _session(tmp_path, rpc, deploys):
+    s = hh.HardhatSession(project_dir=str(tmp_path), cache_path=str(tmp_path / "cache.json"), spawn=False)
+    s.rpc = rpc
+
+    def fake_deploy(script):
+        deploys.append(script)
+        addrs = {"MightyVerseAssets": "0x" + "a" * 40, "CreditToken": "0x" + "c" * 40}
+        for addr in addrs.values():
+            rpc.code[addr] = "0x6080"
+        return addrs
+
+    s._deploy = fake_deploy
+    return s
+
+
+def test_session_deploys_once_and_reuses_cache(tmp_path):
+    (tmp_path / "scripts").mkdir()
+    (tmp_path / "scripts" / "deploy.js").write_text("// deploy")
+    rpc, deploys = FakeRpc(), []
+    s = _session(tmp_path, rpc, deploys)
+    assert s.deployed_address() == "0x" + "a" * 40
+    assert s.deployed_address("CreditToken") == "0x" + "c" * 40
+    assert len(deploys) == 1
+    assert rpc.calls.count("eth_chainId") == 1
+
+    # a second session (new process) hits the on-disk cache
+    s2 = _session(tmp_path, rpc, deploys)
+    s2.deployed_addresses()
+    assert len(deploys) == 1
+
+    # a restarted node has no code at the cached address -> one redeploy
+    rpc.code.clear()
+    s2.deployed_addresses()
+    assert len(deploys) == 2
+
+
+def test_parse_deployed_addresses():
+    out = "Deploying contracts with account: 0x" + "1" * 40 + "\nCreditToken deployed to: 0x" + "2" * 40
+    assert hh.parse_deployed_addresses(out) == {"CreditToken": "0x" + "2" * 40}
+
+
+def test_prepare_mint_uses_shared_session(monkeypatch):
+    from agents.mint_approval import prepare_mint
+
+    class FakeSession:
+        def deployed_addresses(self):
+            return {"MightyVerseAssets": "0x" + "a" * 40}
+
+    monkeypatch.setenv("USE_HARDHAT", "1")
+    monkeypatch.setattr(hh, "get_session", lambda: FakeSession())
+    tx = prepare_mint("bafy:manifest", "card1")
+    assert tx["status"] == "deployed"
+    assert tx["deployed_address"] == "0x" + "a" * 40
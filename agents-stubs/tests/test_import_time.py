@@ -0,0 +1,85 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+WORKSPACE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# generous ceilings (milliseconds) so slow CI passes; before lazy imports
+# `agents.cli` alone took ~100-150ms because `agents_stubs` pulled in requests
+CLI_BUDGET_MS = 200
+SERVICE_OWN_BUDGET_MS = 150
+
+
+def _import_profile(module):
+    """Import `module` in a fresh interpreter; return ({name: (self_ms, cumulative_ms)}, sys.modules)."""
+    code = f"import sys, {module}; print('\\n'.join(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=WORKSPACE_ROOT, capture_output=True, text=True, timeout=60
+    )
+    assert proc.returncode == 0, proc.stderr
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "self [us]" not in line:
+            self_us, cum_us, name = line[len("import time:"):].split("|")
+            times[name.strip()] = (int(self_us) / 1000.0, int(cum_us) / 1000.0)
+    return times, set(proc.stdout.split())
+
+
+def test_package_import_is_lazy():
+    _, modules = _import_profile("agents_stubs")
+    assert not [m for m in modules if m.startswith("agents_stubs.")]
+    assert "requests" not in modules
+
+
+def test_cli_cold_start_budget():
+    times, modules = _import_profile("agents.cli")
+    assert not {"requests", "fastapi", "agents_stubs.agents.asset_review"} & modules
+    assert times["agents.cli"][1] < CLI_BUDGET_MS
+
+
+def test_service_imports_each_module_once():
+    times, modules = _import_profile("agents_stubs.service.app")
+    assert "requests" not in modules
+    assert not [m for m in modules if m.startswith(("_agents_", "mighty."))]
+    own = sum(t[0] for name, t in times.items() if name.startswith(("agents_stubs", "agents")))
+    assert own < SERVICE_OWN_BUDGET_MS
+
+
+def test_agents_alias_shares_module_state():
+    import agents.asset_review
+    import agents.integrations
+    import agents_stubs.agents.asset_review
+    import agents_stubs.agents.integrations
+
+    assert agents.asset_review is agents_stubs.agents.asset_review
+    assert agents.integrations is agents_stubs.agents.integrations
+    assert agents.asset_review.integrations is agents.integrations
+
+
+def test_service_imports_from_inside_agents_stubs():
+    """As the Dockerfile and `make dev` run it: `uvicorn service.app:app` with only agents-stubs/ on sys.path."""
+    code = (
+        "import sys; sys.path[:] = [p for p in sys.path if p not in ('', {root!r})]; sys.path.insert(0, '.'); "
+        "import service.app, agents.asset_review, agents_stubs.agents.asset_review, agents_stubs.service.jobs; "
+        "assert agents_stubs.agents.asset_review is agents.asset_review; "
+        "assert sys.modules['agents_stubs.service.jobs'] is sys.modules['service.jobs']; "
+        "print(service.app.app.title)"
+    ).format(root=WORKSPACE_ROOT)
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONPATH"}
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=os.path.join(WORKSPACE_ROOT, "agents-stubs"), env=env, capture_output=True, text=True, timeout=60
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == "MightyVerse Agent Stubs"
+
+
+def test_a_broken_optional_module_is_not_mistaken_for_a_missing_package(monkeypatch):
+    monkeypatch.setitem(sys.modules, "agents_stubs.utils.tracing", None)
+    path = os.path.join(WORKSPACE_ROOT, "agents-stubs", "agents", "integrations.py")
+    spec = importlib.util.spec_from_file_location("mighty.integrations_check", path)
+    with pytest.raises(ModuleNotFoundError) as e:
+        spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    assert e.value.name == "agents_stubs.utils.tracing"
@@ -0,0 +1,136 @@
+from agents_stubs.utils.indexer import APPROVAL_EVENTS, CREDIT_EVENTS, TRANSFER_TOPIC, EventIndexer
+
+REGISTRY = "0x" + "aa" * 20
+TOKEN = "0x" + "cc" * 20
+ALICE = "0x" + "01" * 20
+ZERO = "0x" + "00" * 20
+TOPICS = {kind: topic for topic, kind in {**APPROVAL_EVENTS, **CREDIT_EVENTS}.items()}
+
+
+def _pad(value):
+    if isinstance(value, str):
+        return "0x" + value[2:].rjust(64, "0")
+    return "0x" + format(value, "064x")
+
+
+def _words(*values):
+    return "0x" + "".join(_pad(v)[2:] for v in values)
+
+
+class FakeChain:
+    def __init__(self):
+        self.head = 0
+        self.fork = "a"
+        self.logs = []
+
+    def block_hash(self, n):
+        return _pad(n)[:-2] + ("0a" if self.fork == "a" or n < 3 else "0b")
+
+    def add(self, block, address, topics, data="0x"):
+        self.head = max(self.head, block)
+        self.logs.append({
+            "blockNumber": hex(block), "blockHash": self.block_hash(block), "logIndex": hex(len(self.logs)),
+            "transactionHash": _pad(1000 + len(self.logs)), "address": address, "topics": topics, "data": data,
+        })
+
+    def call(self, method, params=None):
+        if method == "eth_blockNumber":
+            return hex(self.head)
+        if method == "eth_getBlockByNumber":
+            n = int(params[0], 16)
+            return {"hash": self.block_hash(n)} if n <= self.head else None
+        if method == "eth_getLogs":
+            lo, hi = int(params[0]["fromBlock"], 16), int(params[0]["toBlock"], 16)
+            return [dict(l, blockHash=self.block_hash(int(l["blockNumber"], 16)))
+                    for l in self.logs if lo <= int(l["blockNumber"], 16) <= hi]
+        if method == "eth_call":
+            return _words(1, 2, 2, 0, 2_000_000_000, ALICE)
+        raise AssertionError(method)
+
+    def batch(self, calls):
+        return [self.call(m, p) for m, p in calls]
+
+
+def _index(tmp_path, chain):
+    return EventIndexer(chain, str(tmp_path / "index.db"), {"ApprovalRegistry": REGISTRY, "CreditToken": TOKEN}, batch_size=2)
+
+
+def test_indexer_tracks_approvals_and_balances(tmp_path):
+    chain = FakeChain()
+    op1, op2 = _pad(0x11), _pad(0x22)
+    chain.add(1, REGISTRY, [TOPICS["requested"], op1, _pad(ALICE)], _words(1))
+    chain.add(1, REGISTRY, [TOPICS["requested"], op2, _pad(ALICE)], _words(1))
+    chain.add(2, REGISTRY, [TOPICS["granted"], op1, _pad(ALICE)])
+    chain.add(2, REGISTRY, [TOPICS["completed"], op1], _words(1))
+    chain.add(3, TOKEN, [TRANSFER_TOPIC, _pad(ZERO), _pad(ALICE)], _words(10 ** 22))
+    chain.add(4, TOKEN, [TRANSFER_TOPIC, _pad(ALICE), _pad(ZERO)], _words(5))
+    chain.add(4, TOKEN, [TOPICS["deducted"], _pad(ALICE)], _words(5, 64, 10) + "6d696e745f6173736574".ljust(64, "0"))
+    idx = _index(tmp_path, chain)
+    assert idx.sync()["logs"] == 7
+
+    assert idx.is_approved([op1, op2]) == {op1: True, op2: False}
+    assert idx.approval_status([op1])[op1]["expires_at"] == 2_000_000_000
+    assert idx.balances([ALICE]) == {ALICE: 10 ** 22 - 5}
+    deductions = idx.deductions_by_tx([chain.logs[6]["transactionHash"]])
+    assert list(deductions.values())[0][0]["operation"] == "mint_asset"
+
+    # nothing new -> no work
+    assert idx.sync()["logs"] == 0
+
+
+def test_indexer_rolls_back_reorged_blocks(tmp_path):
+    chain = FakeChain()
+    op = _pad(0x33)
+    chain.add(1, REGISTRY, [TOPICS["requested"], op, _pad(ALICE)], _words(1))
+    chain.add(3, REGISTRY, [TOPICS["completed"], op], _words(1))
+    chain.add(4, TOKEN, [TRANSFER_TOPIC, _pad(ZERO), _pad(ALICE)], _words(7))
+    idx = _index(tmp_path, chain)
+    idx.sync()
+    assert idx.is_approved([op])[op] is True
+
+    # blocks >= 3 are replaced by a fork without those events
+    chain.fork = "b"
+    chain.logs = chain.logs[:1]
+    res = idx.sync()
+    assert res["rolled_back"] >= 2
+    assert idx.is_approved([op])[op] is False
+    assert idx.balances([ALICE])[ALICE] == 0
+
+
+def test_indexer_applies_transfer_deltas_without_replaying_history(tmp_path):
+    bob = "0x" + "02" * 20
+    chain = FakeChain()
+    chain.add(1, TOKEN, [TRANSFER_TOPIC, _pad(ZERO), _pad(ALICE)], _words(100))
+    idx = _index(tmp_path, chain)
+    idx.sync()
+    chain.add(3, TOKEN, [TRANSFER_TOPIC, _pad(ALICE), _pad(bob)], _words(30))
+    chain.add(4, TOKEN, [TRANSFER_TOPIC, _pad(bob), _pad(ZERO)], _words(10))
+    statements = []
+    idx.db.set_trace_callback(statements.append)
+    idx.sync()
+    idx.db.set_trace_callback(None)
+    assert idx.balances([ALICE, bob]) == {ALICE: 70, bob: 20}
+    assert not [q for q in statements if "FROM transfers" in q and "log_index" not in q]
+
+    # re-ingesting an already indexed range does not count its transfers twice
+    idx._ingest(chain.logs[1:], chain.head, chain.block_hash(chain.head))
+    assert idx.balances([ALICE, bob]) == {ALICE: 70, bob: 20}
+
+
+def test_prepare_mint_batch_checks_registry_approvals(tmp_path):
+    from agents.mint_approval import prepare_mint_batch
+
+    chain = FakeChain()
+    op = _pad(0x44)
+    chain.add(1, REGISTRY, [TOPICS["requested"], op, _pad(ALICE)], _words(1))
+    chain.add(1, REGISTRY, [TOPICS["completed"], op], _words(1))
+    idx = _index(tmp_path, chain)
+    idx.sync()
+    cards = [
+        {"card_id": "ok", "manifest_cid": "bafy1", "approval_hash": op},
+        {"card_id": "nope", "manifest_cid": "bafy2", "approval_hash": _pad(0x55)},
+    ]
+    res = prepare_mint_batch(cards, approval_index=idx)
+    assert [c["status"] for c in res["cards"]] == ["batched", "rejected"]
+    assert res["cards"][1]["error"] == "approval_not_granted"
+    assert res["batches"][0]["approval_path"] == "registry"
@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agents_stubs.service.app import app
+from agents_stubs.service.jobs import JobManager, JobQueueFull
+
+client = TestClient(app)
+
+
+def _wait(job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        body = client.get(f"/jobs/{job_id}").json()
+        if body["status"] in ("succeeded", "failed"):
+            return body
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_asset_review_job_poll_and_events():
+    r = client.post("/jobs/asset-review", json={"asset_cid": "bafy_job", "manifest": {"card_id": "c1"}})
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+    assert r.headers["location"] == f"/jobs/{job_id}"
+    body = _wait(job_id)
+    assert body["status"] == "succeeded"
+    assert body["result"]["metadata_suggestion"]["card_id"] == "c1"
+
+    with client.stream("GET", f"/jobs/{job_id}/events") as stream:
+        text = "".join(stream.iter_text())
+    events = [json.loads(line[6:]) for line in text.splitlines() if line.startswith("data: ")]
+    stages = [(e["stage"], e["status"]) for e in events[:-1]]
+    assert stages[0] == ("queued", "ok")
+    assert ("depth", "skipped") in stages and ("qc", "done") in stages
+    assert "event: done" in text and events[-1]["status"] == "succeeded"
+
+
+def test_metadata_and_mint_jobs():
+    r = client.post("/jobs/metadata-gen", json={"metadata_suggestion": {"card_id": "card_job", "project": "P"}})
+    assert _wait(r.json()["job_id"])["result"]["sha256"]
+    r = client.post("/jobs/mint-approval", json={"manifest_cid": "cid", "card_id": "card_job"})
+    assert _wait(r.json()["job_id"])["result"]["status"] == "prepared"
+    assert client.get("/jobs/nope").status_code == 404
+
+
+def test_job_manager_bounds_queue_and_records_failures():
+    manager = JobManager(workers=1, max_pending=2)
+    gate = threading.Event()
+
+    def slow(progress=None):
+        gate.wait(5)
+        return "ok"
+
+    def boom(progress=None):
+        raise ValueError("bad input")
+
+    first = manager.submit("slow", slow)
+    failing = manager.submit("boom", boom)
+    with pytest.raises(JobQueueFull):
+        manager.submit("slow", slow)
+    gate.set()
+    manager.shutdown()
+    assert first.status == "succeeded" and first.result == "ok"
+    assert failing.status == "failed" and failing.error == "bad input"
+    assert manager.stats()["pending"] == 0
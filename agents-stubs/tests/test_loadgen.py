@@ -0,0 +1,44 @@
+import pytest
+
+from agents_stubs.benchmarks import loadgen
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+
+def test_mix_and_percentiles():
+    assert loadgen.parse_mix("asset-review=1, mint-approval=3,metadata-gen=0") == {"asset-review": 1.0, "mint-approval": 3.0}
+    for bad in ("bogus=1", "asset-review=x", "mint-approval=0"):
+        with pytest.raises(ValueError):
+            loadgen.parse_mix(bad)
+    p = loadgen.percentiles([n / 1000 for n in range(1, 101)])
+    assert (p["p50_ms"], p["p95_ms"], p["p99_ms"], p["max_ms"]) == (50.0, 95.0, 99.0, 100.0)
+
+
+def test_closed_loop_in_process_reports_every_endpoint():
+    report = loadgen.run_load(concurrency=4, requests=60)
+    assert report["requests"] == 60 and report["ok"] == 60 and report["error_rate"] == 0.0
+    assert set(report["endpoints"]) == {"asset-review", "metadata-gen", "mint-approval"}
+    assert sum(e["requests"] for e in report["endpoints"].values()) == 60
+    assert 0 < report["p50_ms"] <= report["p95_ms"] <= report["p99_ms"] <= report["max_ms"]
+    assert report["config"]["mode"] == "closed" and report["throughput_per_s"] > 0
+
+
+def test_open_loop_keeps_the_arrival_rate():
+    report = loadgen.run_load(rate=200, duration=0.5, mix={"mint-approval": 1}, arrivals="constant")
+    assert 90 <= report["requests"] <= 101
+    assert report["config"]["mode"] == "open" and set(report["endpoints"]) == {"mint-approval"}
+
+
+def test_unreachable_target_counts_errors():
+    report = loadgen.run_load(target="http://127.0.0.1:9", requests=5, concurrency=1)
+    assert report["errors"] == 5 and report["statuses"] == {"error": 5} and report["p50_ms"] is None
+
+
+def test_saturation_is_where_throughput_stops_growing():
+    def point(c, tput, err=0.0):
+        return {"config": {"concurrency": c}, "throughput_per_s": tput, "error_rate": err}
+
+    assert loadgen.find_saturation([point(1, 100), point(2, 190), point(4, 200), point(8, 195)]) == 2
+    assert loadgen.find_saturation([point(1, 100), point(2, 190), point(4, 300, err=0.2)]) == 2
+    assert loadgen.find_saturation([point(1, 100), point(2, 190)]) is None
@@ -0,0 +1,63 @@
+import re
+
+from fastapi.testclient import TestClient
+
+import agents_stubs.utils.pinning as pinmod
+from agents_stubs.service.app import app
+from agents_stubs.utils.metrics import REGISTRY, Registry
+
+
+def _sample(text, name, **labels):
+    for line in text.splitlines():
+        if line.startswith(name + "{") or line.startswith(name + " "):
+            if all(f'{k}="{v}"' in line for k, v in labels.items()):
+                return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_registry_renders_prometheus_text():
+    reg = Registry()
+    reg.counter("c_total", "a counter", ("k",)).labels(k="x").inc(2)
+    reg.histogram("h_seconds", "a histogram", ("k",), buckets=(0.1, 1)).labels(k="x").observe(0.5)
+    reg.gauge_callback("g", lambda: None)
+    text = reg.render()
+    assert "# TYPE c_total counter" in text and 'c_total{k="x"} 2' in text
+    assert 'h_seconds_bucket{k="x",le="0.1"} 0' in text
+    assert 'h_seconds_bucket{k="x",le="+Inf"} 1' in text
+    assert "g NaN" in text
+
+
+def test_metrics_endpoint_reports_requests_integrations_and_caches():
+    client = TestClient(app)
+    client.post("/asset-review", json={"asset_cid": "bafy_m", "manifest": {"card_id": "m1"}})
+    client.post("/metadata-gen", json={"metadata_suggestion": {"card_id": "m2"}})
+    client.post("/metadata-gen", json={"metadata_suggestion": {"card_id": "m2"}})
+    client.get("/jobs/does-not-exist")
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert _sample(text, "mighty_http_requests_total", route="/metadata-gen", status="200") >= 2
+    assert _sample(text, "mighty_http_requests_total", route="/jobs/{job_id}", status="404") >= 1
+    assert _sample(text, "mighty_http_request_duration_seconds_count", route="/asset-review") >= 1
+    assert _sample(text, "mighty_response_cache_hit_ratio") > 0
+    assert re.search(r"mighty_asset_review_batch_size_count \d+", text)
+
+
+def test_pin_attempts_and_retries_are_recorded(monkeypatch, tmp_path):
+    calls = {"n": 0}
+
+    class Resp:
+        def raise_for_status(self):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise RuntimeError("503")
+
+        def json(self):
+            return {"value": {"cid": "bafyretry"}}
+
+    fake_requests = type("R", (), {"post": staticmethod(lambda *a, **k: Resp())})()
+    monkeypatch.setitem(pinmod.pin_json_with_retries.__globals__, "requests", fake_requests)
+    assert pinmod.pin_json_with_retries({"a": 1}, "KEY", attempts=2, backoff=0) == "bafyretry"
+    text = REGISTRY.render()
+    assert _sample(text, "mighty_pin_attempt_duration_seconds_count", kind="json", attempt="1", outcome="error") >= 1
+    assert _sample(text, "mighty_pin_retries_total", kind="json", outcome="ok") >= 1
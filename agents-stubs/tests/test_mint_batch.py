@@ -0,0 +1,57 @@
+from agents.mint_approval import prepare_mint_batch
+
+
+def _card(i, **kw):
+    card = {"manifest_cid": f"bafy_manifest_{i}", "card_id": f"card{i}"}
+    card.update(kw)
+    return card
+
+
+def test_prepare_mint_batch_groups_by_recipient_and_path():
+    cards = [_card(i, recipient="0xA") for i in range(5)]
+    cards += [_card(i, recipient="0xB") for i in range(5, 8)]
+    cards += [_card(8, recipient="0xA", admin_signature="0xsig", nonce=0, deadline=2_000_000_000)]
+    res = prepare_mint_batch(cards)
+    assert res["summary"]["transactions"] == 3
+    assert res["summary"]["batched"] == 9
+    keys = {(b["recipient"], b["approval_path"]) for b in res["batches"]}
+    assert keys == {("0xA", "open"), ("0xB", "open"), ("0xA", "signature")}
+    for batch in res["batches"]:
+        if batch["method"] == "batchMint":
+            assert len(batch["args"]["recipients"]) == len(batch["cards"])
+
+
+def test_prepare_mint_batch_respects_size_limit_and_reports_status():
+    cards = [_card(i) for i in range(7)]
+    cards.append(_card(99, credits_required=3))
+    cards.append(_card(0))
+    res = prepare_mint_batch(cards, max_batch_size=3)
+    assert [len(b["cards"]) for b in res["batches"]] == [3, 3, 1]
+    statuses = res["cards"]
+    assert statuses[0]["status"] == "batched" and statuses[0]["index"] == 0
+    assert statuses[7] == {"card_id": "card99", "status": "rejected", "error": "insufficient_credits_or_missing_signature"}
+    assert statuses[8]["error"] == "duplicate_card_id"
+
+
+def test_signed_cards_mint_with_signature_not_batch_mint():
+    cards = [_card(i, recipient="0xA", admin_signature=f"0xsig{i}", nonce=i, deadline=2_000_000_000)
+             for i in range(3)]
+    cards.append(_card(3, recipient="0xA", admin_signature="0xsig3"))
+    res = prepare_mint_batch(cards)
+    assert [b["method"] for b in res["batches"]] == ["mintWithSignature"] * 3
+    assert res["batches"][1]["args"] == {
+        "request": {"to": "0xA", "tokenId": 0, "amount": 1, "metadataURI": "ipfs://bafy_manifest_1",
+                    "nonce": 1, "deadline": 2_000_000_000},
+        "signature": "0xsig1",
+    }
+    assert res["cards"][3]["error"] == "invalid_mint_request"
+    # batchMint is MINTER_ROLE-only and checks no signature: it carries only minter-approved cards
+    res = prepare_mint_batch([_card(4), _card(5, approval_hash="0x" + "ab" * 32)])
+    assert {b["approval_path"] for b in res["batches"] if b["method"] == "batchMint"} == {"open", "registry"}
+
+
+def test_prepare_mint_batch_rejects_non_positive_amounts():
+    cards = [_card(0, amount=0), _card(1, amount=-2), _card(2, amount="x"), _card(3, amount=2)]
+    res = prepare_mint_batch(cards)
+    assert [c.get("error") for c in res["cards"]] == ["invalid_amount"] * 3 + [None]
+    assert res["batches"][0]["args"]["amounts"] == [2]
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from agents_stubs.agents import integrations, onnx_backend
+from agents_stubs.benchmarks import bench
+
+
+def test_backend_is_selected_per_integration(monkeypatch):
+    monkeypatch.delenv("MIGHTY_BACKEND_DEPTH", raising=False)
+    monkeypatch.setenv("MIGHTY_QUANTIZE", "midas")
+    assert onnx_backend.backend("depth") == "torch" and integrations._quantized("midas")
+    monkeypatch.setenv("MIGHTY_BACKEND_DEPTH", "ONNX")
+    assert onnx_backend.backend("depth") == "onnx"
+    assert not integrations._quantized("midas")  # the exported graph is fp32
+    monkeypatch.setattr(integrations, "_MODELS", {"midas:DPT_Large": 1, "midas:MiDaS_small:onnx": 2, "midas:DPT_Hybrid:int8": 3})
+    assert integrations._loaded_midas() == ["MiDaS_small"]
+    monkeypatch.setenv("MIGHTY_BACKEND_DEPTH", "tensorrt")
+    with pytest.raises(ValueError):
+        onnx_backend.backend("depth")
+
+
+def test_exported_graphs_are_checked_and_cached(monkeypatch, tmp_path, tiny_depth, cache_round_trip):
+    import torch
+
+    pytest.importorskip("onnxruntime")
+    monkeypatch.setenv("MIGHTY_ONNX_CACHE", str(tmp_path))
+    monkeypatch.setenv("MIGHTY_ORT_INTRA_OP_THREADS", "1")
+    path = onnx_backend.cache_path("tiny")
+    _, second = cache_round_trip(lambda build: onnx_backend.load_onnx("tiny", build, (1, 3, 32, 32)), lambda: path)
+    assert second.path == path
+    x = torch.randn(3, 3, 48, 80)  # batch and size differ from the export example
+    with torch.no_grad():
+        assert torch.allclose(second(x), tiny_depth()(x), atol=1e-4)
+
+    class Baked(torch.nn.Module):
+        def forward(self, x):
+            return x.mean(1) * float(x.shape[2])  # a python float: traced as a constant
+
+    with pytest.raises(RuntimeError, match="differs from torch"):
+        onnx_backend.load_onnx("baked", Baked, (1, 3, 32, 32))
+    assert not os.path.exists(onnx_backend.cache_path("baked")) and sorted(os.listdir(tmp_path)) == [os.path.basename(path)]
+
+
+def test_integrations_run_depth_through_onnx(monkeypatch, tmp_path, tiny_midas):
+    import torch
+
+    pytest.importorskip("onnxruntime")
+    monkeypatch.setenv("MIGHTY_ONNX_CACHE", str(tmp_path))
+    monkeypatch.setenv("MIGHTY_BACKEND_DEPTH", "onnx")
+    model = integrations._midas("MiDaS_small")
+    assert isinstance(model, onnx_backend.OnnxModel) and integrations._loaded_midas() == ["MiDaS_small"]
+    assert set(integrations._MODELS) == {"midas:MiDaS_small:onnx"}
+
+    # an export that cannot run falls back to the torch model rather than losing depth
+    def broken(key, build, shape):
+        raise RuntimeError("exported graph differs from torch")
+
+    monkeypatch.setattr(integrations, "_MODELS", {})
+    monkeypatch.setattr(onnx_backend, "load_onnx", broken)
+    assert isinstance(integrations._midas("MiDaS_small"), torch.nn.Module)
+
+
+def test_backend_benchmarks_skip_without_their_dependencies(monkeypatch, tmp_path):
+    import sys
+
+    monkeypatch.setitem(sys.modules, "onnxruntime", None)
+    doc = bench.run(["backend.depth.onnx"], quick=True, corpus_dir=str(tmp_path), cards=2)
+    assert "not installed" in doc["results"]["backend.depth.onnx"]["skipped"]
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from agents_stubs.agents import pipeline
+
+
+def _sleeper(key, seconds, fail_on=None):
+    def fn(item):
+        if item["index"] == fail_on:
+            raise ValueError("boom")
+        time.sleep(seconds)
+        item[key] = True
+
+    return fn
+
+
+def test_stages_overlap_and_the_bottleneck_is_reported():
+    p = pipeline.Pipeline([
+        pipeline.Stage("review", _sleeper("reviewed", 0.05), workers=2),
+        pipeline.Stage("pin", _sleeper("pinned", 0.05), workers=4),
+    ])
+    start = time.perf_counter()
+    results = list(p.run({"card": n} for n in range(8)))
+    elapsed = time.perf_counter() - start
+    assert sorted(r["index"] for r in results) == list(range(8))
+    assert all(r["reviewed"] and r["pinned"] for r in results)
+    assert elapsed < 0.6  # one card at a time would take 8 x 0.1s
+    stats = p.stats()
+    assert stats["bottleneck"] == "review" and stats["items"] == 8
+    assert stats["stages"]["pin"]["processed"] == 8 and stats["stages"]["review"]["utilization"] > 0.5
+
+
+def test_failed_items_skip_later_stages():
+    seen = []
+    p = pipeline.Pipeline([
+        pipeline.Stage("review", _sleeper("reviewed", 0, fail_on=2)),
+        pipeline.Stage("mint", lambda item: seen.append(item["index"])),
+    ])
+    results = {r["index"]: r for r in p.run({} for _ in range(4))}
+    assert results[2]["error"]["stage"] == "review" and "boom" in results[2]["error"]["error"]
+    assert sorted(seen) == [0, 1, 3]
+    assert p.stats()["stages"]["review"]["errors"] == 1
+
+
+def test_queues_stay_bounded_under_a_slow_stage():
+    fed = []
+
+    def items():
+        for n in range(40):
+            fed.append(n)
+            yield {}
+
+    p = pipeline.Pipeline([
+        pipeline.Stage("fast", lambda item: None, workers=1, queue_size=2),
+        pipeline.Stage("slow", _sleeper("done", 0.01), workers=1, queue_size=3),
+    ], sample_interval=0.002)
+    gen = p.run(items())
+    next(gen)
+    time.sleep(0.05)
+    # at most: both queues full, one item in each worker, one blocked in the feeder, the output queue
+    assert len(fed) <= 2 + 3 + 2 + 1 + 3 + 1
+    list(gen)
+    stages = p.stats()["stages"]
+    assert stages["slow"]["queue"]["max"] <= 3 and stages["slow"]["queue"]["mean"] > 0
+
+
+def test_closing_early_stops_every_worker():
+    p = pipeline.Pipeline([pipeline.Stage("a", _sleeper("a", 0.001), workers=3, queue_size=1)])
+    before = threading.active_count()
+    gen = p.run({} for _ in range(1000))
+    next(gen)
+    gen.close()
+    assert threading.active_count() <= before
+    with pytest.raises(ValueError):
+        pipeline.parse_workers("review=2,bogus=1")
+
+
+def test_card_pipeline_runs_review_metadata_pin_and_mint(monkeypatch):
+    monkeypatch.delenv("NFT_STORAGE_KEY", raising=False)
+    p = pipeline.card_pipeline({"review": 2})
+    results = list(p.run({"asset_cid": f"bafy_{n}", "manifest": {"card_id": f"card-{n}"}} for n in range(3)))
+    assert len(results) == 3 and not [r for r in results if "error" in r]
+    r = min(results, key=lambda r: r["index"])
+    assert r["metadata"]["card_id"] == "card-0" and r["manifest_cid"] is None
+    assert r["mint"]["manifest_cid"] == f"sha256:{r['metadata']['sha256']}"
+    assert set(p.stats()["stages"]) == {"review", "metadata", "pin", "mint"}
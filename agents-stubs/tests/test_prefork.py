@@ -0,0 +1,70 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from fastapi.testclient import TestClient
+
+from agents import integrations
+from agents_stubs.service import readiness
+from agents_stubs.service.app import app
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def test_ready_reflects_warm_state():
+    readiness.mark_not_ready()
+    assert TestClient(app).get("/ready").status_code == 503
+    with TestClient(app) as client:
+        r = client.get("/ready")
+        assert r.status_code == 200 and r.json()["status"] == "ready"
+    assert client.get("/health").json()["status"] == "ok"
+
+
+def test_warm_reports_unavailable_models():
+    status = integrations.warm(["whisper", "nope"])
+    assert status["nope"] == "unavailable: unknown model"
+    assert status["whisper"] == "loaded" or status["whisper"].startswith("unavailable")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(port, path):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as r:
+        return json.loads(r.read())
+
+
+def test_prefork_serves_and_recycles_workers():
+    port = _free_port()
+    code = f"from agents_stubs.service.prefork import serve; serve('127.0.0.1', {port}, workers=2, max_requests=2)"
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                body = _get(port, "/ready")
+                break
+            except Exception:
+                assert time.time() < deadline and proc.poll() is None
+                time.sleep(0.2)
+        assert body["status"] == "ready" and "whisper" in body["warm"]
+        pids = set()
+        deadline = time.time() + 20
+        while len(pids) <= 2 and time.time() < deadline:
+            try:
+                pids.add(_get(port, "/ready")["pid"])
+            except Exception:
+                time.sleep(0.1)
+        assert proc.pid not in pids
+        assert len(pids) > 2  # workers were recycled after max_requests
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=30) == 0
@@ -0,0 +1,79 @@
+import pstats
+import threading
+
+from fastapi.testclient import TestClient
+
+from agents_stubs.service.app import app
+from agents_stubs.utils import profiling
+
+
+def _busy(seconds=0.05):
+    import time
+
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += sum(range(200))
+    return n
+
+
+def test_profile_writes_cpu_sample_and_memory_files(tmp_path):
+    with profiling.Profile("unit test", ("cpu", "sample", "mem"), out_dir=str(tmp_path)) as prof:
+        _busy()
+        blob = [bytearray(1024) for _ in range(100)]
+    assert set(prof.files) == {"cpu", "sample", "mem", "mem_top"}
+    assert prof.files["cpu"].startswith(str(tmp_path / "unit_test-"))
+    assert any("_busy" in func[2] for func in pstats.Stats(prof.files["cpu"]).stats)
+    folded = (tmp_path / prof.files["sample"].rsplit("/", 1)[1]).read_text().splitlines()
+    assert folded and all(line.rsplit(" ", 1)[1].isdigit() for line in folded)
+    assert any("test_profiling.py:_busy" in line for line in folded)
+    assert "test_profiling.py" in open(prof.files["mem_top"]).read()
+    assert len(blob) == 100
+
+
+def test_maybe_is_a_noop_without_modes_and_skips_overlapping_profiles(tmp_path, monkeypatch):
+    monkeypatch.delenv("MIGHTY_PROFILE", raising=False)
+    monkeypatch.setenv("MIGHTY_PROFILE_DIR", str(tmp_path))
+    with profiling.maybe("off") as prof:
+        assert prof is None
+    inside = threading.Event()
+    release = threading.Event()
+    seen = {}
+
+    def hold():
+        with profiling.maybe("first", ("cpu",)) as p:
+            seen["first"] = p
+            inside.set()
+            release.wait(5)
+
+    t = threading.Thread(target=hold)
+    t.start()
+    inside.wait(5)
+    with profiling.maybe("second", ("cpu",)) as p:
+        seen["second"] = p
+    release.set()
+    t.join()
+    assert seen["first"] is not None and seen["second"] is None
+    assert profiling.parse_modes("CPU, mem,bogus") == ("cpu", "mem") and profiling.parse_modes("all") == profiling.MODES
+
+
+def test_profile_header_is_honored_only_when_enabled(tmp_path, monkeypatch):
+    monkeypatch.setenv("MIGHTY_PROFILE_DIR", str(tmp_path))
+    client = TestClient(app)
+    body = {"manifest_cid": "bafy", "card_id": "p1", "credits_required": 1}
+    client.post("/mint-approval", json=body, headers={"X-Mighty-Profile": "cpu"})
+    assert list(tmp_path.iterdir()) == []
+    monkeypatch.setenv("MIGHTY_PROFILE_HEADER", "1")
+    assert client.post("/mint-approval", json=body, headers={"X-Mighty-Profile": "cpu"}).status_code == 200
+    assert [p.name.split("-")[:2] for p in tmp_path.iterdir()] == [["mint", "approval"]]
+
+
+def test_integration_memory_deltas_are_exported(tmp_path):
+    image = tmp_path / "card.png"
+    image.write_bytes(b"not really a png")
+    client = TestClient(app)
+    client.post("/asset-review", json={"asset_cid": "bafy_p", "manifest": {"card_id": "p2", "asset_path": str(image)}})
+    text = client.get("/metrics").text
+    assert 'mighty_integration_peak_rss_delta_bytes_count{integration="depth"' in text
+    assert 'mighty_integration_rss_delta_bytes_bucket{integration="clip"' in text
+    assert "mighty_process_peak_rss_bytes " in text
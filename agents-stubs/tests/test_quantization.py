@@ -0,0 +1,62 @@
+import pytest
+
+from agents_stubs.agents import depth_scheduler as ds
+from agents_stubs.agents import integrations, quantization
+from agents_stubs.benchmarks import quant_report
+
+
+def test_enabled_parses_the_model_list(monkeypatch):
+    monkeypatch.delenv("MIGHTY_QUANTIZE", raising=False)
+    assert not quantization.enabled("midas")
+    monkeypatch.setenv("MIGHTY_QUANTIZE", "all")
+    assert quantization.enabled("midas") and quantization.enabled("whisper")
+    monkeypatch.setenv("MIGHTY_QUANTIZE", "whisper, other")
+    assert quantization.enabled("whisper") and not quantization.enabled("midas")
+    monkeypatch.setenv("MIGHTY_QUANTIZE", "0")
+    assert not quantization.enabled("whisper")
+
+
+def test_wer_and_int8_plans():
+    assert quant_report.wer("the quick brown fox", "the quick brown fox") == 0.0
+    assert quant_report.wer("the quick brown fox", "the quack brown") == 0.5
+    assert quant_report.wer("", "") == 0.0
+    fp32 = ds.plan_depth((1920, 1080), free_bytes=3 * 1024 ** 3 // 2)
+    int8 = ds.plan_depth((1920, 1080), free_bytes=3 * 1024 ** 3 // 2, quantized=True)
+    # int8 weights fit a larger variant in the same budget
+    assert int8["quantized"] and int8["model"] == "DPT_Large" and fp32["model"] != "DPT_Large"
+
+
+def test_quantized_models_are_cached_on_disk(monkeypatch, tmp_path, tiny_depth, cache_round_trip):
+    import torch
+
+    monkeypatch.setenv("MIGHTY_QUANT_CACHE", str(tmp_path))
+    first, second = cache_round_trip(
+        lambda build: quantization.load_quantized("tiny", build), lambda: quantization.cache_path("tiny")
+    )
+    assert isinstance(first.head, torch.ao.nn.quantized.dynamic.Linear)
+    x = torch.randn(2, 3, 8, 8)
+    with torch.no_grad():
+        assert torch.equal(first(x), second(x))
+        assert torch.allclose(first(x), tiny_depth()(x), atol=0.05)
+
+
+def test_depth_comparison_reports_error_and_speed(tiny_depth):
+    import torch
+
+    pytest.importorskip("numpy")
+    fp32 = tiny_depth()
+    row = quant_report.compare_depth(fp32, quantization.quantize(fp32), [torch.randn(3, 8, 8) for _ in range(3)], runs=2, limit=0.05)
+    assert row["samples"] == 3 and row["fp32_ms"] > 0 and row["int8_ms"] > 0
+    assert 0 <= row["depth_error_max"] < 0.05 and row["within_tolerance"] is True
+
+
+def test_integrations_load_midas_int8_when_enabled(monkeypatch, tmp_path, tiny_midas):
+    import torch
+
+    monkeypatch.setenv("MIGHTY_QUANT_CACHE", str(tmp_path))
+    monkeypatch.setenv("MIGHTY_QUANTIZE", "midas")
+    model = integrations._midas("MiDaS_small")
+    assert isinstance(model.head, torch.ao.nn.quantized.dynamic.Linear)
+    assert set(integrations._MODELS) == {"midas:MiDaS_small:int8"} and integrations._loaded_midas() == ["MiDaS_small"]
+    monkeypatch.setenv("MIGHTY_QUANTIZE", "0")
+    assert integrations._loaded_midas() == []  # the int8 copy does not count as the fp32 model
@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+
+import agents.metadata_gen as mg_mod
+from agents_stubs.service import app as app_mod
+from agents_stubs.service.cache import ResponseCache, request_key
+
+
+def test_lru_respects_byte_budget_and_disk_tier(tmp_path):
+    cache = ResponseCache(max_bytes=10, disk_dir=str(tmp_path))
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    cache.get("a")
+    cache.put("c", b"123")
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+    fresh = ResponseCache(max_bytes=10, disk_dir=str(tmp_path))
+    body, etag = fresh.get("b")
+    assert body == b"12345" and etag.startswith('"')
+    assert fresh.stats()["disk_hits"] == 1
+    assert request_key("x", {"a": 1, "b": 2}) == request_key("x", {"b": 2, "a": 1})
+
+
+def test_metadata_gen_caches_and_honours_etags(monkeypatch):
+    app_mod.get_cache().clear()
+    calls = []
+    real = mg_mod.build_metadata
+
+    def counting(*args):
+        calls.append(args)
+        return real(*args)
+
+    monkeypatch.setattr(app_mod.mg_mod, "build_metadata", counting)
+    client = TestClient(app_mod.app)
+    payload = {"metadata_suggestion": {"card_id": "card_cache", "project": "P"}}
+
+    first = client.post("/metadata-gen", json=payload)
+    etag = first.headers["etag"]
+    second = client.post("/metadata-gen", json=payload)
+    assert second.json() == first.json() and second.headers["etag"] == etag
+    assert len(calls) == 1
+
+    not_modified = client.post("/metadata-gen", json=payload, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    changed = client.post("/metadata-gen", json=payload, headers={"If-None-Match": '"stale"'})
+    assert changed.status_code == 200
+    assert len(calls) == 1
+    assert client.get("/cache/stats").json()["hits"] >= 3
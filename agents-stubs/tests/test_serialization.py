@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agents_stubs.service.app import app
+from agents_stubs.utils import jsonio
+
+client = TestClient(app)
+
+
+def test_dumps_matches_stdlib_and_handles_wide_ints():
+    obj = {"card": "é", "layers": [1, 2.5, None, True], "nested": {"b": 1, "a": [{}]}}
+    assert json.loads(jsonio.dumps(obj)) == obj
+    assert b" " not in jsonio.dumps(obj)
+    assert jsonio.dumps(obj, pretty=True).startswith(b'{\n  "card"')
+    wide = {"wei": 2**80}
+    assert json.loads(jsonio.dumps(wide)) == wide
+
+
+def test_dumps_uses_tolist_for_array_like_values():
+    class Arr:
+        def tolist(self):
+            return [[0.5, 1.0]]
+
+    assert json.loads(jsonio.dumps({"depth": Arr()})) == {"depth": [[0.5, 1.0]]}
+
+
+def test_write_json_compact_and_pretty(tmp_path):
+    obj = {"a": [1, 2]}
+    jsonio.write_json(str(tmp_path / "c.json"), obj, compact=True)
+    jsonio.write_json(str(tmp_path / "p.json"), obj)
+    assert (tmp_path / "c.json").read_text() == '{"a":[1,2]}'
+    assert json.loads((tmp_path / "p.json").read_text()) == obj and "\n" in (tmp_path / "p.json").read_text()
+
+
+def test_negotiate_prefers_json_unless_msgpack_is_asked_for(monkeypatch):
+    monkeypatch.setattr(jsonio, "msgpack", object())
+    assert jsonio.negotiate(None) == jsonio.JSON
+    assert jsonio.negotiate("*/*") == jsonio.JSON
+    assert jsonio.negotiate("application/msgpack") == jsonio.MSGPACK
+    assert jsonio.negotiate("application/json;q=0.5, application/x-msgpack") == jsonio.MSGPACK
+    assert jsonio.negotiate("application/msgpack;q=0, application/json") == jsonio.JSON
+    monkeypatch.setattr(jsonio, "msgpack", None)
+    assert jsonio.negotiate("application/msgpack") == jsonio.JSON
+
+
+def test_review_endpoint_json_is_unchanged():
+    r = client.post("/asset-review", json={"asset_cid": "bafy_s", "manifest": {"card_id": "s1"}})
+    assert r.status_code == 200 and r.headers["content-type"] == "application/json"
+    assert r.headers["vary"] == "Accept"
+    assert r.json()["metadata_suggestion"]["card_id"] == "s1"
+
+
+def test_msgpack_responses_round_trip():
+    pytest.importorskip("msgpack")
+    headers = {"Accept": "application/msgpack"}
+    r = client.post("/asset-review", json={"asset_cid": "bafy_mp", "manifest": {"card_id": "mp1"}}, headers=headers)
+    assert r.headers["content-type"] == jsonio.MSGPACK
+    assert jsonio.unpackb(r.content)["metadata_suggestion"]["card_id"] == "mp1"
+    body = {"metadata_suggestion": {"card_id": "mp2"}}
+    packed = client.post("/metadata-gen", json=body, headers=headers)
+    plain = client.post("/metadata-gen", json=body)
+    assert jsonio.unpackb(packed.content)["card_id"] == plain.json()["card_id"] == "mp2"
+    assert packed.headers["etag"] != plain.headers["etag"]
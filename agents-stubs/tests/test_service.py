@@ -33,3 +33,92 @@ def test_mint_approval_endpoint():
     assert r.status_code == 200
     body = r.json()
     assert body.get("status") == "prepared"
+
+
+def test_mint_approval_batch_endpoint():
+    cards = [{"manifest_cid": f"cid{i}", "card_id": f"card{i}"} for i in range(3)]
+    r = client.post("/mint-approval/batch", json={"cards": cards})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["summary"]["transactions"] == 1
+    assert all(c["status"] == "batched" for c in body["cards"])
+
+
+def test_mint_completion_is_internal_only(monkeypatch):
+    payload = {"result": {"credit_hold_id": 1}, "tx_hash": "0x01", "account": "0x" + "01" * 20}
+    monkeypatch.delenv("MIGHTY_INTERNAL_TOKEN", raising=False)
+    assert client.post("/mint-approval/complete", json=payload).status_code == 404
+    monkeypatch.setenv("MIGHTY_INTERNAL_TOKEN", "s3cret")
+    assert client.post("/mint-approval/complete", json=payload).status_code == 401
+    r = client.post("/mint-approval/complete", json=payload, headers={"Authorization": "Bearer wrong"})
+    assert r.status_code == 401
+
+
+def _endless(consumed):
+    async def items():
+        while True:
+            consumed.append(1)
+            yield {"asset_cid": f"bafy{len(consumed)}"}
+
+    return items()
+
+
+def test_batch_review_run_stops_reading_at_max_items():
+    import asyncio
+    import json
+
+    from agents_stubs.service.batch_review import BatchReviewRun
+
+    async def review(asset_cid, manifest):
+        return {"asset_cid": asset_cid}
+
+    async def run():
+        consumed = []
+        batch = BatchReviewRun(review, concurrency=2, max_items=5)
+        batch.start(_endless(consumed))
+        return [json.loads(line) async for line in batch.lines()], consumed
+
+    lines, consumed = asyncio.run(run())
+    assert len(consumed) == 6 and len(lines) == 6
+    assert sorted(line["index"] for line in lines[:5]) == list(range(5))
+    assert lines[-1] == {"status": "error", "error": "batch_too_large: at most 5 items"}
+
+
+def test_batch_review_run_holds_back_a_fast_sender():
+    import asyncio
+
+    from agents_stubs.service.batch_review import BatchReviewRun
+
+    async def run():
+        release = asyncio.Event()
+
+        async def review(asset_cid, manifest):
+            await release.wait()
+            return {}
+
+        consumed = []
+        batch = BatchReviewRun(review, concurrency=2, max_items=10 ** 6)
+        batch.start(_endless(consumed))
+        await asyncio.sleep(0.05)
+        stalled = len(consumed)
+        release.set()
+        lines = batch.lines()
+        for _ in range(20):
+            await lines.__anext__()
+        await lines.aclose()
+        return stalled, len(consumed)
+
+    stalled, later = asyncio.run(run())
+    # two in review, one held by the dispatcher, two queued and one waiting for queue space
+    assert stalled <= 6
+    assert later <= 20 + 8
+
+
+def test_batch_review_endpoint_rejects_oversized_lists(monkeypatch):
+    monkeypatch.setenv("MIGHTY_BATCH_REVIEW_MAX_ITEMS", "2")
+    r = client.post("/asset-review/batch", json=[{"asset_cid": f"bafy{i}"} for i in range(3)])
+    assert r.status_code == 413
+    body = "\n".join('{"asset_cid": "bafy%d"}' % i for i in range(3))
+    r = client.post("/asset-review/batch", content=body, headers={"content-type": "application/x-ndjson"})
+    lines = r.text.strip().splitlines()
+    assert r.status_code == 200 and len(lines) == 3 and "batch_too_large" in lines[-1]
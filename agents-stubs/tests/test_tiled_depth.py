@@ -0,0 +1,74 @@
+import pytest
+
+from agents_stubs.agents import depth_scheduler as ds
+from agents_stubs.agents import integrations
+
+GiB = 1024 ** 3
+
+
+def test_tile_grid_covers_the_image_with_overlap():
+    boxes = ds.tile_grid(2500, 1000, 1024, 128)
+    assert boxes == [(0, 0, 1024, 1000), (896, 0, 1920, 1000), (1476, 0, 2500, 1000)]
+    assert ds.tile_grid(800, 600, 1024, 128) == [(0, 0, 800, 600)]
+    boxes = ds.tile_grid(7680, 4320, 1024, 128)
+    edges = [0, 1, 1023, 1024, 4319, 7679]
+    for x in list(range(0, 7680, 97)) + edges:
+        for y in list(range(0, 4320, 89)) + [e for e in edges if e < 4320]:
+            assert any(x0 <= x < x1 and y0 <= y < y1 for x0, y0, x1, y1 in boxes)
+    assert all((x1 - x0, y1 - y0) == (1024, 1024) for x0, y0, x1, y1 in boxes)
+
+
+def test_very_large_frames_are_tiled_with_bounded_memory():
+    plan = ds.plan_depth((7680, 4320), free_bytes=16 * GiB)
+    assert (plan["strategy"], plan["output_size"], plan["tile_size"], plan["tiles"]) == ("tiled", [7680, 4320], 1024, 45)
+    # tile memory does not grow with the image: a larger frame costs only its decoded pixels more
+    huge = ds.plan_depth((15360, 8640), free_bytes=16 * GiB)
+    assert huge["estimated_peak_bytes"] - plan["estimated_peak_bytes"] == (15360 * 8640 - 7680 * 4320) * ds.TILED_DECODE_BYTES_PER_PIXEL
+    # a normal frame stays whole unless it does not fit
+    assert ds.plan_depth((1920, 1080), free_bytes=16 * GiB)["strategy"] == "full"
+    tight = ds.plan_depth((3840, 2160), free_bytes=300 * ds.MiB)
+    assert tight["strategy"] == "tiled" and tight["estimated_peak_bytes"] <= tight["memory_budget_bytes"]
+
+
+def test_blend_weights_and_alignment():
+    np = pytest.importorskip("numpy")
+    width, height, overlap = 2500, 1000, 128
+    boxes = ds.tile_grid(width, height, 1024, overlap)
+    total = np.zeros((height, width), dtype=np.float32)
+    blended = np.zeros_like(total)
+    for box in boxes:
+        x0, y0, x1, y1 = box
+        w = integrations._blend_weights(box, width, height, overlap)
+        total[y0:y1, x0:x1] += w
+        blended[y0:y1, x0:x1] += 3.0 * w
+    assert total.min() >= 0.5 and np.allclose(blended / total, 3.0)
+    assert integrations._blend_weights(boxes[0], width, height, overlap)[:, 0].min() == 1.0  # image border: no ramp
+
+    depth = np.linspace(0.0, 1.0, 64).reshape(8, 8)
+    scale, shift = integrations._align(depth, depth * 2.5 + 4.0)
+    assert scale == pytest.approx(2.5) and shift == pytest.approx(4.0)
+    assert integrations._align(np.ones((4, 4)), np.full((4, 4), 3.0)) == (1.0, 2.0)
+
+
+def test_tiled_depth_is_seamless_at_full_resolution(tmp_path):
+    np = pytest.importorskip("numpy")
+    torch = pytest.importorskip("torch")
+    Image = pytest.importorskip("PIL.Image")
+    width, height = 700, 300
+    Image.new("RGB", (width, height), (120, 80, 40)).save(tmp_path / "wide.png")
+
+    def midas(batch):
+        # every call answers a different scale/shift of the same smooth ramp, like MiDaS's relative depth
+        midas.calls += 1
+        b, _, h, w = batch.shape
+        ramp = torch.linspace(0, 1, w).expand(b, h, w)
+        return ramp * midas.calls + 10 * midas.calls
+
+    midas.calls = 0
+    plan = {"model": "MiDaS_small", "strategy": "tiled", "input_size": 64, "tile_size": 256, "tile_overlap": 64, "max_batch": 2}
+    path = integrations._tiled_depth(str(tmp_path / "wide.png"), plan, midas)
+    depth = np.load(path)
+    assert depth.shape == (height, width) and depth.dtype == np.float32
+    assert midas.calls == 1 + -(-len(ds.tile_grid(width, height, 256, 64)) // 2)  # whole-image pass + batches of 2
+    # aligned to the whole-image pass (scale 1, shift 10): no steps at the seams
+    assert np.abs(np.diff(depth, axis=1)).max() < 0.05
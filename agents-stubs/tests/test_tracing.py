@@ -0,0 +1,120 @@
+import json
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+import agents_stubs.utils.pinning as pinmod
+from agents_stubs.service.app import app
+from agents_stubs.utils import tracing
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exp = tracing.InMemoryExporter()
+    monkeypatch.setattr(tracing, "_exporter", exp)
+    monkeypatch.setattr(tracing, "_sample_rate", 1.0)
+    return exp
+
+
+def test_nested_spans_export_together_when_root_ends(exporter):
+    with tracing.span("root", card="a") as root:
+        with tracing.span("child") as child:
+            assert tracing.current_span() is child
+        assert exporter.spans == []
+    assert [s.name for s in exporter.spans] == ["child", "root"]
+    assert child.parent_id == root.span_id and child.trace_id == root.trace_id
+    assert root.attributes == {"card": "a"} and root.status == "ok"
+
+
+def test_errors_mark_span_and_tracing_off_is_a_noop(exporter, monkeypatch):
+    with pytest.raises(ValueError):
+        with tracing.span("boom"):
+            raise ValueError("bad")
+    assert exporter.spans[0].status == "error" and exporter.spans[0].events[0]["name"] == "exception"
+    monkeypatch.setattr(tracing, "_exporter", None)
+    with tracing.span("off") as s:
+        assert s is None
+
+
+def test_sampling_decision_is_per_trace(exporter, monkeypatch):
+    monkeypatch.setattr(tracing, "_sample_rate", 0.0)
+    with tracing.span("root") as root:
+        with tracing.span("child") as child:
+            pass
+    assert not root.sampled and not child.sampled and exporter.spans == []
+    with tracing.span("remote", traceparent=f"00-{TRACE_ID}-00f067aa0ba902b7-01") as remote:
+        pass
+    # an untrusted caller's sampled flag does not override the local rate
+    assert not remote.sampled and remote.trace_id == TRACE_ID and remote.parent_id == "00f067aa0ba902b7"
+    monkeypatch.setattr(tracing, "_trust_parent", True)
+    with tracing.span("remote", traceparent=f"00-{TRACE_ID}-00f067aa0ba902b7-01") as remote:
+        pass
+    assert remote.sampled and remote.trace_id == TRACE_ID
+    assert tracing.parse_traceparent("garbage") is None
+
+
+def test_bind_carries_context_to_threads(exporter):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def work():
+        with tracing.span("in-thread") as s:
+            return s
+
+    with ThreadPoolExecutor(1) as pool, tracing.span("root") as root:
+        inner = pool.submit(tracing.bind(work)).result()
+    assert inner.trace_id == root.trace_id and inner.parent_id == root.span_id
+
+
+def test_request_trace_covers_service_review_and_integrations(exporter, tmp_path):
+    image = tmp_path / "card.png"
+    image.write_bytes(b"not really a png")
+    r = TestClient(app).post(
+        "/asset-review",
+        json={"asset_cid": "bafy_t", "manifest": {"card_id": "t1", "asset_path": str(image)}},
+        headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"},
+    )
+    assert r.status_code == 200 and r.headers["traceparent"].startswith(f"00-{TRACE_ID}-")
+    spans = {s.name: s for s in exporter.spans}
+    assert {"POST /asset-review", "integration.depth", "integration.segmentation", "integration.clip", "response.encode"} <= set(spans)
+    assert all(s.trace_id == TRACE_ID for s in exporter.spans)
+    assert spans["POST /asset-review"].attributes["http.status_code"] == 200
+    assert {"mode", "outcome"} <= set(spans["integration.depth"].attributes)
+
+
+def test_pin_attempts_and_backoff_are_spans(exporter, monkeypatch):
+    calls = {"n": 0}
+
+    class Resp:
+        def raise_for_status(self):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise RuntimeError("503")
+
+        def json(self):
+            return {"value": {"cid": "bafytraced"}}
+
+    fake_requests = type("R", (), {"post": staticmethod(lambda *a, **k: Resp())})()
+    monkeypatch.setitem(pinmod.pin_json_with_retries.__globals__, "requests", fake_requests)
+    monkeypatch.setitem(sys.modules, "nft_storage", None)  # force the HTTP retry path
+    with tracing.span("pin"):
+        assert pinmod.pin_json_with_retries({"a": 1}, "KEY", attempts=2, backoff=0) == "bafytraced"
+    attempts = [s for s in exporter.spans if s.name == "pin.attempt"]
+    assert [(s.attributes["attempt"], s.attributes["outcome"]) for s in attempts] == [(1, "error"), (2, "ok")]
+    assert any(s.name == "pin.backoff" for s in exporter.spans)
+
+
+def test_file_exporter_writes_otlp_json(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "_exporter", tracing.FileExporter(str(path)))
+    monkeypatch.setattr(tracing, "_sample_rate", 1.0)
+    with tracing.span("root", n=1):
+        with tracing.span("child"):
+            pass
+    doc = json.loads(path.read_text().splitlines()[0])
+    spans = doc["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [s["name"] for s in spans] == ["child", "root"]
+    assert spans[1]["attributes"] == [{"key": "n", "value": {"intValue": "1"}}]
+    assert spans[0]["parentSpanId"] == spans[1]["spanId"]
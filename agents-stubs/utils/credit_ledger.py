@@ -0,0 +1,625 @@
+"""Off-chain credit ledger with batched on-chain settlement.
+
+Credits are reserved and deducted optimistically in a local SQLite ledger
+instead of one `deductCreditsWithSignature` transaction per operation:
+
+- `reserve` places a hold against the last known on-chain balance, `commit`
+  turns it into a deduction and `release` drops it. Every balance-changing
+  call runs in a `BEGIN IMMEDIATE` transaction, so concurrent threads and
+  processes sharing the database cannot overspend.
+- `settle` nets committed deductions per (account, operation) and submits one
+  on-chain deduction for each group. The signed transaction and its hash are
+  stored before it is broadcast, so a settlement interrupted while
+  `submitting`, or `failed` after the send, is looked up by hash on the next
+  call and only re-sent (byte for byte) when the chain has not seen it.
+- `reconcile` marks settlements confirmed once their `CreditsDeducted` events
+  show up in the event index (utils/indexer.py) and refreshes the on-chain
+  balances in the same transaction.
+
+`available` / `can_afford` are therefore local lookups.
+"""
+import abc
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("mighty.credit_ledger")
+
+DEFAULT_HOLD_TTL = 15 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (account TEXT PRIMARY KEY, onchain_balance TEXT, synced_at REAL);
+CREATE TABLE IF NOT EXISTS holds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT, amount TEXT, operation TEXT, ref TEXT,
+    status TEXT, settlement_id INTEGER, created_at REAL, expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS holds_account ON holds (account, status);
+CREATE TABLE IF NOT EXISTS settlements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT, operation TEXT, amount TEXT,
+    status TEXT, tx_hash TEXT, error TEXT, created_at REAL, updated_at REAL, raw_tx TEXT
+);
+CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT, expires_at REAL);
+"""
+
+# settlement rows left in `submitting` or `submitted` this long are checked against the chain
+STALE_SETTLEMENT = 5 * 60
+
+
+class InsufficientCreditsError(RuntimeError):
+    """Raised when a reservation would exceed the account's available credits."""
+
+
+class Submitter(abc.ABC):
+    """How `settle` puts a net deduction on-chain, split so every step is recoverable.
+
+    - `prepare(account, amount, operation)` signs the transaction without
+      sending it and returns `(tx_hash, raw_tx)`;
+    - `send(raw_tx)` broadcasts it;
+    - `receipt(tx_hash)` is True once it was mined, False if it was mined and
+      reverted, and None while the chain does not know it.
+
+    See `RpcDeductSubmitter` for the JSON-RPC implementation.
+    """
+
+    @abc.abstractmethod
+    def prepare(self, account: str, amount: int, operation: str) -> Tuple[str, str]:
+        ...
+
+    @abc.abstractmethod
+    def send(self, raw_tx: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def receipt(self, tx_hash: str) -> Optional[bool]:
+        ...
+
+
+class CreditLedger:
+    """SQLite-backed ledger of credit holds, deductions and settlements."""
+
+    def __init__(self, db_path: str, busy_timeout: float = 10.0):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+        try:
+            self.db.execute("ALTER TABLE settlements ADD COLUMN raw_tx TEXT")
+        except sqlite3.OperationalError:
+            pass  # created with the column, or already migrated
+
+    def _txn(self):
+        ledger = self
+
+        class _Txn:
+            def __enter__(self):
+                ledger._lock.acquire()
+                ledger.db.execute("BEGIN IMMEDIATE")
+                return ledger.db
+
+            def __exit__(self, exc_type, exc, tb):
+                try:
+                    ledger.db.execute("ROLLBACK" if exc_type else "COMMIT")
+                finally:
+                    ledger._lock.release()
+                return False
+
+        return _Txn()
+
+    # -- balances ------------------------------------------------------------
+
+    def _onchain(self, db: sqlite3.Connection, account: str) -> int:
+        row = db.execute("SELECT onchain_balance FROM accounts WHERE account = ?", (account,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _outstanding(self, db: sqlite3.Connection, account: str, now: float) -> int:
+        total = 0
+        for amount, status, expires_at in db.execute(
+            "SELECT amount, status, expires_at FROM holds WHERE account = ? AND status IN ('reserved', 'committed')",
+            (account,),
+        ):
+            if status == "reserved" and expires_at is not None and expires_at < now:
+                continue
+            total += int(amount)
+        return total
+
+    def set_onchain_balance(self, account: str, balance: int) -> None:
+        with self._txn() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO accounts VALUES (?, ?, ?)", (account.lower(), str(int(balance)), time.time())
+            )
+
+    def available(self, account: str) -> int:
+        """On-chain balance minus live reservations and unconfirmed deductions."""
+        account = account.lower()
+        with self._lock:
+            db = self.db
+            return self._onchain(db, account) - self._outstanding(db, account, time.time())
+
+    def can_afford(self, account: str, amount: int) -> bool:
+        return self.available(account) >= int(amount)
+
+    # -- holds ---------------------------------------------------------------
+
+    def reserve_many(
+        self, requests: Iterable[Tuple[str, int, str, Optional[str]]], ttl: Optional[float] = DEFAULT_HOLD_TTL
+    ) -> List[Optional[int]]:
+        """Reserve `(account, amount, operation, ref)` requests in one transaction.
+
+        Returns one hold id per request, or None where the account could not
+        cover it. Requests are applied in order, so earlier ones win.
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        out: List[Optional[int]] = []
+        with self._txn() as db:
+            available: Dict[str, int] = {}
+            for account, amount, operation, ref in requests:
+                account = account.lower()
+                amount = int(amount)
+                if amount <= 0:
+                    raise ValueError("amount must be > 0")
+                if account not in available:
+                    available[account] = self._onchain(db, account) - self._outstanding(db, account, now)
+                if available[account] < amount:
+                    out.append(None)
+                    continue
+                cur = db.execute(
+                    "INSERT INTO holds (account, amount, operation, ref, status, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, 'reserved', ?, ?)",
+                    (account, str(amount), operation, ref, now, expires_at),
+                )
+                available[account] -= amount
+                out.append(cur.lastrowid)
+        return out
+
+    def reserve(
+        self, account: str, amount: int, operation: str, ref: Optional[str] = None, ttl: Optional[float] = DEFAULT_HOLD_TTL
+    ) -> int:
+        hold_id = self.reserve_many([(account, amount, operation, ref)], ttl=ttl)[0]
+        if hold_id is None:
+            raise InsufficientCreditsError(f"{account} cannot cover {amount} credits for {operation}")
+        return hold_id
+
+    def commit(self, hold_id: int) -> None:
+        """Turn a live reservation into a deduction awaiting settlement."""
+        with self._txn() as db:
+            cur = db.execute(
+                "UPDATE holds SET status = 'committed', expires_at = NULL "
+                "WHERE id = ? AND status = 'reserved' AND (expires_at IS NULL OR expires_at >= ?)",
+                (hold_id, time.time()),
+            )
+            if cur.rowcount != 1:
+                raise ValueError(f"hold {hold_id} is not an active reservation")
+
+    def release(self, hold_id: int) -> None:
+        with self._txn() as db:
+            db.execute("UPDATE holds SET status = 'released' WHERE id = ? AND status = 'reserved'", (hold_id,))
+
+    def commit_many(self, hold_ids: Iterable[int]) -> List[int]:
+        """Commit several holds in one transaction; returns the ids that were not active reservations."""
+        now = time.time()
+        missed = []
+        with self._txn() as db:
+            for hold_id in hold_ids:
+                cur = db.execute(
+                    "UPDATE holds SET status = 'committed', expires_at = NULL "
+                    "WHERE id = ? AND status = 'reserved' AND (expires_at IS NULL OR expires_at >= ?)",
+                    (hold_id, now),
+                )
+                if cur.rowcount != 1:
+                    missed.append(hold_id)
+        return missed
+
+    def release_many(self, hold_ids: Iterable[int]) -> None:
+        with self._txn() as db:
+            db.executemany(
+                "UPDATE holds SET status = 'released' WHERE id = ? AND status = 'reserved'", ((i,) for i in hold_ids)
+            )
+
+    def holds(self, hold_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Account, amount, operation, ref and status of each existing hold."""
+        out = {}
+        with self._lock:
+            for hold_id in hold_ids:
+                row = self.db.execute(
+                    "SELECT account, amount, operation, ref, status FROM holds WHERE id = ?", (hold_id,)
+                ).fetchone()
+                if row:
+                    out[hold_id] = {"account": row[0], "amount": int(row[1]), "operation": row[2],
+                                    "ref": row[3], "status": row[4]}
+        return out
+
+    def deduct(self, account: str, amount: int, operation: str, ref: Optional[str] = None) -> int:
+        """Reserve and commit in one step; returns the hold id."""
+        hold_id = self.reserve(account, amount, operation, ref, ttl=None)
+        self.commit(hold_id)
+        return hold_id
+
+    # -- settlement ----------------------------------------------------------
+
+    def _open_settlements(self) -> None:
+        now = time.time()
+        with self._txn() as db:
+            groups: Dict[Tuple[str, str], Tuple[int, List[int]]] = {}
+            for hold_id, account, amount, operation in db.execute(
+                "SELECT id, account, amount, operation FROM holds WHERE status = 'committed' AND settlement_id IS NULL"
+            ).fetchall():
+                total, ids = groups.get((account, operation), (0, []))
+                groups[(account, operation)] = (total + int(amount), ids + [hold_id])
+            for (account, operation), (total, ids) in groups.items():
+                cur = db.execute(
+                    "INSERT INTO settlements (account, operation, amount, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, 'pending', ?, ?)",
+                    (account, operation, str(total), now, now),
+                )
+                db.executemany(
+                    "UPDATE holds SET settlement_id = ? WHERE id = ?", ((cur.lastrowid, i) for i in ids)
+                )
+
+    def _update(self, sid: int, expect: str, **fields: Any) -> bool:
+        """Set `fields` on settlement `sid` if it is still in status `expect`."""
+        fields["updated_at"] = time.time()
+        names = ", ".join(f"{k} = ?" for k in fields)
+        with self._txn() as db:
+            cur = db.execute(
+                f"UPDATE settlements SET {names} WHERE id = ? AND status = ?", (*fields.values(), sid, expect)
+            )
+            return cur.rowcount == 1
+
+    def _recover(self, submit: Submitter, stale_after: float) -> List[Dict[str, Any]]:
+        """Resolve `failed` and stale `submitting`/`submitted` settlements by their tx hash.
+
+        Nothing is signed again while the stored transaction may still land:
+        it is re-broadcast as is, and a new one is only prepared once it was
+        reverted or can no longer be mined (its sender nonce was used).
+        """
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT id, account, operation, amount, status, tx_hash, raw_tx FROM settlements "
+                "WHERE status = 'failed' OR (status IN ('submitting', 'submitted') AND updated_at < ?) ORDER BY id",
+                (time.time() - stale_after,),
+            ).fetchall()
+        results = []
+        for sid, account, operation, amount, status, tx_hash, raw_tx in rows:
+            if not tx_hash:
+                # nothing was broadcast: prepare failed, or the process stopped before the hash was stored
+                self._update(sid, status, status="pending")
+                continue
+            landed = submit.receipt(tx_hash)
+            if landed is False:
+                logger.warning("settlement %s transaction %s reverted; preparing a new one", sid, tx_hash)
+                self._update(sid, status, status="pending", tx_hash=None, raw_tx=None, error="reverted")
+                continue
+            error = None
+            if landed is None:
+                try:
+                    submit.send(raw_tx)
+                except Exception as e:
+                    error = str(e)
+                    if "nonce too low" in error.lower() and submit.receipt(tx_hash) is None:
+                        # its sender nonce went to another transaction, so this one can never be mined
+                        self._update(sid, status, status="pending", tx_hash=None, raw_tx=None, error=error)
+                        continue
+                    if "already known" not in error.lower():
+                        logger.warning("settlement %s re-broadcast failed: %s", sid, e)
+                        self._update(sid, status, status="failed", error=error)
+                        results.append(self._result(sid, account, operation, amount, "failed", tx_hash, error))
+                        continue
+            if self._update(sid, status, status="submitted", error=None) and status != "submitted":
+                results.append(self._result(sid, account, operation, amount, "submitted", tx_hash, None))
+        return results
+
+    @staticmethod
+    def _result(sid, account, operation, amount, status, tx_hash, error) -> Dict[str, Any]:
+        return {"settlement_id": sid, "account": account, "operation": operation,
+                "amount": int(amount), "status": status, "tx_hash": tx_hash, "error": error}
+
+    def settle(self, submit: Submitter, stale_after: float = STALE_SETTLEMENT) -> List[Dict[str, Any]]:
+        """Submit net deductions on-chain, one transaction per (account, operation).
+
+        Each transaction is prepared and its hash and raw bytes stored before
+        it is sent. Settlements that `failed`, or were left `submitting` or
+        unconfirmed for `stale_after` seconds, are first checked by hash (see
+        `_recover`), so a deduction that reached the chain is never sent twice.
+        """
+        results = self._recover(submit, stale_after)
+        self._open_settlements()
+        with self._lock:
+            pending = self.db.execute(
+                "SELECT id, account, operation, amount FROM settlements WHERE status = 'pending' ORDER BY id"
+            ).fetchall()
+        for sid, account, operation, amount in pending:
+            if not self._update(sid, "pending", status="submitting"):
+                continue
+            try:
+                tx_hash, raw_tx = submit.prepare(account, int(amount), operation)
+            except Exception as e:
+                logger.warning("settlement %s for %s could not be prepared: %s", sid, account, e)
+                self._update(sid, "submitting", status="failed", error=str(e))
+                results.append(self._result(sid, account, operation, amount, "failed", None, str(e)))
+                continue
+            tx_hash = tx_hash.lower()
+            self._update(sid, "submitting", tx_hash=tx_hash, raw_tx=raw_tx)
+            try:
+                submit.send(raw_tx)
+                status, error = "submitted", None
+            except Exception as e:
+                # the node may still have accepted it: the next call looks the hash up before resending
+                logger.warning("settlement %s for %s failed: %s", sid, account, e)
+                status, error = "failed", str(e)
+            self._update(sid, "submitting", status=status, error=error)
+            results.append(self._result(sid, account, operation, amount, status, tx_hash, error))
+        return results
+
+    def reconcile(self, indexer: Any) -> Dict[str, int]:
+        """Confirm submitted settlements against indexed `CreditsDeducted` events.
+
+        Sync the indexer first. Confirmed settlements' holds are marked settled
+        and the touched accounts' on-chain balances are refreshed from the
+        index in the same transaction, so nothing is counted twice.
+        """
+        with self._lock:
+            submitted = self.db.execute(
+                "SELECT id, account, operation, amount, tx_hash FROM settlements WHERE status = 'submitted'"
+            ).fetchall()
+            known = [r[0] for r in self.db.execute("SELECT account FROM accounts")]
+        events = indexer.deductions_by_tx([r[4] for r in submitted if r[4]])
+        confirmed = []
+        for sid, account, operation, amount, tx_hash in submitted:
+            for ev in events.get(tx_hash, []):
+                if ev["account"] == account and ev["amount"] == int(amount) and ev["operation"] == operation:
+                    confirmed.append(sid)
+                    break
+        balances = indexer.balances(known)
+        now = time.time()
+        with self._txn() as db:
+            db.executemany(
+                "UPDATE settlements SET status = 'confirmed', updated_at = ? WHERE id = ?", ((now, s) for s in confirmed)
+            )
+            db.executemany("UPDATE holds SET status = 'settled' WHERE settlement_id = ?", ((s,) for s in confirmed))
+            db.executemany(
+                "UPDATE accounts SET onchain_balance = ?, synced_at = ? WHERE account = ?",
+                ((str(b), now, a) for a, b in balances.items()),
+            )
+        return {"confirmed": len(confirmed), "outstanding": len(submitted) - len(confirmed), "accounts": len(balances)}
+
+    def track(self, accounts: Iterable[str], indexer: Any) -> None:
+        """Start tracking accounts, seeding their balances from the index."""
+        balances = indexer.balances(accounts)
+        now = time.time()
+        with self._txn() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO accounts VALUES (?, ?, ?)", ((a, str(b), now) for a, b in balances.items())
+            )
+
+    # -- leases --------------------------------------------------------------
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew lease `name` for `owner` unless someone else holds it unexpired."""
+        now = time.time()
+        with self._txn() as db:
+            row = db.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != owner and row[1] >= now:
+                return False
+            db.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?)", (name, owner, now + ttl))
+            return True
+
+    def release_lease(self, name: str, owner: str) -> None:
+        with self._txn() as db:
+            db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class SettlementWorker(threading.Thread):
+    """Background thread that periodically settles and reconciles a ledger.
+
+    Every service process may start one, but only the holder of the ledger's
+    `settlement` lease works a cycle, so one worker at a time settles the
+    ledger with its sender key. The lease lasts `lease_ttl` seconds (default
+    the longer of three intervals and `STALE_SETTLEMENT`) and is renewed each
+    cycle; another worker takes over once it lapses.
+    """
+
+    LEASE = "settlement"
+
+    def __init__(
+        self,
+        ledger: CreditLedger,
+        submit: Submitter,
+        indexer: Any = None,
+        interval: float = 60.0,
+        lease_ttl: Optional[float] = None,
+    ):
+        super().__init__(name="credit-settlement", daemon=True)
+        self.ledger = ledger
+        self.submit = submit
+        self.indexer = indexer
+        self.interval = interval
+        self.lease_ttl = lease_ttl or max(3 * interval, STALE_SETTLEMENT)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._stop_event = threading.Event()
+
+    def run_once(self) -> bool:
+        """Run one settle/reconcile cycle if this worker holds the lease; returns whether it did."""
+        if not self.ledger.acquire_lease(self.LEASE, self.owner, self.lease_ttl):
+            return False
+        self.ledger.settle(self.submit)
+        if self.indexer is not None:
+            self.indexer.sync()
+            self.ledger.reconcile(self.indexer)
+        return True
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("credit settlement cycle failed")
+        self.ledger.release_lease(self.LEASE, self.owner)  # hand over without waiting for the lease to lapse
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+def _encode_deduct_call(request: Dict[str, Any], signature: bytes) -> str:
+    """ABI-encode `deductCreditsWithSignature((address,uint256,string,uint256,uint256),bytes)`."""
+    from agents_stubs.utils.eip712 import keccak256
+
+    def word(n: int) -> bytes:
+        return int(n).to_bytes(32, "big")
+
+    def dynamic(raw: bytes) -> bytes:
+        return word(len(raw)) + raw + b"\x00" * (-len(raw) % 32)
+
+    selector = keccak256(b"deductCreditsWithSignature((address,uint256,string,uint256,uint256),bytes)")[:4]
+    tuple_enc = (
+        word(int(request["from"], 16)) + word(request["amount"]) + word(5 * 32)
+        + word(request["nonce"]) + word(request["deadline"]) + dynamic(request["operation"].encode("utf-8"))
+    )
+    head = word(2 * 32) + word(2 * 32 + len(tuple_enc))
+    return "0x" + (selector + head + tuple_enc + dynamic(signature)).hex()
+
+
+def sign_legacy_transaction(tx: Dict[str, Any], private_key: Any, chain_id: int) -> Tuple[str, str]:
+    """Sign an EIP-155 legacy transaction; returns `(tx_hash, raw_tx)` as 0x-hex."""
+    from eth_account import Account
+    from eth_utils import to_checksum_address
+
+    signed = Account.sign_transaction(
+        {
+            "nonce": int(tx["nonce"]),
+            "gasPrice": int(tx["gasPrice"]),
+            "gas": int(tx["gas"]),
+            "to": to_checksum_address(tx["to"]),
+            "value": int(tx.get("value", 0)),
+            "data": tx.get("data", "0x"),
+            "chainId": chain_id,
+        },
+        private_key,
+    )
+    return "0x" + bytes(signed.hash).hex(), "0x" + bytes(signed.raw_transaction).hex()
+
+
+class RpcDeductSubmitter(Submitter):
+    """Settle with operator-signed `deductCreditsWithSignature` calls over JSON-RPC.
+
+    Transactions are signed locally by `sender_key` (so their hash is known
+    before anything is sent) and broadcast with `eth_sendRawTransaction`;
+    `nonces` is a `NonceCache` for CreditToken (utils/eip712.py).
+    """
+
+    def __init__(
+        self,
+        rpc: Any,
+        credit_token: str,
+        operator_key: str,
+        sender_key: str,
+        nonces: Any,
+        chain_id: int = 1337,
+        deadline_seconds: int = 3600,
+        gas: int = 300_000,
+    ):
+        from agents_stubs.utils.eip712 import private_key_to_address
+
+        self.rpc = rpc
+        self.credit_token = credit_token
+        self.operator_key = operator_key
+        self.sender_key = sender_key
+        self.sender = private_key_to_address(sender_key)
+        self.nonces = nonces
+        self.chain_id = chain_id
+        self.deadline_seconds = deadline_seconds
+        self.gas = gas
+
+    def prepare(self, account: str, amount: int, operation: str) -> Tuple[str, str]:
+        from agents_stubs.utils.eip712 import ENGINE, sign_digest
+
+        request = {
+            "from": account,
+            "amount": int(amount),
+            "operation": operation,
+            "nonce": self.nonces.get("CreditToken", account),
+            "deadline": int(time.time()) + self.deadline_seconds,
+        }
+        digest = ENGINE.digest("CreditToken", "DeductRequest", request, self.chain_id, self.credit_token)
+        nonce, gas_price = self.rpc.batch([
+            ("eth_getTransactionCount", [self.sender, "pending"]),
+            ("eth_gasPrice", []),
+        ])
+        tx = {
+            "nonce": int(nonce, 16), "gasPrice": int(gas_price, 16), "gas": self.gas, "to": self.credit_token,
+            "data": _encode_deduct_call(request, sign_digest(digest, self.operator_key)),
+        }
+        signed = sign_legacy_transaction(tx, self.sender_key, self.chain_id)
+        self.nonces.bump("CreditToken", account)
+        return signed
+
+    def send(self, raw_tx: str) -> None:
+        self.rpc.call("eth_sendRawTransaction", [raw_tx])
+
+    def receipt(self, tx_hash: str) -> Optional[bool]:
+        receipt = self.rpc.call("eth_getTransactionReceipt", [tx_hash])
+        if not receipt:
+            return None
+        if int(receipt.get("status") or "0x0", 16) == 1:
+            return True
+        self.nonces.invalidate("CreditToken")  # the reverted request did not use its nonce
+        return False
+
+
+def rpc_deduct_submitter(rpc: Any, credit_token: str, operator_key: str, sender_key: str, nonces: Any,
+                         **kwargs: Any) -> RpcDeductSubmitter:
+    """Build the `settle` submitter for a CreditToken behind `rpc` (see `RpcDeductSubmitter`)."""
+    return RpcDeductSubmitter(rpc, credit_token, operator_key, sender_key, nonces, **kwargs)
+
+
+def worker_from_env(ledger: CreditLedger) -> Optional[SettlementWorker]:
+    """A settlement worker for `ledger` configured from the environment, or None.
+
+    Needs MIGHTY_SETTLEMENT_RPC_URL, MIGHTY_CREDIT_TOKEN,
+    MIGHTY_SETTLEMENT_OPERATOR_KEY and MIGHTY_SETTLEMENT_SENDER_KEY;
+    MIGHTY_CHAIN_ID (default 1337) and MIGHTY_SETTLEMENT_INTERVAL (seconds,
+    default 60) are optional. With MIGHTY_INDEXER_DB the worker also syncs an
+    event index and reconciles against it.
+    """
+    names = ("MIGHTY_SETTLEMENT_RPC_URL", "MIGHTY_CREDIT_TOKEN", "MIGHTY_SETTLEMENT_OPERATOR_KEY",
+             "MIGHTY_SETTLEMENT_SENDER_KEY")
+    values = [os.environ.get(n) for n in names]
+    if not all(values):
+        return None
+    from agents_stubs.utils.eip712 import NonceCache, rpc_nonce_fetcher
+    from agents_stubs.utils.hardhat import JsonRpcClient
+
+    url, credit_token, operator_key, sender_key = values
+    rpc = JsonRpcClient(url)
+    chain_id = int(os.environ.get("MIGHTY_CHAIN_ID") or 1337)
+    nonces = NonceCache(rpc_nonce_fetcher(rpc, {"CreditToken": credit_token}))
+    submit = RpcDeductSubmitter(rpc, credit_token, operator_key, sender_key, nonces, chain_id=chain_id)
+    indexer = None
+    if os.environ.get("MIGHTY_INDEXER_DB"):
+        from agents_stubs.utils.indexer import EventIndexer
+
+        indexer = EventIndexer(rpc, os.environ["MIGHTY_INDEXER_DB"], {"CreditToken": credit_token})
+    interval = float(os.environ.get("MIGHTY_SETTLEMENT_INTERVAL") or 60)
+    return SettlementWorker(ledger, submit, indexer, interval=interval)
+
+
+_ledgers: Dict[str, CreditLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(db_path: str) -> CreditLedger:
+    """Return a shared `CreditLedger` for `db_path` (one connection per process)."""
+    with _ledgers_lock:
+        if db_path not in _ledgers:
+            _ledgers[db_path] = CreditLedger(db_path)
+        return _ledgers[db_path]
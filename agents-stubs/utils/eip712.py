@@ -0,0 +1,412 @@
+"""EIP-712 typed-data hashing and batched signature verification.
+
+Covers the signature schemes of the MightyVerseAssets, CreditToken and
+ApprovalRegistry contracts. Domain separators and type hashes are computed
+once and cached, identical signatures in a batch are recovered once, and
+on-chain nonces are served from a `NonceCache` that fetches misses in a
+single JSON-RPC batch.
+
+Keccak-256 comes from eth-hash and secp256k1 signing and recovery from
+eth-keys (both installed with eth-account); install coincurve so eth-keys
+runs on libsecp256k1 instead of its pure-Python backend.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from eth_hash.auto import keccak as keccak256
+from eth_keys import keys
+from eth_keys.constants import SECPK1_N as _N
+from eth_keys.exceptions import BadSignature, ValidationError
+
+logger = logging.getLogger("mighty.eip712")
+
+# ---------------------------------------------------------------------------
+# secp256k1 (eth-keys; uses coincurve's libsecp256k1 bindings when installed)
+# ---------------------------------------------------------------------------
+
+_HALF_N = _N // 2
+
+
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    raise TypeError(f"Expected bytes or hex string, got {type(value).__name__}")
+
+
+def _address(public_key: keys.PublicKey) -> str:
+    return "0x" + public_key.to_canonical_address().hex()
+
+
+def recover_signer(digest: bytes, signature: Any) -> Optional[str]:
+    """Recover the lowercase signer address of a 65-byte `r || s || v` signature.
+
+    Mirrors OpenZeppelin's ECDSA.recover: `v` must be 27/28 (0/1 accepted)
+    and high-`s` signatures are rejected. Returns None for invalid input.
+    """
+    try:
+        sig = _to_bytes(signature)
+    except (TypeError, ValueError):
+        return None
+    if len(sig) != 65:
+        return None
+    r = int.from_bytes(sig[:32], "big")
+    s = int.from_bytes(sig[32:64], "big")
+    v = sig[64]
+    recid = v - 27 if v >= 27 else v
+    if recid not in (0, 1) or not (0 < r < _N) or not (0 < s <= _HALF_N):
+        return None
+    try:
+        return _address(keys.Signature(vrs=(recid, r, s)).recover_public_key_from_msg_hash(digest))
+    except (BadSignature, ValidationError):
+        return None
+
+
+def private_key_to_address(private_key: Any) -> str:
+    return _address(keys.PrivateKey(_to_bytes(private_key)).public_key)
+
+
+def sign_digest(digest: bytes, private_key: Any) -> bytes:
+    """Sign a 32-byte digest (RFC 6979 deterministic k, low-s) -> `r || s || v`.
+
+    Intended for local tooling and tests (e.g. operator-signed settlements
+    against a Hardhat node); keep real admin keys out of this process.
+    """
+    sig = keys.PrivateKey(_to_bytes(private_key)).sign_msg_hash(digest)
+    return sig.r.to_bytes(32, "big") + sig.s.to_bytes(32, "big") + bytes([27 + sig.v])
+
+
+# ---------------------------------------------------------------------------
+# EIP-712
+# ---------------------------------------------------------------------------
+
+Fields = Sequence[Tuple[str, str]]
+
+DOMAIN_FIELDS: Fields = (
+    ("name", "string"),
+    ("version", "string"),
+    ("chainId", "uint256"),
+    ("verifyingContract", "address"),
+)
+
+# Names and versions match the constructor arguments in contracts/scripts/deploy.js.
+SCHEMES: Dict[str, Dict[str, Any]] = {
+    "MightyVerseAssets": {
+        "name": "MightyVerseAssets",
+        "version": "1",
+        "types": {
+            "MintRequest": (
+                ("to", "address"), ("tokenId", "uint256"), ("amount", "uint256"),
+                ("metadataURI", "string"), ("nonce", "uint256"), ("deadline", "uint256"),
+            ),
+        },
+    },
+    "CreditToken": {
+        "name": "Mighty Verse Credits",
+        "version": "1",
+        "types": {
+            "MintRequest": (("to", "address"), ("amount", "uint256"), ("nonce", "uint256"), ("deadline", "uint256")),
+            "BurnRequest": (("from", "address"), ("amount", "uint256"), ("nonce", "uint256"), ("deadline", "uint256")),
+            "DeductRequest": (
+                ("from", "address"), ("amount", "uint256"), ("operation", "string"),
+                ("nonce", "uint256"), ("deadline", "uint256"),
+            ),
+        },
+    },
+    "ApprovalRegistry": {
+        "name": "MightyVerseApprovals",
+        "version": "1",
+        "types": {
+            "Approval": (
+                ("operationHash", "bytes32"), ("requester", "address"),
+                ("nonce", "uint256"), ("deadline", "uint256"),
+            ),
+        },
+    },
+}
+
+# Which message field each contract checks the nonce against.
+NONCE_ACCOUNT_FIELD = {"MintRequest": "to", "BurnRequest": "from", "DeductRequest": "from", "Approval": "requester"}
+
+DEFAULT_CHAIN_ID = 1337
+
+
+def _encode_atomic(typ: str, value: Any) -> bytes:
+    if typ == "address":
+        return int(value, 16).to_bytes(32, "big") if isinstance(value, str) else _to_bytes(value).rjust(32, b"\x00")
+    if typ == "bool":
+        return (1 if value else 0).to_bytes(32, "big")
+    if typ.startswith("uint") or typ.startswith("int"):
+        n = int(value, 0) if isinstance(value, str) else int(value)
+        return (n % (1 << 256)).to_bytes(32, "big")
+    if typ.startswith("bytes"):
+        return _to_bytes(value).ljust(32, b"\x00")
+    raise ValueError(f"Unsupported EIP-712 type: {typ}")
+
+
+class TypedDataEngine:
+    """Hash EIP-712 messages for the known schemes and verify signatures in batches."""
+
+    def __init__(self, schemes: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.schemes = schemes or SCHEMES
+        self._lock = threading.Lock()
+        self._type_strings: Dict[Tuple[str, str], str] = {}
+        self._type_hashes: Dict[Tuple[str, str], bytes] = {}
+        self._domains: Dict[Tuple[str, int, str], bytes] = {}
+
+    def _types(self, contract: str) -> Dict[str, Fields]:
+        try:
+            return self.schemes[contract]["types"]
+        except KeyError:
+            raise ValueError(f"Unknown EIP-712 scheme: {contract}")
+
+    def encode_type(self, contract: str, primary_type: str) -> str:
+        key = (contract, primary_type)
+        cached = self._type_strings.get(key)
+        if cached is not None:
+            return cached
+        types = self._types(contract)
+        deps: List[str] = []
+
+        def collect(name: str) -> None:
+            if name in deps or name not in types:
+                return
+            deps.append(name)
+            for _, typ in types[name]:
+                collect(typ.split("[")[0])
+
+        collect(primary_type)
+        ordered = [primary_type] + sorted(d for d in deps if d != primary_type)
+        out = "".join(f"{name}({','.join(f'{t} {n}' for n, t in types[name])})" for name in ordered)
+        self._type_strings[key] = out
+        return out
+
+    def type_hash(self, contract: str, primary_type: str) -> bytes:
+        key = (contract, primary_type)
+        cached = self._type_hashes.get(key)
+        if cached is None:
+            cached = keccak256(self.encode_type(contract, primary_type).encode("utf-8"))
+            with self._lock:
+                self._type_hashes[key] = cached
+        return cached
+
+    def _encode_value(self, contract: str, typ: str, value: Any) -> bytes:
+        types = self._types(contract)
+        if typ.endswith("]"):
+            inner = typ[:typ.rindex("[")]
+            return keccak256(b"".join(self._encode_value(contract, inner, v) for v in value))
+        if typ in types:
+            return self.hash_struct(contract, typ, value)
+        if typ == "string":
+            return keccak256(value.encode("utf-8"))
+        if typ == "bytes":
+            return keccak256(_to_bytes(value))
+        return _encode_atomic(typ, value)
+
+    def hash_struct(self, contract: str, primary_type: str, message: Dict[str, Any]) -> bytes:
+        fields = self._types(contract)[primary_type]
+        enc = [self.type_hash(contract, primary_type)]
+        for name, typ in fields:
+            enc.append(self._encode_value(contract, typ, message[name]))
+        return keccak256(b"".join(enc))
+
+    def domain_separator(self, contract: str, chain_id: int = DEFAULT_CHAIN_ID, verifying_contract: str = "0x" + "0" * 40) -> bytes:
+        key = (contract, int(chain_id), verifying_contract.lower())
+        cached = self._domains.get(key)
+        if cached is None:
+            scheme = self.schemes[contract]
+            values = (scheme["name"], scheme["version"], int(chain_id), verifying_contract)
+            type_str = "EIP712Domain(" + ",".join(f"{t} {n}" for n, t in DOMAIN_FIELDS) + ")"
+            enc = [keccak256(type_str.encode("utf-8"))]
+            for (_, typ), value in zip(DOMAIN_FIELDS, values):
+                enc.append(keccak256(value.encode("utf-8")) if typ == "string" else _encode_atomic(typ, value))
+            cached = keccak256(b"".join(enc))
+            with self._lock:
+                self._domains[key] = cached
+        return cached
+
+    def digest(
+        self,
+        contract: str,
+        primary_type: str,
+        message: Dict[str, Any],
+        chain_id: int = DEFAULT_CHAIN_ID,
+        verifying_contract: str = "0x" + "0" * 40,
+    ) -> bytes:
+        """Return the `_hashTypedDataV4` digest a contract would recover against."""
+        domain = self.domain_separator(contract, chain_id, verifying_contract)
+        return keccak256(b"\x19\x01" + domain + self.hash_struct(contract, primary_type, message))
+
+    def sign(self, private_key: Any, contract: str, primary_type: str, message: Dict[str, Any], **domain: Any) -> str:
+        return "0x" + sign_digest(self.digest(contract, primary_type, message, **domain), private_key).hex()
+
+    def verify_batch(
+        self,
+        items: Iterable[Dict[str, Any]],
+        allowed_signers: Optional[Iterable[str]] = None,
+        nonces: Optional["NonceCache"] = None,
+        now: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Verify many signed messages in one call.
+
+        Each item holds `contract`, `primary_type`, `message`, `signature` and
+        optionally `chain_id` / `verifying_contract`. Returns one dict per item
+        (same order) with `valid`, `signer` and, when invalid, `error` — one of
+        `malformed`, `invalid_signature`, `unauthorized_signer`,
+        `expired_deadline`, `invalid_nonce`, `duplicate_nonce` or `nonce_gap`.
+        Each signer's nonces must start at its current nonce (from `nonces`)
+        and increase by one through the batch.
+        """
+        items = list(items)
+        allowed = {a.lower() for a in allowed_signers} if allowed_signers is not None else None
+        now = time.time() if now is None else now
+        results: List[Dict[str, Any]] = [{"valid": False, "signer": None} for _ in items]
+
+        # Prefetch all on-chain nonces the batch needs in one round trip per contract.
+        expected: Dict[Tuple[str, str], int] = {}
+        if nonces is not None:
+            wanted: Dict[str, set] = {}
+            for item in items:
+                field = NONCE_ACCOUNT_FIELD.get(item.get("primary_type"))
+                msg = item.get("message") or {}
+                if field and msg.get(field):
+                    wanted.setdefault(item["contract"], set()).add(str(msg[field]).lower())
+            for contract, accounts in wanted.items():
+                for account, nonce in nonces.get_many(contract, sorted(accounts)).items():
+                    expected[(contract, account)] = nonce
+
+        recovered: Dict[Tuple[bytes, bytes], Optional[str]] = {}
+        # Signatures consume nonces in batch order; without a NonceCache the
+        # first nonce seen for an account stands in for its current one.
+        next_nonce: Dict[Tuple[str, str], int] = dict(expected)
+        seen_nonces = set()
+        for item, res in zip(items, results):
+            try:
+                digest = self.digest(
+                    item["contract"], item["primary_type"], item["message"],
+                    item.get("chain_id", DEFAULT_CHAIN_ID), item.get("verifying_contract", "0x" + "0" * 40),
+                )
+                sig = _to_bytes(item["signature"])
+            except Exception as e:
+                res["error"] = "malformed"
+                res["detail"] = str(e)
+                continue
+            key = (digest, sig)
+            if key not in recovered:
+                recovered[key] = recover_signer(digest, sig)
+            signer = recovered[key]
+            res["signer"] = signer
+            msg = item["message"]
+            if signer is None:
+                res["error"] = "invalid_signature"
+            elif allowed is not None and signer not in allowed:
+                res["error"] = "unauthorized_signer"
+            elif "deadline" in msg and int(msg["deadline"]) < now:
+                res["error"] = "expired_deadline"
+            else:
+                field = NONCE_ACCOUNT_FIELD.get(item["primary_type"])
+                if field and "nonce" in msg:
+                    account_key = (item["contract"], str(msg[field]).lower())
+                    nonce = int(msg["nonce"])
+                    want = next_nonce.setdefault(account_key, nonce)
+                    if nonce != want:
+                        if account_key + (nonce,) in seen_nonces:
+                            res["error"] = "duplicate_nonce"
+                        else:
+                            res["error"] = "invalid_nonce" if nonce < want else "nonce_gap"
+                        continue
+                    next_nonce[account_key] = nonce + 1
+                    seen_nonces.add(account_key + (nonce,))
+                res["valid"] = True
+        return results
+
+
+class NonceCache:
+    """Cache of per-contract account nonces with a TTL.
+
+    `fetch_many(contract, accounts) -> {account: nonce}` is called once per
+    batch of misses; use `rpc_nonce_fetcher` to back it with JSON-RPC. Call
+    `bump` after a signature is consumed locally so the cache stays ahead of
+    the chain without a round trip.
+    """
+
+    def __init__(self, fetch_many: Optional[Callable[[str, List[str]], Dict[str, int]]] = None, ttl: float = 30.0):
+        self.fetch_many = fetch_many
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+    def get_many(self, contract: str, accounts: Iterable[str]) -> Dict[str, int]:
+        now = time.monotonic()
+        out: Dict[str, int] = {}
+        missing: List[str] = []
+        with self._lock:
+            for account in accounts:
+                account = account.lower()
+                hit = self._values.get((contract, account))
+                if hit and now - hit[1] < self.ttl:
+                    out[account] = hit[0]
+                else:
+                    missing.append(account)
+        if missing and self.fetch_many is not None:
+            fetched = self.fetch_many(contract, missing)
+            with self._lock:
+                for account, nonce in fetched.items():
+                    self._values[(contract, account.lower())] = (int(nonce), now)
+                    out[account.lower()] = int(nonce)
+        return out
+
+    def get(self, contract: str, account: str) -> Optional[int]:
+        return self.get_many(contract, [account]).get(account.lower())
+
+    def set(self, contract: str, account: str, nonce: int) -> None:
+        with self._lock:
+            self._values[(contract, account.lower())] = (int(nonce), time.monotonic())
+
+    def bump(self, contract: str, account: str) -> None:
+        with self._lock:
+            key = (contract, account.lower())
+            if key in self._values:
+                self._values[key] = (self._values[key][0] + 1, self._values[key][1])
+
+    def invalidate(self, contract: Optional[str] = None) -> None:
+        with self._lock:
+            if contract is None:
+                self._values.clear()
+            else:
+                for key in [k for k in self._values if k[0] == contract]:
+                    del self._values[key]
+
+
+def rpc_nonce_fetcher(rpc: Any, addresses: Dict[str, str]) -> Callable[[str, List[str]], Dict[str, int]]:
+    """Build a `NonceCache` fetcher calling `getNonce(address)` in one JSON-RPC batch.
+
+    `rpc` is a `JsonRpcClient` (see utils/hardhat.py); `addresses` maps
+    contract names to deployed addresses.
+    """
+    selector = keccak256(b"getNonce(address)")[:4].hex()
+
+    def fetch(contract: str, accounts: List[str]) -> Dict[str, int]:
+        to = addresses[contract]
+        calls = [
+            ("eth_call", [{"to": to, "data": "0x" + selector + _encode_atomic("address", a).hex()}, "latest"])
+            for a in accounts
+        ]
+        return {a: int(r, 16) for a, r in zip(accounts, rpc.batch(calls))}
+
+    return fetch
+
+
+def default_domain() -> Dict[str, Any]:
+    """Domain fields for MightyVerseAssets taken from the environment."""
+    return {
+        "chain_id": int(os.environ.get("MIGHTY_CHAIN_ID", DEFAULT_CHAIN_ID)),
+        "verifying_contract": os.environ.get("MIGHTY_ASSETS_ADDRESS", "0x" + "0" * 40),
+    }
+
+
+ENGINE = TypedDataEngine()
@@ -1,26 +1,268 @@
 """Helper to call local Hardhat scripts from Python (dev/test only).
 
-This module runs `npx hardhat run` and parses stdout for the deployed address.
-In CI or production, prefer using JS/TS tools directly.
+`run_hardhat_deploy` runs `npx hardhat run` and parses stdout for the deployed
+address. `HardhatSession` keeps a long-lived connection to a local Hardhat
+node instead: it starts or attaches to the node once, caches deployed
+contract addresses per network and contract code hash, and talks JSON-RPC
+over a pooled keep-alive HTTP session. In CI or production, prefer using
+JS/TS tools directly.
 """
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
 import subprocess
-from typing import Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
+logger = logging.getLogger("mighty.hardhat")
 
-def run_hardhat_deploy(script: str = "scripts/deploy.js", network: str = "localhost") -> Optional[str]:
-    """Run the deploy script and return deployed contract address if found.
+DEFAULT_RPC_URL = "http://127.0.0.1:8545"
+CONTRACTS_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "..", "contracts"))
+DEPLOY_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mighty", "hardhat_deployments.json")
 
-    Returns address string on success, None otherwise.
-    """
+_DEPLOYED_RE = re.compile(r"(\w+) deployed to:\s*(0x[a-fA-F0-9]{40})")
+
+
+def _run_deploy_script(script: str, network: str, cwd: Optional[str] = None) -> str:
     cmd = ["npx", "hardhat", "run", script, "--network", network]
-    proc = subprocess.run(cmd, capture_output=True, text=True)
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd)
     if proc.returncode != 0:
         raise RuntimeError(f"Hardhat deploy failed: {proc.stderr}")
-    out = proc.stdout + proc.stderr
-    # look for a hex address in output
-    import re
+    return proc.stdout + proc.stderr
+
 
+def run_hardhat_deploy(script: str = "scripts/deploy.js", network: str = "localhost", cwd: Optional[str] = None) -> Optional[str]:
+    """Run the deploy script and return deployed contract address if found.
+
+    Returns address string on success, None otherwise.
+    """
+    out = _run_deploy_script(script, network, cwd)
+    # look for a hex address in output
     m = re.search(r"0x[a-fA-F0-9]{40}", out)
     if m:
         return m.group(0)
     return None
+
+
+def parse_deployed_addresses(output: str) -> Dict[str, str]:
+    """Extract `<Contract> deployed to: 0x...` lines from deploy script output."""
+    return {name: addr for name, addr in _DEPLOYED_RE.findall(output)}
+
+
+class JsonRpcClient:
+    """Minimal JSON-RPC client reusing pooled keep-alive HTTP connections."""
+
+    def __init__(self, url: str = DEFAULT_RPC_URL, pool_size: int = 8, timeout: float = 10):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._ids = itertools.count(1)
+
+    def call(self, method: str, params: Optional[List[Any]] = None) -> Any:
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or []}
+        resp = self.session.post(self.url, json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        if data.get("error"):
+            raise RuntimeError(f"JSON-RPC {method} failed: {data['error']}")
+        return data.get("result")
+
+    def batch(self, calls: List[Tuple[str, List[Any]]]) -> List[Any]:
+        """Send several calls in one JSON-RPC batch; results keep call order."""
+        if not calls:
+            return []
+        payload = [
+            {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+            for method, params in calls
+        ]
+        resp = self.session.post(self.url, json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        by_id = {item.get("id"): item for item in resp.json()}
+        results = []
+        for req in payload:
+            item = by_id.get(req["id"], {})
+            if item.get("error"):
+                raise RuntimeError(f"JSON-RPC {req['method']} failed: {item['error']}")
+            results.append(item.get("result"))
+        return results
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class HardhatSession:
+    """Long-lived handle on a local Hardhat node and its deployed contracts.
+
+    The node is attached to (or spawned with `npx hardhat node` when
+    `spawn=True`) on first use. Deployed addresses are cached on disk keyed by
+    network, chain id and a hash of the deploy script and contract sources, and
+    re-verified with `eth_getCode` in a single batched RPC so a restarted node
+    triggers exactly one redeploy.
+    """
+
+    def __init__(
+        self,
+        rpc_url: Optional[str] = None,
+        project_dir: str = CONTRACTS_DIR,
+        network: str = "localhost",
+        cache_path: str = DEPLOY_CACHE_PATH,
+        spawn: bool = True,
+        startup_timeout: float = 30.0,
+    ):
+        self.rpc_url = rpc_url or os.environ.get("HARDHAT_RPC_URL", DEFAULT_RPC_URL)
+        self.project_dir = project_dir
+        self.network = network
+        self.cache_path = cache_path
+        self.spawn = spawn
+        self.startup_timeout = startup_timeout
+        self.rpc = JsonRpcClient(self.rpc_url)
+        self._lock = threading.RLock()
+        self._node: Optional[subprocess.Popen] = None
+        self._chain_id: Optional[int] = None
+        self._code_hash: Optional[Tuple[Any, str]] = None
+        self._addresses: Dict[str, Dict[str, str]] = {}
+
+    def is_alive(self) -> bool:
+        try:
+            self._chain_id = int(self.rpc.call("eth_chainId"), 16)
+            return True
+        except Exception:
+            return False
+
+    def ensure_node(self) -> int:
+        """Attach to the node (spawning it if allowed) and return its chain id."""
+        with self._lock:
+            if self._chain_id is not None and (self._node is None or self._node.poll() is None):
+                return self._chain_id
+            if self.is_alive():
+                return self._chain_id
+            if not self.spawn:
+                raise RuntimeError(f"No Hardhat node reachable at {self.rpc_url}")
+            logger.info("starting hardhat node in %s", self.project_dir)
+            self._node = subprocess.Popen(
+                ["npx", "hardhat", "node"],
+                cwd=self.project_dir,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            deadline = time.time() + self.startup_timeout
+            while time.time() < deadline:
+                if self._node.poll() is not None:
+                    raise RuntimeError("Hardhat node exited during startup")
+                if self.is_alive():
+                    return self._chain_id
+                time.sleep(0.25)
+            raise RuntimeError("Timed out waiting for Hardhat node")
+
+    def code_hash(self, script: str = "scripts/deploy.js") -> str:
+        """Hash the deploy script and contract sources; recomputed only when files change."""
+        paths = [os.path.join(self.project_dir, script)]
+        src_dir = os.path.join(self.project_dir, "contracts")
+        if os.path.isdir(src_dir):
+            paths += sorted(os.path.join(src_dir, fn) for fn in os.listdir(src_dir) if fn.endswith(".sol"))
+        stamp = tuple((p, os.stat(p).st_mtime_ns) for p in paths if os.path.exists(p))
+        if self._code_hash and self._code_hash[0] == stamp:
+            return self._code_hash[1]
+        h = hashlib.sha256()
+        for p, _ in stamp:
+            with open(p, "rb") as f:
+                h.update(f.read())
+        self._code_hash = (stamp, h.hexdigest())
+        return self._code_hash[1]
+
+    def _load_cache(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save_cache(self, key: str, addresses: Dict[str, str]) -> None:
+        data = self._load_cache()
+        data[key] = addresses
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = self.cache_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.cache_path)
+        except Exception as e:
+            logger.debug("Could not persist hardhat deployment cache: %s", e)
+
+    def _has_code(self, addresses: Dict[str, str]) -> bool:
+        if not addresses:
+            return False
+        codes = self.rpc.batch([("eth_getCode", [addr, "latest"]) for addr in addresses.values()])
+        return all(code not in (None, "0x", "0x0") for code in codes)
+
+    def _deploy(self, script: str) -> Dict[str, str]:
+        out = _run_deploy_script(script, self.network, cwd=self.project_dir)
+        addresses = {}
+        try:
+            with open(os.path.join(self.project_dir, "deployments.json"), "r") as f:
+                addresses = dict(json.load(f).get("contracts") or {})
+        except Exception:
+            pass
+        return addresses or parse_deployed_addresses(out)
+
+    def deployed_addresses(self, script: str = "scripts/deploy.js") -> Dict[str, str]:
+        """Return `{contract_name: address}`, deploying only on a cache miss."""
+        with self._lock:
+            chain_id = self.ensure_node()
+            key = f"{self.network}:{chain_id}:{self.code_hash(script)}"
+            cached = self._addresses.get(key) or self._load_cache().get(key)
+            try:
+                alive = bool(cached) and self._has_code(cached)
+            except Exception:
+                # node went away; re-attach (or respawn) on the next call
+                self._chain_id = None
+                raise
+            if alive:
+                self._addresses[key] = cached
+                return dict(cached)
+            logger.info("deploying contracts to %s (cache miss for %s)", self.network, key)
+            addresses = self._deploy(script)
+            self._addresses[key] = addresses
+            self._save_cache(key, addresses)
+            return dict(addresses)
+
+    def deployed_address(self, contract: str = "MightyVerseAssets", script: str = "scripts/deploy.js") -> Optional[str]:
+        return self.deployed_addresses(script).get(contract)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._node is not None and self._node.poll() is None:
+                self._node.terminate()
+                try:
+                    self._node.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    self._node.kill()
+            self._node = None
+            self._chain_id = None
+            self.rpc.close()
+
+
+_session: Optional[HardhatSession] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> HardhatSession:
+    """Return the process-wide `HardhatSession`, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = HardhatSession(
+                project_dir=os.environ.get("HARDHAT_PROJECT_DIR", CONTRACTS_DIR),
+                spawn=os.environ.get("HARDHAT_SPAWN_NODE", "1") == "1",
+            )
+        return _session
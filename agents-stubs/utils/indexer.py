@@ -0,0 +1,418 @@
+"""Local SQLite index of ApprovalRegistry and CreditToken events.
+
+`EventIndexer` follows a JSON-RPC node (e.g. a local Hardhat node via
+`HardhatSession.rpc`) with `eth_getLogs` in block-range batches and keeps:
+
+- `approvals`: one row per operation hash, replayed from
+  `ApprovalRequested/Granted/Completed/Revoked`;
+- `balances`: CreditToken balances, updated by the delta of each ERC-20
+  `Transfer` event as it is indexed or rolled back (mints, burns and
+  deductions all emit one);
+- the raw `CreditsMinted/Burned/Deducted` events, used to reconcile the
+  off-chain credit ledger.
+
+Block hashes are stored as they are indexed; every sync first re-checks the
+most recent ones and rolls back anything above a fork point, so the index is
+reorg-safe. Approval and balance queries for thousands of cards are answered
+from one local query instead of an RPC call per card.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from agents_stubs.utils.eip712 import keccak256
+
+logger = logging.getLogger("mighty.indexer")
+
+
+def _topic(signature: str) -> str:
+    return "0x" + keccak256(signature.encode("utf-8")).hex()
+
+
+APPROVAL_EVENTS = {
+    _topic("ApprovalRequested(bytes32,address,uint256)"): "requested",
+    _topic("ApprovalGranted(bytes32,address)"): "granted",
+    _topic("ApprovalCompleted(bytes32,uint256)"): "completed",
+    _topic("ApprovalRevoked(bytes32,address)"): "revoked",
+}
+CREDIT_EVENTS = {
+    _topic("CreditsMinted(address,uint256,address)"): "minted",
+    _topic("CreditsBurned(address,uint256,address)"): "burned",
+    _topic("CreditsDeducted(address,uint256,string)"): "deducted",
+}
+TRANSFER_TOPIC = _topic("Transfer(address,address,uint256)")
+ASSET_MINTED_TOPIC = _topic("AssetMinted(uint256,address,uint256,string)")
+ZERO_ADDRESS = "0x" + "0" * 40
+
+_GET_APPROVAL_STATUS = keccak256(b"getApprovalStatus(bytes32)")[:4].hex()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS blocks (number INTEGER PRIMARY KEY, hash TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS approval_events (
+    block_number INTEGER, log_index INTEGER, tx_hash TEXT,
+    op_hash TEXT, kind TEXT, actor TEXT, value INTEGER,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS approval_events_op ON approval_events (op_hash);
+CREATE TABLE IF NOT EXISTS credit_events (
+    block_number INTEGER, log_index INTEGER, tx_hash TEXT,
+    kind TEXT, account TEXT, amount TEXT, operation TEXT, actor TEXT,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS credit_events_tx ON credit_events (tx_hash);
+CREATE TABLE IF NOT EXISTS transfers (
+    block_number INTEGER, log_index INTEGER, tx_hash TEXT,
+    src TEXT, dst TEXT, amount TEXT,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS transfers_src ON transfers (src);
+CREATE INDEX IF NOT EXISTS transfers_dst ON transfers (dst);
+CREATE TABLE IF NOT EXISTS approvals (
+    op_hash TEXT PRIMARY KEY, requester TEXT, required INTEGER,
+    approval_count INTEGER, is_approved INTEGER, revoked INTEGER, expires_at INTEGER
+);
+CREATE TABLE IF NOT EXISTS expiries (op_hash TEXT PRIMARY KEY, expires_at INTEGER);
+CREATE TABLE IF NOT EXISTS balances (account TEXT PRIMARY KEY, balance TEXT);
+"""
+
+
+def _add_transfer(deltas: Dict[str, int], src: str, dst: str, amount: int) -> None:
+    deltas[src] = deltas.get(src, 0) - amount
+    deltas[dst] = deltas.get(dst, 0) + amount
+
+
+def _word(data: str, i: int) -> int:
+    return int(data[2 + 64 * i: 2 + 64 * (i + 1)], 16)
+
+
+def _addr(topic: str) -> str:
+    return "0x" + topic[-40:].lower()
+
+
+def _decode_string(data: str, word_offset: int) -> str:
+    start = _word(data, word_offset) // 32
+    length = _word(data, start)
+    raw = bytes.fromhex(data[2 + 64 * (start + 1): 2 + 64 * (start + 1) + 2 * length])
+    return raw.decode("utf-8", errors="replace")
+
+
+def asset_mints(logs: Iterable[Dict[str, Any]], assets_address: str) -> List[Dict[str, Any]]:
+    """Decode the MightyVerseAssets `AssetMinted` events among `logs` (e.g. of one receipt)."""
+    assets_address = assets_address.lower()
+    mints = []
+    for log in logs:
+        topics = log.get("topics") or []
+        if len(topics) < 3 or topics[0] != ASSET_MINTED_TOPIC or (log.get("address") or "").lower() != assets_address:
+            continue
+        data = log.get("data") or "0x"
+        mints.append({
+            "token_id": int(topics[1], 16),
+            "to": _addr(topics[2]),
+            "amount": _word(data, 0),
+            "metadata_uri": _decode_string(data, 1),
+        })
+    return mints
+
+
+class EventIndexer:
+    """Reorg-safe local index answering approval and credit-balance queries."""
+
+    def __init__(
+        self,
+        rpc: Any,
+        db_path: str,
+        addresses: Dict[str, str],
+        start_block: int = 0,
+        batch_size: int = 2000,
+        confirmations: int = 0,
+        reorg_depth: int = 64,
+        fetch_expiry: bool = True,
+    ):
+        self.rpc = rpc
+        self.approval_registry = (addresses.get("ApprovalRegistry") or "").lower() or None
+        self.credit_token = (addresses.get("CreditToken") or "").lower() or None
+        self.start_block = start_block
+        self.batch_size = batch_size
+        self.confirmations = confirmations
+        self.reorg_depth = reorg_depth
+        self.fetch_expiry = fetch_expiry
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+
+    # -- state ---------------------------------------------------------------
+
+    @property
+    def last_block(self) -> int:
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'last_block'").fetchone()
+        return int(row[0]) if row else self.start_block - 1
+
+    def _set_last_block(self, number: int) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_block', ?)", (str(number),))
+
+    # -- sync ----------------------------------------------------------------
+
+    def sync(self, to_block: Optional[int] = None) -> Dict[str, int]:
+        """Index new blocks up to `to_block` (default: head - confirmations).
+
+        Returns counts of indexed blocks and logs and any rolled-back blocks.
+        """
+        with self._lock:
+            rolled_back = self._handle_reorg()
+            head = int(self.rpc.call("eth_blockNumber"), 16)
+            target = head - self.confirmations if to_block is None else min(to_block, head)
+            start = self.last_block + 1
+            first = start
+            logs_seen = 0
+            addresses = [a for a in (self.approval_registry, self.credit_token) if a]
+            topics = list(APPROVAL_EVENTS) + list(CREDIT_EVENTS) + [TRANSFER_TOPIC]
+            while start <= target:
+                end = min(start + self.batch_size - 1, target)
+                logs = self.rpc.call("eth_getLogs", [{
+                    "fromBlock": hex(start), "toBlock": hex(end), "address": addresses, "topics": [topics],
+                }]) or []
+                end_block = self.rpc.call("eth_getBlockByNumber", [hex(end), False])
+                self._ingest(logs, end, end_block["hash"] if end_block else None)
+                logs_seen += len(logs)
+                start = end + 1
+            return {"from_block": first, "to_block": max(target, first - 1), "logs": logs_seen, "rolled_back": rolled_back}
+
+    def _handle_reorg(self) -> int:
+        rows = self.db.execute(
+            "SELECT number, hash FROM blocks ORDER BY number DESC LIMIT ?", (self.reorg_depth,)
+        ).fetchall()
+        if not rows:
+            return 0
+        chain = self.rpc.batch([("eth_getBlockByNumber", [hex(n), False]) for n, _ in rows])
+        fork = None
+        for (number, stored), block in zip(rows, chain):
+            if block and block.get("hash") == stored:
+                fork = number
+                break
+        if fork == rows[0][0]:
+            return 0
+        if fork is None:
+            fork = rows[-1][0] - 1
+        logger.warning("reorg detected: rolling back index above block %d", fork)
+        self._rollback(fork)
+        return rows[0][0] - fork
+
+    def _rollback(self, fork: int) -> None:
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            ops = {r[0] for r in db.execute("SELECT op_hash FROM approval_events WHERE block_number > ?", (fork,))}
+            deltas: Dict[str, int] = {}
+            for src, dst, amount in db.execute(
+                "SELECT src, dst, amount FROM transfers WHERE block_number > ?", (fork,)
+            ):
+                _add_transfer(deltas, src, dst, -int(amount))
+            for table in ("approval_events", "credit_events", "transfers"):
+                db.execute(f"DELETE FROM {table} WHERE block_number > ?", (fork,))
+            db.execute("DELETE FROM blocks WHERE number > ?", (fork,))
+            self._refresh_approvals(ops)
+            self._apply_balance_deltas(deltas)
+            self._set_last_block(fork)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def _ingest(self, logs: List[Dict[str, Any]], end: int, end_hash: Optional[str]) -> None:
+        db = self.db
+        ops: Set[str] = set()
+        new_ops: Set[str] = set()
+        blocks: Dict[int, str] = {}
+        approval_rows, credit_rows, transfer_rows = [], [], []
+        for log in logs:
+            if log.get("removed"):
+                continue
+            topics = log.get("topics") or []
+            if not topics:
+                continue
+            number = int(log["blockNumber"], 16)
+            index = int(log["logIndex"], 16)
+            blocks[number] = log["blockHash"]
+            address = (log.get("address") or "").lower()
+            data = log.get("data") or "0x"
+            t0 = topics[0]
+            if t0 in APPROVAL_EVENTS and address == self.approval_registry:
+                kind = APPROVAL_EVENTS[t0]
+                op = topics[1].lower()
+                actor = _addr(topics[2]) if len(topics) > 2 else None
+                value = _word(data, 0) if len(data) > 2 else None
+                approval_rows.append((number, index, log["transactionHash"].lower(), op, kind, actor, value))
+                ops.add(op)
+                if kind == "requested":
+                    new_ops.add(op)
+            elif t0 in CREDIT_EVENTS and address == self.credit_token:
+                kind = CREDIT_EVENTS[t0]
+                account = _addr(topics[1])
+                operation = _decode_string(data, 1) if kind == "deducted" else None
+                actor = _addr(topics[2]) if len(topics) > 2 else None
+                credit_rows.append((number, index, log["transactionHash"].lower(), kind, account, str(_word(data, 0)), operation, actor))
+            elif t0 == TRANSFER_TOPIC and address == self.credit_token and len(topics) == 3:
+                src, dst = _addr(topics[1]), _addr(topics[2])
+                transfer_rows.append((number, index, log["transactionHash"].lower(), src, dst, str(_word(data, 0))))
+        if end_hash:
+            blocks[end] = end_hash
+        expiries = self._fetch_expiries(new_ops) if new_ops and self.fetch_expiry else {}
+
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("INSERT OR REPLACE INTO approval_events VALUES (?, ?, ?, ?, ?, ?, ?)", approval_rows)
+            db.executemany("INSERT OR REPLACE INTO credit_events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", credit_rows)
+            deltas = self._store_transfers(transfer_rows)
+            db.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?)", blocks.items())
+            db.executemany("INSERT OR REPLACE INTO expiries VALUES (?, ?)", expiries.items())
+            self._refresh_approvals(ops)
+            self._apply_balance_deltas(deltas)
+            self._set_last_block(end)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def _fetch_expiries(self, ops: Iterable[str]) -> Dict[str, int]:
+        ops = sorted(ops)
+        calls = [
+            ("eth_call", [{"to": self.approval_registry, "data": "0x" + _GET_APPROVAL_STATUS + op[2:]}, "latest"])
+            for op in ops
+        ]
+        try:
+            results = self.rpc.batch(calls)
+        except Exception as e:
+            logger.debug("Could not fetch approval expiries: %s", e)
+            return {}
+        # ApprovalStatus(bool,uint256,uint256,uint256,uint256 expiresAt,address)
+        return {op: _word(res, 4) for op, res in zip(ops, results) if res and len(res) >= 2 + 64 * 6}
+
+    def _refresh_approvals(self, ops: Iterable[str]) -> None:
+        db = self.db
+        for op in ops:
+            state = None
+            for kind, actor, value in db.execute(
+                "SELECT kind, actor, value FROM approval_events WHERE op_hash = ? ORDER BY block_number, log_index",
+                (op,),
+            ):
+                if kind == "requested":
+                    state = {"requester": actor, "required": value, "count": 0, "approved": 0, "revoked": 0}
+                elif state is None:
+                    continue
+                elif kind == "granted":
+                    state["count"] += 1
+                elif kind == "completed":
+                    state["approved"] = 1
+                elif kind == "revoked":
+                    state.update(count=0, approved=0, revoked=1)
+            if state is None:
+                db.execute("DELETE FROM approvals WHERE op_hash = ?", (op,))
+                continue
+            row = db.execute("SELECT expires_at FROM expiries WHERE op_hash = ?", (op,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO approvals VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (op, state["requester"], state["required"], state["count"], state["approved"], state["revoked"],
+                 row[0] if row else None),
+            )
+
+    def _store_transfers(self, rows: List[tuple]) -> Dict[str, int]:
+        """Upsert transfer rows; returns the balance change per account.
+
+        A row already in the index (e.g. a re-fetched block) has its stored
+        transfer backed out first, so overlapping ranges are not counted twice.
+        """
+        db = self.db
+        deltas: Dict[str, int] = {}
+        for row in rows:
+            old = db.execute(
+                "SELECT src, dst, amount FROM transfers WHERE block_number = ? AND log_index = ?", row[:2]
+            ).fetchone()
+            if old:
+                _add_transfer(deltas, old[0], old[1], -int(old[2]))
+            db.execute("INSERT OR REPLACE INTO transfers VALUES (?, ?, ?, ?, ?, ?)", row)
+            _add_transfer(deltas, row[3], row[4], int(row[5]))
+        return deltas
+
+    def _apply_balance_deltas(self, deltas: Dict[str, int]) -> None:
+        db = self.db
+        for account, delta in deltas.items():
+            if account == ZERO_ADDRESS or not delta:
+                continue
+            row = db.execute("SELECT balance FROM balances WHERE account = ?", (account,)).fetchone()
+            balance = (int(row[0]) if row else 0) + delta
+            db.execute("INSERT OR REPLACE INTO balances VALUES (?, ?)", (account, str(balance)))
+
+    # -- queries -------------------------------------------------------------
+
+    def _lookup(self, table: str, key: str, values: Iterable[str], columns: str) -> List[tuple]:
+        values = sorted({v.lower() for v in values})
+        if not values:
+            return []
+        with self._lock:
+            db = self.db
+            db.execute("CREATE TEMP TABLE IF NOT EXISTS _q (v TEXT PRIMARY KEY)")
+            db.execute("DELETE FROM _q")
+            db.executemany("INSERT INTO _q VALUES (?)", ((v,) for v in values))
+            return db.execute(f"SELECT {columns} FROM {table} JOIN _q ON {table}.{key} = _q.v").fetchall()
+
+    def approval_status(self, op_hashes: Iterable[str], now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Return `{op_hash: status}` for all known hashes in a single query.
+
+        `is_approved` mirrors `ApprovalRegistry.isApproved`, including expiry
+        when it could be fetched at index time.
+        """
+        now = time.time() if now is None else now
+        out = {}
+        rows = self._lookup(
+            "approvals", "op_hash", op_hashes,
+            "op_hash, requester, required, approval_count, is_approved, revoked, expires_at",
+        )
+        for op, requester, required, count, approved, revoked, expires_at in rows:
+            out[op] = {
+                "requester": requester,
+                "required_approvals": required,
+                "approval_count": count,
+                "completed": bool(approved),
+                "revoked": bool(revoked),
+                "expires_at": expires_at,
+                "is_approved": bool(approved) and (expires_at is None or now <= expires_at),
+            }
+        return out
+
+    def is_approved(self, op_hashes: Iterable[str], now: Optional[float] = None) -> Dict[str, bool]:
+        op_hashes = [o.lower() for o in op_hashes]
+        status = self.approval_status(op_hashes, now)
+        return {op: bool(status.get(op, {}).get("is_approved")) for op in op_hashes}
+
+    def balances(self, accounts: Iterable[str]) -> Dict[str, int]:
+        accounts = [a.lower() for a in accounts]
+        found = {a: int(b) for a, b in self._lookup("balances", "account", accounts, "account, balance")}
+        return {a: found.get(a, 0) for a in accounts}
+
+    def can_afford(self, account: str, amount: int) -> bool:
+        return self.balances([account])[account.lower()] >= int(amount)
+
+    def deductions_by_tx(self, tx_hashes: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Return indexed `CreditsDeducted` events grouped by transaction hash."""
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        rows = self._lookup(
+            "credit_events", "tx_hash", tx_hashes, "tx_hash, account, amount, operation, block_number, kind"
+        )
+        for tx, account, amount, operation, block, kind in rows:
+            if kind == "deducted":
+                out.setdefault(tx, []).append(
+                    {"account": account, "amount": int(amount), "operation": operation, "block_number": block}
+                )
+        return out
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def from_hardhat_session(session: Any, db_path: str, **kwargs: Any) -> EventIndexer:
+    """Build an indexer against the contracts deployed by a `HardhatSession`."""
+    return EventIndexer(session.rpc, db_path, session.deployed_addresses(), **kwargs)
@@ -0,0 +1,111 @@
+"""Fast JSON / MessagePack serialization helpers.
+
+orjson is used when installed (several times faster than the stdlib for the
+large nested review and manifest dicts) and falls back to `json` otherwise,
+including for values orjson rejects such as integers wider than 64 bits.
+Compact output uses no whitespace; pretty output is indented by 2 like the
+existing CLI files. MessagePack needs the optional `msgpack` package.
+
+Set MIGHTY_FAST_JSON=0 to force the stdlib encoder.
+"""
+import json
+import os
+from typing import Any, Optional
+
+try:
+    import orjson
+except Exception:  # optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except Exception:  # optional dependency
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _fast() -> bool:
+    return orjson is not None and os.environ.get("MIGHTY_FAST_JSON", "1") != "0"
+
+
+def _default(value: Any) -> Any:
+    # numpy scalars/arrays and other objects exposing tolist()/item()
+    for attr in ("tolist", "item"):
+        if hasattr(value, attr):
+            return getattr(value, attr)()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, pretty: bool = False, sort_keys: bool = False) -> bytes:
+    """Serialize `obj` to UTF-8 JSON bytes."""
+    if _fast():
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=_default, option=option)
+        except TypeError:
+            pass  # e.g. integers > 64 bits; the stdlib handles them
+    if pretty:
+        text = json.dumps(obj, indent=2, sort_keys=sort_keys, default=_default, ensure_ascii=False)
+    else:
+        text = json.dumps(obj, separators=(",", ":"), sort_keys=sort_keys, default=_default, ensure_ascii=False)
+    return text.encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    if _fast():
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_json(path: str, obj: Any, compact: bool = False) -> str:
+    """Write `obj` to `path` (indented unless `compact`) and return the path."""
+    with open(path, "wb") as f:
+        f.write(dumps(obj, pretty=not compact))
+    return path
+
+
+def packb(obj: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick MSGPACK when the client prefers it (and msgpack is installed), else JSON."""
+    if not accept or msgpack is None:
+        return JSON
+    best, best_q = JSON, -1.0
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        media = media.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in _MSGPACK_TYPES:
+            kind = MSGPACK
+        elif media in (JSON, "application/*", "*/*"):
+            kind = JSON
+        else:
+            continue
+        # ties go to JSON so `*/*` alongside msgpack does not switch formats
+        if q > best_q or (q == best_q and kind == JSON):
+            best, best_q = kind, q
+    return best if best_q > 0 else JSON
@@ -0,0 +1,241 @@
+"""In-process metrics primitives for the agent service.
+
+Kept dependency-free so the stubs run anywhere. Snapshots are plain dicts
+suitable for a JSON stats endpoint, and `REGISTRY.render()` produces the
+Prometheus text exposition format served at `/metrics`.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate quantiles.
+
+    `buckets` are inclusive upper bounds; values above the last bucket land
+    in an implicit `+Inf` bucket.
+    """
+
+    def __init__(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS, help: str = ""):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+            if self._max is None or value > self._max:
+                self._max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (max for +Inf)."""
+        with self._lock:
+            if not self._count:
+                return None
+            rank = q * self._count
+            seen = 0
+            for idx, count in enumerate(self._counts):
+                seen += count
+                if count and seen >= rank:
+                    return self.buckets[idx] if idx < len(self.buckets) else self._max
+            return self._max
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count, peak = self._sum, self._count, self._max
+        bounds = [str(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else None,
+            "max": peak,
+            "buckets": dict(zip(bounds, counts)),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def linear_buckets(start: float, width: float, count: int) -> Iterable[float]:
+    return [start + width * i for i in range(count)]
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+
+class MetricFamily:
+    """A named metric with one child per distinct label set."""
+
+    def __init__(self, kind: str, name: str, help: str, labelnames: Sequence[str], factory: Callable[[], Any]):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: Any) -> Any:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def children(self) -> List[Tuple[Dict[str, str], Any]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.labelnames, key)), child) for key, child in items]
+
+
+def _fmt_labels(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels.items()) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _fmt_value(value: Optional[float]) -> str:
+    if value is None:
+        return "NaN"
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Registry:
+    """Collection of metric families rendered together for `/metrics`."""
+
+    def __init__(self) -> None:
+        self._families: Dict[str, MetricFamily] = {}
+        self._callbacks: Dict[str, Tuple[str, str, Callable[[], Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _family(self, kind: str, name: str, help: str, labelnames: Sequence[str], factory: Callable[[], Any]) -> MetricFamily:
+        with self._lock:
+            fam = self._families.get(name)
+            if fam is None:
+                fam = self._families[name] = MetricFamily(kind, name, help, labelnames, factory)
+            return fam
+
+    def counter(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._family("counter", name, help, labelnames, Counter)
+
+    def gauge(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._family("gauge", name, help, labelnames, Gauge)
+
+    def histogram(
+        self, name: str, help: str = "", labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> MetricFamily:
+        return self._family("histogram", name, help, labelnames, lambda: Histogram(name, buckets, help))
+
+    def family(self, name: str) -> Optional[MetricFamily]:
+        with self._lock:
+            return self._families.get(name)
+
+    def register_histogram(self, histogram: Histogram) -> None:
+        """Expose an existing unlabeled `Histogram` (replacing one with the same name)."""
+        fam = MetricFamily("histogram", histogram.name, histogram.help, (), lambda: histogram)
+        fam.labels()
+        with self._lock:
+            self._families[histogram.name] = fam
+
+    def gauge_callback(self, name: str, fn: Callable[[], Any], help: str = "", kind: str = "gauge") -> None:
+        """Evaluate `fn` at render time; it returns a number or `{((label, value), ...): number}`."""
+        with self._lock:
+            self._callbacks[name] = (kind, help, fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            families = list(self._families.values())
+            callbacks = list(self._callbacks.items())
+        for fam in families:
+            lines.append(f"# HELP {fam.name} {fam.help}")
+            lines.append(f"# TYPE {fam.name} {fam.kind}")
+            for labels, child in fam.children():
+                if fam.kind == "histogram":
+                    snap = child.snapshot()
+                    cumulative = 0
+                    for bound, count in snap["buckets"].items():
+                        cumulative += count
+                        lines.append(f"{fam.name}_bucket{_fmt_labels(labels, ('le', bound))} {cumulative}")
+                    lines.append(f"{fam.name}_sum{_fmt_labels(labels)} {_fmt_value(snap['sum'])}")
+                    lines.append(f"{fam.name}_count{_fmt_labels(labels)} {snap['count']}")
+                else:
+                    lines.append(f"{fam.name}{_fmt_labels(labels)} {_fmt_value(child.value)}")
+        for name, (kind, help, fn) in callbacks:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            samples = value.items() if isinstance(value, dict) else [((), value)]
+            for labels, v in samples:
+                lines.append(f"{name}{_fmt_labels(dict(labels))} {_fmt_value(v)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+@contextmanager
+def timed(family: MetricFamily, **labels: Any) -> Iterator[Dict[str, Any]]:
+    """Observe the block's duration; set `ctx["outcome"]` to label the result.
+
+    `family` must have an `outcome` label; it defaults to `ok`, or `error`
+    when the block raises.
+    """
+    ctx: Dict[str, Any] = {"outcome": "ok"}
+    start = time.perf_counter()
+    try:
+        yield ctx
+    except BaseException:
+        ctx["outcome"] = "error"
+        raise
+    finally:
+        family.labels(outcome=ctx["outcome"], **labels).observe(time.perf_counter() - start)
+
+
+def ratio(hits: float, misses: float) -> Optional[float]:
+    total = hits + misses
+    return hits / total if total else None
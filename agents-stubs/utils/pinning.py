@@ -3,8 +3,79 @@
 This module uses a small retry/backoff loop to tolerate transient network errors.
 """
 from typing import Dict, Any, Optional
+import os
 import time
-import requests
+
+requests = None  # imported on first pin; tests may patch this module global
+
+
+def _http() -> Any:
+    global requests
+    if requests is None:
+        import requests as _requests
+
+        requests = _requests
+    return requests
+
+
+try:
+    from agents_stubs.utils import tracing as _tracing
+except ModuleNotFoundError as e:
+    if e.name != "agents_stubs":
+        raise
+    _tracing = None  # loaded from its path by a script: no tracing
+
+
+def api_url() -> str:
+    """nft.storage API base URL; NFT_STORAGE_API_URL points pins at a gateway or a local mock."""
+    return os.environ.get("NFT_STORAGE_API_URL", "https://api.nft.storage").rstrip("/")
+
+
+def _attempt_span(kind: str, attempt: int) -> Any:
+    if _tracing is None:
+        return None
+    return _tracing.start_span("pin.attempt", kind=kind, attempt=attempt)
+
+
+def _backoff(kind: str, seconds: float) -> None:
+    """Sleep before the next attempt, traced so retry waits show up in the request."""
+    if _tracing is None:
+        time.sleep(seconds)
+        return
+    with _tracing.span("pin.backoff", kind=kind, seconds=seconds):
+        time.sleep(seconds)
+
+
+def _record_attempt(kind: str, attempt: int, start: float, ok: bool, span: Any = None) -> None:
+    """Record one pin attempt's latency; attempts after the first count as retries."""
+    if span is not None:
+        span.set_attribute("outcome", "ok" if ok else "error")
+        if not ok:
+            span.status = "error"
+        span.end()
+    try:
+        from agents_stubs.utils.metrics import REGISTRY
+    except Exception:
+        return
+    outcome = "ok" if ok else "error"
+    REGISTRY.histogram(
+        "mighty_pin_attempt_duration_seconds",
+        "nft.storage pin attempt latency",
+        ("kind", "attempt", "outcome"),
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    ).labels(kind=kind, attempt=attempt, outcome=outcome).observe(time.time() - start)
+    if attempt > 1:
+        REGISTRY.counter("mighty_pin_retries_total", "nft.storage pin retries", ("kind", "outcome")).labels(
+            kind=kind, outcome=outcome
+        ).inc()
+
+
+def _record_failure(kind: str) -> None:
+    try:
+        from agents_stubs.utils.metrics import REGISTRY
+    except Exception:
+        return
+    REGISTRY.counter("mighty_pin_failures_total", "Pins that failed after all attempts", ("kind",)).labels(kind=kind).inc()
 
 
 def pin_json_with_retries(obj: Dict[str, Any], api_key: str, attempts: int = 3, backoff: float = 0.5) -> Optional[str]:
@@ -12,7 +83,7 @@ def pin_json_with_retries(obj: Dict[str, Any], api_key: str, attempts: int = 3,
 
     Note: this intentionally uses requests to avoid adding heavy SDK dependencies.
     """
-    url = "https://api.nft.storage/store"
+    url = f"{api_url()}/store"
     headers = {"Authorization": f"Bearer {api_key}"}
     last_exc = None
     # Prefer SDK if available
@@ -37,8 +108,9 @@ def pin_json_with_retries(obj: Dict[str, Any], api_key: str, attempts: int = 3,
 
     for i in range(attempts):
         start = time.time()
+        span = _attempt_span("json", i + 1)
         try:
-            resp = requests.post(url, json=obj, headers=headers, timeout=10)
+            resp = _http().post(url, json=obj, headers=headers, timeout=10)
             resp.raise_for_status()
             data = resp.json()
             value = data.get("value", {})
@@ -51,6 +123,7 @@ def pin_json_with_retries(obj: Dict[str, Any], api_key: str, attempts: int = 3,
             if not cid:
                 cid = value.get("/") or data.get("cid")
             duration = time.time() - start
+            _record_attempt("json", i + 1, start, True, span)
             try:
                 import logging
 
@@ -60,9 +133,11 @@ def pin_json_with_retries(obj: Dict[str, Any], api_key: str, attempts: int = 3,
             return cid
         except Exception as e:
             last_exc = e
+            _record_attempt("json", i + 1, start, False, span)
             # exponential backoff
-            time.sleep(backoff * (2 ** i))
+            _backoff("json", backoff * (2 ** i))
     # if we reach here, all attempts failed
+    _record_failure("json")
     raise last_exc
 
 
@@ -71,7 +146,7 @@ def pin_file_with_retries(file_path: str, api_key: str, attempts: int = 3, backo
 
     Returns the CID string on success or raises the last exception on failure.
     """
-    url = "https://api.nft.storage/upload"
+    url = f"{api_url()}/upload"
     headers = {"Authorization": f"Bearer {api_key}"}
     last_exc = None
 
@@ -94,10 +169,11 @@ def pin_file_with_retries(file_path: str, api_key: str, attempts: int = 3, backo
 
     for i in range(attempts):
         start = time.time()
+        span = _attempt_span("file", i + 1)
         try:
             with open(file_path, "rb") as fh:
                 files = {"file": fh}
-                resp = requests.post(url, files=files, headers=headers, timeout=30)
+                resp = _http().post(url, files=files, headers=headers, timeout=30)
             resp.raise_for_status()
             data = resp.json()
             value = data.get("value", {})
@@ -110,6 +186,7 @@ def pin_file_with_retries(file_path: str, api_key: str, attempts: int = 3, backo
             if not cid:
                 cid = value.get("/") or data.get("cid")
             duration = time.time() - start
+            _record_attempt("file", i + 1, start, True, span)
             try:
                 import logging
 
@@ -119,6 +196,7 @@ def pin_file_with_retries(file_path: str, api_key: str, attempts: int = 3, backo
             return cid
         except Exception as e:
             last_exc = e
+            _record_attempt("file", i + 1, start, False, span)
             # write a pending manifest entry on final failure
             if i == attempts - 1:
                 try:
@@ -137,6 +215,7 @@ def pin_file_with_retries(file_path: str, api_key: str, attempts: int = 3, backo
                         json.dump(pm, wf)
                 except Exception:
                     pass
-            time.sleep(backoff * (2 ** i))
+            _backoff("file", backoff * (2 ** i))
 
+    _record_failure("file")
     raise last_exc
@@ -0,0 +1,199 @@
+"""Opt-in CPU and memory profiling for requests, batches and CLI runs.
+
+Modes (comma-separated):
+- cpu: cProfile of the calling thread, written as `.prof` (pstats; open
+  with snakeviz, or convert with flameprof / gprof2dot)
+- sample: wall-clock stack sampling of the calling thread, written as
+  `.folded` collapsed stacks (flamegraph.pl, speedscope, inferno)
+- mem: tracemalloc snapshot (`.tracemalloc`) plus a `.txt` of the top
+  allocation sites
+
+Triggers:
+- MIGHTY_PROFILE=<modes> profiles every request, micro-batch and CLI run
+- `X-Mighty-Profile: <modes>` profiles one request when the service runs
+  with MIGHTY_PROFILE_HEADER=1
+- `--profile <modes>` on `agents_stubs.cli`
+
+Files go to MIGHTY_PROFILE_DIR (default ./profiles). Only one profile runs
+at a time per process; overlapping requests run unprofiled.
+
+`rss_bytes()` / `peak_rss_bytes()` are also used for the per-integration
+memory metrics and the prefork worker memory budget.
+"""
+import contextlib
+import contextvars
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+logger = logging.getLogger("mighty.profiling")
+
+MODES = ("cpu", "sample", "mem")
+HEADER = "x-mighty-profile"
+
+_requested: "contextvars.ContextVar[Optional[Tuple[str, ...]]]" = contextvars.ContextVar("mighty_profile", default=None)
+_busy = threading.Lock()
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process (Linux), else peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """High-water RSS of this process so far."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def parse_modes(value: Optional[str]) -> Tuple[str, ...]:
+    if not value:
+        return ()
+    if value.strip().lower() in ("1", "all", "true"):
+        return MODES
+    return tuple(m for m in (p.strip().lower() for p in value.split(",")) if m in MODES)
+
+
+def header_allowed() -> bool:
+    return os.environ.get("MIGHTY_PROFILE_HEADER", "0") == "1"
+
+
+def requested_modes() -> Tuple[str, ...]:
+    """Modes asked for by the current request, else MIGHTY_PROFILE."""
+    modes = _requested.get()
+    if modes is not None:
+        return modes
+    return parse_modes(os.environ.get("MIGHTY_PROFILE"))
+
+
+@contextlib.contextmanager
+def request(modes: Sequence[str]) -> Iterator[None]:
+    """Request profiling for work done in this context (e.g. one HTTP request)."""
+    token = _requested.set(tuple(modes))
+    try:
+        yield
+    finally:
+        _requested.reset(token)
+
+
+class _StackSampler(threading.Thread):
+    """Sample one thread's stack every `interval` seconds into folded-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="mighty-profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._halt = threading.Event()
+
+    def run(self) -> None:
+        while not self._halt.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join()
+
+
+class Profile:
+    """Profile the enclosed block in the given modes; `files` lists what was written."""
+
+    def __init__(self, label: str, modes: Sequence[str], out_dir: Optional[str] = None):
+        self.label = "".join(c if c.isalnum() or c in "-_." else "_" for c in label)
+        self.modes = tuple(modes)
+        self.out_dir = out_dir or os.environ.get("MIGHTY_PROFILE_DIR", "profiles")
+        self.files: Dict[str, str] = {}
+        self.seconds = 0.0
+        self._cpu: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_StackSampler] = None
+        self._tracing_mem = False
+
+    def _path(self, ext: str) -> str:
+        return os.path.join(self.out_dir, f"{self.label}-{self._stamp}.{ext}")
+
+    def __enter__(self) -> "Profile":
+        self._stamp = f"{int(time.time() * 1000)}-{os.getpid()}"
+        self._start = time.perf_counter()
+        if "mem" in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start(int(os.environ.get("MIGHTY_PROFILE_MEM_FRAMES", "16")))
+            self._tracing_mem = True
+        if "sample" in self.modes:
+            interval = float(os.environ.get("MIGHTY_PROFILE_INTERVAL_MS", "5")) / 1000.0
+            self._sampler = _StackSampler(threading.get_ident(), interval)
+            self._sampler.start()
+        if "cpu" in self.modes:
+            self._cpu = cProfile.Profile()
+            try:
+                self._cpu.enable()
+            except ValueError as e:  # another profiler (e.g. coverage) is active
+                logger.info("cpu profile skipped: %s", e)
+                self._cpu = None
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.seconds = time.perf_counter() - self._start
+        if self._cpu is not None:
+            self._cpu.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        snapshot = tracemalloc.take_snapshot() if "mem" in self.modes and tracemalloc.is_tracing() else None
+        if self._tracing_mem:
+            tracemalloc.stop()
+        try:
+            self._write(snapshot)
+        except OSError:
+            logger.exception("could not write profile for %s", self.label)
+
+    def _write(self, snapshot: Optional[tracemalloc.Snapshot]) -> None:
+        os.makedirs(self.out_dir, exist_ok=True)
+        if self._cpu is not None:
+            self.files["cpu"] = self._path("prof")
+            self._cpu.dump_stats(self.files["cpu"])
+        if self._sampler is not None:
+            self.files["sample"] = self._path("folded")
+            with open(self.files["sample"], "w") as f:
+                for stack, count in self._sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        if snapshot is not None:
+            self.files["mem"] = self._path("tracemalloc")
+            snapshot.dump(self.files["mem"])
+            self.files["mem_top"] = self._path("txt")
+            with open(self.files["mem_top"], "w") as f:
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+        logger.info("profiled %s in %.3fs: %s", self.label, self.seconds, self.files)
+
+
+@contextlib.contextmanager
+def maybe(label: str, modes: Optional[Sequence[str]] = None) -> Iterator[Optional[Profile]]:
+    """Profile the block if profiling was requested; yields the Profile or None."""
+    modes = tuple(modes) if modes is not None else requested_modes()
+    if not modes or not _busy.acquire(blocking=False):
+        if modes:
+            logger.info("profile for %s skipped: another profile is running", label)
+        yield None
+        return
+    try:
+        with Profile(label, modes) as prof:
+            yield prof
+    finally:
+        _busy.release()
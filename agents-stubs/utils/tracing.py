@@ -0,0 +1,330 @@
+"""Lightweight span tracing with W3C `traceparent` propagation.
+
+Spans are kept in a contextvar, so nesting follows the call stack across
+the service, agents, integrations and pinning without passing anything
+around. Hand work to another thread with `bind(fn)`; `anyio` worker
+threads (sync FastAPI endpoints) already inherit the context.
+
+Finished spans go to an exporter, usually once their local root span ends.
+Exporters write OTLP/JSON (`resourceSpans`) lines:
+- MIGHTY_TRACE_EXPORTER=stdout
+- MIGHTY_TRACE_EXPORTER=file with MIGHTY_TRACE_FILE (default ./traces.jsonl)
+- or `set_exporter(obj)` with any object that has `export(spans)`
+
+Tracing is off when no exporter is configured. The sampling decision is
+made once per trace (MIGHTY_TRACE_SAMPLE_RATE, default 0.01). An incoming
+`traceparent` always supplies the trace id, but its sampled flag is only
+honored with MIGHTY_TRACE_TRUST_PARENT=1 (callers are trusted upstream
+services); otherwise the local rate decides, so clients cannot force every
+request to be recorded. Unsampled traces still carry ids but record nothing.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("mighty.tracing")
+
+SERVICE_NAME = "mighty-agents"
+
+
+class _Batch:
+    """Spans of one local trace, exported together when the local root ends."""
+
+    __slots__ = ("spans", "closed", "lock")
+
+    def __init__(self) -> None:
+        self.spans: List["Span"] = []
+        self.closed = False
+        self.lock = threading.Lock()
+
+
+class Span:
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "sampled", "attributes",
+        "events", "links", "status", "start_ns", "end_ns", "_batch", "_local_root",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, batch: Optional[_Batch]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.links: List["Span"] = []
+        self.status = "unset"
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._local_root = batch is None
+        self._batch = _Batch() if batch is None else batch
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        if self.sampled:
+            self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def set_error(self, exc: BaseException) -> None:
+        if self.sampled:
+            self.status = "error"
+            self.add_event("exception", type=type(exc).__name__, message=str(exc))
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if not self.sampled:
+            return
+        if self.status == "unset":
+            self.status = "ok"
+        exporter = get_exporter()
+        if exporter is None:
+            return
+        batch = self._batch
+        with batch.lock:
+            if self._local_root:
+                batch.closed = True
+                spans, batch.spans = batch.spans + [self], []
+            elif batch.closed:
+                spans = [self]  # outlived its local root (e.g. background work)
+            else:
+                batch.spans.append(self)
+                return
+        _export(exporter, spans)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": {"unset": 0, "ok": 1, "error": 2}[self.status]},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.events:
+            span["events"] = [
+                {"name": e["name"], "timeUnixNano": str(e["time_ns"]), "attributes": _otlp_attributes(e["attributes"])}
+                for e in self.events
+            ]
+        if self.links:
+            span["links"] = [{"traceId": l.trace_id, "spanId": l.span_id} for l in self.links]
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attrs: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attrs.items() if v is not None]
+
+
+def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME, "process.pid": os.getpid()})},
+            "scopeSpans": [{"scope": {"name": "mighty.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+        }]
+    }
+
+
+class StreamExporter:
+    """Write one OTLP/JSON line per exported batch to a text stream."""
+
+    def __init__(self, stream: Any = None):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        line = json.dumps(to_otlp(spans), separators=(",", ":"))
+        with self._lock:
+            stream = self.stream or sys.stdout
+            stream.write(line + "\n")
+            stream.flush()
+
+
+class FileExporter(StreamExporter):
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        line = json.dumps(to_otlp(spans), separators=(",", ":"))
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class InMemoryExporter:
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]) -> None:
+        self.spans.extend(spans)
+
+
+def _export(exporter: Any, spans: List[Span]) -> None:
+    try:
+        exporter.export(spans)
+    except Exception:
+        logger.exception("trace export failed")
+
+
+_UNSET = object()
+_exporter: Any = _UNSET
+_sample_rate: Optional[float] = None
+_trust_parent: Optional[bool] = None
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("mighty_span", default=None)
+
+
+def set_exporter(exporter: Any, sample_rate: Optional[float] = None) -> None:
+    """Install an exporter (None disables tracing) and optionally a sample rate."""
+    global _exporter, _sample_rate
+    _exporter = exporter
+    if sample_rate is not None:
+        _sample_rate = sample_rate
+
+
+def get_exporter() -> Any:
+    global _exporter
+    if _exporter is _UNSET:
+        kind = os.environ.get("MIGHTY_TRACE_EXPORTER", "").lower()
+        if kind == "stdout":
+            _exporter = StreamExporter()
+        elif kind == "file":
+            _exporter = FileExporter(os.environ.get("MIGHTY_TRACE_FILE", "traces.jsonl"))
+        else:
+            _exporter = None
+    return _exporter
+
+
+def sample_rate() -> float:
+    global _sample_rate
+    if _sample_rate is None:
+        _sample_rate = float(os.environ.get("MIGHTY_TRACE_SAMPLE_RATE", "0.01"))
+    return _sample_rate
+
+
+def trust_parent() -> bool:
+    """Whether an incoming `traceparent` sampled flag decides sampling."""
+    global _trust_parent
+    if _trust_parent is None:
+        _trust_parent = os.environ.get("MIGHTY_TRACE_TRUST_PARENT", "0") == "1"
+    return _trust_parent
+
+
+def enabled() -> bool:
+    return get_exporter() is not None
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Dict[str, Any]]:
+    parts = (header or "").strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        sampled = bool(int(parts[3][:2], 16) & 1)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32:
+        return None
+    return {"trace_id": parts[1], "parent_id": parts[2], "sampled": sampled}
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Optional[Span]:
+    """Create a span under the current one (or a new trace); returns None when tracing is off."""
+    if not enabled():
+        return None
+    parent = _current.get()
+    if parent is not None:
+        span = Span(name, parent.trace_id, parent.span_id, parent.sampled, parent._batch)
+    else:
+        remote = parse_traceparent(traceparent)
+        if remote is not None:
+            sampled = remote["sampled"] if trust_parent() else random.random() < sample_rate()
+            span = Span(name, remote["trace_id"], remote["parent_id"], sampled, None)
+        else:
+            span = Span(name, "%032x" % random.getrandbits(128), None, random.random() < sample_rate(), None)
+    if span.sampled:
+        span.attributes.update(attributes)
+    return span
+
+
+@contextlib.contextmanager
+def span(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Trace the enclosed block; yields the span (None when tracing is off)."""
+    s = start_span(name, traceparent, **attributes)
+    if s is None:
+        yield None
+        return
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+@contextlib.contextmanager
+def attach(s: Optional[Span]) -> Iterator[None]:
+    """Make `s` the current span for the enclosed block (e.g. on a worker thread)."""
+    token = _current.set(s)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def bind(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Return `fn` bound to the caller's context, for thread pools that do not copy it."""
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args: Any, **kwargs: Any) -> Any:
+        # a Context can only be entered by one thread at a time
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return run
@@ -1,7 +1,37 @@
-"""Top-level agents package to proxy to agents-stubs during local testing.
+"""Top-level `agents` package used by tests, the service and `python -m agents.cli`.
 
-This package exists so tests that run `python -m agents.cli` can find a module named
-`agents.cli`. It forwards execution to `agents-stubs/cli.py`.
+`agents.<name>` is an alias of `agents_stubs.agents.<name>` (the real code
+in `agents-stubs/agents/`): importing either name executes the source once
+and returns the same module object, so module state such as model caches
+and monkeypatches is shared. `agents.cli` is the only module that lives
+here.
 """
+import importlib
+import importlib.abc
+import importlib.util
+import sys
 
 __all__ = ["cli"]
+
+_TARGET = "agents_stubs.agents"
+
+
+class _AliasLoader(importlib.abc.Loader):
+    def create_module(self, spec):
+        return importlib.import_module(f"{_TARGET}.{spec.name.split('.', 1)[1]}")
+
+    def exec_module(self, module):
+        pass  # already executed under its real name
+
+
+class _AliasFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path=None, target=None):
+        if not fullname.startswith(f"{__name__}.") or fullname == f"{__name__}.cli":
+            return None
+        if importlib.util.find_spec(f"{_TARGET}.{fullname.split('.', 1)[1]}") is None:
+            return None
+        return importlib.util.spec_from_loader(fullname, _AliasLoader())
+
+
+if not any(isinstance(f, _AliasFinder) for f in sys.meta_path):
+    sys.meta_path.insert(0, _AliasFinder())